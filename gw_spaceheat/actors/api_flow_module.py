@@ -2,7 +2,7 @@ import asyncio
 import json
 import time
 from functools import cached_property
-from typing import List, Literal, Optional, Sequence
+from typing import Literal, Optional, Sequence
 
 import numpy as np
 from aiohttp.web_request import Request
@@ -28,6 +28,14 @@ from gwsproto.named_types import Glitch, PicoMissing
 from pydantic import BaseModel
 from result import Ok, Result
 from drivers.pipe_flow_sensor.signal_processing import butter_lowpass, filtering
+from drivers.pipe_flow_sensor.ticklist import (
+    drop_outliers,
+    exp_weighted_avg,
+    fill_no_flow_gaps,
+    sample_on_change,
+    tick_frequencies,
+    tick_timestamps_ns,
+)
 from scada_app_interface import ScadaAppInterface
 
 FLATLINE_REPORT_S = 60
@@ -86,7 +94,7 @@ class ApiFlowModule(ShNodeActor):
         self.gpm_channel = self.layout.data_channels[f"{self.name}"]
         self.hz_channel = self.layout.data_channels[f"{self.name}-hz"]
 
-        self.nano_timestamps: List[int] = []
+        self.nano_timestamps: np.ndarray = np.array([], dtype=np.int64)
         self.latest_tick_ns = None
         self.latest_hz = None
         self.latest_gpm = None
@@ -434,15 +442,11 @@ class ApiFlowModule(ShNodeActor):
         pi_time_received_post = time.time_ns()
         pico_time_before_post = data.PicoBeforePostTimestampNanoSecond
         pico_time_delay_ns = pi_time_received_post - pico_time_before_post
-        self.nano_timestamps = sorted(
-            list(
-                set(
-                    [
-                        data.FirstTickTimestampNanoSecond + x*1e3 + pico_time_delay_ns
-                        for x in data.RelativeMicrosecondList
-                    ]
-                )
-            )
+        self.nano_timestamps = tick_timestamps_ns(
+            data.FirstTickTimestampNanoSecond,
+            data.RelativeMicrosecondList,
+            unit_ns=1e3,
+            delay_ns=pico_time_delay_ns,
         )
 
     def update_timestamps_for_reed(self, data: TicklistReed) -> None:
@@ -450,15 +454,11 @@ class ApiFlowModule(ShNodeActor):
         pi_time_received_post = time.time_ns()
         pico_time_before_post = data.PicoBeforePostTimestampNanoSecond
         pico_time_delay_ns = pi_time_received_post - pico_time_before_post
-        self.nano_timestamps = sorted(
-            list(
-                set(
-                    [
-                        data.FirstTickTimestampNanoSecond + x*1e6 + pico_time_delay_ns
-                        for x in data.RelativeMillisecondList
-                    ]
-                )
-            )
+        self.nano_timestamps = tick_timestamps_ns(
+            data.FirstTickTimestampNanoSecond,
+            data.RelativeMillisecondList,
+            unit_ns=1e6,
+            delay_ns=pico_time_delay_ns,
         )
 
     def publish_zero_flow(self):
@@ -632,23 +632,24 @@ class ApiFlowModule(ShNodeActor):
 
         # Single tick
         if len(self.nano_timestamps)==1:
+            first_tick_ns = int(self.nano_timestamps[0])
             if self.latest_tick_ns is not None:
-                frequency_hz = 1e9 / (self.nano_timestamps[0] - self.latest_tick_ns)
+                frequency_hz = 1e9 / (first_tick_ns - self.latest_tick_ns)
             else:
                 frequency_hz = 0
             if self.slow_turner:
                 micro_hz_readings = ChannelReadings(
                     ChannelName=self.hz_channel.Name,
                     ValueList=[int(frequency_hz * 1e6)],
-                    ScadaReadTimeUnixMsList=[int(self.nano_timestamps[0]/1e6)]
+                    ScadaReadTimeUnixMsList=[int(first_tick_ns/1e6)]
                 )
             else:
                 micro_hz_readings = ChannelReadings(
                     ChannelName=self.hz_channel.Name,
                     ValueList=[int(frequency_hz * 1e6), 0],
-                    ScadaReadTimeUnixMsList=[int(self.nano_timestamps[0]/1e6), int(self.nano_timestamps[0]/1e6)+100]
+                    ScadaReadTimeUnixMsList=[int(first_tick_ns/1e6), int(first_tick_ns/1e6)+100]
                 )
-            self.latest_tick_ns = self.nano_timestamps[-1]
+            self.latest_tick_ns = first_tick_ns
             self.latest_hz = frequency_hz if self.slow_turner else 0
             return micro_hz_readings
 
@@ -656,18 +657,13 @@ class ApiFlowModule(ShNodeActor):
         # if self.latest_tick_ns:
         #     self.publish_first_frequency()
 
-        # Sort timestamps and compute frequencies
-        timestamps = sorted(self.nano_timestamps)
-        frequencies = [1/(t2-t1)*1e9 for t1,t2 in zip(timestamps[:-1], timestamps[1:])]
-        timestamps = timestamps[:-1]
+        # Compute frequencies (timestamps are already sorted)
+        timestamps, frequencies = tick_frequencies(self.nano_timestamps)
 
         if not self.slow_turner:
             # Remove outliers
-            min_hz, max_hz = 0, 500
-            tf_pairs = [(t,f) for t,f in zip(timestamps, frequencies) if f<=max_hz and f>=min_hz]
-            timestamps = [x[0] for x in tf_pairs]
-            frequencies = [x[1] for x in tf_pairs]
-            if not timestamps:
+            timestamps, frequencies = drop_outliers(timestamps, frequencies, min_hz=0, max_hz=500)
+            if len(timestamps) == 0:
                 return ChannelReadings(
                     ChannelName=self.hz_channel.Name,
                     ValueList=[],
@@ -675,75 +671,59 @@ class ApiFlowModule(ShNodeActor):
                 )
 
             # Add 0 flow when there is more than no_flow_ms between two points
-            new_timestamps, new_frequencies = [], []
-            for i in range(len(timestamps) - 1):
-                new_timestamps.append(timestamps[i]) 
-                new_frequencies.append(frequencies[i])  
-                if timestamps[i+1] - timestamps[i] > self._component.gt.NoFlowMs*1e6:
-                    step_20ms = 0.02*1e9
-                    while new_timestamps[-1] + step_20ms < timestamps[i+1]:
-                        new_timestamps.append(new_timestamps[-1] + step_20ms)
-                        new_frequencies.append(0.001)
-            new_timestamps.append(timestamps[-1])
-            new_frequencies.append(frequencies[-1])
-            sorted_times_values = sorted(zip(new_timestamps, new_frequencies))
-            timestamps, frequencies = zip(*sorted_times_values)
+            timestamps, frequencies = fill_no_flow_gaps(
+                timestamps, frequencies, no_flow_ns=self._component.gt.NoFlowMs*1e6
+            )
 
         # First reading
         first_reading = False
         if self.latest_hz is None:
             first_reading = True
-            self.latest_hz = frequencies[0]
+            self.latest_hz = float(frequencies[0])
 
         # No processing for slow turners
         if self.slow_turner:
-            sampled_timestamps = timestamps
-            smoothed_frequencies = frequencies
-            self.latest_hz = smoothed_frequencies[-1]
-            self.latest_tick_ns = sorted(self.nano_timestamps)[-1]
+            self.latest_hz = float(frequencies[-1])
+            self.latest_tick_ns = int(self.nano_timestamps[-1])
             return ChannelReadings(
                 ChannelName=self.hz_channel.Name,
-                ValueList=[int(x*1e6) for x in smoothed_frequencies],
-                ScadaReadTimeUnixMsList=[int(x/1e6) for x in sampled_timestamps],
+                ValueList=(frequencies * 1e6).astype(np.int64).tolist(),
+                ScadaReadTimeUnixMsList=(timestamps / 1e6).astype(np.int64).tolist(),
             )
 
         # [Processing] Exponential weighted average
         elif self._component.gt.HzCalcMethod == HzCalcMethod.BasicExpWeightedAvg:
-            alpha = self._component.gt.ExpAlpha
-            smoothed_frequencies = [self.latest_hz]*len(frequencies)
-            for t in range(len(frequencies)-1):
-                smoothed_frequencies[t+1] = (1-alpha)*smoothed_frequencies[t] + alpha*frequencies[t+1]
+            smoothed_frequencies = exp_weighted_avg(
+                frequencies, alpha=self._component.gt.ExpAlpha, initial_hz=self.latest_hz
+            )
             sampled_timestamps = timestamps
 
         # [Processing] Butterworth filter
         elif self._component.gt.HzCalcMethod == HzCalcMethod.BasicButterWorth:
             if len(frequencies) > 20:
                 # Add the last recorded frequency before the filtering (avoids overfitting the first point)
-                timestamps = [timestamps[0]-0.01*1e9] + list(timestamps)
-                frequencies = [self.latest_hz] + list(frequencies)
+                timestamps = np.concatenate(([timestamps[0] - 0.01*1e9], timestamps))
+                frequencies = np.concatenate(([self.latest_hz], frequencies))
                 # Re-sample time at sampling frequency f_s
-                f_s = 5 * max(frequencies)
-                sampled_timestamps = np.linspace(min(timestamps), max(timestamps), int((max(timestamps)-min(timestamps))/1e9 * f_s))
+                f_s = 5 * frequencies.max()
+                sampled_timestamps = np.linspace(timestamps[0], timestamps[-1], int((timestamps[-1]-timestamps[0])/1e9 * f_s))
                 # Re-sample frequency accordingly using a linear interpolaton
                 sampled_frequencies = np.interp(sampled_timestamps, timestamps, frequencies)
                 # Butterworth low-pass filter
                 b, a = butter_lowpass(N=5, Wn=self._component.gt.CutoffFrequency, fs=f_s)
                 smoothed_frequencies = filtering(b, a, sampled_frequencies)
                 # Remove points resulting from adding the first recorded frequency
-                smoothed_frequencies = [
-                    smoothed_frequencies[i]
-                    for i in range(len(smoothed_frequencies))
-                    if sampled_timestamps[i]>=timestamps[1]
-                ]
-                sampled_timestamps = [x for x in sampled_timestamps if x>=timestamps[1]]
+                after_first = sampled_timestamps >= timestamps[1]
+                smoothed_frequencies = smoothed_frequencies[after_first[:len(smoothed_frequencies)]]
+                sampled_timestamps = sampled_timestamps[after_first]
             else:
                 self.log(f"Warning: ticklist was too short ({len(frequencies)} instead of minimum 20) for butterworth.")
                 sampled_timestamps = timestamps
                 smoothed_frequencies = frequencies
 
         # Sanity checks after processing
-        if not sampled_timestamps or len(sampled_timestamps) != len(smoothed_frequencies) :
-            if not sampled_timestamps:
+        if len(sampled_timestamps) == 0 or len(sampled_timestamps) != len(smoothed_frequencies):
+            if len(sampled_timestamps) == 0:
                 glitch_summary = "Filtering resulted in a list of length 0"
             else:
                 glitch_summary = "Sampled Timestamps and Smoothed Frequencies not the same length!"
@@ -754,10 +734,10 @@ class ApiFlowModule(ShNodeActor):
                     Node=self.node.name,
                     Type=LogLevel.Warning,
                     Summary=glitch_summary,
-                    Details=f"get_micro_hz_readings, nano_timestamps were {self.nano_timestamps}"
+                    Details=f"get_micro_hz_readings, nano_timestamps were {self.nano_timestamps.tolist()}"
                 )
             )
-            if not sampled_timestamps:
+            if len(sampled_timestamps) == 0:
                 return ChannelReadings(
                     ChannelName=self.hz_channel.Name,
                     ValueList=[],
@@ -765,23 +745,20 @@ class ApiFlowModule(ShNodeActor):
                 )
             else:
                 raise Exception("Sampled Timestamps and Smoothed Frequencies not the same length!")
-        
+
         # Record Hz on change
         threshold_gpm = self._component.gt.AsyncCaptureThresholdGpmTimes100 / 100
         gallons_per_tick = self._component.gt.ConstantGallonsPerTick
         threshold_hz = threshold_gpm / 60 / gallons_per_tick
         if first_reading:
-            self.latest_hz = smoothed_frequencies[0]
-        micro_hz_list = [int(self.latest_hz * 1e6)]
-        unix_ms_times = [int(sampled_timestamps[0] / 1e6)]
-        for i in range(1, len(smoothed_frequencies)):
-            if abs(smoothed_frequencies[i] - micro_hz_list[-1]/1e6) > threshold_hz:
-                micro_hz_list.append(int(smoothed_frequencies[i] * 1e6))
-                unix_ms_times.append(int(sampled_timestamps[i] / 1e6))
+            self.latest_hz = float(smoothed_frequencies[0])
+        micro_hz_list, unix_ms_times = sample_on_change(
+            smoothed_frequencies, sampled_timestamps, threshold_hz, initial_hz=self.latest_hz
+        )
         self.latest_hz = micro_hz_list[-1]/1e6
-        self.latest_tick_ns = sorted(self.nano_timestamps)[-1]
+        self.latest_tick_ns = int(self.nano_timestamps[-1])
         micro_hz_list = [x if x>0 else 0 for x in micro_hz_list]
-        
+
         return ChannelReadings(
             ChannelName=self.hz_channel.Name,
             ValueList=micro_hz_list,
@@ -5,8 +5,10 @@ import time
 from functools import cached_property
 from typing import Optional, Sequence
 
+import numpy as np
 from aiohttp.web_request import Request
 from aiohttp.web_response import Response
+from gwsproto.conversions.thermistor import volts_to_temp_c
 from gwsproto.errors import DcError
 from gwproactor import MonitoredName, Problems
 from gwproactor.message import PatInternalWatchdogMessage
@@ -243,21 +245,27 @@ class ApiTankModule(ShNodeActor):
 
         channel_name_list = []
         value_list = []
+        volts_list = np.asarray(data.MicroVoltsList, dtype=float) / 1e6
+        temps_c = None
+        if self._component.gt.TempCalcMethod == TempCalcMethod.SimpleBeta:
+            # the whole batch in one call; nan marks a disconnected thermistor
+            temps_c = self.simple_beta_temps_c(volts_list)
         for i, incoming_about in enumerate(data.AboutNodeNameList):
             correct_about_name = depth_map.get(incoming_about, incoming_about)
     
-            volts = data.MicroVoltsList[i] / 1e6
+            volts = volts_list[i]
             if self._component.gt.SendMicroVolts:
                 value_list.append(data.MicroVoltsList[i])
                 channel_name_list.append(f"{correct_about_name}-micro-v")
                 #print(f"Updated {channel_name_list[-1]}: {round(volts,3)} V")
             if volts <= 0:
                 continue
-            elif self._component.gt.TempCalcMethod == TempCalcMethod.SimpleBeta:
-                try:
-                    value_list.append(int(self.simple_beta(volts) * 1000))
+            elif temps_c is not None:
+                if not math.isnan(temps_c[i]):
+                    value_list.append(int(round(float(temps_c[i]), 2) * 1000))
                     channel_name_list.append(f"{correct_about_name}-device") # channel names match node names
-                except BaseException as e:
+                else:
+                    e = ValueError("Disconnected thermistor!")
                     self.log(f"Problem with simple_beta({volts})! {e}")
                     self.services.send_threadsafe(
                         Message(
@@ -345,34 +353,37 @@ class ApiTankModule(ShNodeActor):
     def simple_beta(self, volts: float, fahrenheit=False) -> float:
         """ Return temperature as a function of volts. Default Celsius. Use 
         standard beta function (self._component.gt.TempCalcMethod = TempCalcMethod.SimpleBeta)
-        """
-        if self._component.gt.TempCalcMethod != TempCalcMethod.SimpleBeta:
-            raise Exception(f"Only call when TempCalcMethod is SimpleBeta, not {self._component.gt.TempCalcMethod }")
-        r_therm = R_FIXED_KOHMS * volts/(PICO_VOLTS-volts)
-        if r_therm <= 0:
-            raise ValueError("Disconnected thermistor!")
 
-        return self.temp_beta(r_therm, fahrenheit=fahrenheit)
-
-    def temp_beta(self, r_therm_kohms: float, fahrenheit: bool = False) -> float:
-        """
-        beta formula specs for the Amphenol MA100GG103BN
+        Beta formula specs for the Amphenol MA100GG103BN
         Uses T0 and R0 are a matching pair of values: this is a 10 K thermistor
         which means at 25 deg C (T0) it has a resistance of 10K Ohms
 
         [More info](https://drive.google.com/drive/u/0/folders/1f8SaqCHOFt8iJNW64A_kNIBGijrJDlsx)
         """
-        t0, r0 = (
-            THERMISTOR_T0,
-            THERMISTOR_R0_KOHMS,
-        )
-        beta = self._component.gt.ThermistorBeta
-        r_therm = r_therm_kohms
-        temp_c = 1 / ((1 / t0) + (math.log(r_therm / r0) / beta)) - 273
-
+        if self._component.gt.TempCalcMethod != TempCalcMethod.SimpleBeta:
+            raise Exception(f"Only call when TempCalcMethod is SimpleBeta, not {self._component.gt.TempCalcMethod }")
+        try:
+            temp_c = volts_to_temp_c(volts, **self.beta_params)
+        except ValueError:
+            raise ValueError("Disconnected thermistor!")
         temp_f = 32 + (temp_c * 9 / 5)
         return round(temp_f, 2) if fahrenheit else round(temp_c, 2)
 
+    def simple_beta_temps_c(self, volts: np.ndarray) -> np.ndarray:
+        """simple_beta for a batch of voltages, unrounded, nan where the
+        thermistor looks disconnected"""
+        return volts_to_temp_c(volts, **self.beta_params)
+
+    @cached_property
+    def beta_params(self) -> dict:
+        return {
+            "beta": self._component.gt.ThermistorBeta,
+            "r0": THERMISTOR_R0_KOHMS,
+            "r_divider": R_FIXED_KOHMS,
+            "supply_v": PICO_VOLTS,
+            "t0_k": THERMISTOR_T0,
+        }
+
     def thermistor_resistance(self, volts):
         r_fixed = R_FIXED_KOHMS
         r_pico = self._component.gt.PicoKOhms
@@ -39,11 +39,22 @@ class ScadaSettings(AppSettings):
     power_meter_logging_level: int = logging.WARNING
     contract_rep_logging_level: int = logging.INFO
     relay_multiplexer_logging_level: int = logging.INFO
+    # How often the 0-10V multiplexer rewrites every output. 0 to disable.
+    dfr_refresh_seconds: int = 300
     paho_logging: bool = False
     local_mqtt: MQTTClient = MQTTClient(tls=TLSInfo(use_tls=False))
     gridworks_mqtt: MQTTClient = MQTTClient(tls=TLSInfo(use_tls=False))
     seconds_per_report: int = 300
+    # Send ChannelReadingsCompact in reports once the LTN advertises support
+    compact_reports: bool = False
     seconds_per_snapshot: int = 30
+    # Every Nth snapshot is sent in full; the ones in between are
+    # SnapshotSpaceheatDelta. 1 sends every snapshot in full.
+    snapshots_per_keyframe: int = 1
+    # How often LoopHealth is sent upstream. 0 to disable.
+    loop_health_seconds: int = 300
+    # Event loop callbacks longer than this are recorded in LoopHealth
+    slow_callback_ms: int = 100
     async_power_reporting_threshold: float = 0.02
     persister: PersisterSettings = PersisterSettings()
     admin: AdminLinkSettings = AdminLinkSettings(tls=TLSInfo(use_tls=False))
@@ -1,13 +1,11 @@
 import time
-import json
 import pytz
 import asyncio
 import aiohttp
-import math
 import numpy as np
 from typing import Optional, Sequence
 from result import Ok, Result
-from datetime import datetime,  timezone
+from datetime import datetime
 from gwproto import Message
 
 from gwsproto.data_classes.sh_node import ShNode
@@ -15,6 +13,12 @@ from gwsproto.named_types import SingleReading, SyncedReadings
 from gwproactor import MonitoredName
 from gwproactor.message import PatInternalWatchdogMessage
 
+from actors.forecast_store import (
+    FALLBACK_WEATHER_CHANNEL, FORECAST_STORE_NAME, WEATHER, ForecastFetcher, ForecastStore,
+    WeatherGovSource, hour_start,
+)
+from actors.discharge_model import DischargeModel, rswt_quadratic_params
+from actors.message_dispatcher import DispatchErrorPolicy, MessageDispatcher
 from actors.sh_node_actor import ShNodeActor
 from gwsproto.conversions.temperature import convert_temp_to_f
 from gwsproto.enums import SystemMode, SeasonalStorageMode
@@ -52,6 +56,12 @@ class DerivedGenerator(ShNodeActor):
         # used by the rswt quad params calculator
         self._cached_params: Optional[Ha1Params] = None 
         self._rswt_quadratic_params: Optional[np.ndarray] = None 
+        # used by rwt_f and the storage discharge simulations
+        self._discharge_model: Optional[DischargeModel] = None
+        self._required_swt_key: Optional[tuple[HeatingForecast, bool]] = None
+        self._required_swt: Optional[float] = None
+        # opened on the first weather fetch
+        self._forecast_fetcher: Optional[ForecastFetcher] = None
     
         self.log(f"self.timezone: {self.timezone}")
         self.log(f"self.latitude: {self.latitude}")
@@ -61,6 +71,12 @@ class DerivedGenerator(ShNodeActor):
         self.weather_forecast: Optional[WeatherForecast] = None
         self.coldest_oat_by_month = [-3, -7, 1, 21, 30, 31, 46, 47, 28, 24, 16, 0]
         self.tmap: TankTempCalibrationMap = TankTempCalibrationMap.model_validate(getattr(self.node, "TankTempCalibrationMap"))
+
+        self._dispatcher = MessageDispatcher(
+            on_error=self.log, default_error_policy=DispatchErrorPolicy.Raise
+        )
+        self._dispatcher.register(ScadaParams, self.process_scada_params)
+        self._dispatcher.register(SyncedReadings, self.process_synced_readings)
     
     @property
     def params(self) -> Ha1Params:
@@ -78,14 +94,7 @@ class DerivedGenerator(ShNodeActor):
         from required source water temp, recalculating if necessary
         """
         if self.params != self._cached_params:
-            intermediate_rswt = self.params.IntermediateRswtF
-            dd_rswt = self.params.DdRswtF
-            intermediate_power = self.params.IntermediatePowerKw
-            dd_power = self.params.DdPowerKw
-            x_rswt = np.array([self.no_power_rswt, intermediate_rswt, dd_rswt])
-            y_hpower = np.array([0, intermediate_power, dd_power])
-            A = np.vstack([x_rswt**2, x_rswt, np.ones_like(x_rswt)]).T
-            self._rswt_quadratic_params = np.linalg.solve(A, y_hpower)
+            self._rswt_quadratic_params = rswt_quadratic_params(self.params)
             self._cached_params = self.params
             self.log(f"Calculating rswt_quadratic_params: {self._rswt_quadratic_params}")
         
@@ -93,6 +102,40 @@ class DerivedGenerator(ShNodeActor):
             raise Exception("_rswt_quadratic_params should have been set here!!")
         return self._rswt_quadratic_params
 
+    @property
+    def discharge_model(self) -> DischargeModel:
+        """Rebuilt only when Ha1Params or the required SWT for the coming
+        on-peak change. Requires self.heating_forecast"""
+        required_swt = self.required_swt_for_discharge()
+        model = self._discharge_model
+        if model is None or model.params != self.params or model.required_swt != required_swt:
+            self._discharge_model = DischargeModel(self.params, required_swt)
+        return self._discharge_model
+
+    def required_swt_for_discharge(self) -> float:
+        """Hottest required SWT over the on-peak hours rwt_f discharges for:
+        morning and afternoon overnight and in the morning, otherwise just
+        the afternoon"""
+        if self.heating_forecast is None:
+            raise RuntimeError(
+                "rwt_f called before heating_forecast is available"
+            )
+        timenow = datetime.now(self.timezone)
+        morning_and_afternoon = timenow.hour > 19 or timenow.hour < 12
+        if (
+            self._required_swt_key is None
+            or self._required_swt_key[0] is not self.heating_forecast
+            or self._required_swt_key[1] != morning_and_afternoon
+        ):
+            forecasts_times_tz = [datetime.fromtimestamp(x, tz=self.timezone) for x in self.heating_forecast.Time]
+            on_peak_hours = [7,8,9,10,11,16,17,18,19] if morning_and_afternoon else [16,17,18,19]
+            self._required_swt = max(
+                [rswt for t, rswt in zip(forecasts_times_tz, self.heating_forecast.RswtF)
+                if t.hour in on_peak_hours]
+                )
+            self._required_swt_key = (self.heating_forecast, morning_and_afternoon)
+        return self._required_swt
+
     def start(self) -> None:
         self.services.add_task(
             asyncio.create_task(self.main(), name="Synth Generator keepalive")
@@ -135,14 +178,15 @@ class DerivedGenerator(ShNodeActor):
         from_node = self.layout.node(message.Header.Src)
         if not from_node:
             return Ok(True) # or not?
-        match message.Payload:
-            case ScadaParams():
-                self.log("Received new parameters, time to recompute forecasts!")
-                self.received_new_params = True
-            case SyncedReadings():
-                self.process_synced_readings(from_node, message.Payload)
+        self._dispatcher.dispatch(from_node, message.Payload)
         return Ok(True)
 
+    def process_scada_params(self, from_node: ShNode, payload: ScadaParams) -> None:
+        self.log("Received new parameters, time to recompute forecasts!")
+        self.received_new_params = True
+        self._cached_params = None
+        self._discharge_model = None
+
     def hack_maple_primary_flow(self, from_node: ShNode, payload: SyncedReadings) -> None:
         """
         Compute primary-flow = sieg-send + sieg-flow using one fresh value
@@ -284,33 +328,10 @@ class DerivedGenerator(ShNodeActor):
 
         mass_kg_per_layer = gallons_per_layer * self.GALLON_PER_LITER
 
-        usable_kwh = 0
-        while True:
-            hottest_f = simulated_layers_f[0]
-            rwt_f =self.rwt_f(hottest_f)
-
-            if rwt_f is None:
-                return
-            if round(hottest_f) == round(rwt_f):
-                simulated_layers_f = [
-                    sum(simulated_layers_f) / len(simulated_layers_f)
-                ] * len(simulated_layers_f)
-
-                if round(simulated_layers_f[0]) == round(rwt_f):
-                    break
-
-            delta_c = (hottest_f - rwt_f) * 5 / 9
-
-            # add this layer's delta energy
-            usable_kwh += (
-                mass_kg_per_layer
-                * self.WATER_SPECIFIC_HEAT_KWH_PER_KG_C # kWh needed to raise 1 liter 1 deg C
-                * delta_c
-            )
-            # pop the layer
-            simulated_layers_f = (
-                simulated_layers_f[1:] + [rwt_f]
-            )
+        usable_kwh = self.discharge_model.usable_kwh(
+            simulated_layers_f,
+            mass_kg_per_layer * self.WATER_SPECIFIC_HEAT_KWH_PER_KG_C * 5/9,
+        )
 
         # self.log(f"Usable energy: {round(usable_kwh,1)} kWh")
 
@@ -333,16 +354,9 @@ class DerivedGenerator(ShNodeActor):
             self.last_evaluated_strategy = time.time()
         else:
             return
-        simulated_layers = [self.params.MaxEwtF]*3   
-        max_buffer_usable_kwh = 0
-        while True:
-            if round(self.rwt_f(simulated_layers[0])) == round(simulated_layers[0]):
-                simulated_layers = [sum(simulated_layers)/len(simulated_layers) for x in simulated_layers]
-                if round(self.rwt_f(simulated_layers[0])) == round(simulated_layers[0]):
-                    break
-            delta_t_celcius = (simulated_layers[0] - self.rwt_f(simulated_layers[0])) * 5/9
-            max_buffer_usable_kwh += self.LITERS_PER_LAYER * self.WATER_SPECIFIC_HEAT_KWH_PER_KG_C * delta_t_celcius
-            simulated_layers = simulated_layers[1:] + [self.rwt_f(simulated_layers[0])]          
+        max_buffer_usable_kwh = self.discharge_model.max_storage_kwh(
+            3, self.params.MaxEwtF, self.kwh_per_layer_f
+        )
         self.log(f"Max buffer usable energy: {round(max_buffer_usable_kwh,1)} kWh")
         required_energy = self.data.latest_channel_values.get(H0CN.required_energy, 0)
         if round(max_buffer_usable_kwh,1) < round(required_energy,1):
@@ -391,17 +405,9 @@ class DerivedGenerator(ShNodeActor):
         else:
             raise Exception(f"not prepared for seasonal storage mode {self.settings.seasonal_storage_mode}")
 
-        simulated_layers = [self.params.MaxEwtF + 10] * num_layers
-        max_storage_kwh = 0
-        while True:
-            if round(self.rwt_f(simulated_layers[0])) == round(simulated_layers[0]):
-                simulated_layers = [sum(simulated_layers)/len(simulated_layers) for x in simulated_layers]
-                if round(self.rwt_f(simulated_layers[0])) == round(simulated_layers[0]):
-                    break
-
-            delta_t_celcius = (simulated_layers[0] - self.rwt_f(simulated_layers[0])) * 5/9
-            max_storage_kwh += self.LITERS_PER_LAYER * self.WATER_SPECIFIC_HEAT_KWH_PER_KG_C * delta_t_celcius
-            simulated_layers = simulated_layers[1:] + [self.rwt_f(simulated_layers[0])]
+        max_storage_kwh = self.discharge_model.max_storage_kwh(
+            num_layers, self.params.MaxEwtF + 10, self.kwh_per_layer_f
+        )
         if (((time_now.weekday()<4 or time_now.weekday()==6) and time_now.hour>=20) or (time_now.weekday()<5 and time_now.hour<=6)):
             self.log('Preparing for a morning onpeak + afternoon onpeak')
             weather_forecasts_times_tz = [datetime.fromtimestamp(x, tz=self.timezone) for x in self.weather_forecast.Time]
@@ -432,6 +438,11 @@ class DerivedGenerator(ShNodeActor):
                 ),
             )
 
+    @property
+    def kwh_per_layer_f(self) -> float:
+        """Energy to cool one tank layer by 1 F"""
+        return self.LITERS_PER_LAYER * self.WATER_SPECIFIC_HEAT_KWH_PER_KG_C * 5/9
+
     def delta_T(self, swt: float) -> float:
         a, b, c = self.rswt_quadratic_params
         delivered_heat_power = a*swt**2 + b*swt + c
@@ -454,105 +465,49 @@ class DerivedGenerator(ShNodeActor):
         c2 = c - required_kw_thermal
         return round((-b + (b**2-4*a*c2)**0.5)/(2*a), 2)
     
+    @property
+    def forecast_fetcher(self) -> ForecastFetcher:
+        if self._forecast_fetcher is None:
+            self._forecast_fetcher = ForecastFetcher(
+                ForecastStore(self.settings.paths.data_dir / FORECAST_STORE_NAME),
+                [WeatherGovSource(self.latitude, self.longitude, self.timezone)],
+                logger=self.services.logger,
+            )
+        return self._forecast_fetcher
+
     async def get_weather(self, session: aiohttp.ClientSession) -> None:
-        config_dir = self.settings.paths.config_dir
-        weather_file = config_dir / "weather.json"
-        try:
-            url = f"https://api.weather.gov/points/{self.latitude},{self.longitude}"
-            response = await session.get(url)
-            if response.status != 200:
-                self.log(f"Error fetching weather forecast url: {response.status}")
-                raise Exception()
-            
-            data = await response.json()
-            forecast_hourly_url = data['properties']['forecastHourly']
-            forecast_response = await session.get(forecast_hourly_url)
-            if forecast_response.status != 200:
-                self.log(f"Error fetching hourly weather forecast: {forecast_response.status}")
-                raise Exception()
-            
-            forecast_data = await forecast_response.json()
-            forecasts_all = {
-                datetime.fromisoformat(period['startTime']): 
-                period['temperature']
-                for period in forecast_data['properties']['periods']
-                if 'temperature' in period and 'startTime' in period 
-                and datetime.fromisoformat(period['startTime']) > datetime.now(tz=self.timezone)
-            }
-            ws_forecasts_all = {
-                datetime.fromisoformat(period['startTime']): 
-                int(period['windSpeed'].replace(' mph',''))
-                for period in forecast_data['properties']['periods']
-                if 'windSpeed' in period and 'startTime' in period 
-                and datetime.fromisoformat(period['startTime']) > datetime.now(tz=self.timezone)
-            }
-            forecasts_48h = dict(list(forecasts_all.items())[:48])
-            ws_forecasts_48h = dict(list(ws_forecasts_all.items())[:48])
-            weather = {
-                'time': [int(x.astimezone(timezone.utc).timestamp()) for x in list(forecasts_48h.keys())],
-                'oat': list(forecasts_48h.values()),
-                'ws': list(ws_forecasts_48h.values())
-                }
-            self.log(f"Obtained a {len(forecasts_all)}-hour weather forecast starting at {weather['time'][0]}")
-
-            # Save 96h weather forecast to a local file
-            forecasts_96h = dict(list(forecasts_all.items())[:96])
-            ws_forecasts_96h = dict(list(ws_forecasts_all.items())[:96])
-            weather_96h = {
-                'time': [int(x.astimezone(timezone.utc).timestamp()) for x in list(forecasts_96h.keys())],
-                'oat': list(forecasts_96h.values()),
-                'ws': list(ws_forecasts_96h.values()),
-                }
-            with open(weather_file, 'w') as f:
-                json.dump(weather_96h, f, indent=4) 
-        
-        except Exception as e:
-            self.log(f"[!] Unable to get weather forecast from API: {e}")
-            try:
-                # Try reading an old forecast from local file
-                with open(weather_file, 'r') as f:
-                    weather_96h = json.load(f)
-                    self.weather_96h = weather_96h
-                if weather_96h['time'][-1] >= time.time()+ 48*3600:
-                    self.log("A valid weather forecast is available locally.")
-                    seconds_late = time.time() - weather_96h['time'][0]
-                    hours_late = math.ceil(seconds_late/3600)
-                    weather = {}
-                    for key in weather_96h:
-                        weather[key] = weather_96h[key][hours_late:hours_late+48]
-                    self.first_time = weather['time'][0]
-                    if weather['oat'] == []:
-                        raise Exception()
-                    if weather['time'][0] < time.time():
-                        raise Exception(f"Weather forecast start of {weather['time'][0]} is in the past!! Check math")
-                else:
-                    self.log("No valid weather forecasts available locally. Using coldest of the current month.")
-                    current_month = datetime.now().month-1
-                    weather = {
-                        'time': [int(time.time()+(1+x)*3600) for x in range(48)],
-                        'oat': [self.coldest_oat_by_month[current_month]]*48,
-                        'ws': [0]*48,
-                        }
-            except Exception as e:
-                self.log(f"Issue getting local weather forecast! Using coldest of the current month.\n Issue: {e}")
-                current_month = datetime.now().month-1
-                weather = {
-                    'time': [int(time.time()+(1+x)*3600) for x in range(48)],
-                    'oat': [self.coldest_oat_by_month[current_month]]*48,
-                    'ws': [0]*48,
-                    }
+        fetcher = self.forecast_fetcher
+        forecast = await fetcher.fetch(WEATHER, session)
+        if forecast is not None:
+            self.log(f"Obtained a {len(forecast)}-hour weather forecast starting at {forecast.hour_start_s[0]}")
+        stored = fetcher.store.hours(WEATHER, hour_start(time.time()) + 3600, 48)
         # International Civil Aviation Organization: 4-char alphanumeric code
         # assigned to airports and weather observation stations
         ICAO_CODE = "KMLT"
         WEATHER_CHANNEL = f"weather.gov.{ICAO_CODE}".lower()
-
-        self.weather_forecast = WeatherForecast(
-            FromGNodeAlias=self.layout.scada_g_node_alias,
-            WeatherChannelName=WEATHER_CHANNEL,
-            Time = weather['time'],
-            OatF = weather['oat'],
-            WindSpeedMph= weather['ws'],
-        )
+        if len(stored) == 48:
+            if forecast is None:
+                self.log("A valid weather forecast is available locally.")
+            self.weather_forecast = WeatherForecast(
+                FromGNodeAlias=self.layout.scada_g_node_alias,
+                WeatherChannelName=WEATHER_CHANNEL,
+                Time=stored.hour_start_s,
+                OatF=stored.fields['oat'],
+                WindSpeedMph=stored.fields['ws'],
+                # when the stored hours were fetched, so the LTN can tell
+                # how old they are
+                ForecastCreatedS=fetcher.store.fetched_s(WEATHER) or int(time.time()),
+            )
+        else:
+            self.log("No valid weather forecasts available locally. Using coldest of the current month.")
+            current_month = datetime.now().month-1
+            self.weather_forecast = WeatherForecast(
+                FromGNodeAlias=self.layout.scada_g_node_alias,
+                WeatherChannelName=FALLBACK_WEATHER_CHANNEL,
+                Time=[int(time.time()+(1+x)*3600) for x in range(48)],
+                OatF=[self.coldest_oat_by_month[current_month]]*48,
+                WindSpeedMph=[0]*48,
+            )
 
     async def get_forecasts(self, session: aiohttp.ClientSession):
     
@@ -584,7 +539,10 @@ class DerivedGenerator(ShNodeActor):
         # downstream actors treat the forecast as a trigger, not as state.
         self.data.heating_forecast = hf
         self._send_to(self.ltn, hf)
-        self._send_to(self.ltn, self.weather_forecast)
+        # The fallback is not a forecast: keep it out of the LTN's store so
+        # the LTN fetches the weather itself
+        if self.weather_forecast.WeatherChannelName != FALLBACK_WEATHER_CHANNEL:
+            self._send_to(self.ltn, self.weather_forecast)
 
         if not self.first_required_energy_update_done:
             self.log("Updating usable and required energy")
@@ -614,26 +572,4 @@ class DerivedGenerator(ShNodeActor):
         It is a load- and forecast-limited effective return temperature.
         Requires self.heating_forecast
         """
-        if self.heating_forecast is None:
-            raise RuntimeError(
-                "rwt_f called before heating_forecast is available"
-            )
-        forecasts_times_tz = [datetime.fromtimestamp(x, tz=self.timezone) for x in self.heating_forecast.Time]
-        timenow = datetime.now(self.timezone)
-        if timenow.hour > 19 or timenow.hour < 12:
-            required_swt = max(
-                [rswt for t, rswt in zip(forecasts_times_tz, self.heating_forecast.RswtF)
-                if t.hour in [7,8,9,10,11,16,17,18,19]]
-                )
-        else:
-            required_swt = max(
-                [rswt for t, rswt in zip(forecasts_times_tz, self.heating_forecast.RswtF)
-                if t.hour in [16,17,18,19]]
-                )
-        if swt_f < required_swt - 10:
-            delta_t = 0
-        elif swt_f < required_swt:
-            delta_t = self.delta_T(required_swt) * (swt_f-(required_swt-10))/10
-        else:
-            delta_t = self.delta_T(swt_f)
-        return round(swt_f - delta_t,2)
+        return float(self.discharge_model.rwt_f(swt_f))
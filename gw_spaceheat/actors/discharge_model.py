@@ -0,0 +1,112 @@
+"""Forecast-limited discharge of stratified storage, used by DerivedGenerator.
+
+Everything here depends only on Ha1Params and the required source water
+temperature for the coming on-peak, so DerivedGenerator keeps one
+DischargeModel until either changes instead of re-deriving the curves on
+every pass through its discharge simulations.
+"""
+from typing import Sequence, Union
+
+import numpy as np
+
+from gwsproto.named_types import Ha1Params
+
+FloatOrArray = Union[float, np.ndarray]
+
+
+def rswt_quadratic_params(params: Ha1Params) -> np.ndarray:
+    """Coefficients (a, b, c) of heating power a*rswt**2 + b*rswt + c,
+    through zero power at the no-load temperature and the intermediate and
+    design day points"""
+    alpha = params.AlphaTimes10 / 10
+    beta = params.BetaTimes100 / 100
+    no_power_rswt = -alpha/beta
+    x_rswt = np.array([no_power_rswt, params.IntermediateRswtF, params.DdRswtF])
+    y_hpower = np.array([0, params.IntermediatePowerKw, params.DdPowerKw])
+    A = np.vstack([x_rswt**2, x_rswt, np.ones_like(x_rswt)]).T
+    return np.linalg.solve(A, y_hpower)
+
+
+class DischargeModel:
+    """Return water temperature and usable energy when discharging storage
+    to meet a required source water temperature.
+
+    rwt_f, delta_T and the simulations accept numpy arrays as well as
+    floats. max_storage_kwh is memoized per layer count and starting
+    temperature.
+    """
+
+    def __init__(self, params: Ha1Params, required_swt: float):
+        self.params = params
+        self.required_swt = required_swt
+        self.quadratic_params = rswt_quadratic_params(params)
+        self._delta_t_per_kw = params.DdDeltaTF / params.DdPowerKw
+        self.required_delta_t = float(self.delta_T(required_swt))
+        self._max_storage_kwh: dict[tuple[int, float, float], float] = {}
+
+    def delta_T(self, swt: FloatOrArray) -> FloatOrArray:
+        a, b, c = self.quadratic_params
+        delivered_heat_power = a*swt**2 + b*swt + c
+        return np.maximum(self._delta_t_per_kw * delivered_heat_power, 0)
+
+    def rwt_f(self, swt_f: FloatOrArray) -> FloatOrArray:
+        """See DerivedGenerator.rwt_f"""
+        swt_f = np.asarray(swt_f, dtype=np.float64)
+        required_swt = self.required_swt
+        delta_t = np.where(
+            swt_f < required_swt - 10,
+            0,
+            np.where(
+                swt_f < required_swt,
+                self.required_delta_t * (swt_f-(required_swt-10))/10,
+                self.delta_T(swt_f),
+            ),
+        )
+        return np.round(swt_f - delta_t, 2)
+
+    def usable_kwh(self, layers_f: Sequence[float], kwh_per_layer_f: float) -> float:
+        """Energy drawn discharging layers_f, hottest first, until the
+        layers mix down to the return water temperature.
+
+        Each pass pops every layer, hottest first, and puts its return water
+        in at the bottom, so a whole pass is one vectorized rwt_f. When the
+        popped layer can no longer give up heat the store is mixed and, unless
+        the mix is also spent, the simulation continues from there.
+        """
+        queue = [float(x) for x in layers_f]
+        n = len(queue)
+        drawn_f = 0.0
+        while True:
+            hottest = np.array(queue)
+            rwt = self.rwt_f(hottest)
+            spent = np.round(hottest) == np.round(rwt)
+            if not spent.any():
+                drawn_f += float((hottest - rwt).sum())
+                queue = rwt.tolist()
+                continue
+            j = int(spent.argmax())
+            drawn_f += float((hottest[:j] - rwt[:j]).sum())
+            queue = queue[j:] + rwt[:j].tolist()
+            hottest_f, rwt_f = float(hottest[j]), float(rwt[j])
+            mixed_f = sum(queue) / n
+            if round(mixed_f) == round(rwt_f):
+                break
+            drawn_f += hottest_f - rwt_f
+            queue = [mixed_f] * (n - 1) + [rwt_f]
+        return drawn_f * kwh_per_layer_f
+
+    def max_storage_kwh(self, num_layers: int, start_f: float, kwh_per_layer_f: float) -> float:
+        """Energy drawn discharging num_layers layers that all start at
+        start_f.
+
+        The layers stay equal, so every pass lowers them all from v to
+        rwt_f(v) and the energy telescopes to the drop from start_f to the
+        first temperature that can give up no more heat.
+        """
+        key = (num_layers, start_f, kwh_per_layer_f)
+        if key not in self._max_storage_kwh:
+            v = start_f
+            while round(float(self.rwt_f(v))) != round(v):
+                v = float(self.rwt_f(v))
+            self._max_storage_kwh[key] = num_layers * (start_f - v) * kwh_per_layer_f
+        return self._max_storage_kwh[key]
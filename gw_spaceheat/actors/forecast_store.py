@@ -0,0 +1,303 @@
+"""Hourly weather and price forecasts, kept in a local SQLite file.
+
+ForecastStore holds one value per (source, hour start, field), so the
+current hour is a primary key lookup and a forecast window is an index range
+scan. Every put is one transaction that also drops hours older than the
+retention, so readers never see half a forecast and the file stays small.
+
+ForecastFetcher pulls a forecast from a ForecastSource and puts it in the
+store. Sources are small objects with an async fetch; the HTTP ones
+(WeatherGovSource, PriceServiceSource) can be swapped for a StubSource in
+tests or offline runs.
+
+SCADA's DerivedGenerator fetches the weather and forwards it to the LTN as a
+WeatherForecast, which the LTN stores, so api.weather.gov is asked once per
+house. The LTN fetches the weather itself only when SCADA's copy is stale.
+Forwarded copies are recorded apart from the store's own fetches, and
+SCADA's coldest-of-the-month fallback is never stored.
+"""
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Mapping, NamedTuple, Optional, Protocol, Sequence
+
+import aiohttp
+import pytz
+from gwproactor.logger import LoggerOrAdapter
+
+WEATHER = "weather"
+PRICE = "price"
+
+FORECAST_STORE_NAME = "forecasts.sqlite"
+# WeatherChannelName of the WeatherForecast SCADA makes up when it has no
+# real forecast. Not a forecast of anything, so it is never stored.
+FALLBACK_WEATHER_CHANNEL = "fallback.coldest.oat.of.month"
+HOUR_S = 3600
+DEFAULT_RETENTION_HOURS = 14 * 24
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecast_value (
+    source TEXT NOT NULL,
+    hour_start_s INTEGER NOT NULL,
+    field TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (source, hour_start_s, field)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS forecast_fetch (
+    source TEXT PRIMARY KEY,
+    fetched_s INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS forecast_forward (
+    source TEXT PRIMARY KEY,
+    fetched_s INTEGER NOT NULL
+);
+"""
+
+
+class HourlyForecast(NamedTuple):
+    """Values per field, one for each hour start in hour_start_s"""
+
+    source: str
+    hour_start_s: list[int]
+    fields: dict[str, list[float]]
+
+    def __len__(self) -> int:  # type: ignore[override]
+        return len(self.hour_start_s)
+
+
+class ForecastStore:
+    def __init__(self, path: Path | str, retention_hours: int = DEFAULT_RETENTION_HOURS):
+        self.path = Path(path)
+        self.retention_hours = retention_hours
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def put(
+        self, forecast: HourlyForecast, fetched_s: Optional[int] = None, forwarded: bool = False
+    ) -> None:
+        """Insert or replace the forecast's hours in one transaction. A
+        forwarded forecast was fetched elsewhere at fetched_s; its time goes
+        in forwarded_s rather than fetched_s."""
+        for field, values in forecast.fields.items():
+            if len(values) != len(forecast.hour_start_s):
+                raise ValueError(
+                    f"{forecast.source}.{field}: {len(values)} values for "
+                    f"{len(forecast.hour_start_s)} hours"
+                )
+        if fetched_s is None:
+            fetched_s = int(time.time())
+        rows = [
+            (forecast.source, hour_start(t), field, float(v))
+            for field, values in forecast.fields.items()
+            for t, v in zip(forecast.hour_start_s, values)
+        ]
+        oldest_kept_s = hour_start(fetched_s) - self.retention_hours * HOUR_S
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO forecast_value VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO forecast_forward VALUES (?, ?)"
+                if forwarded
+                else "INSERT OR REPLACE INTO forecast_fetch VALUES (?, ?)",
+                (forecast.source, fetched_s),
+            )
+            self._conn.execute(
+                "DELETE FROM forecast_value WHERE hour_start_s < ?", (oldest_kept_s,)
+            )
+
+    def hour(self, source: str, hour_start_s: int) -> Optional[dict[str, float]]:
+        """The fields stored for one hour, or None"""
+        rows = self._conn.execute(
+            "SELECT field, value FROM forecast_value WHERE source = ? AND hour_start_s = ?",
+            (source, hour_start(hour_start_s)),
+        ).fetchall()
+        return dict(rows) if rows else None
+
+    def hours(self, source: str, start_s: int, count: int) -> HourlyForecast:
+        """Stored hours from start_s's hour for count hours, in order. Hours
+        missing from the store are missing from the result."""
+        start_s = hour_start(start_s)
+        rows = self._conn.execute(
+            "SELECT hour_start_s, field, value FROM forecast_value "
+            "WHERE source = ? AND hour_start_s >= ? AND hour_start_s < ? "
+            "ORDER BY hour_start_s",
+            (source, start_s, start_s + count * HOUR_S),
+        ).fetchall()
+        by_hour: dict[int, dict[str, float]] = {}
+        for t, field, value in rows:
+            by_hour.setdefault(t, {})[field] = value
+        names = sorted({field for _, field, _ in rows})
+        complete = [t for t, values in by_hour.items() if len(values) == len(names)]
+        return HourlyForecast(
+            source=source,
+            hour_start_s=complete,
+            fields={name: [by_hour[t][name] for t in complete] for name in names},
+        )
+
+    def fetched_s(self, source: str) -> Optional[int]:
+        """When this store last fetched source itself"""
+        row = self._conn.execute(
+            "SELECT fetched_s FROM forecast_fetch WHERE source = ?", (source,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def forwarded_s(self, source: str) -> Optional[int]:
+        """When the latest forwarded copy of source was fetched"""
+        row = self._conn.execute(
+            "SELECT fetched_s FROM forecast_forward WHERE source = ?", (source,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def hour_start(unix_s: float) -> int:
+    return int(unix_s) - int(unix_s) % HOUR_S
+
+
+class ForecastSource(Protocol):
+    name: str
+
+    async def fetch(self, session: aiohttp.ClientSession) -> HourlyForecast: ...
+
+
+class WeatherGovSource:
+    """Hourly outside air temperature (oat, F) and wind speed (ws, mph) from
+    api.weather.gov, for hours starting after now"""
+
+    name = WEATHER
+
+    def __init__(self, latitude: float, longitude: float, timezone: pytz.BaseTzInfo, max_hours: int = 96):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.timezone = timezone
+        self.max_hours = max_hours
+
+    async def fetch(self, session: aiohttp.ClientSession) -> HourlyForecast:
+        url = f"https://api.weather.gov/points/{self.latitude},{self.longitude}"
+        response = await session.get(url)
+        if response.status != 200:
+            raise ValueError(f"Error fetching weather forecast url: {response.status}")
+        data = await response.json()
+        forecast_response = await session.get(data["properties"]["forecastHourly"])
+        if forecast_response.status != 200:
+            raise ValueError(f"Error fetching hourly weather forecast: {forecast_response.status}")
+        forecast_data = await forecast_response.json()
+        now = datetime.now(tz=self.timezone)
+        hours, oat, ws = [], [], []
+        for period in forecast_data["properties"]["periods"]:
+            if "temperature" not in period or "startTime" not in period or "windSpeed" not in period:
+                continue
+            start = datetime.fromisoformat(period["startTime"])
+            if start <= now:
+                continue
+            hours.append(int(start.timestamp()))
+            oat.append(float(period["temperature"]))
+            ws.append(float(period["windSpeed"].replace(" mph", "")))
+            if len(hours) == self.max_hours:
+                break
+        if not hours:
+            raise ValueError("Weather forecast has no hours after now")
+        return HourlyForecast(WEATHER, hours, {"oat": oat, "ws": ws})
+
+
+class PriceServiceSource:
+    """Hourly distribution (dist) and LMP (lmp) prices in USD/MWh"""
+
+    name = PRICE
+
+    def __init__(self, url: str):
+        self.url = url
+
+    async def fetch(self, session: aiohttp.ClientSession) -> HourlyForecast:
+        response = await session.get(self.url)
+        if response.status != 200:
+            raise ValueError(f"Failed to receive price forecast from API, status code: {response.status}")
+        data = await response.json()
+        return HourlyForecast(
+            PRICE,
+            list(data["HourStartS"]),
+            {"dist": list(data["DistList"]), "lmp": list(data["LmpList"])},
+        )
+
+
+class StubSource:
+    """Serves a fixed forecast, or fails if given None"""
+
+    def __init__(self, name: str, forecast: Optional[HourlyForecast] = None):
+        self.name = name
+        self.forecast = forecast
+
+    async def fetch(self, session: aiohttp.ClientSession) -> HourlyForecast:
+        if self.forecast is None:
+            raise ValueError(f"No stub {self.name} forecast")
+        return self.forecast
+
+
+class ForecastFetcher:
+    def __init__(
+        self,
+        store: ForecastStore,
+        sources: Sequence[ForecastSource],
+        logger: Optional[LoggerOrAdapter] = None,
+    ):
+        self.store = store
+        self.sources: dict[str, ForecastSource] = {s.name: s for s in sources}
+        self.logger = logger
+
+    def set_source(self, source: ForecastSource) -> None:
+        self.sources[source.name] = source
+
+    async def fetch(self, name: str, session: aiohttp.ClientSession) -> Optional[HourlyForecast]:
+        """Fetch and store a forecast. Returns None, after logging why, if
+        the source fails."""
+        try:
+            forecast = await self.sources[name].fetch(session)
+            self.store.put(forecast)
+        except Exception as e:
+            if self.logger is not None:
+                self.logger.error(f"[!] Unable to get {name} forecast: {e}")
+            return None
+        return forecast
+
+    def is_fresh(
+        self,
+        name: str,
+        max_age_s: float,
+        now_s: Optional[float] = None,
+        include_forwarded: bool = False,
+    ) -> bool:
+        """Whether name was fetched within max_age_s, by this store or, with
+        include_forwarded, by whoever forwarded the latest copy"""
+        times = [self.store.fetched_s(name)]
+        if include_forwarded:
+            times.append(self.store.forwarded_s(name))
+        known = [t for t in times if t is not None]
+        if not known:
+            return False
+        return (now_s if now_s is not None else time.time()) - max(known) <= max_age_s
+
+    def store_fields(
+        self,
+        name: str,
+        hour_start_s: Sequence[int],
+        fields: Mapping[str, Sequence[float]],
+        fetched_s: int,
+    ) -> bool:
+        """Store a forecast that was fetched elsewhere at fetched_s and
+        arrived by message. Skipped, returning False, if this store has
+        fetched name itself since then."""
+        own_fetched_s = self.store.fetched_s(name)
+        if own_fetched_s is not None and own_fetched_s > fetched_s:
+            return False
+        self.store.put(
+            HourlyForecast(name, list(hour_start_s), {k: list(v) for k, v in fields.items()}),
+            fetched_s=fetched_s,
+            forwarded=True,
+        )
+        return True
@@ -1,7 +1,8 @@
 import asyncio
 import time
 from enum import Enum
-from typing import Any, Dict, List, Optional, Sequence, cast
+from functools import partial
+from typing import Dict, List, NamedTuple, Optional, Sequence, cast
 
 from gwsproto.enums import AslEnum
 from gwproto.message import Message
@@ -21,8 +22,17 @@ from gwsproto.enums import (ActorClass, ChangeRelayPin, FsmActionType,
 
 from gwsproto.named_types import (SingleReading,
                                  SyncedReadings, FsmAtomicReport)
-from pydantic import BaseModel, Field
 from result import Err, Ok, Result
+from actors.message_dispatcher import DispatchErrorPolicy, MessageDispatcher
+from drivers.i2c.bus_scheduler import I2cBusScheduler, I2cPriority
+from drivers.i2c.pcf8575_backend import (
+    PORT_ALL_HIGH,
+    AdafruitPcf8575Backend,
+    Pcf8575Backend,
+    Pcf8575Port,
+    SimulatedPcf8575,
+    SimulatedPcf8575Backend,
+)
 from actors.sh_node_actor import ShNodeActor
 from gwsproto.named_types import ActuatorsReady, FsmEvent, Glitch
 from gwsproto.enums import LogLevel
@@ -38,8 +48,11 @@ class KridaPinState(Enum):
     DeEnergized = 1
 
 
-class SimulatedPin(BaseModel):
-    value: int = Field(ge=0, le=1)
+class PendingPin(NamedTuple):
+    idx: int
+    relay: ShNode
+    state: RelayEnergizationState
+    trigger_id: str
 
 
 SLEEP_STEP_SECONDS = 0.1
@@ -54,8 +67,10 @@ class I2cRelayMultiplexer(ShNodeActor):
     event_enum: AslEnum
     layout: House0Layout
     _stop_requested: bool
-    i2c_bus: Optional[Any]  # board.I2C()
-    krida_board: Dict[int, Any]
+    pcf_backend: Pcf8575Backend
+    i2c_bus: I2cBusScheduler
+    krida_board: Dict[int, Pcf8575Port]
+    port_shadow: Dict[int, int]
     relay_state: Dict[int, RelayEnergizationState]
     my_relays: List[ShNode]
 
@@ -76,108 +91,106 @@ class I2cRelayMultiplexer(ShNodeActor):
                 f"Expected {MakeModel.KRIDA__DOUBLEEMR16I2CV3}, got {self.component.cac}"
             )
         # Move into driver code if/when we get a second i2c relay component
-        self.i2c_bus = None
-
-        # krida_board[0] is the first krida board (# adafruit_pcf8575.PCF8575)
-        # krida_board[1] is the second krida board
-        self.krida_board: Dict[int, Any] = {}
-
-        # A dict that controls the 32 pins
-        self.krida_relay_pin: Dict[int, Any] = {}
+        self.pcf_backend = (
+            SimulatedPcf8575Backend() if self.is_simulated else AdafruitPcf8575Backend()
+        )
+        self.i2c_bus = services.i2c_bus
+        self.board_address: Dict[int, int] = {
+            i + 1: address for i, address in enumerate(self.component.gt.I2cAddressList)
+        }
+
+        # krida_board[1] is the first krida board (a PCF8575 port)
+        # krida_board[2] is the second krida board
+        self.krida_board: Dict[int, Pcf8575Port] = {}
+        # The port value last written to each board. Pins are set here and
+        # written a whole board at a time, once per event loop tick.
+        self.port_shadow: Dict[int, int] = {}
+        self._pending: List[PendingPin] = []
+        self._commit_scheduled = False
         relay_node_names = [config.ActorName for config in self.component.gt.ConfigList]
         self.my_relays = [self.layout.nodes[name] for name in relay_node_names]
         # dict of current energization state
         self.relay_state: Dict[int, RelayEnergizationState] = {}
         self._stop_requested = False
+        self._dispatcher = MessageDispatcher(
+            on_error=self.log, default_error_policy=DispatchErrorPolicy.Raise
+        )
+        self._dispatcher.register(
+            FsmEvent, lambda _, payload: self._process_event_message(payload)
+        )
 
     async def initialize_boards(self) -> None:
-        if self.is_simulated:
-            for relay in self.my_relays:
-                idx = self.get_idx(relay)
-                self.relay_state[idx] = RelayEnergizationState.DeEnergized
-                self.krida_relay_pin[idx] = SimulatedPin(
-                    value=KridaPinState.DeEnergized.value
-                )
-        else:
-            # from starter-scripts/krida.py
-            import adafruit_pcf8575
-            import board
-
-            self.i2c_bus = board.I2C()
-            addresses = self.component.gt.I2cAddressList
-
-            num_boards = 2
-            for i in range(num_boards):
-                setup_attempts = 0
-                setup_done = False
-                while setup_attempts < 3 and not setup_done:
-                    wait_s = setup_attempts + 1
-                    board_idx = i + 1
-                    address = addresses[i]
-                    try:
-                        self.krida_board[board_idx] = adafruit_pcf8575.PCF8575(
-                            i2c_bus=self.i2c_bus, address=address
-                        )
-                        self.logger.info(f"Found board at {address} for board {board_idx}")
-                    except Exception as e:
-                        self.logger.warning(
-                            f"Failed to get board at {address} for board {board_idx}: {e}"
-                        )
-                        await asyncio.sleep(wait_s)
-                        continue
-
+        # from starter-scripts/krida.py
+        self.pcf_backend.open_bus()
+        addresses = self.component.gt.I2cAddressList
+
+        num_boards = 2
+        for i in range(num_boards):
+            setup_attempts = 0
+            setup_done = False
+            while setup_attempts < 3 and not setup_done:
+                wait_s = setup_attempts + 1
+                board_idx = i + 1
+                address = addresses[i]
+                try:
+                    self.krida_board[board_idx] = self.i2c_bus.transact(
+                        address,
+                        partial(self.pcf_backend.open_board, address),
+                        I2cPriority.Actuation,
+                        retries=0,
+                    )
+                    self.logger.info(f"Found board at {address} for board {board_idx}")
+                except Exception as e:
+                    self.logger.warning(
+                        f"Failed to get board at {address} for board {board_idx}: {e}"
+                    )
+                    await asyncio.sleep(wait_s)
+                    continue
+
+                if not self.is_simulated:
                     await asyncio.sleep(0.2)
-                    self.logger.info(f"initializing board {board_idx} at {hex(address)}")
-                    try:
-                        for j in range(1, 17):
-                            # set relay to correct pin, and switch to output. This energizes all relays
-                            gw_idx = (board_idx - 1) * 16 + j
-                            pin_idx = gw_to_pin(gw_idx)
-                            self.krida_relay_pin[gw_idx] = self.krida_board[board_idx].get_pin(
-                                pin_idx
-                            )
-                            self.krida_relay_pin[gw_idx].switch_to_output()
-                        for j in range(1, 17):
-                            # move all relays back to de-energized position
-                            self.krida_relay_pin[
-                                i * 16 + j
-                            ].value = ChangeKridaPin.DeEnergize.value
-                        # and record the de-energized state for all known relays
-                        self.logger.info(f"Successfully initialized board {board_idx}")
-                        setup_done = True
-                    except Exception as e:
-                        self.logger.warning(f"Trouble initializing board {board_idx}! {e}")
-                        setup_attempts += 1
-                        await asyncio.sleep(wait_s)
-                # send up a Glitch if things took more than once
-                if setup_attempts > 0:
-                    if not setup_done:
-                        for j in range(1,17):
-                            gw_idx = (board_idx - 1) * 16 + j
-                            self.krida_relay_pin[gw_idx] = SimulatedPin(
-                                value=KridaPinState.DeEnergized.value
-                            )
-                        log_level = LogLevel.Critical
-                        summary = f"i2c board {board_idx} ({hex(address)}) failed to initialize. Setting as simulated"
-
-                    else: 
-                        log_level = LogLevel.Info
-                        summary = f"i2c board {board_idx} ({hex(address)}) took {setup_attempts+1} attempts to initialize! "
-                        self._send_to(self.ltn,
-                                    Glitch(
-                                        FromGNodeAlias=self.layout.scada_g_node_alias,
-                                        Node=self.node.Name,
-                                        Type=log_level,
-                                        Summary=summary,
-                                        Details="",
-                                    )
-                        )
-                # finally, de-energize all relays
-                self.log("De-energizing all the relays")
-                for relay in self.my_relays:                        
-                    self.relay_state[
-                        self.get_idx(relay)
-                    ] = RelayEnergizationState.DeEnergized
+                self.logger.info(f"initializing board {board_idx} at {hex(address)}")
+                try:
+                    # drive all 16 pins high in one write: every relay de-energized
+                    self.i2c_bus.transact(
+                        address,
+                        partial(self.krida_board[board_idx].write_gpio, PORT_ALL_HIGH),
+                        I2cPriority.Actuation,
+                        retries=0,
+                    )
+                    self.port_shadow[board_idx] = PORT_ALL_HIGH
+                    self.logger.info(f"Successfully initialized board {board_idx}")
+                    setup_done = True
+                except Exception as e:
+                    self.logger.warning(f"Trouble initializing board {board_idx}! {e}")
+                    setup_attempts += 1
+                    await asyncio.sleep(wait_s)
+            # send up a Glitch if things took more than once
+            if setup_attempts > 0:
+                if not setup_done:
+                    self.krida_board[board_idx] = SimulatedPcf8575(address)
+                    self.port_shadow[board_idx] = PORT_ALL_HIGH
+                    log_level = LogLevel.Critical
+                    summary = f"i2c board {board_idx} ({hex(address)}) failed to initialize. Setting as simulated"
+
+                else:
+                    log_level = LogLevel.Info
+                    summary = f"i2c board {board_idx} ({hex(address)}) took {setup_attempts+1} attempts to initialize! "
+                    self._send_to(self.ltn,
+                                Glitch(
+                                    FromGNodeAlias=self.layout.scada_g_node_alias,
+                                    Node=self.node.Name,
+                                    Type=log_level,
+                                    Summary=summary,
+                                    Details="",
+                                )
+                    )
+        # finally, record the de-energized state for all known relays
+        self.log("De-energizing all the relays")
+        for relay in self.my_relays:
+            self.relay_state[
+                self.get_idx(relay)
+            ] = RelayEnergizationState.DeEnergized
 
         # announce that the relays are ready
         self._send_to(self.primary_scada, ActuatorsReady())
@@ -226,23 +239,62 @@ class I2cRelayMultiplexer(ShNodeActor):
             return Err(
                 ValueError(f"message.FromHandle {dispatch.FromHandle} not in layout!")
             )
-        ChangeRelayPin.Energize
         idx = self.get_idx(relay)
         if idx is None:
             return Err(ValueError(f"Not a valid relay: {relay}"))
         if idx not in self.relay_state:
             self.log("Relay board not initialized yet. Ignoring dispatch")
             return Ok(False)
+        if dispatch.EventName == ChangeRelayPin.Energize.value:
+            state = RelayEnergizationState.Energized
+        else:
+            state = RelayEnergizationState.DeEnergized
+        self._pending.append(PendingPin(idx, relay, state, dispatch.TriggerId))
+        self._schedule_commit()
+        return Ok()
+
+    def _schedule_commit(self) -> None:
+        if self._commit_scheduled:
+            return
+        self._commit_scheduled = True
         try:
-            if dispatch.EventName == ChangeRelayPin.Energize.value:
-                self.krida_relay_pin[idx].value = ChangeKridaPin.Energize.value
-                self.relay_state[idx] = RelayEnergizationState.Energized
-            else:
-                self.krida_relay_pin[idx].value = ChangeKridaPin.DeEnergize.value
-                self.relay_state[idx] = RelayEnergizationState.DeEnergized
-        except Exception as e:
-            return Err(ValueError(f"Trouble setting relay {idx} via i2c: {e}"))
-        channel = self.get_channel(relay)
+            asyncio.get_running_loop().call_soon(self.commit_pending)
+        except RuntimeError:
+            self.commit_pending()
+
+    def commit_pending(self) -> None:
+        """Write each board with pending pin changes once, then report the
+        changes. Dispatches that arrive in the same event loop tick share
+        one i2c transaction per board."""
+        self._commit_scheduled = False
+        pending, self._pending = self._pending, []
+        by_board: Dict[int, List[PendingPin]] = {}
+        for pin in pending:
+            by_board.setdefault(board_from_gw_idx(pin.idx), []).append(pin)
+        for board_idx, pins in by_board.items():
+            port = self.port_shadow[board_idx]
+            for pin in pins:
+                port = set_krida_pin(port, pin.idx, pin.state)
+            if port != self.port_shadow[board_idx]:
+                try:
+                    self.i2c_bus.transact(
+                        self.board_address[board_idx],
+                        partial(self.krida_board[board_idx].write_gpio, port),
+                        I2cPriority.Actuation,
+                        retries=0,
+                    )
+                except Exception as e:
+                    self.log(
+                        f"Trouble setting relays {[pin.idx for pin in pins]} via i2c: {e}"
+                    )
+                    continue
+                self.port_shadow[board_idx] = port
+            for pin in pins:
+                self.relay_state[pin.idx] = pin.state
+                self._report_relay_pin(pin)
+
+    def _report_relay_pin(self, pin: PendingPin) -> None:
+        channel = self.get_channel(pin.relay)
         if channel is None:
             raise Exception("Channel can't be None here")
         if channel.TelemetryName != TelemetryName.RelayState:
@@ -254,23 +306,22 @@ class I2cRelayMultiplexer(ShNodeActor):
             self.primary_scada,
             SingleReading(
                 ChannelName=channel.Name,
-                Value=self.relay_state[idx].value,
+                Value=pin.state.value,
                 ScadaReadTimeUnixMs=t_ms,
             ),
         )
         self._send_to(
-            relay,
+            pin.relay,
             FsmAtomicReport(
                 MachineHandle=self.node.handle,
                 StateEnum="relay.pin",
                 ReportType=FsmReportType.Action,
                 ActionType=FsmActionType.RelayPinSet,
-                Action=self.relay_state[idx].value,
+                Action=pin.state.value,
                 UnixTimeMs=t_ms,
-                TriggerId=dispatch.TriggerId,
+                TriggerId=pin.trigger_id,
             ),
         )
-        return Ok()
 
     def _process_event_message(self, message: FsmEvent) -> Result[bool, BaseException]:
         if message.ToHandle != self.node.handle:
@@ -288,8 +339,8 @@ class I2cRelayMultiplexer(ShNodeActor):
         return Ok()
 
     def process_message(self, message: Message) -> Result[bool, BaseException]:
-        if isinstance(message.Payload, FsmEvent):
-            return self._process_event_message(message.Payload)
+        if self._dispatcher.dispatch(None, message.Payload):
+            return Ok()
         return Err(
             ValueError(
                 f"Error. Relay Multiplexer{self.name} receieved unexpected message: {message.Header}"
@@ -300,33 +351,45 @@ class I2cRelayMultiplexer(ShNodeActor):
     def monitored_names(self) -> Sequence[MonitoredName]:
         return [MonitoredName(self.name, self.RELAY_LOOP_S * 2)]
 
+    def verify_ports(self) -> None:
+        """Read each board back and rewrite it only if it disagrees with
+        the port value last written"""
+        for board_idx, board in self.krida_board.items():
+            expected = self.port_shadow[board_idx]
+            address = self.board_address[board_idx]
+            try:
+                actual = self.i2c_bus.transact(address, board.read_gpio, retries=0)
+                if actual != expected:
+                    self.logger.warning(
+                        f"Board {board_idx} reads {actual:#06x}, expected {expected:#06x}. Rewriting"
+                    )
+                    self.i2c_bus.transact(
+                        address,
+                        partial(board.write_gpio, expected),
+                        I2cPriority.Actuation,
+                        retries=0,
+                    )
+            except Exception as e:
+                self.log(f"Trouble verifying board {board_idx} via i2c: {e}")
+
     async def maintain_relay_states(self):
         first_time: bool = True
         while not self._stop_requested:
             self._send(PatInternalWatchdogMessage(src=self.name))
+            if not first_time:
+                self.verify_ports()
+                self.logger.info(f"i2c bus: {self.i2c_bus.metrics()}")
             channel_names = []
             values = []
             for relay in self.my_relays:
                 idx = self.get_idx(relay)
                 channel_names.append(self.get_channel(relay).Name)
-                if self.relay_state[idx] == RelayEnergizationState.Energized:
-                    values.append(RelayEnergizationState.Energized.value)
-                    if not first_time:
-                        self.krida_relay_pin[idx].value = KridaPinState.Energized.value
-                        # self.logger.info(f"Making sure {relay.name} is Energized")
-                else:
-                    values.append(RelayEnergizationState.DeEnergized.value)
-                    if not first_time:
-                        self.krida_relay_pin[idx].value = KridaPinState.DeEnergized.value
-                        # self.logger.info(f"Making sure {relay.name} is DeEnergized")
+                values.append(self.relay_state[idx].value)
             readings = SyncedReadings(
                 ChannelNameList=channel_names,
                 ValueList=values,
                 ScadaReadTimeUnixMs=int(time.time() * 1000),
             )
-            # if first_time:
-            #     self.log("SENDING FIRST TIME!!")
-            #     self.log(readings)
             self._send_to(self.primary_scada, readings)
             first_time = False
             await asyncio.sleep(self.RELAY_LOOP_S)
@@ -359,6 +422,15 @@ def board_from_gw_idx(gw_idx: int) -> int:
     return int((gw_idx - 1) / 16) + 1
 
 
+def set_krida_pin(port: int, gw_idx: int, state: RelayEnergizationState) -> int:
+    """port with gw_idx's pin driven for state. Krida relays are energized
+    by a low pin."""
+    bit = 1 << gw_to_pin(gw_idx)
+    if state == RelayEnergizationState.Energized:
+        return port & ~bit
+    return port | bit
+
+
 def gw_to_pin(gw_idx: int) -> int:
     i = (gw_idx - 1) % 16 + 1
     krida_idx = 0
@@ -1,7 +1,8 @@
 import asyncio
+import json
 import time
-import smbus2
-from typing import Any, Dict, List, Optional, Sequence, cast
+from functools import partial
+from typing import Dict, List, Optional, Sequence, Tuple, cast
 from gwsproto.errors import DcError
 from gwproto.message import Message
 from gwproactor import  MonitoredName
@@ -15,23 +16,37 @@ from gwsproto.named_types import AnalogDispatch, SingleReading
 
 from result import Err, Result
 from actors.sh_node_actor import ShNodeActor
-from gwsproto.named_types import ActuatorsReady
+from gwsproto.named_types import ActuatorsReady, Glitch
+from gwsproto.enums import LogLevel
+from drivers.i2c.bus_scheduler import I2cBusScheduler, I2cPriority
+from drivers.i2c.gp8403_backend import (
+    GP8403_OUTPUT_RANGE_10V,
+    GP8403_OUTPUT_REGISTERS,
+    GP8403_OUTPUT_SET_RANGE,
+    SimulatedSmbusBackend,
+    Smbus2Backend,
+    SmbusBackend,
+    SmbusLike,
+    gp8403_data,
+)
 from scada_app_interface import ScadaAppInterface
 
-DFR_OUTPUT_SET_RANGE = 0x01
-DFR_OUTPUT_RANGE_10V = 17
-
 
 SLEEP_STEP_SECONDS = 0.1
 class I2cZeroTenMultiplexer(ShNodeActor):
     LOOP_S = 300
+    RESEND_S = 2
     node: ShNode
     component: DfrComponent
     layout: House0Layout
     _stop_requested: bool
     is_simulated: bool
-    bus: Optional[Any]  # smbus2.bus()
+    smbus_backend: SmbusBackend
+    bus: Optional[SmbusLike]
+    i2c_bus: I2cBusScheduler
     dfr_val: Dict[str, int] # voltage x 100 by node name
+    # last register word successfully written, by (i2c address, register)
+    committed: Dict[Tuple[int, int], int]
     my_dfrs: List[ShNode]
 
     def __init__(
@@ -55,18 +70,24 @@ class I2cZeroTenMultiplexer(ShNodeActor):
         self.first_i2c_addr = self.component.gt.I2cAddressList[0]
         self.second_i2c_addr = self.component.gt.I2cAddressList[1]
         self.is_simulated = self.services.settings.is_simulated
+        self.smbus_backend = (
+            SimulatedSmbusBackend() if self.is_simulated else Smbus2Backend()
+        )
+        self.i2c_bus = services.i2c_bus
         if self.is_simulated:
             self.bus = None
         else:
             try:
-                self.bus = smbus2.SMBus(1)
+                self.bus = self.smbus_backend.open_bus()
             except Exception as e:
                 raise Exception("No i2c /dev/i2c-1 for dfr!!")
             if self.bus is None:
                 raise Exception("No i2c bus object for dfr!!")
             try:
-                self.bus.read_byte(self.first_i2c_addr)
-                self.bus.read_byte(self.second_i2c_addr)
+                for address in (self.first_i2c_addr, self.second_i2c_addr):
+                    self.i2c_bus.transact(
+                        address, partial(self.bus.read_byte, address), retries=0
+                    )
             except Exception as e:
                 raise Exception(f"Trouble reading addresses! {e}")
             # TODO: look for objects at the addresses 94, 95
@@ -80,14 +101,19 @@ class I2cZeroTenMultiplexer(ShNodeActor):
         self.check_channels()
         self._stop_requested = False
         self.resend_dfr = {dfr.Name: False for dfr in self.my_dfrs}
+        self.refresh_s = self.settings.dfr_refresh_seconds
+        self.committed = {}
+        self.write_counts = {dfr.name: 0 for dfr in self.my_dfrs}
+        self.i2c_errors = {dfr.name: 0 for dfr in self.my_dfrs}
+        self._reported_errors = 0
 
     def initialize_board(self) -> None:
         self.log("INITILIZING I2C DFR MULTIPLEXER")
         if self.is_simulated:
-            self.log("SIMULATED ... no actual i2c bus object")
-        if not self.is_simulated:
-            self.bus = smbus2.SMBus(1)
-            self.initialize_range()
+            self.log("SIMULATED ... using a simulated i2c bus")
+        self.bus = self.smbus_backend.open_bus()
+        self.initialize_range()
+        self.committed = {}
 
         for dfr in self.my_dfrs:
             dfr_config = next(
@@ -98,15 +124,27 @@ class I2cZeroTenMultiplexer(ShNodeActor):
             init = dfr_config.InitialVoltsTimes100
             self.set_level(dfr, init)
     
+    def _set_range(self, address: int) -> None:
+        self.bus.read_byte(address)
+        self.bus.write_word_data(address, GP8403_OUTPUT_SET_RANGE, GP8403_OUTPUT_RANGE_10V)
+
     def initialize_range(self) -> None:
         try:
-            self.bus.read_byte(self.first_i2c_addr)
-            self.bus.write_word_data(self.first_i2c_addr, DFR_OUTPUT_SET_RANGE, DFR_OUTPUT_RANGE_10V)
+            self.i2c_bus.transact(
+                self.first_i2c_addr,
+                partial(self._set_range, self.first_i2c_addr),
+                I2cPriority.Actuation,
+                retries=0,
+            )
         except Exception:
             raise Exception(f"Failed to find DFR at addr {self.first_i2c_addr}")
         try:
-            self.bus.read_byte(self.second_i2c_addr)
-            self.bus.write_word_data(self.second_i2c_addr, DFR_OUTPUT_SET_RANGE, DFR_OUTPUT_RANGE_10V)
+            self.i2c_bus.transact(
+                self.second_i2c_addr,
+                partial(self._set_range, self.second_i2c_addr),
+                I2cPriority.Actuation,
+                retries=0,
+            )
         except Exception:
             print("No second dfr")
             #raise Exception(f"Failed to find DFR at addr {self.second_i2c_addr}")
@@ -126,6 +164,14 @@ class I2cZeroTenMultiplexer(ShNodeActor):
             return None
         return dfr_config.OutputIdx
 
+    def get_register(self, dfr: ShNode) -> Optional[Tuple[int, int]]:
+        """The (i2c address, output register) that sets dfr's output"""
+        idx = self.get_idx(dfr)
+        if idx not in (1, 2, 3, 4):
+            return None
+        address = self.first_i2c_addr if idx < 3 else self.second_i2c_addr
+        return address, GP8403_OUTPUT_REGISTERS[(idx - 1) % 2]
+
     def check_channels(self) -> None:
         #Channel names should equal node names for my_dfrs
         for dfr in self.my_dfrs:
@@ -144,33 +190,38 @@ class I2cZeroTenMultiplexer(ShNodeActor):
             if dfr_config.ChannelName != dfr.name:
                 raise DcError(f"Channel name {dfr_config.ChannelName} must be node name {dfr.name}!")
     
-    def set_level(self, dfr: ShNode, value: int) -> None:
+    def set_level(self, dfr: ShNode, value: int, force: bool = False) -> None:
         """
         value: (int): An integer between 0 and 100 representing 
         voltage x 10. 
 
         node: (ShNode): the dfr node getting dispatched
+
+        force: (bool): write even if the output already holds value.
+        Otherwise the i2c write is skipped when nothing would change.
         """
         self.dfr_val[dfr.name] = value
         try:
-            if not self.is_simulated:
-                GP8403_CONFIG_CURRENT_REG = 0x02
-                if dfr not in self.my_dfrs:
-                    raise Exception(f"Only call for one of my dfr nodes: {self.my_dfrs}")
-                idx = self.get_idx(dfr)
-                data = int(float(4095 * value / 100)) << 4
-                if idx == 1:
-                    self.bus.write_word_data(self.first_i2c_addr, GP8403_CONFIG_CURRENT_REG, data)
-                elif idx == 2:
-                    self.bus.write_word_data(self.first_i2c_addr, GP8403_CONFIG_CURRENT_REG << 1, data)
-                elif idx == 3:
-                    self.bus.write_word_data(self.second_i2c_addr, GP8403_CONFIG_CURRENT_REG, data)
-                elif idx == 4:
-                    self.bus.write_word_data(self.second_i2c_addr, GP8403_CONFIG_CURRENT_REG << 1, data)
-                else:
-                    self.log(f"That's strange, got dfr idx {idx}")
+            if dfr not in self.my_dfrs:
+                raise Exception(f"Only call for one of my dfr nodes: {self.my_dfrs}")
+            register = self.get_register(dfr)
+            data = gp8403_data(value)
+            if register is None:
+                self.log(f"That's strange, got dfr idx {self.get_idx(dfr)}")
+            elif force or self.committed.get(register) != data:
+                # forget the old value first: after a failed write the
+                # output is unknown
+                self.committed.pop(register, None)
+                self.i2c_bus.transact(
+                    register[0],
+                    partial(self.bus.write_word_data, *register, data),
+                    I2cPriority.Actuation,
+                    retries=0,
+                )
+                self.committed[register] = data
+                self.write_counts[dfr.name] += 1
+                self.log(f"Set {dfr.name} to {value}")
             self.resend_dfr[dfr.Name] = False
-            self.log(f"Set {dfr.name} to {value}")
             self._send_to(self.primary_scada,
             SingleReading(
                     ChannelName=dfr.name,
@@ -180,17 +231,19 @@ class I2cZeroTenMultiplexer(ShNodeActor):
             )
         except Exception as e:
             self.resend_dfr[dfr.Name] = True
+            if dfr.name in self.i2c_errors:
+                self.i2c_errors[dfr.name] += 1
             self.log(f"Trouble setting dfr level for {dfr.Name}!: {e}")
 
     def process_analog_dispatch(self, dispatch: AnalogDispatch) -> None:
-        if not self.layout.node_by_handle(dispatch.FromHandle):
+        dfr = self.layout.node_by_handle(dispatch.FromHandle)
+        if not dfr:
             self.log(f"Ignoring dispatch from  handle {dispatch.FromHandle} - not in layout!!")
             return
             #raise Exception(f"{dispatch.FromName} not in layout!!")
         if dispatch.ToHandle != self.node.handle:
             self.log(f"Ignoring dispatch {dispatch} - ToHandle is not {self.node.handle}!")
             return
-        dfr = self.layout.node_by_handle(dispatch.FromHandle)
         if dfr not in self.my_dfrs:
             self.log(f"Ignoring dispatch {dispatch} - not from one of my dfrs! {self.my_dfrs}")
             return
@@ -202,6 +255,27 @@ class I2cZeroTenMultiplexer(ShNodeActor):
 
         self.set_level(dfr, dispatch.Value)
 
+    def refresh(self) -> None:
+        """Rewrite every output from the cache, since the GP8403 cannot be
+        read back, and report write and i2c error counts"""
+        for dfr in self.my_dfrs:
+            self.set_level(dfr, self.dfr_val[dfr.name], force=True)
+        self.log(f"dfr writes: {self.write_counts}. i2c errors: {self.i2c_errors}")
+        errors = sum(self.i2c_errors.values())
+        if errors > self._reported_errors:
+            self._send_to(self.ltn,
+                Glitch(
+                    FromGNodeAlias=self.layout.scada_g_node_alias,
+                    Node=self.node.Name,
+                    Type=LogLevel.Warning,
+                    Summary=f"{errors - self._reported_errors} i2c errors setting dfr levels",
+                    Details=json.dumps(
+                        {"Writes": self.write_counts, "I2cErrors": self.i2c_errors}
+                    ),
+                )
+            )
+            self._reported_errors = errors
+
     def process_message(self, message: Message) -> Result[bool, BaseException]:
         if isinstance(message.Payload, AnalogDispatch):
             try:
@@ -219,22 +293,23 @@ class I2cZeroTenMultiplexer(ShNodeActor):
         return [MonitoredName(self.name, self.LOOP_S * 2)]
 
     async def maintain_dfr_states(self):
-        await asyncio.sleep(2)
-        for dfr in self.my_dfrs:
-            self.set_level(dfr, self.dfr_val[dfr.name])
-        last_set = time.time() 
+        await asyncio.sleep(self.RESEND_S)
+        self.refresh()
+        last_set = time.time()
+        last_pat = time.time()
 
         while not self._stop_requested:
-            if time.time() - last_set > self.LOOP_S:
-                for dfr in self.my_dfrs:
-                    self.set_level(dfr, self.dfr_val[dfr.name])
-                self._send(PatInternalWatchdogMessage(src=self.name))
+            if self.refresh_s > 0 and time.time() - last_set > self.refresh_s:
+                self.refresh()
                 last_set = time.time()
+            if time.time() - last_pat > self.LOOP_S:
+                self._send(PatInternalWatchdogMessage(src=self.name))
+                last_pat = time.time()
 
             for dfr in self.my_dfrs:
                 if self.resend_dfr[dfr.name]:
                     self.set_level(dfr, self.dfr_val[dfr.name])
-            await asyncio.sleep(2) 
+            await asyncio.sleep(self.RESEND_S)
 
     def start(self) -> None:
         try:
@@ -138,6 +138,7 @@ class LocalControlTouBase(ShNodeActor):
         
         for node in self.my_actuators():
             node.Handle = f"{boss.Handle}.{node.Name}"
+        self.layout.index_command_tree()
         self._send_to(
             self.ltn,
             NewCommandTree(
@@ -0,0 +1,293 @@
+"""Event loop instrumentation for the scada, scada2 and ltn apps.
+
+Every actor in an app shares one asyncio event loop, so one callback that
+blocks holds up all of them. Until now the only symptom was a
+PatInternalWatchdogMessage timeout. LoopMonitor measures the loop from the
+outside:
+
+- A watchdog thread schedules a no-op on the loop every probe interval and
+  times how late it runs. That delay is the loop lag.
+- If the no-op has not run after slow_callback_s, the watchdog samples the
+  loop thread's stack. It records the running task, the handler the loop
+  called, and the line it is stuck on. The recorded duration is the full
+  lag of that probe, an upper bound on the slow callback's run time.
+- instrument() times each call of an actor's message entry points.
+- SyncThreadActor thread queues are sampled when a snapshot is taken.
+
+snapshot() packs all of it into a LoopHealth for one period.
+"""
+import asyncio
+import functools
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from types import FrameType
+from typing import Any, Callable, Deque, Dict, Iterable, Optional, Sequence, Tuple
+
+from gwsproto.named_types import (
+    ActorMessageTiming,
+    LoopHealth,
+    SlowCallback,
+    ThreadQueueDepth,
+)
+
+# Upper bounds, in ms, of the lag and message timing histogram buckets
+BUCKET_UPPER_MS: Tuple[float, ...] = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+# Where messages enter a prime actor, which gets them from the proactor
+# rather than through process_message
+PRIME_ACTOR_ENTRY_POINTS = ("process_internal_message", "process_mqtt_message")
+
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+
+class LatencyHistogram:
+    __slots__ = ("counts", "samples", "total_ms", "max_ms")
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.counts = [0] * (len(BUCKET_UPPER_MS) + 1)
+        self.samples = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float) -> None:
+        self.counts[bisect_left(BUCKET_UPPER_MS, ms)] += 1
+        self.samples += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.samples if self.samples else 0.0
+
+
+def _in_asyncio(frame: FrameType) -> bool:
+    return frame.f_code.co_filename.startswith(_ASYNCIO_DIR)
+
+
+def describe_loop_frame(frame: Optional[FrameType]) -> Tuple[str, str]:
+    """(handler, where) for the loop thread's current frame: the first
+    function below asyncio's machinery and the innermost line"""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    if not frames:
+        return "unknown", "unknown"
+    handler = next(
+        (
+            f
+            for f in reversed(frames)  # outermost first
+            if not _in_asyncio(f) and f.f_back is not None and _in_asyncio(f.f_back)
+        ),
+        None,
+    )
+    innermost = frames[0]
+    where = (
+        f"{os.path.basename(innermost.f_code.co_filename)}:{innermost.f_lineno} "
+        f"{innermost.f_code.co_qualname}"
+    )
+    if handler is None:
+        return where, where
+    return handler.f_code.co_qualname, where
+
+
+class LoopMonitor:
+    app_name: str
+    probe_interval_s: float
+    slow_callback_s: float
+    lag: LatencyHistogram
+    actor_timing: Dict[str, LatencyHistogram]
+    slow_callbacks: Deque[SlowCallback]
+
+    def __init__(
+        self,
+        app_name: str,
+        probe_interval_s: float = 0.25,
+        slow_callback_s: float = 0.1,
+        max_slow_callbacks: int = 20,
+    ) -> None:
+        self.app_name = app_name
+        self.probe_interval_s = probe_interval_s
+        self.slow_callback_s = slow_callback_s
+        self.lag = LatencyHistogram()
+        self.actor_timing = {}
+        # the oldest are dropped when full
+        self.slow_callbacks = deque(maxlen=max_slow_callbacks)
+        self._sync_threads: Dict[str, Any] = {}
+        self._period_start_s = time.time()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def instrument(
+        self, actor: Any, entry_points: Sequence[str] = ("process_message",)
+    ) -> None:
+        """Time every call to the actor's entry points. Safe to call more
+        than once for the same actor."""
+        name = actor.name
+        histogram = self.actor_timing.setdefault(name, LatencyHistogram())
+        for entry_point in entry_points:
+            method = getattr(actor, entry_point, None)
+            if method is None or getattr(method, "loop_monitored", False):
+                continue
+            setattr(actor, entry_point, self._timed(method, histogram))
+        sync_thread = getattr(actor, "_sync_thread", None)
+        if sync_thread is not None:
+            self._sync_threads[name] = sync_thread
+
+    def instrument_all(self, actors: Iterable[Any], prime_actor: Any) -> None:
+        for actor in actors:
+            if actor is prime_actor:
+                self.instrument(actor, PRIME_ACTOR_ENTRY_POINTS)
+            elif actor is not None:
+                self.instrument(actor)
+
+    @staticmethod
+    def _timed(method: Callable[..., Any], histogram: LatencyHistogram) -> Callable[..., Any]:
+        @functools.wraps(method)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                histogram.add(1000 * (time.perf_counter() - start))
+
+        timed.loop_monitored = True  # type: ignore[attr-defined]
+        return timed
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Start watching loop, by default the running one. Call from the
+        loop's thread."""
+        if self._watchdog is not None:
+            return
+        self._loop = loop or asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._watchdog = threading.Thread(
+            target=self._watch, name=f"{self.app_name}-loop-monitor", daemon=True
+        )
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=2 * self.probe_interval_s + self.slow_callback_s)
+            self._watchdog = None
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.probe_interval_s):
+            ran = threading.Event()
+            posted_s = time.monotonic()
+            try:
+                self._loop.call_soon_threadsafe(ran.set)
+            except RuntimeError:  # loop closed
+                return
+            if not ran.wait(self.slow_callback_s):
+                task_name, handler, where = self._sample_loop_thread()
+                while not ran.wait(self.probe_interval_s):
+                    if self._stop.is_set():
+                        return
+                lag_s = time.monotonic() - posted_s
+                self.slow_callbacks.append(
+                    SlowCallback(
+                        TaskName=task_name,
+                        Handler=handler,
+                        Where=where,
+                        DurationMs=round(1000 * lag_s, 3),
+                        StartUnixMs=int(1000 * (time.time() - lag_s)),
+                    )
+                )
+            else:
+                lag_s = time.monotonic() - posted_s
+            self.lag.add(1000 * lag_s)
+
+    def _sample_loop_thread(self) -> Tuple[Optional[str], str, str]:
+        frame = sys._current_frames().get(self._loop_thread_id)  # noqa: SLF001
+        handler, where = describe_loop_frame(frame)
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        return (task.get_name() if task is not None else None), handler, where
+
+    def thread_queue_depths(self) -> Dict[str, Optional[int]]:
+        depths = {}
+        for name, sync_thread in self._sync_threads.items():
+            sync_queue = getattr(sync_thread, "_sync_queue", None)
+            depths[name] = sync_queue.qsize() if sync_queue is not None else None
+        return depths
+
+    def snapshot(self, from_g_node_alias: str, reset: bool = True) -> LoopHealth:
+        """LoopHealth since the last reset. Call from the loop's thread."""
+        now_s = time.time()
+        lag = self.lag
+        try:
+            task_count = len(asyncio.all_tasks(self._loop)) if self._loop else 0
+        except RuntimeError:
+            task_count = 0
+        health = LoopHealth(
+            FromGNodeAlias=from_g_node_alias,
+            AppName=self.app_name,
+            PeriodStartUnixMs=int(1000 * self._period_start_s),
+            PeriodEndUnixMs=int(1000 * now_s),
+            BucketUpperMsList=list(BUCKET_UPPER_MS),
+            LagSamples=lag.samples,
+            MeanLagMs=round(lag.mean_ms, 3),
+            MaxLagMs=round(lag.max_ms, 3),
+            LagBucketCountList=list(lag.counts),
+            TaskCount=task_count,
+            SlowCallbackList=list(self.slow_callbacks),
+            ActorTimingList=[
+                ActorMessageTiming(
+                    ActorName=name,
+                    Messages=histogram.samples,
+                    TotalMs=round(histogram.total_ms, 3),
+                    MaxMs=round(histogram.max_ms, 3),
+                    BucketCountList=list(histogram.counts),
+                )
+                for name, histogram in sorted(self.actor_timing.items())
+            ],
+            ThreadQueueList=[
+                ThreadQueueDepth(ActorName=name, SyncQueueDepth=depth)
+                for name, depth in sorted(self.thread_queue_depths().items())
+            ],
+        )
+        if reset:
+            self.reset()
+            self._period_start_s = now_s
+        return health
+
+    def reset(self) -> None:
+        self.lag.reset()
+        for histogram in self.actor_timing.values():
+            histogram.reset()
+        self.slow_callbacks.clear()
+
+
+def loop_health_summary(health: LoopHealth) -> str:
+    """One line for the log"""
+    s = (
+        f"[{health.AppName}] loop lag mean {health.MeanLagMs:.1f} ms, "
+        f"max {health.MaxLagMs:.1f} ms over {health.LagSamples} probes, "
+        f"{health.TaskCount} tasks"
+    )
+    slowest = sorted(health.ActorTimingList, key=lambda t: t.MaxMs, reverse=True)[:3]
+    if slowest:
+        s += ". Slowest handlers: " + ", ".join(
+            f"{t.ActorName} {t.MaxMs:.1f} ms" for t in slowest
+        )
+    for cb in health.SlowCallbackList:
+        s += (
+            f"\n  slow callback {cb.DurationMs:.0f} ms: task {cb.TaskName} "
+            f"handler {cb.Handler} at {cb.Where}"
+        )
+    return s
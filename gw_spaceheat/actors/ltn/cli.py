@@ -1,11 +1,17 @@
+import json
+import sys
+from datetime import datetime
 from pathlib import Path
+from typing import Annotated, Optional
 
 import dotenv
+import pytz
 import rich
 import typer
 from gwproactor.logging_setup import enable_aiohttp_logging
 from trogon import Trogon
 from typer.main import get_group
+from actors.ltn.event_archive import ARCHIVE_DIR_NAME, EventArchiveReader
 from ltn_app import LtnApp
 
 
@@ -60,6 +66,55 @@ def run(
     )
 
 
+@app.command()
+def archive(
+    env_file: str = ".env",
+    *,
+    start: Annotated[
+        Optional[datetime], typer.Option(help="Local time of the first record to replay")
+    ] = None,
+    end: Annotated[
+        Optional[datetime], typer.Option(help="Local time to stop replaying at (exclusive)")
+    ] = None,
+    type_name: Annotated[
+        Optional[list[str]], typer.Option("--type", help="Only replay this TypeName (repeatable)")
+    ] = None,
+    archive_dir: Annotated[
+        Optional[Path], typer.Option(help="Archive directory. Defaults to <data_dir>/archive")
+    ] = None,
+    summary: bool = False,
+) -> None:
+    """Replay archived LTN events and reports as JSON lines."""
+    settings = LtnApp.get_settings(env_file=dotenv.find_dotenv(env_file))
+    if archive_dir is None:
+        archive_dir = Path(settings.paths.data_dir) / ARCHIVE_DIR_NAME
+    timezone = pytz.timezone(settings.timezone_str)
+
+    def to_ms(dt: Optional[datetime]) -> Optional[int]:
+        if dt is None:
+            return None
+        if dt.tzinfo is None:
+            dt = timezone.localize(dt)
+        return int(dt.timestamp() * 1000)
+
+    reader = EventArchiveReader(archive_dir)
+    start_ms, end_ms = to_ms(start), to_ms(end)
+    if summary:
+        for segment in reader.segments(start_ms, end_ms, type_name):
+            rich.print(
+                f"{segment.name}  "
+                f"{datetime.fromtimestamp(segment.start_ms / 1000, tz=timezone).isoformat()} .. "
+                f"{datetime.fromtimestamp(segment.end_ms / 1000, tz=timezone).isoformat()}  "
+                f"{segment.records} records  {segment.type_counts}"
+            )
+        return
+    for record in reader.records(start_ms, end_ms, type_name):
+        sys.stdout.write(
+            json.dumps({"TimeMs": record.time_ms, "TypeName": record.type_name, "Payload": record.payload})
+            + "\n"
+        )
+
+
 @app.callback()
 def main_app_callback() -> None:
     """Commands for the main ltn application"""
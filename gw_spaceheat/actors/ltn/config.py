@@ -41,6 +41,8 @@ class LtnSettings(AppSettings):
     scada_mqtt: MQTTClient = MQTTClient()
     c_to_f: bool = True
     save_events: bool = False
+    event_archive_segment_mb: int = 16
+    event_archive_segment_minutes: int = 60
     dashboard: DashboardSettings = DashboardSettings()
     timezone_str: str = "America/New_York"
     latitude: float = 45.6573 
@@ -55,6 +57,12 @@ class LtnSettings(AppSettings):
     monitor_only: bool = False
     seasonal_storage_mode: SeasonalStorageMode = SeasonalStorageMode.AllTanks
     create_graph_minute: int = 40
+    flo_worker_max_runs: int = 24
+    flo_worker_max_rss_mb: int = 1500
+    # How often the ltn logs its own LoopHealth. 0 to disable.
+    loop_health_seconds: int = 300
+    # Event loop callbacks longer than this are recorded in LoopHealth
+    slow_callback_ms: int = 100
 
     model_config = SettingsConfigDict(env_prefix="LTN_", extra="ignore")
 
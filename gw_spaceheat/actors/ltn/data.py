@@ -1,13 +1,13 @@
 import json
 from pathlib import Path
 
-from typing import Union
+from typing import Optional, Union
 from gwsproto.data_classes.house_0_names import H0CN
 from gwsproto.named_types import LayoutLite
 from gwsproto.data_classes.layout_lite_dc import LayoutLiteDc
 from gwsproto.named_types import (
     DataChannelGt, DerivedChannelGt, 
-    Report, SnapshotSpaceheat
+    Report, SnapshotSpaceheat, SnapshotSpaceheatDelta
 )
 
 
@@ -22,6 +22,15 @@ class LtnData:
         self.latest_power_w: int | None = None
         self.tank_temps_available: bool = False
 
+    def apply_snapshot_delta(
+        self, delta: SnapshotSpaceheatDelta
+    ) -> Optional[SnapshotSpaceheat]:
+        """The latest snapshot with delta applied, or None if delta does not
+        follow it (a snapshot was missed and a keyframe is needed)."""
+        if self.latest_snapshot is None or not delta.follows(self.latest_snapshot):
+            return None
+        return delta.apply(self.latest_snapshot)
+
     def my_data_channels(self) -> list[DataChannelGt]:
         if self.layout_lite is None:
             return []
@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
 from gwsproto.named_types import FloParamsHouse0
 
 
@@ -10,6 +14,7 @@ class DNode:
         self.energy = self.get_energy()
         self.pathcost = 0 if time_slice==self.params.HorizonHours else 1e9
         self.next_node: DNode | None = None
+        self.shortest_path_hp_kwh_el: list[float] = []
 
     def get_energy(self) -> float:
         energy_kwh = 0 # TODO: create
@@ -17,10 +22,143 @@ class DNode:
 
 
 class DEdge:
-    def __init__(self, tail:DNode, head:DNode, cost:float):
+    def __init__(self, tail:DNode, head:DNode, cost:float, hp_heat_out:float=0):
         self.tail: DNode = tail
         self.head: DNode = head
         self.cost = cost
+        self.hp_heat_out = hp_heat_out
 
     def __repr__(self):
-        return f"Edge[{self.tail} --cost:{round(self.cost,3)}--> {self.head}]"
\ No newline at end of file
+        return f"Edge[{self.tail} --cost:{round(self.cost,3)}--> {self.head}]"
+
+def segment_argmin(values: np.ndarray, edge_ptr: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Minimum and index of the first minimum of each CSR segment
+    values[edge_ptr[i]:edge_ptr[i+1]]. Empty segments get inf and -1."""
+    num_segments = len(edge_ptr) - 1
+    counts = np.diff(edge_ptr)
+    mins = np.full(num_segments, np.inf)
+    arg = np.full(num_segments, -1, dtype=np.int32)
+    nonempty = counts > 0
+    if not nonempty.any():
+        return mins, arg
+    mins[nonempty] = np.minimum.reduceat(values, edge_ptr[:-1][nonempty])
+    segment = np.repeat(np.arange(num_segments), counts)
+    hits = np.flatnonzero(values == mins[segment])
+    hit_segment = segment[hits]
+    first = np.ones(len(hits), dtype=bool)
+    first[1:] = hit_segment[1:] != hit_segment[:-1]
+    arg[hit_segment[first]] = hits[first]
+    return mins, arg
+
+
+class FloGraph:
+    """The FLO graph as arrays.
+
+    Time slice t has one entry per storage state in energy[t]. The edges
+    out of slice t (t < horizon) are in CSR form: the edges of state i are
+    edge_ptr[t][i]:edge_ptr[t][i+1] in edge_head[t] (int32 state in slice
+    t+1), edge_cost[t] (float32) and edge_hp_heat_out[t] (float32 kWh).
+    cop[t] turns slice t heat into heat pump electricity for plans.
+
+    solve() fills pathcost[t] (float64, cost to the end of the horizon)
+    and next_edge[t] (int32 index into slice t's edges, -1 for none).
+    """
+
+    def __init__(
+        self,
+        energy: Sequence[np.ndarray],
+        edge_ptr: Sequence[np.ndarray],
+        edge_head: Sequence[np.ndarray],
+        edge_cost: Sequence[np.ndarray],
+        edge_hp_heat_out: Sequence[np.ndarray],
+        cop: Sequence[float],
+    ):
+        self.energy = [np.asarray(e, dtype=np.float32) for e in energy]
+        self.edge_ptr = [np.asarray(p, dtype=np.int32) for p in edge_ptr]
+        self.edge_head = [np.asarray(h, dtype=np.int32) for h in edge_head]
+        self.edge_cost = [np.asarray(c, dtype=np.float32) for c in edge_cost]
+        self.edge_hp_heat_out = [np.asarray(q, dtype=np.float32) for q in edge_hp_heat_out]
+        self.cop = np.asarray(cop, dtype=float)
+        if not (len(self.edge_ptr) == len(self.edge_head) == len(self.edge_cost)
+                == len(self.edge_hp_heat_out) == len(self.energy) - 1 == len(self.cop)):
+            raise ValueError("Need one set of edges and one cop per time slice but the last")
+        for t, ptr in enumerate(self.edge_ptr):
+            if len(ptr) != len(self.energy[t]) + 1 or ptr[-1] != len(self.edge_head[t]):
+                raise ValueError(f"Slice {t} edge_ptr does not match its states and edges")
+        self.pathcost: list[np.ndarray] = []
+        self.next_edge: list[np.ndarray] = []
+
+    @property
+    def horizon(self) -> int:
+        return len(self.edge_ptr)
+
+    def num_states(self, time_slice: int) -> int:
+        return len(self.energy[time_slice])
+
+    def solve(self) -> None:
+        """Backward induction, one vectorized segment-min per time slice.
+        A state with no edges keeps the unreachable pathcost of 1e9."""
+        pathcost = [np.empty(0)] * (self.horizon + 1)
+        next_edge = [np.empty(0, dtype=np.int32)] * self.horizon
+        pathcost[self.horizon] = np.zeros(self.num_states(self.horizon))
+        for t in range(self.horizon - 1, -1, -1):
+            total = pathcost[t + 1][self.edge_head[t]] + self.edge_cost[t]
+            mins, arg = segment_argmin(total, self.edge_ptr[t])
+            mins[arg < 0] = 1e9
+            pathcost[t] = mins
+            next_edge[t] = arg
+        self.pathcost = pathcost
+        self.next_edge = next_edge
+
+    def shortest_path_hp_kwh_el(self, time_slice: int) -> np.ndarray:
+        """Heat pump kWh of electricity for each hour of the shortest path
+        from every state of time_slice to the end of the horizon, as a
+        (states, hours) float32 array. Hours past a dead end are nan."""
+        states = np.arange(self.num_states(time_slice))
+        plan = np.full((len(states), self.horizon - time_slice), np.nan, dtype=np.float32)
+        alive = np.ones(len(states), dtype=bool)
+        for k, t in enumerate(range(time_slice, self.horizon)):
+            edge = self.next_edge[t][states]
+            alive &= edge >= 0
+            edge = np.where(alive, edge, 0)
+            if len(self.edge_head[t]) == 0:
+                break
+            plan[alive, k] = self.edge_hp_heat_out[t][edge[alive]] / self.cop[t]
+            states = np.where(alive, self.edge_head[t][edge], 0)
+        return plan
+
+    def trimmed(self) -> "TrimmedFloGraph":
+        """Everything bidding and next-hour planning need: slice 0, its edges
+        and the solved slice 1"""
+        if not self.pathcost:
+            raise ValueError("Solve the graph before trimming it")
+        return TrimmedFloGraph(
+            energy0=self.energy[0],
+            edge_ptr=self.edge_ptr[0],
+            edge_head=self.edge_head[0],
+            edge_cost=self.edge_cost[0],
+            edge_hp_heat_out=self.edge_hp_heat_out[0],
+            energy1=self.energy[1],
+            pathcost1=self.pathcost[1],
+            plan1=self.shortest_path_hp_kwh_el(1),
+        )
+
+
+class TrimmedFloGraph(NamedTuple):
+    """The first hour of a solved FloGraph. A few hundred kB for a full size
+    graph, so it can be kept in memory until the bid and plans are done."""
+    energy0: np.ndarray
+    edge_ptr: np.ndarray
+    edge_head: np.ndarray
+    edge_cost: np.ndarray
+    edge_hp_heat_out: np.ndarray
+    energy1: np.ndarray
+    pathcost1: np.ndarray
+    plan1: np.ndarray # (slice 1 states, hours) heat pump kWh el along each shortest path
+
+    def edges(self, state: int) -> slice:
+        return slice(int(self.edge_ptr[state]), int(self.edge_ptr[state + 1]))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self)
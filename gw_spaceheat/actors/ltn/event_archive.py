@@ -0,0 +1,285 @@
+"""Append-only archive of the events and reports the LTN receives.
+
+Records are newline-delimited JSON, one per line:
+
+    {"TimeMs": 1718000000000, "TypeName": "report", "Payload": {...}}
+
+and are written, in batches, to gzip-compressed segment files. The segment
+being written is named events.<first ms>.ndjson.gz.part; it is finished and
+renamed to .ndjson.gz once it reaches max_segment_bytes or max_segment_s.
+Each finished segment adds one line to index.ndjson with its time range,
+record count and count per TypeName, so a reader skips segments outside the
+window or without the wanted types without opening them.
+
+Every batch ends with a gzip sync flush, so a .part left by a crash is
+readable up to its last batch; EventArchive finishes such segments when it
+is next opened. Batches are written from append, and from flush_if_due,
+which the owner calls periodically so a quiet archive still writes its
+buffer within flush_s and rolls its segment within max_segment_s.
+"""
+import gzip
+import json
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Iterable, Iterator, NamedTuple, Optional
+
+ARCHIVE_DIR_NAME = "archive"
+INDEX_NAME = "index.ndjson"
+SEGMENT_PREFIX = "events."
+SEGMENT_SUFFIX = ".ndjson.gz"
+ACTIVE_SUFFIX = SEGMENT_SUFFIX + ".part"
+
+
+class ArchivedRecord(NamedTuple):
+    time_ms: int
+    type_name: str
+    payload: dict[str, Any]
+
+
+class SegmentInfo(NamedTuple):
+    name: str
+    start_ms: int
+    end_ms: int
+    records: int
+    type_counts: dict[str, int]
+
+    def overlaps(
+        self,
+        start_ms: Optional[int],
+        end_ms: Optional[int],
+        type_names: Optional[Iterable[str]],
+    ) -> bool:
+        if start_ms is not None and self.end_ms < start_ms:
+            return False
+        if end_ms is not None and self.start_ms >= end_ms:
+            return False
+        if type_names is not None and not any(t in self.type_counts for t in type_names):
+            return False
+        return True
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "Segment": self.name,
+                "StartMs": self.start_ms,
+                "EndMs": self.end_ms,
+                "Records": self.records,
+                "Types": self.type_counts,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, line: str) -> "SegmentInfo":
+        d = json.loads(line)
+        return cls(d["Segment"], d["StartMs"], d["EndMs"], d["Records"], d["Types"])
+
+
+def _segment_lines(path: Path) -> Iterator[bytes]:
+    """Complete lines of a segment, tolerating a stream cut off by a crash"""
+    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    pending = b""
+    with path.open("rb") as f:
+        while chunk := f.read(1 << 16):
+            try:
+                pending += decompressor.decompress(chunk)
+            except zlib.error:
+                break
+            *lines, pending = pending.split(b"\n")
+            yield from lines
+            if decompressor.eof:
+                break
+
+
+def _decode(line: bytes) -> ArchivedRecord:
+    d = json.loads(line)
+    return ArchivedRecord(d["TimeMs"], d["TypeName"], d["Payload"])
+
+
+def _scan_segment(path: Path, name: str) -> SegmentInfo:
+    start_ms, end_ms, records = None, None, 0
+    type_counts: dict[str, int] = {}
+    for line in _segment_lines(path):
+        record = _decode(line)
+        records += 1
+        start_ms = record.time_ms if start_ms is None else min(start_ms, record.time_ms)
+        end_ms = record.time_ms if end_ms is None else max(end_ms, record.time_ms)
+        type_counts[record.type_name] = type_counts.get(record.type_name, 0) + 1
+    return SegmentInfo(name, start_ms or 0, end_ms or 0, records, type_counts)
+
+
+class EventArchive:
+    def __init__(
+        self,
+        directory: Path | str,
+        max_segment_bytes: int = 16 * 2**20,
+        max_segment_s: float = 3600,
+        flush_records: int = 100,
+        flush_s: float = 30,
+        compresslevel: int = 1,
+    ):
+        self.directory = Path(directory)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_s = max_segment_s
+        self.flush_records = flush_records
+        self.flush_s = flush_s
+        self.compresslevel = compresslevel
+        self._buffer: list[str] = []
+        self._file = None
+        self._gz: Optional[gzip.GzipFile] = None
+        self._path: Optional[Path] = None
+        self._opened_s = 0.0
+        self._flushed_s = 0.0
+        self._start_ms: Optional[int] = None
+        self._end_ms: Optional[int] = None
+        self._records = 0
+        self._type_counts: dict[str, int] = {}
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._recover()
+
+    def append(self, type_name: str, time_ms: int, payload_json: str) -> None:
+        """Archive one record. payload_json must be a JSON object on one line,
+        e.g. from model_dump_json()."""
+        if self._gz is None:
+            self._open_segment()
+        self._buffer.append(
+            f'{{"TimeMs":{int(time_ms)},"TypeName":{json.dumps(type_name)},"Payload":{payload_json}}}\n'
+        )
+        self._records += 1
+        self._start_ms = time_ms if self._start_ms is None else min(self._start_ms, time_ms)
+        self._end_ms = time_ms if self._end_ms is None else max(self._end_ms, time_ms)
+        self._type_counts[type_name] = self._type_counts.get(type_name, 0) + 1
+        if len(self._buffer) >= self.flush_records:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self) -> None:
+        """Flush if records have been buffered for flush_s or the segment
+        is max_segment_s old"""
+        if self._gz is None:
+            return
+        now_s = time.monotonic()
+        if (
+            self._buffer and now_s - self._flushed_s >= self.flush_s
+        ) or now_s - self._opened_s >= self.max_segment_s:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered records, then roll the segment if it is full or old"""
+        if self._gz is None:
+            return
+        if self._buffer:
+            self._gz.write("".join(self._buffer).encode())
+            self._gz.flush()
+            self._file.flush()
+            self._buffer.clear()
+        self._flushed_s = time.monotonic()
+        if (
+            self._file.tell() >= self.max_segment_bytes
+            or time.monotonic() - self._opened_s >= self.max_segment_s
+        ):
+            self._finish_segment()
+
+    def close(self) -> None:
+        self.flush()
+        if self._gz is not None:
+            self._finish_segment()
+
+    def _open_segment(self) -> None:
+        first_ms = int(time.time() * 1000)
+        while (path := self.directory / f"{SEGMENT_PREFIX}{first_ms}{ACTIVE_SUFFIX}").exists() or (
+            self.directory / f"{SEGMENT_PREFIX}{first_ms}{SEGMENT_SUFFIX}"
+        ).exists():
+            first_ms += 1
+        self._path = path
+        self._file = path.open("xb")
+        self._gz = gzip.GzipFile(
+            fileobj=self._file, mode="wb", compresslevel=self.compresslevel, mtime=0
+        )
+        self._opened_s = self._flushed_s = time.monotonic()
+        self._start_ms = self._end_ms = None
+        self._records = 0
+        self._type_counts = {}
+
+    def _finish_segment(self) -> None:
+        self._gz.close()
+        self._file.close()
+        self._gz = self._file = None
+        if self._records:
+            name = self._path.name.removesuffix(".part")
+            self._path.rename(self.directory / name)
+            self._add_to_index(
+                SegmentInfo(name, self._start_ms, self._end_ms, self._records, self._type_counts)
+            )
+        else:
+            self._path.unlink()
+
+    def _add_to_index(self, info: SegmentInfo) -> None:
+        with (self.directory / INDEX_NAME).open("a") as f:
+            f.write(info.to_json() + "\n")
+
+    def _recover(self) -> None:
+        for path in sorted(self.directory.glob(f"{SEGMENT_PREFIX}*{ACTIVE_SUFFIX}")):
+            name = path.name.removesuffix(".part")
+            info = _scan_segment(path, name)
+            if info.records:
+                path.rename(self.directory / name)
+                self._add_to_index(info)
+            else:
+                path.unlink()
+
+
+class EventArchiveReader:
+    def __init__(self, directory: Path | str):
+        self.directory = Path(directory)
+
+    def segments(
+        self,
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None,
+        type_names: Optional[Iterable[str]] = None,
+    ) -> list[SegmentInfo]:
+        """Finished and in-progress segments that may hold records in
+        [start_ms, end_ms) of the given types, oldest first"""
+        if type_names is not None:
+            type_names = set(type_names)
+        found = []
+        index = self.directory / INDEX_NAME
+        if index.exists():
+            with index.open() as f:
+                found = [SegmentInfo.from_json(line) for line in f if line.strip()]
+        for path in self.directory.glob(f"{SEGMENT_PREFIX}*{ACTIVE_SUFFIX}"):
+            try:
+                found.append(_scan_segment(path, path.name))
+            except FileNotFoundError:
+                pass  # finished while we listed; it is in the next index read
+        return sorted(
+            (s for s in found if s.overlaps(start_ms, end_ms, type_names)),
+            key=lambda s: s.start_ms,
+        )
+
+    def records(
+        self,
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None,
+        type_names: Optional[Iterable[str]] = None,
+    ) -> Iterator[ArchivedRecord]:
+        """Records with start_ms <= TimeMs < end_ms, segment by segment in
+        the order they were archived"""
+        if type_names is not None:
+            type_names = set(type_names)
+        for segment in self.segments(start_ms, end_ms, type_names):
+            path = self.directory / segment.name
+            if not path.exists():
+                # the writer finished this segment since segments() listed it
+                path = path.with_name(segment.name.removesuffix(".part"))
+            for line in _segment_lines(path):
+                record = _decode(line)
+                if start_ms is not None and record.time_ms < start_ms:
+                    continue
+                if end_ms is not None and record.time_ms >= end_ms:
+                    continue
+                if type_names is not None and record.type_name not in type_names:
+                    continue
+                yield record
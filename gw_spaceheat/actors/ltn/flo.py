@@ -1,73 +1,156 @@
 import gc
+import logging
 import time
 import json
-from typing import List
+from typing import List, Optional, Sequence
+import numpy as np
 from gwproactor.logger import LoggerOrAdapter
-from actors.ltn.dtypes import DNode, DEdge
+from actors.ltn.dtypes import DNode, DEdge, FloGraph, TrimmedFloGraph
 from gwsproto.enums import MarketPriceUnit, MarketQuantityUnit, MarketTypeName
 from gwsproto.named_types import FloParamsHouse0, PriceQuantityUnitless, BidRecommendation
 
 P_NODE = "hw1.isone.ver.keene" # TODO: add to House0Params for audit trail
+MIN_BID_PRICE_USD_MWH = -100
+MAX_BID_PRICE_USD_MWH = 2000
+FIXED_COST_THRESHOLD = 1e4 # edges costing at least this do not depend on price
+
+
+class BidSweep:
+    """The bid edges out of the initial node packed as arrays, for finding
+    the best edge at many prices at once.
+
+    At a given price an edge costs its head's pathcost plus either its
+    fixed cost (if >= FIXED_COST_THRESHOLD) or the price of the electricity
+    its heat takes at the forecasted cop. Costs are computed in the same
+    order as the scalar loop they replace, so ties and argmins match it
+    exactly.
+    """
+    MAX_CELLS = 1_000_000 # price x edge cells per argmin chunk
+
+    def __init__(self, hp_heat_out: np.ndarray, cost: np.ndarray, head_pathcost: np.ndarray, cop: float):
+        heat_out = np.asarray(hp_heat_out, dtype=float)
+        cost = np.asarray(cost, dtype=float)
+        pathcost = np.asarray(head_pathcost, dtype=float)
+        if len(heat_out) == 0:
+            raise ValueError("No bid edges to sweep")
+        fixed = cost >= FIXED_COST_THRESHOLD
+        self.num_edges = len(heat_out)
+        self.offset = np.where(fixed, pathcost + cost, pathcost)
+        self.kwh = np.where(fixed, 0.0, heat_out / cop)
+        self.quantity_x1000 = [int(max(0, q/cop) * 1000) for q in heat_out.tolist()]
+
+    @classmethod
+    def from_edges(cls, edges: Sequence[DEdge], cop: float) -> "BidSweep":
+        return cls(
+            [e.hp_heat_out for e in edges],
+            [e.cost for e in edges],
+            [e.head.pathcost for e in edges],
+            cop,
+        )
+
+    @classmethod
+    def from_graph(cls, graph: TrimmedFloGraph, state: int, cop: float) -> "BidSweep":
+        """The edges out of slice 0 state of a trimmed graph"""
+        edges = graph.edges(state)
+        return cls(
+            graph.edge_hp_heat_out[edges],
+            graph.edge_cost[edges],
+            graph.pathcost1[graph.edge_head[edges]],
+            cop,
+        )
+
+    def best_edge_idx(self, prices_usd_mwh: np.ndarray) -> np.ndarray:
+        """Index of the cheapest edge (the first of equals) at each price"""
+        prices = np.asarray(prices_usd_mwh, dtype=float)
+        best = np.empty(len(prices), dtype=np.intp)
+        rows = max(1, self.MAX_CELLS // self.num_edges)
+        for start in range(0, len(prices), rows):
+            chunk = prices[start:start + rows, None]
+            best[start:start + rows] = np.argmin(self.offset + self.kwh * chunk / 1000, axis=1)
+        return best
+
+    def pq_pairs(self, prices_usd_mwh: np.ndarray) -> List[PriceQuantityUnitless]:
+        """PQ pairs over ascending prices. The quantity only changes where
+        the best edge does, so only those breakpoints are visited; a new
+        pair starts when the quantity drops by more than 10 Wh."""
+        prices = np.asarray(prices_usd_mwh, dtype=float)
+        best = self.best_edge_idx(prices)
+        breakpoints = np.flatnonzero(best[1:] != best[:-1]) + 1
+        pq_pairs: List[PriceQuantityUnitless] = []
+        for i in [0, *breakpoints.tolist()]:
+            quantity_x1000 = self.quantity_x1000[best[i]]
+            if not pq_pairs or pq_pairs[-1].QuantityX1000 - quantity_x1000 > 10:
+                pq_pairs.append(
+                    PriceQuantityUnitless(
+                        PriceX1000=int(prices[i] * 1000),
+                        QuantityX1000=quantity_x1000,
+                    )
+                )
+        return pq_pairs
+
+
+def bid_prices_usd_mwh(forecasted_price_usd_mwh: float, step_usd_mwh: float = 1) -> np.ndarray:
+    """Ascending prices to sweep: every step from MIN_BID_PRICE_USD_MWH up to
+    MAX_BID_PRICE_USD_MWH, plus the forecasted price"""
+    prices = np.arange(MIN_BID_PRICE_USD_MWH, MAX_BID_PRICE_USD_MWH, step_usd_mwh, dtype=float)
+    return np.sort(np.append(prices, forecasted_price_usd_mwh))
+
 
 class Flo():
+    """Bids and plans from the FLO graph, held as a FloGraph of arrays.
+
+    After solve_dijkstra and trim_graph_for_waiting only a TrimmedFloGraph
+    (the first hour) is kept, which is small enough to stay in memory in
+    the LTN until the bid and next hour plans have been made.
+    """
     LOGGER_NAME="flo"
-    def __init__(self, flo_params_bytes: bytes, logger: LoggerOrAdapter):
+    def __init__(self, flo_params_bytes: bytes, logger: Optional[LoggerOrAdapter] = None, graph: Optional[FloGraph] = None):
         flo_params_dict = json.loads(flo_params_bytes.decode('utf-8'))
         flo_params = FloParamsHouse0.model_validate(flo_params_dict)
-        self.logger = logger
+        self.logger = logger or logging.getLogger(self.LOGGER_NAME)
         self.flo_params = flo_params
-        raise NotImplementedError("Need to populate graph before this works!")
+        self.trimmed_graph: Optional[TrimmedFloGraph] = None
+        if graph is None:
+            graph = self.create_graph()
+        self.graph: Optional[FloGraph] = graph
 
-    def create_nodes(self):
-        self.nodes: dict[int, list[DNode]] = {h: [] for h in range(self.flo_params.HorizonHours+1)}
-        # TODO make Dijkstra Nodes
+    def create_graph(self) -> FloGraph:
+        # TODO: storage states per time slice (energy), and per slice CSR
+        # edges to the next slice with their costs and heat pump heat out
+        raise NotImplementedError("Need to populate graph before this works!")
 
-    def create_edges(self):
-        self.edges: dict[DNode, list[DEdge]] = {}
-        # TODO make Dijkstra Edges
-    
     def solve_dijkstra(self):
         start_time = time.time()
         try:
-            for time_slice in range(self.flo_params.HorizonHours-1, -1, -1):
-                for node in self.nodes[time_slice]:
-                    best_edge = min(self.edges[node], key=lambda e: e.head.pathcost + e.cost)
-                    node.pathcost = best_edge.head.pathcost + best_edge.cost
-                    node.next_node = best_edge.head
+            self.graph.solve()
             self.logger.info(f"Solved Dijkstra in {round(time.time()-start_time, 1)} seconds")
         except Exception as e:
             self.logger.error(f"Error solving Dijkstra algorithm: {e}")
             raise
 
     def find_initial_node(self, updated_flo_params: FloParamsHouse0 | None = None):
-        self.initial_node: DNode = self.nodes[0][50]
-        self.bid_edges: dict[DNode, list[DEdge]] = {}
+        # TODO: the slice 0 state closest to the storage in updated_flo_params
+        self.initial_state: int = min(50, len(self.trimmed_graph.energy0) - 1)
+        self.initial_node = DNode(self.flo_params, time_slice=0)
+        self.initial_node.energy = float(self.trimmed_graph.energy0[self.initial_state])
 
-    def generate_recommendation(self, flo_params_bytes: bytes | None=None) -> bytes:
+    def generate_recommendation(self, flo_params_bytes: bytes | None=None, price_step_usd_mwh: float=1) -> bytes:
         """ Returns serialized"""
         self.logger.info("Generating bid...")
+        flo_params = self.flo_params
         if flo_params_bytes:
             flo_params_dict = json.loads(flo_params_bytes.decode('utf-8'))
             flo_params = FloParamsHouse0.model_validate(flo_params_dict)
-        self.pq_pairs: List[PriceQuantityUnitless] = []
+        if self.trimmed_graph is None:
+            self.trim_graph_for_waiting()
         self.find_initial_node(flo_params)
-        
+
         forecasted_cop = self.flo_params.COP(oat=self.flo_params.OatForecastF[0])
         forecasted_price_usd_mwh = self.flo_params.total_price_forecast[0]
-        price_range_usd_mwh = sorted(list(range(-100, 2000)) + [forecasted_price_usd_mwh])
-        edge_cost = {}
-
-        for price_usd_mwh in price_range_usd_mwh:
-            for edge in self.bid_edges[self.initial_node]:
-                edge_cost[edge] = edge.cost if edge.cost >= 1e4 else edge.hp_heat_out/forecasted_cop * price_usd_mwh/1000
-            best_edge: DEdge = min(self.bid_edges[self.initial_node], key=lambda e: e.head.pathcost + edge_cost[e])
-            best_quantity_kwh = max(0, best_edge.hp_heat_out/forecasted_cop)
-            if not self.pq_pairs or (self.pq_pairs[-1].QuantityX1000-int(best_quantity_kwh*1000)>10):
-                self.pq_pairs.append(
-                    PriceQuantityUnitless(
-                        PriceX1000 = int(price_usd_mwh * 1000),
-                        QuantityX1000 = int(best_quantity_kwh * 1000))
-                )
+        sweep = BidSweep.from_graph(self.trimmed_graph, self.initial_state, forecasted_cop)
+        self.pq_pairs: List[PriceQuantityUnitless] = sweep.pq_pairs(
+            bid_prices_usd_mwh(forecasted_price_usd_mwh, price_step_usd_mwh)
+        )
         self.logger.info(f"Done ({len(self.pq_pairs)} PQ pairs found).")
         slot_start_s = flo_params.StartUnixS
         mtn = MarketTypeName.rt60gate5.value # TODO: send in House0FloParams
@@ -82,10 +165,28 @@ class Flo():
             QuantityUnit=MarketQuantityUnit.AvgkW
         ).model_dump_json().encode('utf-8')
 
+    def get_next_node_at_price(self, price_usd_mwh: float) -> DNode:
+        """Sets initial_node.next_node to the slice 1 state chosen at this
+        price, with its energy and the heat pump plan along its shortest path"""
+        forecasted_cop = self.flo_params.COP(oat=self.flo_params.OatForecastF[0])
+        sweep = BidSweep.from_graph(self.trimmed_graph, self.initial_state, forecasted_cop)
+        edge = self.trimmed_graph.edges(self.initial_state).start + int(sweep.best_edge_idx([price_usd_mwh])[0])
+        state = int(self.trimmed_graph.edge_head[edge])
+        next_node = DNode(self.flo_params, time_slice=1)
+        next_node.energy = float(self.trimmed_graph.energy1[state])
+        next_node.pathcost = float(self.trimmed_graph.pathcost1[state])
+        plan = self.trimmed_graph.plan1[state]
+        dead_ends = np.flatnonzero(np.isnan(plan))
+        next_node.shortest_path_hp_kwh_el = plan[:dead_ends[0] if len(dead_ends) else len(plan)].tolist()
+        self.initial_node.next_node = next_node
+        return next_node
+
     def trim_graph_for_waiting(self):
-        """Remove all but the first two time slices to save memory while waiting to generate bid."""
+        """Keep only the first hour of the solved graph while waiting to generate bid."""
         start_time = time.time()
-        del self.nodes
-        del self.edges
+        self.trimmed_graph = self.graph.trimmed()
+        self.graph = None
         gc.collect()
-        self.logger.info(f"Trimmed graph in {round(time.time()-start_time, 1)} seconds.")
\ No newline at end of file
+        self.logger.info(
+            f"Trimmed graph to {self.trimmed_graph.nbytes} bytes in {round(time.time()-start_time, 1)} seconds."
+        )
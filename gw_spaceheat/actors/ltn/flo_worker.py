@@ -0,0 +1,276 @@
+"""Long-lived process that builds, holds and queries the FLO graph.
+
+The LTN's BidRunner used to start a fresh forkserver child for every market
+slot, and pickled the trimmed graph back out of it. FloWorker keeps one
+process alive across slots instead: the graph stays in the worker from the
+build until the next-hour plan, and only parameters and results cross the
+pipe. Memory stays bounded by recycling the process once its resident set
+passes a threshold or after a fixed number of runs.
+
+Commands are (command, argument) tuples sent over a multiprocessing Pipe.
+Every reply is (status, result, FloPhaseStats), where status is "ok" or
+"error" and an error's result is its message.
+"""
+import gc
+import multiprocessing
+import resource
+import time
+from multiprocessing.connection import Connection
+from typing import Any, Callable, NamedTuple, Optional
+
+from gwproactor.logger import LoggerOrAdapter
+
+try:
+    from gridflo import Flo
+# this is so CI/CD passes - will remove once Flo is decoupled
+except ImportError:
+    from actors.ltn.flo import Flo # Will raise NotImplementedError
+
+BUILD = "build"
+RECOMMEND = "recommend"
+PLANS = "plans"
+RELEASE = "release"
+STOP = "stop"
+
+
+class FloWorkerError(Exception):
+    """A FLO worker command failed, timed out, or the worker died"""
+
+
+class FloPhaseStats(NamedTuple):
+    elapsed_s: float
+    rss_mb: float
+    peak_rss_mb: float
+    pid: int
+
+
+def _proc_status_mb(field: str) -> Optional[float]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process"""
+    rss = _proc_status_mb("VmRSS:")
+    return rss if rss is not None else peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size since the process started or since
+    reset_peak_rss, where the OS supports resetting it"""
+    peak = _proc_status_mb("VmHWM:")
+    if peak is not None:
+        return peak
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def reset_peak_rss() -> None:
+    """Restart peak RSS accounting (Linux >= 4.0), so each build reports its
+    own peak rather than the worker's lifetime peak"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def flo_next_hour_plan(g: Flo, price_usd_mwh: float) -> tuple[float, list[float]]:
+    """Expected storage at hour 1 and the hourly heat pump plan at the clearing price"""
+    g.get_next_node_at_price(price_usd_mwh)
+    expected_storage_kwh = round(float(g.initial_node.next_node.energy), 2)
+    hourly_plan = [float(x) for x in list(g.initial_node.next_node.shortest_path_hp_kwh_el)]
+    return expected_storage_kwh, hourly_plan
+
+
+def flo_worker_main(conn: Connection, flo_factory: Callable[[bytes], Any] = Flo) -> None:
+    """Worker process: serve commands until STOP or until the parent goes away"""
+    g = None
+    while True:
+        try:
+            command, arg = conn.recv()
+        except (EOFError, OSError):
+            return
+        st = time.time()
+        result: Any = None
+        try:
+            if command == BUILD:
+                g = None
+                gc.collect()
+                reset_peak_rss()
+                g = flo_factory(arg)
+                g.solve_dijkstra()
+                g.trim_graph_for_waiting()
+                gc.collect()
+            elif command == RECOMMEND:
+                if g is None:
+                    raise FloWorkerError("No graph. Send build first")
+                result = g.generate_recommendation(arg)
+            elif command == PLANS:
+                if g is None:
+                    raise FloWorkerError("No graph. Send build first")
+                result = flo_next_hour_plan(g, arg)
+            elif command == RELEASE:
+                g = None
+                gc.collect()
+            elif command != STOP:
+                raise FloWorkerError(f"Unknown command {command!r}")
+            status = "ok"
+        except Exception as e:
+            status, result = "error", f"{type(e).__name__}: {e}"
+        stats = FloPhaseStats(
+            elapsed_s=time.time() - st,
+            rss_mb=rss_mb(),
+            peak_rss_mb=peak_rss_mb(),
+            pid=multiprocessing.current_process().pid,
+        )
+        try:
+            conn.send((status, result, stats))
+        except (BrokenPipeError, OSError):
+            return
+        if command == STOP:
+            return
+
+
+class FloWorker:
+    """The LTN's handle on its FLO worker process.
+
+    The process is started on the first request and after each recycle.
+    Requests come from one BidRunner thread at a time.
+    """
+
+    def __init__(
+        self,
+        max_runs: int = 24,
+        max_rss_mb: float = 1500,
+        flo_factory: Callable[[bytes], Any] = Flo,
+        logger: Optional[LoggerOrAdapter] = None,
+    ):
+        self.max_runs = max_runs
+        self.max_rss_mb = max_rss_mb
+        self.flo_factory = flo_factory
+        self.logger = logger
+        self.runs = 0
+        self.last_stats: Optional[FloPhaseStats] = None
+        self._proc: Optional[multiprocessing.process.BaseProcess] = None
+        self._conn: Optional[Connection] = None
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._proc.pid if self._proc is not None else None
+
+    def is_alive(self) -> bool:
+        return self._proc is not None and self._proc.is_alive()
+
+    def start(self) -> None:
+        ctx = multiprocessing.get_context("forkserver")
+        self._conn, child_conn = ctx.Pipe()
+        self._proc = ctx.Process(
+            target=flo_worker_main,
+            args=(child_conn, self.flo_factory),
+            daemon=True,
+        )
+        self._proc.start()
+        child_conn.close()
+        self.runs = 0
+        self.last_stats = None
+        self._log(f"Started FLO worker pid {self._proc.pid}")
+
+    def request(
+        self,
+        command: str,
+        arg: Any = None,
+        timeout_s: float = 30,
+        max_total_s: float = 300,
+        pat_watchdog: Optional[Callable[[], None]] = None,
+    ) -> tuple[Any, FloPhaseStats]:
+        """Send one command and wait for its reply.
+
+        Calls pat_watchdog every timeout_s seconds while waiting. Kills the
+        worker after max_total_s seconds so a deadlocked graph build cannot
+        block the BidRunner forever; the next request starts a new one.
+        Raises FloWorkerError if the command fails.
+        """
+        if not self.is_alive():
+            self.start()
+        try:
+            self._conn.send((command, arg))
+        except (BrokenPipeError, OSError) as e:
+            self.kill()
+            raise FloWorkerError(f"FLO worker unreachable: {e}")
+        deadline = time.time() + max_total_s
+        while not self._conn.poll(timeout_s):
+            if time.time() > deadline:
+                self.kill()
+                raise FloWorkerError(f"FLO worker {command} timed out after {max_total_s}s")
+            if not self._proc.is_alive():
+                self.kill()
+                raise FloWorkerError(f"FLO worker died during {command}")
+            if pat_watchdog:
+                pat_watchdog()
+        try:
+            status, result, stats = self._conn.recv()
+        except (EOFError, OSError):
+            self.kill()
+            raise FloWorkerError(f"FLO worker died during {command}")
+        self.last_stats = stats
+        if status == "error":
+            raise FloWorkerError(result)
+        return result, stats
+
+    def finish_run(self) -> Optional[FloPhaseStats]:
+        """Drop the graph after a market slot, and recycle the worker if it
+        has served max_runs slots or is still over max_rss_mb without one.
+        Returns the worker's stats after the release, or None if it was
+        already gone."""
+        if not self.is_alive():
+            return None
+        self.runs += 1
+        try:
+            _, stats = self.request(RELEASE)
+        except FloWorkerError as e:
+            self._log(f"Releasing FLO graph failed: {e}")
+            self.kill()
+            return None
+        if self.runs >= self.max_runs:
+            self._log(f"Recycling FLO worker pid {self.pid} after {self.runs} runs")
+            self.stop()
+        elif stats.rss_mb > self.max_rss_mb:
+            self._log(
+                f"Recycling FLO worker pid {self.pid}: "
+                f"{stats.rss_mb:.0f} MB resident > {self.max_rss_mb:.0f} MB"
+            )
+            self.stop()
+        return stats
+
+    def stop(self, timeout_s: float = 5) -> None:
+        if self._proc is None:
+            return
+        if self._proc.is_alive():
+            try:
+                self._conn.send((STOP, None))
+                if self._conn.poll(timeout_s):
+                    self._conn.recv()
+            except (EOFError, OSError):
+                pass
+            self._proc.join(timeout=timeout_s)
+        self.kill()
+
+    def kill(self) -> None:
+        if self._proc is not None:
+            if self._proc.is_alive():
+                self._proc.kill()
+            self._proc.join(timeout=5)
+        if self._conn is not None:
+            self._conn.close()
+        self._proc = None
+        self._conn = None
+
+    def _log(self, note: str) -> None:
+        if self.logger is not None:
+            self.logger.info(note)
@@ -1,9 +1,6 @@
-import csv
 import asyncio
 import json
 import gc
-import multiprocessing
-import pickle
 import subprocess
 import threading
 import time
@@ -18,7 +15,6 @@ import numpy as np
 import pytz
 import aiohttp
 import rich
-import httpx
 
 from gwproto.messages import (
     Ack,
@@ -41,13 +37,6 @@ from gwproactor import ProactorName
 from gwproactor import AppInterface
 from gwproto import HardwareLayout
 
-
-try:
-    from gridflo import Flo
-# this is so CI/CD passes - will remove once Flo is decoupled
-except ImportError:
-    from actors.ltn.flo import Flo # Will raise NotImplementedError
-
 from gwproto import Message, MQTTCodec, create_message_model
 from gwproto.messages import EventBase
 
@@ -56,7 +45,9 @@ from gwproactor.config import LoggerLevels
 from gwproactor.logger import LoggerOrAdapter
 from gwproactor.message import DBGCommands, DBGPayload, MQTTReceiptPayload, PatInternalWatchdogMessage
 
+from gwsproto.conversions.storage_model import three_layer_storage_model
 from gwsproto.conversions.temperature import convert_temp_to_f
+from gwsproto.named_types.channel_readings_compact import COMPACT_CHANNEL_READINGS_ENCODING
 from gwsproto.data_classes.house_0_layout import House0Layout
 from gwsproto.data_classes.house_0_names import H0CN, H0N
 
@@ -74,73 +65,29 @@ from actors.ltn.contract_handler import LtnContractHandler
  
 from gwsproto.named_types import (
     Bid, BidRecommendation, FloParamsHouse0, FloNextHourPlans, Glitch, Ha1Params, LatestPrice,
-    LayoutLite, NoNewContractWarning, ResetHpKeepValue, ScadaParams, SendLayout,
-    SetLwtControlParams, SiegLoopEndpointValveAdjustment, SlowContractHeartbeat, SnapshotSpaceheat,
+    LayoutLite, LoopHealth, NoNewContractWarning, ResetHpKeepValue, ScadaParams, SendLayout,
+    SetLwtControlParams, SiegLoopEndpointValveAdjustment, SlowContractHeartbeat, SnapshotSpaceheat, SnapshotSpaceheatDelta,
+    WeatherForecast,
 )
 
 from paho.mqtt.client import MQTTMessageInfo
 from pydantic import BaseModel
 
 
+from actors.forecast_store import (
+    FALLBACK_WEATHER_CHANNEL, FORECAST_STORE_NAME, PRICE, WEATHER, ForecastFetcher,
+    ForecastStore, PriceServiceSource, WeatherGovSource, hour_start,
+)
 from actors.ltn.config import LtnSettings, DashboardSettings
+from actors.ltn.event_archive import ARCHIVE_DIR_NAME, EventArchive
 from actors.ltn.dashboard.dashboard import Dashboard
 from actors.ltn.data import LtnData
+from actors.loop_monitor import PRIME_ACTOR_ENTRY_POINTS, LoopMonitor, loop_health_summary
+from actors.ltn.flo_worker import BUILD, PLANS, RECOMMEND, FloPhaseStats, FloWorker, FloWorkerError
 
 TANK_GALLONS = 120
 MAX_HORIZON_HOURS = 48
-
-
-def _flo_build_worker(flo_params_bytes: bytes, result_queue: multiprocessing.Queue) -> None:
-    """Child process: build Flo, solve Dijkstra, trim, pickle the trimmed graph, send it back, exit."""
-    try:
-        g = Flo(flo_params_bytes)
-        g.solve_dijkstra()
-        g.trim_graph_for_waiting()
-        g.logger = None
-        g.patting_watchdog = None
-        g.settings = None
-        trimmed_data = pickle.dumps(g)
-        result_queue.put(("ok", trimmed_data))
-    except Exception as e:
-        result_queue.put(("error", str(e)))
-
-
-def _flo_recommend_worker(
-    trimmed_graph_data: bytes,
-    updated_flo_params_bytes: bytes,
-    result_queue: multiprocessing.Queue,
-) -> None:
-    """Child process: unpickle trimmed graph, generate recommendation, send back result bytes."""
-    try:
-        import logging as _logging
-        g: Flo = pickle.loads(trimmed_graph_data)
-        g.logger = _logging.getLogger("gridflo.flo")
-        recommendation_bytes = g.generate_recommendation(updated_flo_params_bytes)
-        # Also pickle the trimmed graph again (with initial_node etc. now set)
-        # so the next child can use it for get_next_node_at_price
-        g.logger = None
-        updated_trimmed_data = pickle.dumps(g)
-        result_queue.put(("ok", recommendation_bytes, updated_trimmed_data))
-    except Exception as e:
-        result_queue.put(("error", str(e)))
-
-
-def _flo_plans_worker(
-    trimmed_graph_data: bytes,
-    price_usd_mwh: float,
-    result_queue: multiprocessing.Queue,
-) -> None:
-    """Child process: unpickle trimmed graph, get next hour plans at price, send back results."""
-    try:
-        import logging as _logging
-        g: Flo = pickle.loads(trimmed_graph_data)
-        g.logger = _logging.getLogger("gridflo.flo")
-        g.get_next_node_at_price(price_usd_mwh)
-        expected_storage_kwh = round(float(g.initial_node.next_node.energy), 2)
-        hourly_plan = [float(x) for x in list(g.initial_node.next_node.shortest_path_hp_kwh_el)]
-        result_queue.put(("ok", expected_storage_kwh, hourly_plan))
-    except Exception as e:
-        result_queue.put(("error", str(e)))
+PRICE_FORECAST_URL = "https://price-service.electricity.works/hw1-isone-me-versant-keene-ps/gw0-price-forecast"
 
 
 def _get_flo_git_commit() -> str:
@@ -182,12 +129,12 @@ class PriceForecast(BaseModel):
 
 
 class BidRunner(threading.Thread):
-    """Coordinates Flo work across three short-lived child processes.
+    """Coordinates Flo work for one market slot.
 
-    Every phase that touches the Flo graph (build, recommend, plans) runs
-    in a forked child process. The parent thread only holds pickle bytes
-    and plain results (floats, lists). When each child exits, the OS
-    reclaims all its memory.
+    The graph is built, solved and queried in the LTN's long-lived FLO
+    worker process and stays there between phases; this thread only sends
+    parameters and turns the results into messages. The worker's latency
+    and peak RSS for each phase are logged and sent as an Info glitch.
     """
 
     def __init__(self, params: FloParamsHouse0,
@@ -197,6 +144,7 @@ class BidRunner(threading.Thread):
                  ltn_g_node_alias: str,
                  send_threadsafe: Callable[[Message], None],
                  on_complete: Callable[[str], None],
+                 flo_worker: FloWorker,
                  logger: LoggerOrAdapter):
         super().__init__()
         self.stop_event = threading.Event()
@@ -208,96 +156,75 @@ class BidRunner(threading.Thread):
         self.ltn_alias = ltn_g_node_alias
         self.send_threadsafe = send_threadsafe
         self.on_complete = on_complete
+        self.flo_worker = flo_worker
+        self.phase_stats: Dict[str, FloPhaseStats] = {}
         self.get_bid_event = threading.Event()
         self.get_next_hour_plans_event = threading.Event()
 
-    def _run_in_child(self, target, args, timeout_s=30, max_total_s=300, pat_watchdog=True):
-        """Run target in a forked child process and return the result tuple.
-
-        Pats the watchdog every timeout_s seconds while waiting.
-        Kills the child and returns an error after max_total_s seconds
-        to prevent deadlocked children from blocking the BidRunner forever.
-        """
-        ctx = multiprocessing.get_context("forkserver")
-        result_queue = ctx.Queue()
-        proc = ctx.Process(target=target, args=(*args, result_queue), daemon=True)
-        proc.start()
-
-        deadline = time.time() + max_total_s
-        result = None
-        while result is None:
-            if time.time() > deadline:
-                self.logger.error(f"Child process timed out after {max_total_s}s — killing it")
-                proc.kill()
-                proc.join(timeout=5)
-                return ("error", f"Child process timed out after {max_total_s}s")
-            if pat_watchdog:
-                self.pat_watchdog()
-            try:
-                result = result_queue.get(timeout=timeout_s)
-            except Exception:
-                if not proc.is_alive():
-                    result = ("error", "Child process died unexpectedly")
-                    break
-
-        proc.join(timeout=5)
-        if proc.is_alive():
-            proc.terminate()
-            proc.join(timeout=5)
+    def _request(self, phase: str, arg: Any) -> Any:
+        result, stats = self.flo_worker.request(phase, arg, pat_watchdog=self.pat_watchdog)
+        self.phase_stats[phase] = stats
+        self.logger.info(
+            f"FLO {phase} took {stats.elapsed_s:.2f}s, "
+            f"worker pid {stats.pid} peak RSS {stats.peak_rss_mb:.0f} MB"
+        )
         return result
 
+    def _send_glitch(self, log_level: LogLevel, summary: str, details: str) -> None:
+        glitch = Glitch(
+            FromGNodeAlias=self.ltn_alias,
+            Node=self.ltn_name,
+            Type=log_level,
+            Summary=f"{self.ltn_alias.split('.')[-2]}.{self.ltn_alias.split('.')[-1]} - {summary}",
+            Details=details,
+            CreatedMs=int(time.time() * 1000)
+        )
+        self.send_threadsafe(Message(Src=self.ltn_name, Dst=self.ltn_name, Payload=glitch))
+
+    def _report_phases(self, release_stats: Optional[FloPhaseStats]) -> None:
+        if not self.phase_stats:
+            return
+        details = ", ".join(
+            f"{phase} {stats.elapsed_s:.2f}s peak {stats.peak_rss_mb:.0f} MB"
+            for phase, stats in self.phase_stats.items()
+        )
+        if release_stats is not None:
+            details += f"; {release_stats.rss_mb:.0f} MB resident after release"
+        details += (
+            f"; worker pid {next(iter(self.phase_stats.values())).pid}, "
+            f"run {self.flo_worker.runs} of {self.flo_worker.max_runs}"
+        )
+        self.logger.info(f"FLO phases: {details}")
+        self._send_glitch(LogLevel.Info, "FLO worker phases", details)
+
     def run(self):
         try:
             while not self.stop_event.is_set():
-                # ── Phase 0: Build + solve in a child process ──
-                self.logger.info("Creating graph and solving Dijkstra (in child process)...")
-                st = time.time()
+                # ── Phase 0: Build + solve in the FLO worker ──
+                self.logger.info("Creating graph and solving Dijkstra (in FLO worker)...")
                 flo_params_bytes = self.orig_flo_params.model_dump_json().encode('utf-8')
-
-                result = self._run_in_child(_flo_build_worker, (flo_params_bytes,))
-
-                if result[0] == "error":
-                    self.logger.error(f"Error in child process: {result[1]}")
-                    glitch = Glitch(
-                        FromGNodeAlias=self.ltn_alias,
-                        Node=self.ltn_name,
-                        Type=LogLevel.Error,
-                        Summary=f"{self.ltn_alias.split('.')[-2]}.{self.ltn_alias.split('.')[-1]} - Error creating DGraph w Advanced FLO",
-                        Details=result[1],
-                        CreatedMs=int(time.time() * 1000)
-                    )
-                    self.send_threadsafe(Message(Src=self.ltn_name, Dst=self.ltn_name, Payload=glitch))
+                try:
+                    self._request(BUILD, flo_params_bytes)
+                except FloWorkerError as e:
+                    self.logger.error(f"Error in FLO worker: {e}")
+                    self._send_glitch(LogLevel.Error, "Error creating DGraph w Advanced FLO", str(e))
                     return
 
-                trimmed_graph_data = result[1]
-                self.logger.info(
-                    f"Built and solved in {round(time.time()-st,2)} seconds! "
-                    f"Trimmed graph: {len(trimmed_graph_data)} bytes"
-                )
-
-                # ── Phase 1: Wait for get_bid, then generate recommendation in child ──
+                # ── Phase 1: Wait for get_bid, then generate recommendation ──
                 # Don't clear() before wait() — if get_bid() was already called
                 # during Phase 0, the flag is already set and we should proceed.
                 self.logger.info("BidRunner waiting for get_bid to be called before computing bid.")
                 self.get_bid_event.wait()
                 self.get_bid_event.clear()
-                self.logger.info("Generating bid recommendation (in child process)")
+                self.logger.info("Generating bid recommendation")
 
                 updated_bytes = self.updated_flo_params.model_dump_json().encode('utf-8')
-                result = self._run_in_child(
-                    _flo_recommend_worker,
-                    (trimmed_graph_data, updated_bytes),
-                    pat_watchdog=False,
-                )
-                del trimmed_graph_data
-
-                if result[0] == "error":
-                    self.logger.info(f"Error generating recommendation: {result[1]}")
+                try:
+                    recommendation_bytes = self._request(RECOMMEND, updated_bytes)
+                except FloWorkerError as e:
+                    self.logger.info(f"Error generating recommendation: {e}")
                     return
 
-                recommendation_bytes = result[1]
-                trimmed_graph_data = result[2]  # updated graph with initial_node set
-
                 recommendation_dict = json.loads(recommendation_bytes)
                 recommendation = BidRecommendation.model_validate(recommendation_dict)
                 self.logger.info(f"Done! Found {len(recommendation.PqPairs)} PQ pairs.")
@@ -321,25 +248,21 @@ class BidRunner(threading.Thread):
                     )
                 )
 
-                # ── Phase 2: Wait for get_next_hour_plans, then run in child ──
+                # ── Phase 2: Wait for get_next_hour_plans, then plan at the clearing price ──
                 self.logger.info("BidRunner waiting for get_next_hour_plans to be called.")
                 self.get_next_hour_plans_event.wait()
                 self.get_next_hour_plans_event.clear()
-                self.logger.info("Getting plan at clearing price (in child process)")
+                self.logger.info("Getting plan at clearing price")
 
-                result = self._run_in_child(
-                    _flo_plans_worker,
-                    (trimmed_graph_data, self.latest_price_usd_mwh),
-                    pat_watchdog=False,
-                )
-                del trimmed_graph_data
-
-                if result[0] == "error":
-                    self.logger.info(f"Error getting plan at price: {result[1]}")
+                try:
+                    expected_storage_kwh_at_hour1, hourly_hp_kwh_el_plan = self._request(
+                        PLANS, self.latest_price_usd_mwh
+                    )
+                except FloWorkerError as e:
+                    self.logger.info(f"Error getting plan at price: {e}")
                     return
 
                 # Send flo next hour plans through LTN's message processing
-                _, expected_storage_kwh_at_hour1, hourly_hp_kwh_el_plan = result
                 flo_next_hour_plans = FloNextHourPlans(
                     ExpectedStorageKwhAtHour1=expected_storage_kwh_at_hour1,
                     HourlyHpKwhElPlan=hourly_hp_kwh_el_plan,
@@ -356,6 +279,10 @@ class BidRunner(threading.Thread):
         except Exception as e:
             self.logger.info(f"An error occured running Dijkstra or getting bid: {e}")
         finally:
+            try:
+                self._report_phases(self.flo_worker.finish_run())
+            except Exception as e:
+                self.logger.info(f"Error finishing FLO worker run: {e}")
             self.logger.info("Done running bid runner")
             self.on_complete(self.ltn_name)
             self._clear()
@@ -373,6 +300,8 @@ class BidRunner(threading.Thread):
         self.ltn_alias = None
         self.get_bid_event = None
         self.get_next_hour_plans_event = None
+        self.flo_worker = None
+        self.phase_stats = {}
 
     def get_bid(self, updated_flo_params: FloParamsHouse0):
         self.logger.info("Getting bid...")
@@ -455,6 +384,8 @@ class Telemetry(BaseModel):
 class Ltn(PrimeActor):
     MAIN_LOOP_SLEEP_SECONDS = 61
     HEARTBEAT_INTERVAL_S = 60
+    WEATHER_MAX_AGE_S = 2 * 3600
+    EVENT_ARCHIVE_CHECK_S = 5
     P_NODE = "hw1.isone.ver.keene"
     SCADA_MQTT = "scada_mqtt"
     data: LtnData
@@ -483,10 +414,30 @@ class Ltn(PrimeActor):
         self.tank_temp_channel_names = None
         self.ha1_params: Optional[Ha1Params] = None
         self.latest_report: Optional[Report] = None
-        self.report_output_dir = Path(f"{self.settings.paths.data_dir}/report")
-        self.report_output_dir.mkdir(parents=True, exist_ok=True)
+        self.keyframe_requested = False
+        self.loop_monitor = LoopMonitor(
+            H0N.ltn, slow_callback_s=self.settings.slow_callback_ms / 1000
+        )
+        self.loop_monitor.instrument(self, PRIME_ACTOR_ENTRY_POINTS)
+        # the latest LoopHealth from each scada app, by AppName
+        self.scada_loop_health: Dict[str, LoopHealth] = {}
+        self.event_archive: Optional[EventArchive] = None
+        if self.settings.save_events:
+            self.event_archive = EventArchive(
+                Path(self.settings.paths.data_dir) / ARCHIVE_DIR_NAME,
+                max_segment_bytes=self.settings.event_archive_segment_mb * 2**20,
+                max_segment_s=self.settings.event_archive_segment_minutes * 60,
+            )
         self._flo_next_hour_plans_file = Path(f"{self.settings.paths.data_dir}/flo_next_hour_plans.json")
         self.flo_next_hour_plans = self._load_flo_next_hour_plans()
+        self.forecast_fetcher = ForecastFetcher(
+            ForecastStore(Path(self.settings.paths.data_dir) / FORECAST_STORE_NAME),
+            [
+                WeatherGovSource(self.latitude, self.longitude, self.timezone),
+                PriceServiceSource(PRICE_FORECAST_URL),
+            ],
+            logger=self.logger,
+        )
 
         if self.settings.dashboard.print_gui:
             self.dashboard = Dashboard(
@@ -512,6 +463,14 @@ class Ltn(PrimeActor):
             send_threadsafe=self.services.send_threadsafe,
         )
         self.bid_runner: Optional[BidRunner] = None
+        self.flo_worker = FloWorker(
+            max_runs=self.settings.flo_worker_max_runs,
+            max_rss_mb=self.settings.flo_worker_max_rss_mb,
+            logger=self.logger.add_category_logger(
+                "BID_RUNNER",
+                level=self.settings.flo_logging_level
+            ),
+        )
         self.send_bid_minute: int = 57
         # min_minute = min(max(3, datetime.now().minute), self.send_bid_minute-2)
         # self.create_graph_minute: int = random.randint(min_minute, self.send_bid_minute-1)
@@ -643,6 +602,9 @@ class Ltn(PrimeActor):
             case LayoutLite():
                 path_dbg |= 0x00000001
                 self.process_layout_lite(decoded.Payload)
+            case LoopHealth():
+                path_dbg |= 0x00001000
+                self.process_loop_health(decoded.Payload)
             case NoNewContractWarning():
                 path_dbg |= 0x00000002
                 self.process_no_new_contract_warning(decoded.Payload)
@@ -651,6 +613,7 @@ class Ltn(PrimeActor):
                 self.process_power_watts(decoded.Payload)
             case Report():
                 path_dbg |= 0x00000008
+                self._archive_report(decoded.Payload)
                 self.process_report(decoded.Payload)
             case ScadaParams():
                 path_dbg |= 0x00000010
@@ -658,8 +621,14 @@ class Ltn(PrimeActor):
             case SnapshotSpaceheat():
                 path_dbg |= 0x00000020
                 self.process_snapshot(decoded.Payload)
+            case SnapshotSpaceheatDelta():
+                path_dbg |= 0x00000400
+                self.process_snapshot_delta(decoded.Payload)
             case SlowContractHeartbeat():
                 self.contract_handler.process_slow_contract_heartbeat(decoded.Payload)
+            case WeatherForecast():
+                path_dbg |= 0x00000800
+                self.process_weather_forecast(decoded.Payload)
             case EventBase():
                 path_dbg |= 0x00000040
                 self._process_event(decoded.Payload)
@@ -679,6 +648,11 @@ class Ltn(PrimeActor):
                 path_dbg |= 0x00000200
         self.logger.path("--Ltn.process_mqtt_message  path:0x%08X", path_dbg)
 
+    def process_loop_health(self, payload: LoopHealth) -> None:
+        self.scada_loop_health[payload.AppName] = payload
+        if payload.SlowCallbackList:
+            self.log(loop_health_summary(payload))
+
     def process_no_new_contract_warning(self, payload: NoNewContractWarning) -> None:
         """
         Resending a "Created" hb if it exists
@@ -732,7 +706,19 @@ class Ltn(PrimeActor):
             print(f"New: {params.NewParams}")
             self.ha1_params = params.NewParams
 
+    def process_snapshot_delta(self, delta: SnapshotSpaceheatDelta) -> None:
+        snapshot = self.data.apply_snapshot_delta(delta)
+        if snapshot is None:
+            # Missed a snapshot. Ask for a keyframe once and drop deltas until it comes.
+            if not self.keyframe_requested:
+                self.log(f"Snapshot delta {delta.Seq} does not follow the latest snapshot. Requesting keyframe")
+                self.keyframe_requested = True
+                self.snap()
+            return
+        self.process_snapshot(snapshot)
+
     def process_snapshot(self, snapshot: SnapshotSpaceheat) -> None:
+        self.keyframe_requested = False
         self.data.latest_snapshot = snapshot
 
         if self.settings.dashboard.print_gui and self.dashboard:
@@ -768,6 +754,7 @@ class Ltn(PrimeActor):
             self.log("Received layout data - LTN now ready for contract operations")
 
     def process_report(self, report: Report) -> None:
+        report = report.expanded()
         self.data.latest_report = report
         # Check if HP is on or off by looking at relay 6
         for machine_state in report.StateList:
@@ -777,22 +764,19 @@ class Ltn(PrimeActor):
                     self.hp_is_off = True
                 else:
                     self.hp_is_off = False
-        if self.settings.save_events:
-            report_file = (
-                self.report_output_dir / f"Report.{report.SlotStartUnixS}.json"
+
+    def _archive_report(self, report: Report) -> None:
+        # Reports that arrive inside a ReportEvent are archived with the event
+        if self.event_archive is not None:
+            self.event_archive.append(
+                report.TypeName, report.SlotStartUnixS * 1000, report.model_dump_json()
             )
-            with report_file.open("w") as f:
-                f.write(str(report))
 
     def _process_event(self, event: EventBase) -> None:
-        if self.settings.save_events:
-            timezone = pytz.timezone("America/New_York")
-            event_dt = datetime.fromtimestamp(event.TimeCreatedMs / 1000, tz=timezone)
-            event_file = Path(
-                f"{self.settings.paths.event_dir}/{event_dt.isoformat()}.{event.TypeName}.uid[{event.MessageId}].json"
+        if self.event_archive is not None:
+            self.event_archive.append(
+                event.TypeName, event.TimeCreatedMs, event.model_dump_json()
             )
-            with event_file.open("w") as f:
-                f.write(event.model_dump_json(indent=2))
 
     def snap(self):
         self.services.send_threadsafe(
@@ -828,15 +812,28 @@ class Ltn(PrimeActor):
                 Dst=self.scada.name,
                 Payload=SendLayout(
                     FromGNodeAlias=self.layout.ltn_g_node_alias,
-                    MessageCreatedMs=int(time.time() * 1000)
+                    MessageCreatedMs=int(time.time() * 1000),
+                    ReportEncodings=[COMPACT_CHANNEL_READINGS_ENCODING],
                 ),
             )
         )
         self.log("Requesting layout")
 
+    def stop(self) -> None:
+        self._stop_requested = True
+        self.loop_monitor.stop()
+        if self.bid_runner is not None:
+            self.bid_runner.stop()
+        self.flo_worker.kill()
+        if self.event_archive is not None:
+            self.event_archive.close()
+
     def start_tasks(self) -> Sequence[asyncio.Task[Any]]:
+        self.loop_monitor.start()
         return  [
             asyncio.create_task(self.main(), name="ltn-main"),
+            asyncio.create_task(self.loop_health_task(), name="loop_health"),
+            asyncio.create_task(self.event_archive_task(), name="event_archive"),
             asyncio.create_task(
                 self.contract_handler.contract_heartbeat_task(),
                 name="contract_heartbeat"
@@ -844,6 +841,28 @@ class Ltn(PrimeActor):
             asyncio.create_task(self.fake_market_maker(), name="fake market maker")
         ]
 
+    async def loop_health_task(self) -> None:
+        period_s = self.settings.loop_health_seconds
+        if period_s <= 0:
+            return
+        while not self._stop_requested:
+            await asyncio.sleep(period_s)
+            health = self.loop_monitor.snapshot(self.layout.ltn_g_node_alias)
+            if health.SlowCallbackList:
+                self.log(loop_health_summary(health))
+
+    async def event_archive_task(self) -> None:
+        """Write buffered events and roll the archive's segment when no new
+        events arrive to do it"""
+        if self.event_archive is None:
+            return
+        while not self._stop_requested:
+            await asyncio.sleep(self.EVENT_ARCHIVE_CHECK_S)
+            try:
+                self.event_archive.flush_if_due()
+            except Exception as e:
+                self.log(f"Trouble flushing the event archive: {e}")
+
     async def main(self):
         async with aiohttp.ClientSession() as session:
             await self.main_loop(session)
@@ -938,7 +957,7 @@ class Ltn(PrimeActor):
             self.log(f"NOT RUNNING Dijkstra! Not past minute {self.create_graph_minute}")
             return
         await self.get_weather(session)
-        await self.get_price_forecast()
+        await self.get_price_forecast(session)
 
         if not self.layout_lite:
             self.log("Do not have layout lite from scada so not running dijkstra... must not be connected!!")
@@ -1056,6 +1075,7 @@ class Ltn(PrimeActor):
             ltn_g_node_alias=self.layout.ltn_g_node_alias,
             send_threadsafe=self.services.send_threadsafe,
             on_complete=self._cleanup_bid_runner,
+            flo_worker=self.flo_worker,
             logger=self.logger.add_category_logger(
                 "BID_RUNNER",
                 level=self.settings.flo_logging_level
@@ -1305,23 +1325,6 @@ class Ltn(PrimeActor):
             self.log("Could not find RSWT!")
             return None
 
-    async def kmeans(self, data, k=3, max_iters=100, tol=1e-4):
-        data = np.array(data).reshape(-1, 1)
-        centroids = data[np.random.choice(len(data), k, replace=False)]
-        for _ in range(max_iters):
-            labels = np.argmin(np.abs(data - centroids.T), axis=1)
-            new_centroids = np.zeros_like(centroids)
-            for i in range(k):
-                cluster_points = data[labels == i]
-                if len(cluster_points) > 0:
-                    new_centroids[i] = cluster_points.mean()
-                else:
-                    new_centroids[i] = data[np.random.choice(len(data))]
-            if np.all(np.abs(new_centroids - centroids) < tol):
-                break
-            centroids = new_centroids
-        return labels
-
     async def get_three_layer_storage_model(self) -> Optional[Tuple[float, int, int, int, int]]:
         # Get all storage tank temperatures in a dict
         if self.tank_temp_channel_names is None:
@@ -1351,90 +1354,13 @@ class Ltn(PrimeActor):
             thermocline2 = 8 #out of 12 layers
             return top_temp, middle_temp, bottom_temp, thermocline1, thermocline2
 
-        # Process layer temperatures
-        layer_temps = [tank_temps[key] for key in tank_temps]
-        iter_count = 0
-        while (sorted(layer_temps, reverse=True) != layer_temps and iter_count<20):
-            iter_count += 1
-            layer_temps = []
-            for layer in tank_temps:
-                if layer_temps:
-                    if tank_temps[layer] > layer_temps[-1]:
-                        mean = round((layer_temps[-1] + tank_temps[layer]) / 2)
-                        layer_temps[-1] = mean
-                        layer_temps.append(mean)
-                    else:
-                        layer_temps.append(tank_temps[layer])
-                else:
-                    layer_temps.append(tank_temps[layer])
-            for i, layer in enumerate(tank_temps):
-                tank_temps[layer] = layer_temps[i]
-            if iter_count == 20:
-                layer_temps = sorted(layer_temps, reverse=True)
-
-        # Cluster 10 times and select the result with the highest top temperature
-        data = layer_temps.copy()
-        clustering_runs = []
-        for i in range(10):
-            labels = await self.kmeans(data, k=3)
-            cluster_0 = sorted([data[i] for i in range(len(data)) if labels[i] == 0], reverse=True)
-            cluster_1 = sorted([data[i] for i in range(len(data)) if labels[i] == 1], reverse=True)
-            cluster_2 = sorted([data[i] for i in range(len(data)) if labels[i] == 2], reverse=True)
-            cluster_top = max(cluster_0, cluster_1, cluster_2, key=lambda x: np.mean(x) if len(x)>0 else 0)
-            top_temp = sum(cluster_top)/len(cluster_top)
-            clustering_runs.append({
-                'cluster_0': cluster_0,
-                'cluster_1': cluster_1,
-                'cluster_2': cluster_2,
-                'top_temp': top_temp
-            })
-        best_run = max(clustering_runs, key=lambda x: x['top_temp'])
-        cluster_0 = best_run['cluster_0']
-        cluster_1 = best_run['cluster_1']
-        cluster_2 = best_run['cluster_2']
-
-        # Dealing with 3 clusters
-        if cluster_0 and cluster_1 and cluster_2:
-            cluster_top = max(cluster_0, cluster_1, cluster_2, key=lambda x: sum(x)/len(x))
-            cluster_bottom = min(cluster_0, cluster_1, cluster_2, key=lambda x: sum(x)/len(x))
-            cluster_middle = [
-                cluster_x for cluster_x in [cluster_0, cluster_1, cluster_2]
-                if cluster_x != cluster_top
-                and cluster_x != cluster_bottom
-                ][0]
-
-            thermocline1 = max(1, len(cluster_top))
-            thermocline2 = thermocline1 + len(cluster_middle)
-
-            top_temp = round(sum(cluster_top)/len(cluster_top))
-            middle_temp = round(sum(cluster_middle)/len(cluster_middle))
-            bottom_temp = round(sum(cluster_bottom)/len(cluster_bottom))
-            self.log(f"Storage model: {top_temp}({thermocline1}){middle_temp}({thermocline2}){bottom_temp}")
-            return top_temp, middle_temp, bottom_temp, thermocline1, thermocline2
+        model = three_layer_storage_model(list(tank_temps.values()))
+        self.log(
+            f"Storage model: {model.top_temp}({model.thermocline1}){model.middle_temp}"
+            f"({model.thermocline2}){model.bottom_temp}"
+        )
+        return model
 
-        # Dealing with less than 3 clusters
-        else:
-            if cluster_0 and cluster_2:
-                cluster_1 = cluster_2
-            elif cluster_1 and cluster_2:
-                cluster_0 = cluster_2
-            # Two clusters
-            if cluster_0 and cluster_1:
-                cluster_top = max(cluster_0, cluster_1, key=lambda x: sum(x)/len(x))
-                cluster_bottom = min(cluster_0, cluster_1, key=lambda x: sum(x)/len(x))
-                thermocline1 = len(cluster_top)
-                top_temp = round(sum(cluster_top)/len(cluster_top))
-                bottom_temp = round(sum(cluster_bottom)/len(cluster_bottom))
-                self.log(f"Storage model: {top_temp}({thermocline1}){bottom_temp}")
-                return top_temp, top_temp, bottom_temp, thermocline1, thermocline1
-            # Single cluster
-            else:
-                cluster_top = max(cluster_0, cluster_1, cluster_2, key=lambda x: len(x))
-                top_temp = round(sum(cluster_top)/len(cluster_top))
-                thermocline1 = 12
-                self.log(f"Storage model: {top_temp}({thermocline1})")
-                return top_temp, top_temp, top_temp, thermocline1, thermocline1
-    
     async def get_buffer_available_kwh(self):
         if self.short_cycle_buffer:
             return 0
@@ -1505,102 +1431,45 @@ class Ltn(PrimeActor):
         return min(0, house_availale_kwh) # TODO: TEMPORARY only consider negative values
 
     async def get_weather(self, session: aiohttp.ClientSession) -> None:
-        config_dir = self.settings.paths.config_dir
-        weather_file = Path(f"{config_dir}/weather.json")
-        try:
-            url = f"https://api.weather.gov/points/{self.latitude},{self.longitude}"
-            response =  await session.get(url)
-            if response.status != 200:
-                self.log(f"Error fetching weather data: {response.status}")
-                return None
-            data = await response.json()
-            forecast_hourly_url = data["properties"]["forecastHourly"]
-            forecast_response = await session.get(forecast_hourly_url)
-            if forecast_response.status != 200:
-                self.log(
-                    f"Error fetching hourly weather forecast: {forecast_response.status}"
-                )
-                return None
-            forecast_data = await forecast_response.json()
-            forecasts = {}
-            periods = forecast_data["properties"]["periods"]
-            for period in periods:
-                if (
-                    "temperature" in period
-                    and "startTime" in period
-                    and datetime.fromisoformat(period["startTime"])
-                    > datetime.now(tz=self.timezone)
-                ):
-                    forecasts[datetime.fromisoformat(period["startTime"])] = [
-                        float(period["temperature"]), float(period["windSpeed"].replace(' mph',''))
-                    ]
-            forecasts = dict(list(forecasts.items())[:96])
-            cropped_forecast = dict(list(forecasts.items())[:48])
-            wf = {
-                "time": list(forecasts.keys()),
-                "oat": [x[0] for x in list(forecasts.values())],
-                "ws": [x[1] for x in list(forecasts.values())],
+        """Next 48 hours of weather from the forecast store. SCADA forwards the
+        forecast it fetches, so api.weather.gov is only asked directly when
+        that copy is missing or stale."""
+        fetcher = self.forecast_fetcher
+        next_hour_s = hour_start(time.time()) + 3600
+        stored = fetcher.store.hours(WEATHER, next_hour_s, 48)
+        if len(stored) < 48 or not fetcher.is_fresh(
+            WEATHER, self.WEATHER_MAX_AGE_S, include_forwarded=True
+        ):
+            if await fetcher.fetch(WEATHER, session) is not None:
+                stored = fetcher.store.hours(WEATHER, next_hour_s, 48)
+        if len(stored) == 48:
+            self.log(f"Using a 48-hour weather forecast starting at {stored.hour_start_s[0]}")
+            self.weather_forecast = {
+                "oat": stored.fields["oat"],
+                "ws": stored.fields["ws"],
             }
+        else:
             self.log(
-                f"Obtained a {len(forecasts)}-hour weather forecast starting at {wf['time'][0]}"
+                "No valid weather forecasts available locally. Using coldest of the current month."
             )
-            weather_long = {
-                "time": [x.timestamp() for x in list(forecasts.keys())],
-                "oat": [x[0] for x in list(forecasts.values())],
-                "ws": [x[1] for x in list(forecasts.values())],
+            current_month = datetime.now().month - 1
+            self.weather_forecast = {
+                "oat": [self.coldest_oat_by_month[current_month]] * 48,
+                "ws": [0] * 48,
             }
-            with open(weather_file, "w") as f:
-                json.dump(weather_long, f, indent=4)
 
-        except Exception as e:
-            self.log(f"[!] Unable to get weather forecast from API: {e}")
-            try:
-                with open(weather_file, "r") as f:
-                    weather_long = json.load(f)
-                    weather_long["time"] = [
-                        datetime.fromtimestamp(x, tz=self.timezone)
-                        for x in weather_long["time"]
-                    ]
-                if weather_long["time"][-1] >= datetime.fromtimestamp(
-                    time.time(), tz=self.timezone
-                ) + timedelta(hours=48):
-                    self.log("A valid weather forecast is available locally.")
-                    time_late = weather_long["time"][0] - datetime.now(self.timezone)
-                    hours_late = int(time_late.total_seconds() / 3600)
-                    wf = weather_long
-                    for key in wf:
-                        wf[key] = wf[key][hours_late : hours_late + 48]
-                else:
-                    self.log(
-                        "No valid weather forecasts available locally. Using coldest of the current month."
-                    )
-                    current_month = datetime.now().month - 1
-                    wf = {
-                        "time": [
-                            datetime.now(tz=self.timezone) + timedelta(hours=1 + x)
-                            for x in range(48)
-                        ],
-                        "oat": [self.coldest_oat_by_month[current_month]] * 48,
-                        "ws": [0] * 48,
-                    }
-            except Exception as e:
-                self.log(
-                    "No valid weather forecasts available locally. Using coldest of the current month."
-                )
-                current_month = datetime.now().month - 1
-                wf = {
-                    "time": [
-                        datetime.now(tz=self.timezone) + timedelta(hours=1 + x)
-                        for x in range(48)
-                    ],
-                    "oat": [self.coldest_oat_by_month[current_month]] * 48,
-                    "ws": [0] * 48,
-                }
-
-        self.weather_forecast = {
-            "oat": wf["oat"],
-            "ws": wf["ws"],
-        }
+    def process_weather_forecast(self, payload: WeatherForecast) -> None:
+        """Store SCADA's forecast. ForecastCreatedS is when SCADA fetched it."""
+        if payload.WeatherChannelName == FALLBACK_WEATHER_CHANNEL:
+            self.log("Ignoring SCADA's fallback weather forecast")
+            return
+        if not self.forecast_fetcher.store_fields(
+            WEATHER,
+            payload.Time,
+            {"oat": payload.OatF, "ws": payload.WindSpeedMph},
+            fetched_s=payload.ForecastCreatedS,
+        ):
+            self.log("Ignoring SCADA's weather forecast: ours is newer")
 
     async def get_real_time_price(self) -> float:
         '''Returns current 5min real-time price (LMP+Dist) in USD/MWh'''
@@ -1640,115 +1509,47 @@ class Ltn(PrimeActor):
         #         self.log(f"Error getting forecast price: {e}")
         #         return 0
 
-    async def get_price_forecast(self) -> None:
+    async def get_price_forecast(self, session: aiohttp.ClientSession) -> None:
         '''Updates self.price_forecast for the start of next hour. All in USD/MWh'''
-        try:
-            # Get price forecast from the price service API
-            url = "https://price-service.electricity.works/hw1-isone-me-versant-keene-ps/gw0-price-forecast"
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url)
-                if response.status_code == 200:
-                    self.log("Successfully received price forecast from the price service API")
-                    data = response.json()
-                    self.price_forecast = PriceForecast(
-                        dp_usd_per_mwh=data['DistList'],
-                        lmp_usd_per_mwh=data['LmpList'],  
-                        reg_usd_per_mwh=[0] * len(data['LmpList']),
-                    )
-                    # self.log(f"- LMP USD/MWh {self.price_forecast.lmp_usd_per_mwh}")
-                    # self.log(f"- Total energy USD/MWh {[round(x,2) for x in self.price_forecast.total_energy]}")
-                    
-                    # Save price forecast to a local CSV file
-                    prices_file = Path(f"{self.settings.paths.data_dir}/price_forecast.csv")
-                    # Check if current hour's data exists in the existing file
-                    current_hour_row = None
-                    if prices_file.exists():
-                        current_hour_timestamp = data['HourStartS'][0] - 3600
-                        with open(prices_file, 'r', newline='') as f:
-                            reader = csv.reader(f)
-                            header = next(reader)
-                            for row in reader:
-                                if float(row[0]) == current_hour_timestamp:
-                                    current_hour_row = row
-                                    break
-                    # Write the new file
-                    with open(prices_file, 'w', newline='') as f:
-                        writer = csv.writer(f)
-                        writer.writerow(['HourStartS', 'DistList', 'LmpList'])
-                        if current_hour_row:
-                            writer.writerow(current_hour_row)
-                        for i in range(len(data['DistList'])):
-                            writer.writerow([data['HourStartS'][i], data['DistList'][i], data['LmpList'][i]])                   
-                    self.log(f"Saved price forecast to {prices_file}")
-                else:
-                    raise Exception(f"Failed to receive price forecast from API, status code: {response.status_code}")
-        
-        except Exception as e:
-            self.log(f"FAILED to receive price forecast from the price service API and/or to save it to a local CSV: {e}")
-            self.log("Trying to read price forecast from the local CSV file")
-            try:
-                # Read the local CSV file with the latest received price forecast
-                file_path = Path(f"{self.settings.paths.data_dir}/price_forecast.csv")
-                with open(file_path, mode='r', newline='') as file:
-                    reader = csv.reader(file)
-                    next(reader)
-                    rows = list(reader)
-                timestamps = [float(row[0]) for row in rows]
-                dist_usd_mwh = [float(row[1]) for row in rows]
-                lmp_usd_mwh = [float(row[2]) for row in rows]
-                reg_usd_mwh = [0.0] * len(rows)
-
-                # Crop the beginning of the CSV and extend the end to get a forecast for the next 48 hours
-                time_now = time.time()
-                timestamps_forecast = [t for t in timestamps if t > time_now]
-                hours_available = len(timestamps_forecast)
-                if not hours_available:
-                    raise Exception("No forecasts available for the next hours!")
-                dp_forecast_usd_per_mwh = [p for p,t in zip(dist_usd_mwh, timestamps) if t > time_now]
-                lmp_forecast_usd_per_mwh = [p for p,t in zip(lmp_usd_mwh, timestamps) if t > time_now]
-                reg_forecast_usd_per_mwh = [p for p,t in zip(reg_usd_mwh, timestamps) if t > time_now]
-                if hours_available < 48:
-                    dp_forecast_usd_per_mwh = dp_forecast_usd_per_mwh + [dp_forecast_usd_per_mwh[-1]] * (48-len(dp_forecast_usd_per_mwh))
-                    lmp_forecast_usd_per_mwh = lmp_forecast_usd_per_mwh + [lmp_forecast_usd_per_mwh[-1]] * (48-len(lmp_forecast_usd_per_mwh))
-                    reg_forecast_usd_per_mwh = reg_forecast_usd_per_mwh + [reg_forecast_usd_per_mwh[-1]] * (48-len(reg_forecast_usd_per_mwh))
-
-                # Update the price forecast
-                self.price_forecast = PriceForecast(
-                    dp_usd_per_mwh=dp_forecast_usd_per_mwh,
-                    lmp_usd_per_mwh=lmp_forecast_usd_per_mwh,
-                    reg_usd_per_mwh=reg_forecast_usd_per_mwh,
-                )
-                self.log("Successfully read price forecast from local CSV.")
-                # self.log(f"- LMP USD/MWh {self.price_forecast.lmp_usd_per_mwh}")
-                # self.log(f"- Total energy USD/MWh {[round(x,2) for x in self.price_forecast.total_energy]}")
+        forecast = await self.forecast_fetcher.fetch(PRICE, session)
+        if forecast is not None:
+            self.log("Successfully received price forecast from the price service API")
+            self.price_forecast = PriceForecast(
+                dp_usd_per_mwh=forecast.fields["dist"],
+                lmp_usd_per_mwh=forecast.fields["lmp"],
+                reg_usd_per_mwh=[0] * len(forecast),
+            )
+            return
 
-            except Exception as e:
-                self.log(f"Could not get a price forecast from the local CSV file: {e}.")
-                await self.send_glitch(f"Failed to read price forecast from local CSV file: {e}", log_level=LogLevel.Error)
+        self.log("Trying to read price forecast from the local forecast store")
+        # Start at the next hour and extend the end to get a forecast for the next 48 hours
+        stored = self.forecast_fetcher.store.hours(PRICE, hour_start(time.time()) + 3600, 48)
+        if not len(stored):
+            self.log("Could not get a price forecast from the local forecast store.")
+            await self.send_glitch("Failed to read price forecast from local forecast store", log_level=LogLevel.Error)
+            return
+        dp_forecast_usd_per_mwh = stored.fields["dist"]
+        lmp_forecast_usd_per_mwh = stored.fields["lmp"]
+        missing = 48 - len(stored)
+        self.price_forecast = PriceForecast(
+            dp_usd_per_mwh=dp_forecast_usd_per_mwh + [dp_forecast_usd_per_mwh[-1]] * missing,
+            lmp_usd_per_mwh=lmp_forecast_usd_per_mwh + [lmp_forecast_usd_per_mwh[-1]] * missing,
+            reg_usd_per_mwh=[0.0] * 48,
+        )
+        self.log("Successfully read price forecast from the local forecast store.")
 
     async def read_forecasted_price_for_now(self) -> float:
         """Returns the forecasted price for this hour (LMP + Dist) in USD/MWh"""
-        try:
-            prices_file = Path(f"{self.settings.paths.data_dir}/price_forecast.csv")
-            if prices_file.exists():
-                start_of_hour_timestamp = int(time.time()//3600) * 3600
-                with open(prices_file, 'r', newline='') as f:
-                    reader = csv.reader(f)
-                    next(reader)
-                    rows = list(reader)
-                # Find the row with matching timestamp
-                for row in rows:
-                    if float(row[0]) == start_of_hour_timestamp:
-                        self.log("A valid price forecast for this hour was available locally.")
-                        price = float(row[1]) + float(row[2])  # dist + lmp
-                        return price
-                raise Exception(f"{prices_file} does not have a price forecast for this hour.")
-            else:
-                raise Exception(f"{prices_file} does not exist.")
-        except Exception as e:
-            self.log(f"Failed: {e}")
-            await self.send_glitch(f"Error in read_forecasted_price_for_now: {e}", log_level=LogLevel.Error)
+        prices = self.forecast_fetcher.store.hour(PRICE, int(time.time()))
+        if prices is None:
+            self.log("Failed: the forecast store has no price forecast for this hour.")
+            await self.send_glitch(
+                "Error in read_forecasted_price_for_now: no price forecast for this hour",
+                log_level=LogLevel.Error,
+            )
             return 0
+        self.log("A valid price forecast for this hour was available locally.")
+        return prices["dist"] + prices["lmp"]  # dist + lmp
 
     async def fake_market_maker(self):
         while True:
@@ -0,0 +1,130 @@
+"""Type-keyed dispatch of named-type payloads to actor handlers.
+
+Actors build one MessageDispatcher at construction, registering a handler per
+payload type. Dispatch is a single dict lookup on ``type(payload)`` instead of
+walking a ``match`` statement, and each registered type keeps counters for
+calls, cumulative handler time and exceptions.
+"""
+
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, Type
+
+from gwsproto.data_classes.sh_node import ShNode
+
+Handler = Callable[[Optional[ShNode], Any], Any]
+
+
+class DispatchErrorPolicy(Enum):
+    """What the dispatcher does when a handler raises.
+
+    Log: count the exception, report it through the dispatcher's on_error
+        callback and carry on.
+    Raise: count the exception and re-raise it to the caller.
+    """
+    Log = "Log"
+    Raise = "Raise"
+
+
+@dataclass(slots=True)
+class HandlerStats:
+    calls: int = 0
+    seconds: float = 0.0
+    exceptions: int = 0
+
+    @property
+    def mean_ms(self) -> float:
+        if self.calls == 0:
+            return 0.0
+        return 1000 * self.seconds / self.calls
+
+
+@dataclass(slots=True)
+class _Registration:
+    handler: Handler
+    error_policy: DispatchErrorPolicy
+    stats: HandlerStats
+
+
+class MessageDispatcher:
+    """Maps payload types to handlers called as handler(from_node, payload).
+
+    Each payload type is resolved once through its MRO, so subclasses of a
+    registered type reach its handler, and the result (including 'no
+    handler') is cached.
+    """
+
+    def __init__(
+        self,
+        on_error: Callable[[str], None],
+        default_error_policy: DispatchErrorPolicy = DispatchErrorPolicy.Log,
+    ) -> None:
+        self._on_error = on_error
+        self._default_error_policy = default_error_policy
+        self._registrations: Dict[type, _Registration] = {}
+        self._resolved: Dict[type, Optional[_Registration]] = {}
+
+    def register(
+        self,
+        payload_type: Type[Any],
+        handler: Handler,
+        error_policy: Optional[DispatchErrorPolicy] = None,
+    ) -> None:
+        if payload_type in self._registrations:
+            raise ValueError(f"Handler for {payload_type.__name__} already registered")
+        self._registrations[payload_type] = _Registration(
+            handler=handler,
+            error_policy=error_policy or self._default_error_policy,
+            stats=HandlerStats(),
+        )
+        self._resolved.clear()
+
+    def handles(self, payload: Any) -> bool:
+        return self._lookup(type(payload)) is not None
+
+    def dispatch(self, from_node: Optional[ShNode], payload: Any) -> bool:
+        """Run the handler registered for type(payload).
+
+        Returns False, without calling anything, if no handler is registered.
+        """
+        registration = self._lookup(type(payload))
+        if registration is None:
+            return False
+        stats = registration.stats
+        stats.calls += 1
+        start = time.perf_counter()
+        try:
+            registration.handler(from_node, payload)
+        except Exception as e:
+            stats.exceptions += 1
+            if registration.error_policy == DispatchErrorPolicy.Raise:
+                raise
+            self._on_error(f"Trouble with {type(payload).__name__}: \n {e}")
+        finally:
+            stats.seconds += time.perf_counter() - start
+        return True
+
+    def stats(self) -> Dict[str, HandlerStats]:
+        """Handler counters keyed by payload class name"""
+        return {
+            payload_type.__name__: registration.stats
+            for payload_type, registration in self._registrations.items()
+        }
+
+    def reset_stats(self) -> None:
+        for registration in self._registrations.values():
+            registration.stats = HandlerStats()
+
+    def _lookup(self, payload_type: type) -> Optional[_Registration]:
+        try:
+            return self._resolved[payload_type]
+        except KeyError:
+            pass
+        registration = None
+        for base in payload_type.__mro__:
+            registration = self._registrations.get(base)
+            if registration is not None:
+                break
+        self._resolved[payload_type] = registration
+        return registration
@@ -8,6 +8,7 @@ import time
 import typing
 from typing import Dict, List, Optional
 
+from drivers.i2c.bus_scheduler import I2cBusScheduler
 from drivers.multipurpose_sensor.multipurpose_sensor_driver import \
     MultipurposeSensorDriver
 from gwproactor import SyncThreadActor
@@ -41,12 +42,14 @@ class MpDriverThreadSetupHelper:
     settings: ScadaSettings
     hardware_layout: HardwareLayout
     component: Ads111xBasedComponent
+    i2c_bus: Optional[I2cBusScheduler]
 
     def __init__(
         self,
         node: ShNode,
         settings: ScadaSettings,
         hardware_layout: HardwareLayout,
+        i2c_bus: Optional[I2cBusScheduler] = None,
     ):
         if not isinstance(node.component, Ads111xBasedComponent):
             raise ValueError(
@@ -57,6 +60,7 @@ class MpDriverThreadSetupHelper:
         self.settings = settings
         self.hardware_layout = hardware_layout
         self.component = typing.cast(Ads111xBasedComponent, node.component)
+        self.i2c_bus = i2c_bus
 
     def make_driver(self) -> MultipurposeSensorDriver:
         driver_module_name = ""
@@ -87,7 +91,9 @@ class MpDriverThreadSetupHelper:
         if driver_module_name not in sys.modules:
             importlib.import_module(driver_module_name)
         driver_class = getattr(sys.modules[driver_module_name], driver_class_name)
-        return driver_class(component=self.component, settings=self.settings)
+        return driver_class(
+            component=self.component, settings=self.settings, i2c_bus=self.i2c_bus
+        )
 
 
 class MultipurposeSensorDriverThread(SyncAsyncInteractionThread):
@@ -110,6 +116,7 @@ class MultipurposeSensorDriverThread(SyncAsyncInteractionThread):
         telemetry_destination: str,
         responsive_sleep_step_seconds=0.01,
         daemon: bool = True,
+        i2c_bus: Optional[I2cBusScheduler] = None,
     ):
         super().__init__(
             name=node.Name,
@@ -129,7 +136,7 @@ class MultipurposeSensorDriverThread(SyncAsyncInteractionThread):
             for ch in self._hardware_layout.data_channels.values()
             if ch.AboutNodeName in my_channel_names
         ]
-        setup_helper = MpDriverThreadSetupHelper(node, settings, hardware_layout)
+        setup_helper = MpDriverThreadSetupHelper(node, settings, hardware_layout, i2c_bus)
         self.cfg_by_ch = {
             self._hardware_layout.data_channels[cfg.ChannelName]: cfg
             for cfg in self.component.gt.ConfigList
@@ -288,5 +295,6 @@ class MultipurposeSensor(SyncThreadActor):
                 settings=services.settings if settings is None else settings,
                 hardware_layout=services.hardware_layout,
                 telemetry_destination=services.name,
+                i2c_bus=services.i2c_bus,
             ),
         )
@@ -24,6 +24,7 @@ from gwsproto.named_types import (
 from result import Ok, Result
 from transitions import Machine
 import transitions
+from actors.message_dispatcher import DispatchErrorPolicy, MessageDispatcher
 from actors.sh_node_actor import ShNodeActor
 from gwsproto.enums import LogLevel, PicoCyclerEvent, PicoCyclerState
 from gwsproto.named_types import Glitch, GoDormant, PicoMissing, WakeUp
@@ -155,6 +156,17 @@ class PicoCycler(ShNodeActor):
             initial=PicoCyclerState.PicosLive,
             send_event=True,
         )
+        self._dispatcher = MessageDispatcher(
+            on_error=self.log, default_error_policy=DispatchErrorPolicy.Raise
+        )
+        self._dispatcher.register(ChannelReadings, self.process_channel_readings)
+        self._dispatcher.register(
+            FsmFullReport, lambda _, payload: self.process_fsm_full_report(payload)
+        )
+        self._dispatcher.register(GoDormant, self.process_go_dormant)
+        self._dispatcher.register(PicoMissing, self.process_pico_missing)
+        self._dispatcher.register(SyncedReadings, self.process_synced_readings)
+        self._dispatcher.register(WakeUp, self.process_wake_up)
 
     @property
     def flatlined(self) -> List[str]:
@@ -330,33 +342,20 @@ class PicoCycler(ShNodeActor):
     def process_message(self, message: Message) -> Result[bool, BaseException]:
         # print(f"++pico_cycler  {message.message_type()}", flush=True)
         self.services.logger.path(f"++pico_cycler  {message.message_type()}")
-        path_dbg = 0
+        handled = False
         src_node = self.layout.node(message.Header.Src)
         if src_node is not None:
-            path_dbg |= 0x00000001
-            match message.Payload:
-                case ChannelReadings():
-                    path_dbg |= 0x00000002
-                    self.process_channel_readings(src_node, message.Payload)
-                case FsmFullReport():
-                    path_dbg |= 0x00000004
-                    self.process_fsm_full_report(message.Payload)
-                case GoDormant():
-                    if self.state != PicoCyclerState.Dormant:
-                        self.GoDormant()
-                        self.log("Going Dormant!")
-                case PicoMissing():
-                    path_dbg |= 0x00000008
-                    self.process_pico_missing(src_node, message.Payload)
-                case SyncedReadings():
-                    path_dbg |= 0x00000010
-                    self.process_synced_readings(src_node, message.Payload)
-                case WakeUp():
-                    self.WakeUp()
-                case _:
-                    path_dbg |= 0x00000020
-        self.services.logger.path(f"--pico_cycler  path:0x{path_dbg:08X}")
+            handled = self._dispatcher.dispatch(src_node, message.Payload)
+        self.services.logger.path(f"--pico_cycler  handled:{handled}")
         return Ok(True)
+
+    def process_go_dormant(self, from_node: ShNode, payload: GoDormant) -> None:
+        if self.state != PicoCyclerState.Dormant:
+            self.GoDormant()
+            self.log("Going Dormant!")
+
+    def process_wake_up(self, from_node: ShNode, payload: WakeUp) -> None:
+        self.WakeUp()
     
     def WakeUp(self) -> None:
         if self.state == PicoCyclerState.Dormant:
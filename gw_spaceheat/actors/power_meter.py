@@ -176,6 +176,10 @@ class PowerMeterDriverThread(SyncAsyncInteractionThread):
             ch: None for ch in self.my_channels
         }
         self.async_power_reporting_threshold = settings.async_power_reporting_threshold
+        # Reads that came back with warnings, and reads that failed outright.
+        # Written by this thread only; Scada reads them for /metrics.
+        self.read_warnings = 0
+        self.read_failures = 0
 
     def _validate_channels_with_component(self, component: ElectricMeterComponent) -> None:
         for channel in self.my_channels:
@@ -257,27 +261,25 @@ class PowerMeterDriverThread(SyncAsyncInteractionThread):
         self._iterate_sleep_seconds = sleep_time_ms / 1000
 
     def update_latest_value_dicts(self):
-        logged_one = False
-        for ch in self.my_channels:
-            read = self.driver.read_telemetry_value(ch)
-            if read.is_ok():
-                if read.value.value is not None:
-                    self.latest_telemetry_value[ch] = read.value.value
-                if read.value.warnings:
-                    log_event = False
-                    if not logged_one and self._logger.isEnabledFor(logging.DEBUG):
-                        logged_one = True
-                        log_event = True
-                        self._logger.info(f"PowerMeter: TryConnectResult:\n{read.value}")
-                        problems = Problems(warnings=read.value.warnings)
-                        self._logger.info(f"PowerMeter: Problems:\n{problems}")
-                    self._report_problems(
-                        problems=Problems(warnings=read.value.warnings),
-                        tag="read warnings",
-                        log_event=log_event
-                    )
-            else:
-                raise read.value
+        read = self.driver.read_telemetry_values(self.my_channels)
+        if read.is_ok():
+            for ch, value in read.value.value.items():
+                if value is not None:
+                    self.latest_telemetry_value[ch] = value
+            if read.value.warnings:
+                self.read_warnings += 1
+                problems = Problems(warnings=read.value.warnings)
+                log_event = self._logger.isEnabledFor(logging.DEBUG)
+                if log_event:
+                    self._logger.info(f"PowerMeter: Problems:\n{problems}")
+                self._report_problems(
+                    problems=problems,
+                    tag="read warnings",
+                    log_event=log_event
+                )
+        else:
+            self.read_failures += 1
+            raise read.value
 
     def report_sampled_telemetry_values(
         self, channel_report_list: List[DataChannel]
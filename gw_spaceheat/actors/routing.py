@@ -0,0 +1,69 @@
+from collections import Counter
+from enum import StrEnum
+from typing import Callable, NamedTuple, Optional
+
+from gwsproto.data_classes.house_0_names import H0N
+
+
+class Route(StrEnum):
+    communicator = "communicator"  # an actor in this process
+    admin = "admin"  # the admin MQTT link
+    ltn = "ltn"  # the LTN MQTT link
+    local_mqtt = "local-mqtt"  # an actor in another process on the LAN
+
+
+class Destination(NamedTuple):
+    route: Route
+    name: str  # the communicator or node name to address
+
+
+class MessageRoutes:
+    """Where a message to each node goes from this process.
+
+    Destinations are resolved from the communicator names once and cached
+    until invalidate() is called, which the app does whenever communicators
+    are added. Every resolution is counted per route in counts.
+    """
+
+    # Nodes whose 'actors' are handled by another node's communicator
+    ALIASES: dict[str, str] = {H0N.local_control_normal: H0N.local_control}
+
+    def __init__(self, get_communicator_names: Callable[[], set[str]]) -> None:
+        self._get_communicator_names = get_communicator_names
+        self._destinations: Optional[dict[str, Destination]] = None
+        self.counts: Counter[Route] = Counter()
+        self.rebuilds = 0
+
+    def invalidate(self) -> None:
+        self._destinations = None
+
+    def _build(self) -> dict[str, Destination]:
+        destinations = {
+            name: Destination(Route.communicator, name)
+            for name in self._get_communicator_names()
+        }
+        for alias, name in self.ALIASES.items():
+            if name in destinations:
+                destinations[alias] = destinations[name]
+        self.rebuilds += 1
+        return destinations
+
+    def resolve(self, dst_name: str, local_name: Optional[str] = None) -> Destination:
+        """The route to dst_name. local_name, the sending actor's own name,
+        always resolves to a communicator even if it is not registered."""
+        if self._destinations is None:
+            self._destinations = self._build()
+        destination = self._destinations.get(dst_name)
+        if destination is None:
+            name = self.ALIASES.get(dst_name, dst_name)
+            if dst_name == H0N.admin:
+                destination = Destination(Route.admin, dst_name)
+            elif dst_name == H0N.ltn:
+                destination = Destination(Route.ltn, dst_name)
+            else:
+                destination = Destination(Route.local_mqtt, name)
+            self._destinations[dst_name] = destination
+        if destination.route != Route.communicator and destination.name == local_name:
+            destination = Destination(Route.communicator, local_name)
+        self.counts[destination.route] += 1
+        return destination
@@ -20,6 +20,7 @@ from gwproto.messages import EventBase
 
 from gwsproto.enums import ActorClass
 
+from actors.routing import Route
 from actors.scada_interface import ScadaInterface
 from gwsproto.data_classes.house_0_layout import House0Layout
 from gwsproto.named_types import FsmFullReport, PowerWatts, SendSnap, ReportEvent
@@ -40,9 +41,14 @@ from gwproactor.message import MQTTReceiptPayload
 
 from actors.subscription_handler import ChannelSubscription, StateMachineSubscription
 from actors.local_control_loader import LocalControl
+from actors.loop_monitor import loop_health_summary
+from actors.pico_cycler import PicoCycler
+from actors.power_meter import PowerMeter
+from actors.scada_metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, ScadaMetrics
 from actors.leaf_ally_loader import LeafAlly
 from actors.codec_factories import ScadaCodecFactory
 from actors.contract_handler import ContractHandler
+from actors.message_dispatcher import DispatchErrorPolicy, HandlerStats, MessageDispatcher
 from gwsproto.data_classes.house_0_names import H0N, ScadaWeb
 from gwsproto.data_classes.components.web_server_component import WebServerComponent
 from gwsproto.enums import (LeafAllyBufferOnlyState,  LeafAllyAllTanksState,
@@ -50,9 +56,10 @@ from gwsproto.enums import (LeafAllyBufferOnlyState,  LeafAllyAllTanksState,
                    MainAutoEvent, MainAutoState, SeasonalStorageMode,  TopState)
 
 from gwsproto.named_types.scada_control_capabilities import ControlNode, ControlChannel
+from gwsproto.named_types.channel_readings_compact import COMPACT_CHANNEL_READINGS_ENCODING
 from gwsproto.named_types import ( ActuatorsReady, FsmEvent,
     AdminDispatch, AdminAnalogDispatch, AdminKeepAlive, AdminReleaseControl, AllyGivesUp, ChannelFlatlined,
-    Glitch, GoDormant, LayoutLite, NewCommandTree, NoNewContractWarning, ResetHpKeepValue, ScadaControlCapabilities,
+    Glitch, GoDormant, LayoutLite, LoopHealth, NewCommandTree, NoNewContractWarning, ResetHpKeepValue, ScadaControlCapabilities,
     ScadaParams, SendControlCapabilities, SendLayout, SetLwtControlParams, SetTargetLwt, SiegLoopEndpointValveAdjustment,
     SiegTargetTooLow, SingleMachineState,SlowContractHeartbeat, SuitUp, WakeUp,
 )
@@ -74,6 +81,7 @@ class Scada(PrimeActor, ScadaInterface):
     _admin_timeout_task: Optional[asyncio.Task] = None
     _stop_requested: bool = False
     _contract_handler: ContractHandler
+    _dispatcher: MessageDispatcher
 
     top_states = ["Auto", "Admin"]
     top_transitions = [
@@ -98,6 +106,8 @@ class Scada(PrimeActor, ScadaInterface):
         print("Scada slots:", getattr(Scada, "__slots__", None))
         print("MRO:", Scada.__mro__)
         super().__init__(name, services)
+        self._dispatcher = self._make_message_dispatcher()
+        self._metrics = ScadaMetrics()
         if not isinstance(services.hardware_layout, House0Layout):
             raise Exception("Make sure to pass House0Layout object as hardware_layout!")
         self.got_first_buffer_reading = False
@@ -110,6 +120,8 @@ class Scada(PrimeActor, ScadaInterface):
         now = int(time.time())
         self._channels_reported = False
         self._last_report_second = int(now - (now % self.settings.seconds_per_report))
+        # ChannelReadings encodings the ltn advertised in its last SendLayout
+        self._ltn_report_encodings: set[str] = set()
         self._last_snap_s = int(now - (now % self.settings.seconds_per_snapshot))
         self.pending_dispatch: Optional[AnalogDispatch] = None
 
@@ -189,14 +201,74 @@ class Scada(PrimeActor, ScadaInterface):
             path="/ping",
             handler=self._handle_ping,
         )
+        self.services.add_web_route(
+            server_name=ScadaWeb.DEFAULT_SERVER_NAME,
+            method="GET",
+            path="/loop-health",
+            handler=self._handle_loop_health,
+        )
+        self.services.add_web_route(
+            server_name=ScadaWeb.DEFAULT_SERVER_NAME,
+            method="GET",
+            path="/metrics",
+            handler=self._handle_metrics,
+        )
 
     # And add the handler method:
     async def _handle_ping(self, request: Request) -> Response:
         """Simple ping endpoint for connectivity checks"""
         return Response(text="pong", status=200)
 
+    async def _handle_loop_health(self, request: Request) -> Response:
+        """Loop lag, slow callbacks and message handling times so far this
+        LoopHealth period"""
+        health = self.services.loop_monitor.snapshot(
+            self.layout.scada_g_node_alias, reset=False
+        )
+        return Response(
+            text=health.model_dump_json(), status=200, content_type="application/json"
+        )
+
+    async def _handle_metrics(self, request: Request) -> Response:
+        """Operational metrics in the Prometheus text format"""
+        return Response(
+            text=self.render_metrics(),
+            status=200,
+            headers={"Content-Type": METRICS_CONTENT_TYPE},
+        )
+
+    def render_metrics(self) -> str:
+        modbus_errors = {}
+        for node in self.layout.nodes.values():
+            if node.ActorClass == ActorClass.PowerMeter:
+                meter = self.get_communicator(node.Name)
+                if isinstance(meter, PowerMeter):
+                    sync_thread = meter.sync_thread
+                    modbus_errors[node.Name] = (
+                        sync_thread.read_warnings, sync_thread.read_failures
+                    )
+        cycler = self.get_communicator(H0N.pico_cycler)
+        if isinstance(cycler, PicoCycler):
+            pico_states = {pico: state.value for pico, state in cycler.pico_states.items()}
+            pico_reboots = cycler.reboots
+            zombie_picos = cycler.zombies
+        else:
+            pico_states, pico_reboots, zombie_picos = {}, {}, []
+        return self._metrics.render(
+            channel_values=self._data.latest_channel_values,
+            channel_unix_ms=self._data.latest_channel_unix_ms,
+            link_states=self.services.link_states(),
+            handler_stats=self.message_handler_stats(),
+            i2c_devices=self.services.i2c_bus.device_stats(),
+            modbus_errors=modbus_errors,
+            pico_states=pico_states,
+            pico_reboots=pico_reboots,
+            zombie_picos=zombie_picos,
+        )
+
     def stop(self):
         self._stop_requested = True
+        self.services.loop_monitor.stop()
 
     @property
     def logger(self) -> ProactorLogger:
@@ -211,10 +283,12 @@ class Scada(PrimeActor, ScadaInterface):
         return self._data
 
     def start_tasks(self) -> typing.Sequence[asyncio.Task]:
+        self.services.loop_monitor.start()
         return [
             asyncio.create_task(self.report_sending_task(), name="report_sender"),
             asyncio.create_task(self.snap_sending_task(), name="snap_sender"),
             asyncio.create_task(self.state_tracker(), name="scada top_state_tracker"),
+            asyncio.create_task(self.loop_health_task(), name="loop_health_sender"),
         ]
 
     @classmethod
@@ -226,156 +300,57 @@ class Scada(PrimeActor, ScadaInterface):
     # Messages
     #######################################
 
+    def _make_message_dispatcher(self) -> MessageDispatcher:
+        """Handlers for NamedTypes sent to primary scada, keyed by payload type"""
+        dispatcher = MessageDispatcher(on_error=self.log)
+        dispatcher.register(ActuatorsReady, self.process_actuators_ready)
+        dispatcher.register(AdminDispatch, self.process_admin_dispatch)
+        dispatcher.register(AdminAnalogDispatch, self.process_admin_analog_dispatch)
+        dispatcher.register(AdminKeepAlive, self.process_admin_keep_alive)
+        dispatcher.register(AdminReleaseControl, self.process_admin_release_control)
+        dispatcher.register(AllyGivesUp, self.process_ally_gives_up)
+        dispatcher.register(AnalogDispatch, self._process_ltn_analog_dispatch)
+        dispatcher.register(ChannelFlatlined, self._process_channel_flatlined)
+        dispatcher.register(ChannelReadings, self.process_channel_readings)
+        dispatcher.register(FsmFullReport, self.process_fsm_full_report)
+        dispatcher.register(
+            Glitch, self._process_glitch, error_policy=DispatchErrorPolicy.Raise
+        )
+        dispatcher.register(LoopHealth, self._process_loop_health)
+        dispatcher.register(MachineStates, self.process_machine_states)
+        dispatcher.register(PowerWatts, self.process_power_watts)
+        dispatcher.register(ResetHpKeepValue, self.process_reset_hp_keep_value)
+        dispatcher.register(ScadaParams, self._process_ltn_scada_params)
+        dispatcher.register(SendControlCapabilities, self._process_send_control_capabilities)
+        dispatcher.register(SendLayout, self._process_send_layout)
+        dispatcher.register(SendSnap, self._process_send_snap)
+        dispatcher.register(SetLwtControlParams, self.process_set_lwt_control_params)
+        dispatcher.register(SetTargetLwt, self.process_set_target_lwt)
+        dispatcher.register(
+            SiegLoopEndpointValveAdjustment,
+            self.process_sieg_loop_endpoint_valve_adjustment,
+        )
+        dispatcher.register(
+            SiegTargetTooLow,
+            self._process_sieg_target_too_low,
+            error_policy=DispatchErrorPolicy.Raise,
+        )
+        dispatcher.register(SingleMachineState, self.process_single_machine_state)
+        dispatcher.register(SingleReading, self.process_single_reading)
+        dispatcher.register(SlowContractHeartbeat, self.process_slow_contract_heartbeat)
+        dispatcher.register(SuitUp, self.process_suit_up)
+        dispatcher.register(SyncedReadings, self.process_synced_readings)
+        return dispatcher
+
     def process_scada_message(self, from_node: ShNode, payload: Any) -> None:
         """Process NamedTypes sent to primary scada"""
-        # Todo: turn msg into GwBase
-        match payload:
-            case ActuatorsReady():
-                try:
-                    self.process_actuators_ready(from_node, payload)
-                except Exception as e:
-                    self.log(f"Trouble with process_actuators_ready: \n {e}")
-            case AdminDispatch():
-                try:
-                    self.process_admin_dispatch(from_node, payload)
-                except Exception as e:
-                    self.log(f"Trouble with process_admin_dispatch: \n {e}")
-            case AdminAnalogDispatch():
-                try:
-                    self.process_admin_analog_dispatch(from_node, payload)
-                except Exception as e:
-                    self.log(f"Trouble with process_admin_dispatch: \n {e}")
-            case AdminKeepAlive():
-                try:
-                    self.process_admin_keep_alive(from_node, payload)
-                except Exception as e:
-                    self.log(f"Trouble with process_admin_keep_alive: \n {e}")
-            case AdminReleaseControl():
-                try:
-                    self.process_admin_release_control(from_node, payload)
-                except Exception as e:
-                    self.log(f"Trouble with admin_release_control: \n {e}")
-            case AllyGivesUp():
-                try:
-                    self.process_ally_gives_up(from_node, payload)
-                except Exception as e:
-                    self.log(f"Trouble with process_ally_gives_up: \n {e}")
-            case AnalogDispatch():
-                if payload.FromGNodeAlias != self._layout.ltn_g_node_alias:
-                    self.logger.error("IGNORING DISPATCH - NOT FROM MY LTN")
-                    return
-                try:
-                    self.process_analog_dispatch(payload)
-                except Exception as e:
-                    self.log(f"Trouble with proces_analog_dispatch: \n {e}")
-            case ChannelFlatlined():
-                try:
-                    self.data.flush_channel_from_latest(payload.Channel.Name)
-                except Exception as e:
-                    self.log(f"Trouble with ChannelFlatlined: \n {e}")
-            case ChannelReadings():
-                try:
-                    self.process_channel_readings(from_node, payload)
-                except Exception as e:
-                    self.logger.error(f"problem with process_channel_readings: \n {e}")
-            case FsmFullReport():
-                try:
-                    self.process_fsm_full_report(from_node, payload)
-                except Exception as e:
-                    self.logger.error(f"problem with process_fsm_full_report: \n {e}")
-            case Glitch():
-                new_glitch = Glitch(
-                    FromGNodeAlias=payload.FromGNodeAlias,
-                    Node=payload.Node,
-                    Type=payload.Type,
-                    Summary=payload.Summary,
-                    Details=payload.Details,
-                    CreatedMs=payload.CreatedMs
-                )
-                self._send_to(self.ltn, new_glitch)
-            case MachineStates():
-                try:
-                    self.process_machine_states(from_node, payload)
-                except Exception as e:
-                    self.log(f"Trouble with process_machine_states: \n {e}")
-            case PowerWatts():
-                try:
-                    self.process_power_watts(from_node, payload)
-                except Exception as e:
-                    self.log(f"Trouble with process_power_watts: \n {e}")
-            case ResetHpKeepValue():
-                try:
-                    self.process_reset_hp_keep_value(from_node, payload)
-                except Exception as e:
-                    self.log(f"Trouble with process_reset_hp_keep_value: \n {e}")
-            case ScadaParams():
-                try:
-                    self.process_scada_params(from_node, payload)
-                    self._send_to(self.derived_generator, payload)
-                except Exception as e:
-                    self.log(f"Trouble with process_scada_params: \n {e}")
-            case SendControlCapabilities():
-                try:
-                    self._send_to(from_node, self.control_capabilities)
-                except Exception as e:
-                    self.log(f"Trouble with SendLayout: {e}")
-            case SendLayout():
-                try:
-                    self._send_to(from_node, self.layout_lite)
-                except Exception as e:
-                    self.log(f"Trouble with SendLayout: {e}")
-            case SendSnap():
-                try:
-                    self._send_to(from_node, self._data.make_snapshot())
-                except Exception as e:
-                    self.log(f"Trouble with SendSnap: {e}")
-            case SetLwtControlParams():
-                try:
-                    self.process_set_lwt_control_params(from_node, payload)
-                except Exception as e:
-                    self.log(f"Trouble with process_set_lwt_control_params: {e}")
-            case SetTargetLwt():
-                try:
-                    self.process_set_target_lwt(from_node, payload)
-                except Exception as e:
-                    self.log(f"Trouble with process_set_target_lwt: {e}")
-            case SiegLoopEndpointValveAdjustment():
-                try:
-                    self.process_sieg_loop_endpoint_valve_adjustment(from_node, payload)
-                except Exception as e:
-                    self.log(f"Trouble with process_sieg_loop_endpoint_valve_adjustment: \n {e}")
-            case SiegTargetTooLow():
-                # send up to ltn so we have a record
-                self._send_to(self.ltn, payload)
-            case SingleMachineState():
-                try:
-                    self.process_single_machine_state(from_node, payload)
-                except Exception as e:
-                    self.log(f"Trouble with process_single_machine_state_: \n {e}")
-            case SingleReading():
-                try:
-                    self.process_single_reading(from_node, payload)
-                except Exception as e:
-                    self.payload = payload
-                    self.from_node = from_node
-                    self.log(f"Trouble with process_single_reading: \n {e}")
-            case SlowContractHeartbeat():
-                try:
-                    self.process_slow_contract_heartbeat(from_node, payload)
-                except Exception as e:
-                    self.log(f"Trouble with process_slow_contract_heartbeat: \n {e}")
-            case SuitUp():
-                try:
-                    self.process_suit_up(from_node, payload)
-                except Exception as e:
-                    self.logger.error(f"Trouble with process_suit_up: \n {e}")
-            case SyncedReadings():
-                try:
-                    self.process_synced_readings(from_node, payload)
-                except Exception as e:
-                    self.log(f"Trouble with process_synced_reading: \n {e}")
-            case _:
-                raise ValueError(f"Scada does not expect to receive[{type(payload)}!]")
+        if not self._dispatcher.dispatch(from_node, payload):
+            raise ValueError(f"Scada does not expect to receive[{type(payload)}!]")
+
+    def message_handler_stats(self) -> typing.Dict[str, HandlerStats]:
+        """Per-payload-type call count, cumulative handler seconds and
+        exception count for process_scada_message"""
+        return self._dispatcher.stats()
 
     def get_communicator(self, name: str) -> Optional[CommunicatorInterface]:
         return self.services.get_communicator(name)
@@ -524,6 +499,19 @@ class Scada(PrimeActor, ScadaInterface):
         #     self.log(f"Sending to {to_node.Name}")
         #     self._send_to(to_node.Name, payload)
 
+    def _process_ltn_analog_dispatch(
+        self, from_node: ShNode, payload: AnalogDispatch
+    ) -> None:
+        if payload.FromGNodeAlias != self._layout.ltn_g_node_alias:
+            self.logger.error("IGNORING DISPATCH - NOT FROM MY LTN")
+            return
+        self.process_analog_dispatch(payload)
+
+    def _process_channel_flatlined(
+        self, from_node: ShNode, payload: ChannelFlatlined
+    ) -> None:
+        self.data.flush_channel_from_latest(payload.Channel.Name)
+
     def process_channel_readings(
         self, from_node: ShNode, payload: ChannelReadings
     ) -> None:
@@ -536,14 +524,9 @@ class Scada(PrimeActor, ScadaInterface):
             raise ValueError(
                 f"{payload.ChannelName} shoudl be read by {ch.captured_by_node}, not {from_node}!"
             )
-        self._data.recent_channel_values[ch.Name] += payload.ValueList
-
-        self._data.recent_channel_unix_ms[ch.Name] += payload.ScadaReadTimeUnixMsList
-        if len(payload.ValueList) > 0:
-            self._data.latest_channel_values[ch.Name] = payload.ValueList[-1]
-            self._data.latest_channel_unix_ms[
-                ch.Name
-            ] = payload.ScadaReadTimeUnixMsList[-1]
+        self._data.add_readings(
+            ch.Name, payload.ValueList, payload.ScadaReadTimeUnixMsList
+        )
 
     def process_fsm_full_report(
         self, from_node: ShNode, payload: FsmFullReport
@@ -569,6 +552,21 @@ class Scada(PrimeActor, ScadaInterface):
         self.log(f"Got ResetHpKeepValue. Sending {new_payload} to {to_node.Name} from {boss.name}")
         self._send_to(to_node, new_payload, boss)
 
+    def _process_glitch(self, from_node: ShNode, payload: Glitch) -> None:
+        new_glitch = Glitch(
+            FromGNodeAlias=payload.FromGNodeAlias,
+            Node=payload.Node,
+            Type=payload.Type,
+            Summary=payload.Summary,
+            Details=payload.Details,
+            CreatedMs=payload.CreatedMs
+        )
+        self._send_to(self.ltn, new_glitch)
+
+    def _process_loop_health(self, from_node: ShNode, payload: LoopHealth) -> None:
+        """Pass scada2's LoopHealth on to the ltn"""
+        self._send_to(self.ltn, payload, from_node)
+
     def process_machine_states(
         self, from_node: ShNode, payload: MachineStates
     ) -> None:
@@ -668,6 +666,32 @@ class Scada(PrimeActor, ScadaInterface):
             self.logger.error(f"Sending back {response}")
             self._send_to(self.ltn, response)
 
+    def _process_ltn_scada_params(
+        self, from_node: ShNode, payload: ScadaParams
+    ) -> None:
+        self.process_scada_params(from_node, payload)
+        self._send_to(self.derived_generator, payload)
+
+    def _process_send_control_capabilities(
+        self, from_node: ShNode, payload: SendControlCapabilities
+    ) -> None:
+        self._send_to(from_node, self.control_capabilities)
+
+    def _process_send_layout(self, from_node: ShNode, payload: SendLayout) -> None:
+        if from_node == self.ltn:
+            self._ltn_report_encodings = set(payload.ReportEncodings or [])
+        self._send_to(from_node, self.layout_lite)
+
+    def _process_send_snap(self, from_node: ShNode, payload: SendSnap) -> None:
+        if self.settings.snapshots_per_keyframe > 1 and from_node in (self.ltn, self.admin):
+            # A new keyframe for every delta receiver, so their chains stay in step
+            self.send_snap(keyframe=True)
+        else:
+            start = time.perf_counter()
+            snapshot = self._data.make_snapshot()
+            self._metrics.observe_build("snapshot", time.perf_counter() - start)
+            self._send_to(from_node, snapshot)
+
     def process_set_lwt_control_params(
             self, from_node: ShNode, payload: SetLwtControlParams
     ) -> None:
@@ -726,6 +750,12 @@ class Scada(PrimeActor, ScadaInterface):
         self.log(f"GotSiegLoopEndpointValveAdjustment. Sending to {to_node.Name}")
         self._send_to(to_node, new_payload, boss)
 
+    def _process_sieg_target_too_low(
+        self, from_node: ShNode, payload: SiegTargetTooLow
+    ) -> None:
+        # send up to ltn so we have a record
+        self._send_to(self.ltn, payload)
+
     def process_single_machine_state(
         self, from_node: ShNode, payload: SingleMachineState
     ) -> None:
@@ -782,10 +812,7 @@ class Scada(PrimeActor, ScadaInterface):
             ch = self._layout.derived_channels[payload.ChannelName]
         else:
             raise Exception(f"Missing channel name {payload.ChannelName}!")
-        self._data.recent_channel_values[ch.Name].append(payload.Value)
-        self._data.recent_channel_unix_ms[ch.Name].append(payload.ScadaReadTimeUnixMs)
-        self._data.latest_channel_values[ch.Name] = payload.Value
-        self._data.latest_channel_unix_ms[ch.Name] = payload.ScadaReadTimeUnixMs
+        self._data.add_reading(ch.Name, payload.Value, payload.ScadaReadTimeUnixMs)
         self._forward_single_reading(payload)
 
     def process_suit_up(self, from_node: ShNode, payload: SuitUp) -> None:
@@ -812,12 +839,9 @@ class Scada(PrimeActor, ScadaInterface):
                 ch = self._layout.derived_channels[channel_name ]
             else:
                 raise Exception(f"Missing channel name {channel_name}!")
-            self._data.recent_channel_values[ch.Name].append(payload.ValueList[idx])
-            self._data.recent_channel_unix_ms[ch.Name].append(
-                payload.ScadaReadTimeUnixMs
+            self._data.add_reading(
+                ch.Name, payload.ValueList[idx], payload.ScadaReadTimeUnixMs
             )
-            self._data.latest_channel_values[ch.Name] = payload.ValueList[idx]
-            self._data.latest_channel_unix_ms[ch.Name] = payload.ScadaReadTimeUnixMs
 
         # Hack for moving out of Initializing rapidly when restarting Scada
         if from_node.Name ==H0N.buffer.reader and not self.got_first_buffer_reading:
@@ -1190,6 +1214,7 @@ class Scada(PrimeActor, ScadaInterface):
                     node.Handle = f"{H0N.auto}.{H0N.pico_cycler}.{node.Name}"
                 else:
                     node.Handle = (f"{boss.handle}.{node.Name}")
+        self.layout.index_command_tree()
 
         self._send_to(
             self.ltn,
@@ -1327,14 +1352,27 @@ class Scada(PrimeActor, ScadaInterface):
     def time_to_send_snap(self) -> bool:
         return time.time() > self.next_snap_second()
 
+    def compact_reports(self) -> bool:
+        """True if configured for compact reports and the ltn can decode them"""
+        return (
+            self.settings.compact_reports
+            and COMPACT_CHANNEL_READINGS_ENCODING in self._ltn_report_encodings
+        )
+
     def send_report(self):
-        report = self._data.make_report(self._last_report_second)
+        start = time.perf_counter()
+        report = self._data.make_report(
+            self._last_report_second, compact=self.compact_reports()
+        )
+        self._metrics.observe_build("report", time.perf_counter() - start)
         self._data.reports_to_store[report.Id] = report
         self.services.generate_event(ReportEvent(Report=report))  # noqa
         self._data.flush_recent_readings()
 
-    def send_snap(self):
-        snapshot = self._data.make_snapshot()
+    def send_snap(self, keyframe: bool = False):
+        start = time.perf_counter()
+        snapshot = self._data.next_snapshot(keyframe=keyframe)
+        self._metrics.observe_build("snapshot", time.perf_counter() - start)
         self._send_to(self.ltn, snapshot)
         if self.settings.admin.enabled:
             self._send_to(self.admin, snapshot)
@@ -1359,6 +1397,20 @@ class Scada(PrimeActor, ScadaInterface):
             except Exception as e:
                 self.log(e)
 
+    async def loop_health_task(self):
+        period_s = self.settings.loop_health_seconds
+        if period_s <= 0:
+            return
+        while not self._stop_requested:
+            await asyncio.sleep(period_s)
+            try:
+                health = self.services.loop_monitor.snapshot(self.layout.scada_g_node_alias)
+                if health.SlowCallbackList:
+                    self.log(loop_health_summary(health))
+                self._send_to(self.ltn, health)
+            except Exception as e:
+                self.log(e)
+
     #####################################################################
     # Basic plumbing - mostly about messages
     #####################################################################
@@ -1370,21 +1422,19 @@ class Scada(PrimeActor, ScadaInterface):
         if from_node is None:
             from_node = self.node
 
-        # HACK FOR nodes whose 'actors' are handled by their parent's communicator
-        communicator_by_name = {to_node.Name: to_node.Name}
-        communicator_by_name[H0N.local_control_normal] = H0N.local_control
-    
+        destination = self.services.routes.resolve(to_node.Name, self.name)
+
         # if the message is meant for primary_scada, process here
         if to_node.name == self.name:
             self.process_scada_message(from_node, payload)
-        
+
         # if its meant for an actor spawned by primary_scada (aka communicator)
         # call its process_message
-        elif communicator_by_name[to_node.Name] in self.services.get_communicator_names():
-            self.get_communicator(communicator_by_name[to_node.Name]).process_message(
+        elif destination.route == Route.communicator:
+            self.get_communicator(destination.name).process_message(
                 Message(Src=from_node.Name, Dst=to_node.Name, Payload=payload)
             )
-        elif to_node.Name == H0N.admin:
+        elif destination.route == Route.admin:
             self.services.publish_message(
                 link_name=self.ADMIN_MQTT,
                 message=Message(
@@ -1392,7 +1442,7 @@ class Scada(PrimeActor, ScadaInterface):
                 ),
                 qos=QOS.AtMostOnce,
             )
-        elif to_node.Name == H0N.ltn:
+        elif destination.route == Route.ltn:
             #self._links.publish_upstream(payload)
             self.services.publish_message(
                 link_name=self.LTN_MQTT,
@@ -1417,6 +1467,9 @@ class Scada(PrimeActor, ScadaInterface):
         """
         from_node = self._layout.node(message.Header.Src, None)
         to_node = self._layout.node(message.Header.Dst, None)
+        self._metrics.count_message(
+            "internal", getattr(message.Payload, "TypeName", type(message.Payload).__name__)
+        )
 
         if to_node is not None and to_node != self.node:
             try:
@@ -1438,6 +1491,10 @@ class Scada(PrimeActor, ScadaInterface):
             to_node = self.node
         payload = decoded.Payload
         src = decoded.Header.Src
+        self._metrics.count_message(
+            message.Payload.client_name,
+            getattr(payload, "TypeName", type(payload).__name__),
+        )
         if message.Payload.client_name == self.LOCAL_MQTT:
             # store and pass on all the events from scada2
             if isinstance(decoded.Payload, EventBase):
@@ -1,15 +1,19 @@
 """Container for data Scada uses in building status and snapshot messages, separated from Scada for clarity,
 not necessarily re-use. """
 
+import itertools
 import time
 import uuid
-from typing import Dict, List, Optional, Union
+from array import array
+from functools import cached_property
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Union
 
 from actors.config import ScadaSettings
 from gwsproto.data_classes.data_channel import DataChannel
 from gwsproto.data_classes.house_0_names import H0CN
 from gwsproto.named_types import (
     ChannelReadings,
+    ChannelReadingsCompact,
     Report,
     SingleReading,
     SingleMachineState,
@@ -19,15 +23,110 @@ from gwsproto.named_types import (
     Ha1Params,
     HeatingForecast,
     SnapshotSpaceheat,
+    SnapshotSpaceheatDelta,
 )
 
 from gwsproto.data_classes.derived_channel import DerivedChannel
 from gwsproto.data_classes.house_0_layout import House0Layout
+
+
+class ChannelReadingsBuffer:
+    """Columnar store of one channel's readings since the last report.
+
+    Values and read times live in two preallocated array('q') columns with a
+    fill count. Appends write in place, capacity doubles when full and is kept
+    across reports, so clear() is O(1) and steady-state reporting allocates
+    nothing per reading.
+    """
+    INITIAL_CAPACITY = 64
+
+    __slots__ = ("_values", "_unix_ms", "_count")
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY) -> None:
+        capacity = max(capacity, 1)
+        self._values = array("q", bytes(8 * capacity))
+        self._unix_ms = array("q", bytes(8 * capacity))
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def capacity(self) -> int:
+        return len(self._values)
+
+    def append(self, value: int, unix_ms: int) -> None:
+        n = self._count
+        if n == len(self._values):
+            self._grow(n + 1)
+        self._values[n] = value
+        self._unix_ms[n] = unix_ms
+        self._count = n + 1
+
+    def extend(self, values: Sequence[int], unix_ms: Sequence[int]) -> None:
+        if len(values) != len(unix_ms):
+            raise ValueError(
+                f"Got {len(values)} values but {len(unix_ms)} read times"
+            )
+        n = self._count
+        end = n + len(values)
+        if end > len(self._values):
+            self._grow(end)
+        self._values[n:end] = array("q", values)
+        self._unix_ms[n:end] = array("q", unix_ms)
+        self._count = end
+
+    def clear(self) -> None:
+        self._count = 0
+
+    def value_list(self) -> List[int]:
+        with memoryview(self._values) as view:
+            return view[:self._count].tolist()
+
+    def unix_ms_list(self) -> List[int]:
+        with memoryview(self._unix_ms) as view:
+            return view[:self._count].tolist()
+
+    def values(self) -> array:
+        return self._values[:self._count]
+
+    def unix_ms(self) -> array:
+        return self._unix_ms[:self._count]
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self._values)
+        while capacity < needed:
+            capacity *= 2
+        extra = bytes(8 * (capacity - len(self._values)))
+        self._values.frombytes(extra)
+        self._unix_ms.frombytes(extra)
+
+
+class RecentColumn(Mapping[str, array]):
+    """Read-only {channel name: column} view over the recent readings buffers.
+    Each lookup returns a copy of the filled part of the column."""
+
+    def __init__(self, buffers: Dict[str, ChannelReadingsBuffer], unix_ms: bool) -> None:
+        self._buffers = buffers
+        self._unix_ms = unix_ms
+
+    def __getitem__(self, channel_name: str) -> array:
+        buffer = self._buffers[channel_name]
+        return buffer.unix_ms() if self._unix_ms else buffer.values()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._buffers)
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+
 class ScadaData:
+    NYQUIST = 2.1  # https://en.wikipedia.org/wiki/Nyquist_frequency
+    DERIVED_CHANNEL_CAPTURE_S = 60  # TODO: fix
 
     def __init__(self, settings: ScadaSettings, hardware_layout: House0Layout):
         self.reports_to_store: Dict[str, Report] = {}
-        self.seconds_by_channel: Dict[str, int] = {}
 
         self.settings: ScadaSettings = settings
         self.layout: House0Layout = hardware_layout
@@ -67,16 +166,23 @@ class ScadaData:
 
         self.latest_channel_values[H0CN.usable_energy] = 0
         self.latest_channel_unix_ms[H0CN.usable_energy] = int(time.time() * 1000)
-        self.recent_channel_values: Dict[str, List] = {
-            ch.Name: [] for ch in self.my_channels
-        }
-        self.recent_channel_unix_ms: Dict[str, List] = {
-            ch.Name: [] for ch in self.my_channels
+        self.recent_readings: Dict[str, ChannelReadingsBuffer] = {
+            ch.Name: ChannelReadingsBuffer() for ch in self.my_channels
         }
+        self.recent_channel_values = RecentColumn(self.recent_readings, unix_ms=False)
+        self.recent_channel_unix_ms = RecentColumn(self.recent_readings, unix_ms=True)
         self.latest_power_w: Optional[int] = None
         self.heating_forecast: HeatingForecast | None = None
         self.recent_fsm_reports = {}
         self.flush_recent_readings()
+        # Snapshot chain: a keyframe, then deltas built from the channels
+        # marked in the dirty bitmap (indexed like my_channels) since the
+        # previous snapshot, until snapshots_per_keyframe is reached.
+        self.snapshot_seq = 0
+        self._snapshot_dirty = bytearray(len(self.my_channels))
+        self._snapshot_time_ms: Optional[int] = None
+        self._snapshot_channel_names: set[str] = set()
+        self._snapshot_states: Dict[str, SingleMachineState] = {}
 
     def get_my_data_channels(self) -> List[DataChannel]:
         return list(self.layout.data_channels.values())
@@ -84,6 +190,70 @@ class ScadaData:
     def get_my_derived_channels(self) -> List[DerivedChannel]:
         return list(self.layout.derived_channels.values())
 
+    def layout_changed(self) -> None:
+        """Re-read channels from the layout after channels or components were
+        added or removed, and drop the name-indexed channel lookups."""
+        self.my_data_channels = self.get_my_data_channels()
+        self.my_derived_channels = self.get_my_derived_channels()
+        self.my_channels = self.my_data_channels + self.my_derived_channels
+        names = {ch.Name for ch in self.my_channels}
+        for name in list(self.recent_readings):
+            if name not in names:
+                del self.recent_readings[name]
+        for ch in self.my_channels:
+            self.latest_channel_values.setdefault(ch.Name, None)
+            self.latest_channel_unix_ms.setdefault(ch.Name, None)
+            if ch.Name not in self.recent_readings:
+                self.recent_readings[ch.Name] = ChannelReadingsBuffer()
+        self.clear_channel_indexes()
+        # channel indexes moved, so the next snapshot must be a keyframe
+        self._snapshot_dirty = bytearray(len(self.my_channels))
+        self._snapshot_time_ms = None
+
+    def clear_channel_indexes(self) -> None:
+        for cached_prop_name in [
+            prop_name
+            for prop_name in type(self).__dict__
+            if isinstance(type(self).__dict__[prop_name], cached_property)
+        ]:
+            self.__dict__.pop(cached_prop_name, None)
+
+    @cached_property
+    def my_channel_names(self) -> set[str]:
+        return {ch.Name for ch in self.my_channels}
+
+    @cached_property
+    def channel_idx(self) -> Dict[str, int]:
+        """Position of each channel in my_channels"""
+        return {ch.Name: idx for idx, ch in enumerate(self.my_channels)}
+
+    @cached_property
+    def my_reported_channels(self) -> list[Union[DataChannel, DerivedChannel]]:
+        """
+        Channels that should be included in reports.
+        """
+        unreported = self.layout.unreported_channels
+        return [ch for ch in self.my_channels if ch.Name not in unreported]
+
+    @cached_property
+    def seconds_by_channel(self) -> Dict[str, int]:
+        """Capture period by channel name"""
+        seconds_by_channel = {}
+        for c in self.layout.components.values():
+            for config in c.gt.ConfigList:
+                seconds_by_channel[config.ChannelName] = config.CapturePeriodS
+        for ch in self.my_derived_channels:
+            seconds_by_channel[ch.Name] = self.DERIVED_CHANNEL_CAPTURE_S
+        return seconds_by_channel
+
+    @cached_property
+    def flatline_ms_by_channel(self) -> Dict[str, float]:
+        """How long after its latest reading a channel counts as flatlined"""
+        return {
+            name: seconds * self.NYQUIST * 1000
+            for name, seconds in self.seconds_by_channel.items()
+        }
+
     def channel_has_value(self, channel: str) -> bool:
         return (
             channel in self.latest_channel_values
@@ -98,39 +268,68 @@ class ScadaData:
             print(f"Channel {channel_name} flatlined - removing from snapshots!")
         self.latest_channel_values[channel_name] = None
         self.latest_channel_unix_ms[channel_name] = None
+        if channel_name in self.channel_idx:
+            self._snapshot_dirty[self.channel_idx[channel_name]] = 1
+
+    def add_reading(self, channel_name: str, value: int, unix_ms: int) -> None:
+        self.recent_readings[channel_name].append(value, unix_ms)
+        self.latest_channel_values[channel_name] = value
+        self.latest_channel_unix_ms[channel_name] = unix_ms
+        self._snapshot_dirty[self.channel_idx[channel_name]] = 1
+
+    def add_readings(
+        self, channel_name: str, values: Sequence[int], unix_ms: Sequence[int]
+    ) -> None:
+        self.recent_readings[channel_name].extend(values, unix_ms)
+        if len(values) > 0:
+            self.latest_channel_values[channel_name] = values[-1]
+            self.latest_channel_unix_ms[channel_name] = unix_ms[-1]
+            self._snapshot_dirty[self.channel_idx[channel_name]] = 1
 
     def flush_recent_readings(self):
-        self.recent_channel_values = {ch.Name: [] for ch in self.my_channels}
-        self.recent_channel_unix_ms = {ch.Name: [] for ch in self.my_channels}
+        for buffer in self.recent_readings.values():
+            buffer.clear()
         self.recent_fsm_reports = {}
         self.recent_machine_states = {}
 
     def make_channel_readings(self, ch: DataChannel) -> Optional[ChannelReadings]:
-        if ch in self.my_channels:
-            if len(self.recent_channel_values[ch.Name]) == 0:
-                return None
-            return ChannelReadings(
-                ChannelName=ch.Name,
-                ValueList=self.recent_channel_values[ch.Name],
-                ScadaReadTimeUnixMsList=self.recent_channel_unix_ms[ch.Name],
-            )
-        else:
+        if ch.Name not in self.my_channel_names:
+            return None
+        buffer = self.recent_readings[ch.Name]
+        if len(buffer) == 0:
             return None
+        return ChannelReadings(
+            ChannelName=ch.Name,
+            ValueList=buffer.value_list(),
+            ScadaReadTimeUnixMsList=buffer.unix_ms_list(),
+        )
 
-    @property
-    def my_reported_channels(self) -> list[Union[DataChannel, DerivedChannel]]:
-        """
-        Channels that should be included in reports.
-        """
-        return [
-            ch for ch in self.my_channels
-            if ch.Name not in self.layout.unreported_channels
-        ]
+    def make_compact_channel_readings(
+        self, ch: DataChannel, slot_start_seconds: int
+    ) -> Optional[ChannelReadingsCompact]:
+        if ch.Name not in self.my_channel_names:
+            return None
+        buffer = self.recent_readings[ch.Name]
+        if len(buffer) == 0:
+            return None
+        return ChannelReadingsCompact.from_lists(
+            ch.Name,
+            buffer.values(),
+            buffer.unix_ms(),
+            slot_start_seconds,
+        )
 
-    def make_report(self, slot_start_seconds: int) -> Report:
+    def make_report(self, slot_start_seconds: int, compact: bool = False) -> Report:
+        """compact packs the readings as ChannelReadingsCompact, which only
+        receivers advertising COMPACT_CHANNEL_READINGS_ENCODING can decode."""
         channel_reading_list = []
         for ch in self.my_reported_channels:
-            channel_readings = self.make_channel_readings(ch)
+            if compact:
+                channel_readings = self.make_compact_channel_readings(
+                    ch, slot_start_seconds
+                )
+            else:
+                channel_readings = self.make_channel_readings(ch)
             if channel_readings:
                 channel_reading_list.append(channel_readings)
 
@@ -148,33 +347,23 @@ class ScadaData:
         )
 
     def capture_seconds(self, ch: Union[DataChannel, DerivedChannel]) -> int:
-        if ch.Name not in self.seconds_by_channel:
-            self.seconds_by_channel = {}
-            components = [c.gt for c in self.layout.components.values()]
-            for c in components:
-                for config in c.ConfigList:
-                    self.seconds_by_channel[config.ChannelName] = config.CapturePeriodS
-            for s in self.my_derived_channels:
-                self.seconds_by_channel[s.Name] = 60  # TODO: fix
         return self.seconds_by_channel[ch.Name]
 
-    def flatlined(self, ch: Union[DataChannel, DerivedChannel]) -> bool:
-        if self.latest_channel_unix_ms[ch.Name] is None:
+    def flatlined(
+        self, ch: Union[DataChannel, DerivedChannel], now_ms: Optional[float] = None
+    ) -> bool:
+        latest_ms = self.latest_channel_unix_ms[ch.Name]
+        if latest_ms is None:
             return True
-        # nyquist
-        nyquist = 2.1  # https://en.wikipedia.org/wiki/Nyquist_frequency
-        if (
-            time.time() - (self.latest_channel_unix_ms[ch.Name] / 1000)
-            > self.capture_seconds(ch) * nyquist
-        ):
-            return True
-        return False
+        if now_ms is None:
+            now_ms = time.time() * 1000
+        return now_ms - latest_ms > self.flatline_ms_by_channel[ch.Name]
 
     def make_snapshot(self) -> SnapshotSpaceheat:
         latest_reading_list = []
-
+        now_ms = time.time() * 1000
         for ch in self.my_channels:
-            if not self.flatlined(ch):
+            if not self.flatlined(ch, now_ms):
                 latest_reading_list.append(
                     SingleReading(
                         ChannelName=ch.Name,
@@ -189,3 +378,82 @@ class ScadaData:
             LatestReadingList=latest_reading_list,
             LatestStateList=list(self.latest_machine_state.values()),
         )
+
+    def _next_snapshot_ms(self) -> int:
+        now_ms = int(time.time() * 1000)
+        if self._snapshot_time_ms is not None and now_ms <= self._snapshot_time_ms:
+            return self._snapshot_time_ms + 1
+        return now_ms
+
+    def make_keyframe(self) -> SnapshotSpaceheat:
+        """A full snapshot that starts a new snapshot chain"""
+        snapshot = self.make_snapshot()
+        snapshot.SnapshotTimeUnixMs = self._next_snapshot_ms()
+        self._snapshot_dirty[:] = bytes(len(self._snapshot_dirty))
+        self._snapshot_time_ms = snapshot.SnapshotTimeUnixMs
+        self._snapshot_channel_names = {
+            r.ChannelName for r in snapshot.LatestReadingList
+        }
+        self._snapshot_states = dict(self.latest_machine_state)
+        self.snapshot_seq = 0
+        return snapshot
+
+    def make_snapshot_delta(self) -> SnapshotSpaceheatDelta:
+        """What changed since the previous snapshot in the chain. Only the
+        channels with new readings get a SingleReading; the rest of the
+        snapshot is only checked for channels that have since flatlined."""
+        if self._snapshot_time_ms is None:
+            raise ValueError("No keyframe to build a snapshot delta on")
+        now_ms = self._next_snapshot_ms()
+        flatline_ms = self.flatline_ms_by_channel
+        included = self._snapshot_channel_names
+        changed_readings = []
+        for ch in itertools.compress(self.my_channels, self._snapshot_dirty):
+            if not self.flatlined(ch, now_ms):
+                changed_readings.append(
+                    SingleReading(
+                        ChannelName=ch.Name,
+                        Value=self.latest_channel_values[ch.Name],
+                        ScadaReadTimeUnixMs=self.latest_channel_unix_ms[ch.Name],
+                    )
+                )
+                included.add(ch.Name)
+        dropped_channel_names = []
+        for name in included:
+            latest_ms = self.latest_channel_unix_ms[name]
+            if latest_ms is None or now_ms - latest_ms > flatline_ms[name]:
+                dropped_channel_names.append(name)
+        included.difference_update(dropped_channel_names)
+        changed_states = []
+        for name, state in self.latest_machine_state.items():
+            if self._snapshot_states.get(name) is not state:
+                changed_states.append(state)
+                self._snapshot_states[name] = state
+        self._snapshot_dirty[:] = bytes(len(self._snapshot_dirty))
+        self.snapshot_seq += 1
+        delta = SnapshotSpaceheatDelta(
+            FromGNodeAlias=self.layout.scada_g_node_alias,
+            FromGNodeInstanceId=self.layout.scada_g_node_id,
+            SnapshotTimeUnixMs=now_ms,
+            BaseSnapshotTimeUnixMs=self._snapshot_time_ms,
+            Seq=self.snapshot_seq,
+            ChangedReadingList=changed_readings,
+            DroppedChannelNames=dropped_channel_names,
+            ChangedStateList=changed_states,
+        )
+        self._snapshot_time_ms = now_ms
+        return delta
+
+    def next_snapshot(
+        self, keyframe: bool = False
+    ) -> Union[SnapshotSpaceheat, SnapshotSpaceheatDelta]:
+        """The next snapshot to publish: a keyframe every
+        settings.snapshots_per_keyframe snapshots (or when asked for one)
+        and deltas in between."""
+        if (
+            keyframe
+            or self._snapshot_time_ms is None
+            or self.snapshot_seq + 1 >= self.settings.snapshots_per_keyframe
+        ):
+            return self.make_keyframe()
+        return self.make_snapshot_delta()
@@ -0,0 +1,215 @@
+"""Operational metrics for Scada's GET /metrics, in the Prometheus text format.
+
+Only two things are counted as they happen, each with a dict update:
+messages received per (link, TypeName), and how long reports and snapshots
+take to build. Everything else is read when the endpoint is scraped: channel
+values, MQTT link states, message handler counters, i2c and Modbus error
+counts, pico states and process RSS. Scraping costs a walk over the channels
+and picos. The message path pays nothing beyond the counter.
+"""
+import math
+import resource
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+from actors.message_dispatcher import HandlerStats
+from drivers.i2c.bus_scheduler import I2cDeviceStats
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class BuildDuration:
+    __slots__ = ("count", "sum_s", "max_s", "last_s")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.sum_s = 0.0
+        self.max_s = 0.0
+        self.last_s = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.sum_s += seconds
+        self.last_s = seconds
+        if seconds > self.max_s:
+            self.max_s = seconds
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+class Exposition:
+    """Accumulates metric families and renders them as text"""
+
+    def __init__(self) -> None:
+        self._lines: list[str] = []
+
+    def family(self, name: str, kind: str, help_text: str) -> None:
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value: float, **labels: str) -> None:
+        if labels:
+            label_str = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+            self._lines.append(f"{name}{{{label_str}}} {_format_value(value)}")
+        else:
+            self._lines.append(f"{name} {_format_value(value)}")
+
+    def text(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+
+def rss_bytes() -> int:
+    """Current resident set size, or the peak where /proc is not available"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ScadaMetrics:
+    messages: Dict[Tuple[str, str], int]
+    builds: Dict[str, BuildDuration]
+
+    def __init__(self) -> None:
+        self.messages = {}
+        self.builds = {}
+
+    def count_message(self, link: str, type_name: str) -> None:
+        key = (link, type_name)
+        self.messages[key] = self.messages.get(key, 0) + 1
+
+    def observe_build(self, kind: str, seconds: float) -> None:
+        build = self.builds.get(kind)
+        if build is None:
+            build = self.builds[kind] = BuildDuration()
+        build.observe(seconds)
+
+    def render(  # noqa: PLR0913
+        self,
+        *,
+        channel_values: Mapping[str, Optional[int]],
+        channel_unix_ms: Mapping[str, Optional[int]],
+        link_states: Mapping[str, str],
+        handler_stats: Mapping[str, HandlerStats],
+        i2c_devices: Mapping[int, I2cDeviceStats],
+        modbus_errors: Mapping[str, Tuple[int, int]],
+        pico_states: Mapping[str, str],
+        pico_reboots: Mapping[str, int],
+        zombie_picos: Iterable[str],
+    ) -> str:
+        """modbus_errors maps each power meter to (read warnings, failed reads)"""
+        out = Exposition()
+
+        out.family("scada_channel_value", "gauge", "Latest value of each channel")
+        for name, value in sorted(channel_values.items()):
+            if value is not None:
+                out.sample("scada_channel_value", value, channel=name)
+        out.family(
+            "scada_channel_last_reading_timestamp_seconds",
+            "gauge",
+            "Unix time of each channel's latest value",
+        )
+        for name, unix_ms in sorted(channel_unix_ms.items()):
+            if unix_ms is not None:
+                out.sample(
+                    "scada_channel_last_reading_timestamp_seconds",
+                    unix_ms / 1000,
+                    channel=name,
+                )
+
+        out.family(
+            "scada_messages_received_total",
+            "counter",
+            "Messages received, by link and TypeName",
+        )
+        for (link, type_name), count in sorted(self.messages.items()):
+            out.sample("scada_messages_received_total", count, link=link, type_name=type_name)
+
+        out.family("scada_link_state", "gauge", "1 for each MQTT link's current state")
+        for link, state in sorted(link_states.items()):
+            out.sample("scada_link_state", 1, link=link, state=state)
+
+        out.family(
+            "scada_handler_calls_total", "counter", "Scada message handler calls by payload type"
+        )
+        for type_name, stats in sorted(handler_stats.items()):
+            out.sample("scada_handler_calls_total", stats.calls, payload=type_name)
+        out.family(
+            "scada_handler_seconds_total",
+            "counter",
+            "Time spent in Scada message handlers by payload type",
+        )
+        for type_name, stats in sorted(handler_stats.items()):
+            out.sample("scada_handler_seconds_total", stats.seconds, payload=type_name)
+        out.family(
+            "scada_handler_exceptions_total",
+            "counter",
+            "Exceptions raised by Scada message handlers by payload type",
+        )
+        for type_name, stats in sorted(handler_stats.items()):
+            out.sample("scada_handler_exceptions_total", stats.exceptions, payload=type_name)
+
+        out.family(
+            "scada_build_duration_seconds", "summary", "Time to build reports and snapshots"
+        )
+        for kind, build in sorted(self.builds.items()):
+            out.sample("scada_build_duration_seconds_count", build.count, kind=kind)
+            out.sample("scada_build_duration_seconds_sum", build.sum_s, kind=kind)
+        out.family(
+            "scada_build_duration_max_seconds",
+            "gauge",
+            "Longest report or snapshot build since start",
+        )
+        for kind, build in sorted(self.builds.items()):
+            out.sample("scada_build_duration_max_seconds", build.max_s, kind=kind)
+
+        for name, attr, help_text in (
+            ("scada_i2c_transactions_total", "transactions", "i2c transaction attempts"),
+            ("scada_i2c_errors_total", "errors", "i2c transactions that raised OSError"),
+            ("scada_i2c_retries_total", "retries", "i2c transactions retried after an error"),
+            ("scada_i2c_timeouts_total", "timeouts", "i2c transactions that timed out waiting for the bus"),
+        ):
+            out.family(name, "counter", f"{help_text}, by device address")
+            for address, stats in sorted(i2c_devices.items()):
+                out.sample(name, getattr(stats, attr), address=f"0x{address:02X}")
+
+        out.family(
+            "scada_modbus_read_warnings_total", "counter", "Power meter reads that returned warnings"
+        )
+        for meter, (warnings, _) in sorted(modbus_errors.items()):
+            out.sample("scada_modbus_read_warnings_total", warnings, meter=meter)
+        out.family("scada_modbus_read_failures_total", "counter", "Power meter reads that failed")
+        for meter, (_, failures) in sorted(modbus_errors.items()):
+            out.sample("scada_modbus_read_failures_total", failures, meter=meter)
+
+        zombies = set(zombie_picos)
+        out.family("scada_pico_state", "gauge", "1 for each pico's current state")
+        for pico, state in sorted(pico_states.items()):
+            out.sample("scada_pico_state", 1, pico=pico, state=state)
+        out.family("scada_pico_zombie", "gauge", "1 if the pico has used up its reboot attempts")
+        for pico in sorted(pico_states):
+            out.sample("scada_pico_zombie", pico in zombies, pico=pico)
+        out.family("scada_pico_reboots", "gauge", "Consecutive failed reboots of each pico")
+        for pico, reboots in sorted(pico_reboots.items()):
+            out.sample("scada_pico_reboots", reboots, pico=pico)
+
+        out.family("process_resident_memory_bytes", "gauge", "Resident memory size in bytes")
+        out.sample("process_resident_memory_bytes", rss_bytes())
+        return out.text()
@@ -1,6 +1,7 @@
 """Parentless (Scada2) implementation"""
+import asyncio
 import typing
-from typing import Any, Optional
+from typing import Any, Optional, Sequence
 
 from gwproactor import PrimeActor
 from gwproactor import ProactorLogger
@@ -19,6 +20,7 @@ from gwproactor.message import MQTTReceiptPayload
 from gwsproto.named_types import PowerWatts, Report, SyncedReadings
 from actors.codec_factories import Scada2CodecFactory
 from gwsproto.named_types import Glitch, SnapshotSpaceheat
+from actors.loop_monitor import loop_health_summary
 from actors.scada_interface import ScadaInterface
 
 from scada_app_interface import ScadaAppInterface
@@ -36,6 +38,7 @@ class SecondaryScada(PrimeActor, ScadaInterface):
     LOCAL_MQTT: str = Scada2CodecFactory.LOCAL_MQTT
     _data: Scada2Data
     _publication_name: str
+    _stop_requested: bool = False
 
     def __init__(self, name: str, services: ScadaAppInterface) -> None:
         if not isinstance(services.hardware_layout, House0Layout):
@@ -63,6 +66,44 @@ class SecondaryScada(PrimeActor, ScadaInterface):
     def init(self) -> None:
         """Called after constructor so derived functions can be used in setup."""
 
+    def start_tasks(self) -> Sequence[asyncio.Task]:
+        self.services.loop_monitor.start()
+        return [
+            asyncio.create_task(self.loop_health_task(), name="loop_health_sender"),
+        ]
+
+    def stop(self) -> None:
+        self._stop_requested = True
+        self.services.loop_monitor.stop()
+        super().stop()
+
+    async def loop_health_task(self) -> None:
+        """Send LoopHealth to the primary scada, which passes it on to the ltn"""
+        period_s = self.settings.loop_health_seconds
+        if period_s <= 0:
+            return
+        while not self._stop_requested:
+            await asyncio.sleep(period_s)
+            try:
+                health = self.services.loop_monitor.snapshot(self.layout.scada_g_node_alias)
+                if health.SlowCallbackList:
+                    self.log(loop_health_summary(health))
+                self.services.publish_message(
+                    SecondaryScada.LOCAL_MQTT,
+                    Message(
+                        Header=Header(
+                            Src=self.name,
+                            Dst=H0N.primary_scada,
+                            MessageType=health.TypeName,
+                        ),
+                        Payload=health,
+                    ),
+                    QOS.AtMostOnce,
+                    use_link_topic=True,
+                )
+            except Exception as e:
+                self.log(f"Trouble sending LoopHealth: {e}")
+
     @property
     def node(self) -> ShNode:
         return self.layout.node(self.name)
@@ -87,6 +128,10 @@ class SecondaryScada(PrimeActor, ScadaInterface):
     def logger(self) -> ProactorLogger:
         return self.services.logger
 
+    def log(self, note: str) -> None:
+        log_str = f"[scada2] {note}"
+        self.services.logger.error(log_str)
+
     def _publish_to_local(self, from_node: ShNode, payload, qos: QOS = QOS.AtMostOnce):
         return self.services.publish_message(
             SecondaryScada.LOCAL_MQTT,
@@ -172,5 +217,5 @@ class SecondaryScada(PrimeActor, ScadaInterface):
         self._data.latest_snap = payload
 
     def process_report(self, payload: Report)-> None:
-        self._data.latest_report = payload
+        self._data.latest_report = payload.expanded()
     
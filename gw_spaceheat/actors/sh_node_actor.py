@@ -16,6 +16,7 @@ from gwproactor import Actor
 from gwproto import Message
 
 from actors.config import ScadaSettings
+from actors.routing import Route
 from actors.scada_data import ScadaData
 from gwsproto.conversions.temperature import convert_temp_to_f
 from gwsproto.data_classes.house_0_layout import House0Layout
@@ -1245,6 +1246,7 @@ class ShNodeActor(Actor, ABC):
         else:
             for node in self.my_actuators():
                 node.Handle =  f"{boss_node.handle}.{node.Name}"
+        self.layout.index_command_tree()
 
         self._send_to(
             self.ltn,
@@ -1261,17 +1263,10 @@ class ShNodeActor(Actor, ABC):
             return
         if src is None:
             src = self.node
-        # HACK FOR nodes whose 'actors' are handled by their parent's communicator
-        communicator_by_name = {dst.Name: dst.Name}
-        communicator_by_name[H0N.local_control_normal] = H0N.local_control
-        
-        message = Message(Src=src.name, Dst=communicator_by_name[dst.Name], Payload=payload)
-
-        if communicator_by_name[dst.name] in set(self.services.get_communicator_names()) | {
-            self.name
-        }:  # noqa: SLF001
-            self.services.send(message)
-        elif dst.Name == H0N.admin:
+        destination = self.services.routes.resolve(dst.Name, self.name)
+        if destination.route == Route.communicator:
+            self.services.send(Message(Src=src.name, Dst=destination.name, Payload=payload))
+        elif destination.route == Route.admin:
             self.services.publish_message(
                 link_name=self.services.prime_actor.ADMIN_MQTT,
                 message=Message(
@@ -1279,11 +1274,12 @@ class ShNodeActor(Actor, ABC):
                 ),
                 qos=QOS.AtMostOnce,
             ) # noqa: SLF001
-        elif dst.Name == H0N.ltn:
+        elif destination.route == Route.ltn:
             self.services.publish_upstream(payload)  # noqa: SLF001
         else:
             self.services.publish_message(
-                self.services.prime_actor.LOCAL_MQTT, message
+                self.services.prime_actor.LOCAL_MQTT,
+                Message(Src=src.name, Dst=destination.name, Payload=payload),
             )  # noqa: SLF001
 
     def log(self, note: str) -> None:
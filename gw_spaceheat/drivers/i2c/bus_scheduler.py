@@ -0,0 +1,233 @@
+"""One-at-a-time access to the Pi's shared i2c bus.
+
+The Krida relay boards, the GP8403 0-10V outputs and the TSnap ADS1115
+chips all sit on /dev/i2c-1, but they are driven by different actors: the
+two multiplexers on the event loop and the MultipurposeSensor on its own
+thread. Left alone, a relay burst can land in the middle of an ADS1115
+conversion and one of them fails with an OSError.
+
+I2cBusScheduler runs every transaction through a single queue. A caller
+submits a callable, the device address and a priority, and blocks until
+the bus is free and no waiting transaction is ahead of it. Actuation goes
+ahead of telemetry; within a priority, first come first served. Waiting is
+bounded per priority: a transaction that does not get the bus in time
+raises I2cBusTimeout, which is a TimeoutError and so an OSError, like any
+other failed i2c transaction. A transaction that raises an OSError is
+requeued up to `retries` times, waiting for the bus again each time. The
+scheduler is not reentrant: the callable must not submit another
+transaction.
+
+SimulatedI2cWire models the contention off-hardware. Transactions that
+overlap on it collide and both fail, as they do on the real bus.
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class I2cPriority(IntEnum):
+    Actuation = 0
+    Telemetry = 1
+
+
+# Longest a transaction of each priority waits for the bus. Every retry
+# waits again, so callers on the event loop pass retries=0: the relay and
+# 0-10V multiplexers then hold the loop up for at most this bound, plus the
+# transaction itself, per transaction.
+DEFAULT_MAX_WAIT_S: Dict[I2cPriority, float] = {
+    I2cPriority.Actuation: 0.5,
+    I2cPriority.Telemetry: 0.25,
+}
+
+
+class I2cBusTimeout(TimeoutError):
+    ...
+
+
+@dataclass
+class I2cDeviceStats:
+    transactions: int = 0
+    errors: int = 0
+    retries: int = 0
+    timeouts: int = 0
+    busy_s: float = 0.0
+
+
+@dataclass
+class I2cQueueStats:
+    granted: int = 0
+    total_wait_s: float = 0.0
+    max_wait_s: float = 0.0
+
+
+class I2cBusScheduler:
+    max_wait_s: Dict[I2cPriority, float]
+    retries: int
+    devices: Dict[int, I2cDeviceStats]
+    queues: Dict[I2cPriority, I2cQueueStats]
+
+    def __init__(
+        self,
+        max_wait_s: Optional[Dict[I2cPriority, float]] = None,
+        retries: int = 1,
+    ) -> None:
+        self.max_wait_s = dict(DEFAULT_MAX_WAIT_S)
+        if max_wait_s is not None:
+            self.max_wait_s.update(max_wait_s)
+        self.retries = retries
+        self.devices = defaultdict(I2cDeviceStats)
+        self.queues = {priority: I2cQueueStats() for priority in I2cPriority}
+        self._cond = threading.Condition()
+        # (priority, arrival) of every transaction waiting for the bus
+        self._waiting: List[Tuple[int, int]] = []
+        self._arrivals = itertools.count()
+        self._busy = False
+        self._busy_s = 0.0
+        self._started_s = time.monotonic()
+
+    def transact(
+        self,
+        address: int,
+        fn: Callable[[], T],
+        priority: I2cPriority = I2cPriority.Telemetry,
+        retries: Optional[int] = None,
+    ) -> T:
+        """Run fn, one i2c transaction with the device at address, when the
+        bus is ours. Returns what fn returns; raises its last OSError after
+        the retries, or I2cBusTimeout."""
+        retries = self.retries if retries is None else retries
+        for attempt in range(retries + 1):
+            self._acquire(address, priority)
+            started_s = time.monotonic()
+            failed = True
+            retry = False
+            try:
+                result = fn()
+                failed = False
+                return result
+            except OSError:
+                if attempt == retries:
+                    raise
+                retry = True
+            finally:
+                self._release(address, time.monotonic() - started_s, failed, retry)
+        raise AssertionError("unreachable")
+
+    def _acquire(self, address: int, priority: I2cPriority) -> None:
+        ticket = (int(priority), next(self._arrivals))
+        max_wait_s = self.max_wait_s[priority]
+        with self._cond:
+            queued_s = time.monotonic()
+            heapq.heappush(self._waiting, ticket)
+            while self._busy or self._waiting[0] != ticket:
+                remaining_s = queued_s + max_wait_s - time.monotonic()
+                if remaining_s <= 0:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self.devices[address].timeouts += 1
+                    # we may have been the head of the queue
+                    self._cond.notify_all()
+                    raise I2cBusTimeout(
+                        f"i2c bus busy for {max_wait_s:.3f}s "
+                        f"({priority.name} transaction with 0x{address:x})"
+                    )
+                self._cond.wait(remaining_s)
+            heapq.heappop(self._waiting)
+            self._busy = True
+            waited_s = time.monotonic() - queued_s
+            queue = self.queues[priority]
+            queue.granted += 1
+            queue.total_wait_s += waited_s
+            queue.max_wait_s = max(queue.max_wait_s, waited_s)
+
+    def _release(self, address: int, busy_s: float, failed: bool, retry: bool) -> None:
+        with self._cond:
+            self._busy = False
+            self._busy_s += busy_s
+            stats = self.devices[address]
+            stats.transactions += 1
+            stats.busy_s += busy_s
+            if failed:
+                stats.errors += 1
+            if retry:
+                stats.retries += 1
+            self._cond.notify_all()
+
+    @property
+    def utilization(self) -> float:
+        """Fraction of the time since the scheduler was made that the bus
+        spent in a transaction"""
+        elapsed_s = time.monotonic() - self._started_s
+        return self._busy_s / elapsed_s if elapsed_s > 0 else 0.0
+
+    def device_stats(self) -> Dict[int, I2cDeviceStats]:
+        """A copy of the per-device counters, safe to read while driver
+        threads keep transacting"""
+        with self._cond:
+            return {address: replace(stats) for address, stats in self.devices.items()}
+
+    def metrics(self) -> Dict[str, Any]:
+        """A snapshot of the bus, queue and per-device counters"""
+        with self._cond:
+            return {
+                "Utilization": round(self.utilization, 4),
+                "Waiting": len(self._waiting),
+                "Queues": {
+                    priority.name: {
+                        "Granted": queue.granted,
+                        "MeanWaitMs": round(
+                            1000 * queue.total_wait_s / queue.granted, 3
+                        ) if queue.granted else 0.0,
+                        "MaxWaitMs": round(1000 * queue.max_wait_s, 3),
+                    }
+                    for priority, queue in self.queues.items()
+                },
+                "Devices": {
+                    f"0x{address:x}": {
+                        "Transactions": stats.transactions,
+                        "Errors": stats.errors,
+                        "Retries": stats.retries,
+                        "Timeouts": stats.timeouts,
+                    }
+                    for address, stats in sorted(self.devices.items())
+                },
+            }
+
+
+class SimulatedI2cWire:
+    """A simulated bus shared by simulated devices. transaction() holds the
+    wire for duration_s; a transaction that starts while another is in
+    flight raises OSError, and so does the one it collided with."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._in_flight: Optional[int] = None
+        self._collided = False
+        self.transactions = 0
+        self.collisions = 0
+
+    def transaction(self, address: int, duration_s: float = 0.0) -> None:
+        with self._lock:
+            if self._in_flight is not None:
+                self._collided = True
+                self.collisions += 1
+                raise OSError(f"[Errno 121] Remote I/O error (0x{address:x})")
+            self._in_flight = address
+            self._collided = False
+        try:
+            if duration_s:
+                time.sleep(duration_s)
+        finally:
+            with self._lock:
+                self._in_flight = None
+                collided = self._collided
+                self.transactions += 1
+        if collided:
+            raise OSError(f"[Errno 121] Remote I/O error (0x{address:x})")
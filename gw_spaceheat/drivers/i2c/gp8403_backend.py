@@ -0,0 +1,82 @@
+"""Access to the GP8403 dual 0-10V DACs on DFRobot DFR0971 boards.
+
+Each board has two outputs, set by writing a 12-bit value (left-aligned in
+a 16-bit word) to that output's register. The GP8403 output registers
+cannot be read back, so an output is known only by what was last written
+to it.
+
+Smbus2Backend opens the Pi's i2c bus. SimulatedSmbusBackend stands in for
+it without hardware and counts writes per register and failures.
+"""
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Dict, Optional, Protocol, Tuple
+
+GP8403_OUTPUT_SET_RANGE = 0x01
+GP8403_OUTPUT_RANGE_10V = 17
+# Output register for each of a board's two outputs
+GP8403_OUTPUT_REGISTERS = (0x02, 0x04)
+
+
+def gp8403_data(value: int) -> int:
+    """Register word for value, 0-100 (volts x 10)"""
+    return int(float(4095 * value / 100)) << 4
+
+
+class SmbusLike(Protocol):
+    def read_byte(self, i2c_addr: int) -> int: ...
+
+    def write_word_data(self, i2c_addr: int, register: int, value: int) -> None: ...
+
+
+class SmbusBackend(ABC):
+
+    @abstractmethod
+    def open_bus(self) -> SmbusLike:
+        """Open the i2c bus. Raises if it is not available."""
+        raise NotImplementedError
+
+
+class Smbus2Backend(SmbusBackend):
+    def __init__(self, bus_number: int = 1) -> None:
+        self.bus_number = bus_number
+
+    def open_bus(self) -> SmbusLike:
+        import smbus2
+
+        return smbus2.SMBus(self.bus_number)
+
+
+class SimulatedSmbus:
+    """A simulated bus with devices at addresses (all addresses if None).
+    Writes to an address in fail raise OSError, as a board that dropped off
+    the bus would."""
+
+    def __init__(self, addresses: Optional[set[int]] = None) -> None:
+        self.addresses = addresses
+        self.registers: Dict[Tuple[int, int], int] = {}
+        self.writes: Counter = Counter()
+        self.reads = 0
+        self.fail: set[int] = set()
+
+    def _check(self, i2c_addr: int) -> None:
+        if i2c_addr in self.fail or (self.addresses is not None and i2c_addr not in self.addresses):
+            raise OSError(f"[Errno 121] Remote I/O error (0x{i2c_addr:x})")
+
+    def read_byte(self, i2c_addr: int) -> int:
+        self._check(i2c_addr)
+        self.reads += 1
+        return 0
+
+    def write_word_data(self, i2c_addr: int, register: int, value: int) -> None:
+        self._check(i2c_addr)
+        self.writes[(i2c_addr, register)] += 1
+        self.registers[(i2c_addr, register)] = value
+
+
+class SimulatedSmbusBackend(SmbusBackend):
+    def __init__(self, addresses: Optional[set[int]] = None) -> None:
+        self.bus = SimulatedSmbus(addresses)
+
+    def open_bus(self) -> SimulatedSmbus:
+        return self.bus
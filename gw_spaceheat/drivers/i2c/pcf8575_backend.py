@@ -0,0 +1,114 @@
+"""Access to PCF8575 16-bit i2c port expanders, as used on Krida relay boards.
+
+A PCF8575 has no direction or per-pin registers: every write sets all 16
+port pins at once and every read returns all 16 pin levels. Boards are
+handled through write_gpio / read_gpio on whole ports, which is what
+adafruit_pcf8575.PCF8575 already provides.
+
+AdafruitPcf8575Backend opens real boards on the Pi's i2c bus.
+SimulatedPcf8575Backend stands in for them without hardware and counts the
+i2c transactions each board sees.
+"""
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Protocol
+
+# Port value at power-on: all pins high
+PORT_ALL_HIGH = 0xFFFF
+
+
+class Pcf8575Port(Protocol):
+    def write_gpio(self, val: int) -> None: ...
+
+    def read_gpio(self) -> int: ...
+
+
+class Pcf8575Backend(ABC):
+
+    @abstractmethod
+    def open_bus(self) -> None:
+        """Open the i2c bus. Raises if it is not available."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def open_board(self, address: int) -> Pcf8575Port:
+        """Connect to the PCF8575 at address. Raises if it does not answer."""
+        raise NotImplementedError
+
+
+class AdafruitPcf8575Backend(Pcf8575Backend):
+    def __init__(self) -> None:
+        self.i2c: Optional[Any] = None
+
+    def open_bus(self) -> None:
+        # noinspection PyUnresolvedReferences
+        import board
+
+        self.i2c = board.I2C()
+
+    def open_board(self, address: int) -> Pcf8575Port:
+        # noinspection PyUnresolvedReferences
+        import adafruit_pcf8575
+
+        return adafruit_pcf8575.PCF8575(i2c_bus=self.i2c, address=address)
+
+
+class SimulatedPcf8575:
+    """One simulated board. Reads return the last value written unless
+    stuck_low forces pins low, e.g. to simulate a board that reset."""
+
+    def __init__(self, address: int, transaction_s: float = 0.0) -> None:
+        self.address = address
+        self.transaction_s = transaction_s
+        self.port = PORT_ALL_HIGH
+        self.stuck_low = 0
+        self.writes = 0
+        self.reads = 0
+        self.fail = False
+
+    def _transaction(self) -> None:
+        if self.fail:
+            raise OSError(f"[Errno 121] Remote I/O error (0x{self.address:x})")
+        if self.transaction_s:
+            time.sleep(self.transaction_s)
+
+    def write_gpio(self, val: int) -> None:
+        self._transaction()
+        self.writes += 1
+        self.port = val & 0xFFFF
+
+    def read_gpio(self) -> int:
+        self._transaction()
+        self.reads += 1
+        return self.port & ~self.stuck_low & 0xFFFF
+
+
+class SimulatedPcf8575Backend(Pcf8575Backend):
+    """Simulated boards at the given addresses (all addresses if None)"""
+
+    def __init__(self, addresses: Optional[set[int]] = None, transaction_s: float = 0.0) -> None:
+        self.addresses = addresses
+        self.transaction_s = transaction_s
+        self.boards: Dict[int, SimulatedPcf8575] = {}
+
+    def open_bus(self) -> None:
+        pass
+
+    def open_board(self, address: int) -> SimulatedPcf8575:
+        if self.addresses is not None and address not in self.addresses:
+            raise ValueError(f"No I2C device at address: 0x{address:x}")
+        board = SimulatedPcf8575(address, self.transaction_s)
+        self.boards[address] = board
+        return board
+
+    @property
+    def writes(self) -> int:
+        return sum(board.writes for board in self.boards.values())
+
+    @property
+    def reads(self) -> int:
+        return sum(board.reads for board in self.boards.values())
+
+    @property
+    def transactions(self) -> int:
+        return self.writes + self.reads
@@ -0,0 +1,141 @@
+"""Access to ADS1115 analog to digital converters for the TSnap driver.
+
+AdafruitAds1115Backend talks to real chips over the Pi's i2c bus.
+SimulatedAds1115Backend stands in for them without hardware: it returns
+voltages from a callback and counts conversions and input mux switches.
+"""
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional, Protocol
+
+
+class AnalogInput(Protocol):
+    @property
+    def voltage(self) -> float: ...
+
+
+class Ads1115Backend(ABC):
+
+    @abstractmethod
+    def open_bus(self) -> None:
+        """Open the i2c bus. Raises if it is not available."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def open_chip(self, address: int, gain: float) -> Any:
+        """Connect to the ADS1115 at address. Raises if it does not answer."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def analog_in(self, chip: Any, pin: int) -> AnalogInput:
+        """A reusable single-ended input on pin 0-3 of chip"""
+        raise NotImplementedError
+
+
+class AdafruitAds1115Backend(Ads1115Backend):
+    def __init__(self) -> None:
+        self.i2c = None
+
+    def open_bus(self) -> None:
+        # noinspection PyUnresolvedReferences
+        import board
+        # noinspection PyUnresolvedReferences
+        import busio
+
+        self.i2c = busio.I2C(board.SCL, board.SDA)
+
+    def open_chip(self, address: int, gain: float) -> Any:
+        # noinspection PyUnresolvedReferences
+        import adafruit_ads1x15.ads1115 as ADS
+
+        chip = ADS.ADS1115(address=address, i2c=self.i2c)
+        chip.gain = gain
+        return chip
+
+    def analog_in(self, chip: Any, pin: int) -> AnalogInput:
+        # noinspection PyUnresolvedReferences
+        import adafruit_ads1x15.ads1115 as ADS
+        # noinspection PyUnresolvedReferences
+        from adafruit_ads1x15.analog_in import AnalogIn
+
+        return AnalogIn(chip, [ADS.P0, ADS.P1, ADS.P2, ADS.P3][pin])
+
+
+class SimulatedAds1115:
+    """One simulated chip. Like the real one, reading a pin other than the
+    last one read means reconfiguring the input mux first."""
+
+    def __init__(
+        self,
+        address: int,
+        voltage_source: Callable[[int, int], float],
+        conversion_s: float = 0.0,
+    ) -> None:
+        self.address = address
+        self.gain = 1.0
+        self.voltage_source = voltage_source
+        self.conversion_s = conversion_s
+        self.last_pin: Optional[int] = None
+        self.conversions = 0
+        self.mux_switches = 0
+
+    def read(self, pin: int) -> float:
+        if pin != self.last_pin:
+            self.mux_switches += 1
+            self.last_pin = pin
+        self.conversions += 1
+        if self.conversion_s:
+            time.sleep(self.conversion_s)
+        return self.voltage_source(self.address, pin)
+
+
+class SimulatedAnalogIn:
+    def __init__(self, chip: SimulatedAds1115, pin: int) -> None:
+        self.chip = chip
+        self.pin = pin
+
+    @property
+    def voltage(self) -> float:
+        return self.chip.read(self.pin)
+
+
+class SimulatedAds1115Backend(Ads1115Backend):
+    """Simulated chips at the given addresses (all addresses if None).
+
+    voltage_source(address, pin) supplies each reading; the default is a
+    steady 2.4 V, a thermistor at about 25 C. A voltage_source may raise
+    OSError to simulate a failed i2c transaction.
+    """
+
+    def __init__(
+        self,
+        addresses: Optional[set[int]] = None,
+        voltage_source: Optional[Callable[[int, int], float]] = None,
+        conversion_s: float = 0.0,
+    ) -> None:
+        self.addresses = addresses
+        self.voltage_source = voltage_source or (lambda address, pin: 2.4)
+        self.conversion_s = conversion_s
+        self.chips: Dict[int, SimulatedAds1115] = {}
+
+    def open_bus(self) -> None:
+        pass
+
+    def open_chip(self, address: int, gain: float) -> SimulatedAds1115:
+        if self.addresses is not None and address not in self.addresses:
+            raise ValueError(f"No I2C device at address: 0x{address:x}")
+        chip = SimulatedAds1115(address, self.voltage_source, self.conversion_s)
+        chip.gain = gain
+        self.chips[address] = chip
+        return chip
+
+    def analog_in(self, chip: SimulatedAds1115, pin: int) -> SimulatedAnalogIn:
+        return SimulatedAnalogIn(chip, pin)
+
+    @property
+    def conversions(self) -> int:
+        return sum(chip.conversions for chip in self.chips.values())
+
+    @property
+    def mux_switches(self) -> int:
+        return sum(chip.mux_switches for chip in self.chips.values())
@@ -1,19 +1,18 @@
-import math
 import time
-from typing import Dict, List, Optional
-
-# noinspection PyUnresolvedReferences
-import adafruit_ads1x15.ads1115 as ADS
-# noinspection PyUnresolvedReferences
-import board
-# noinspection PyUnresolvedReferences
-import busio
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
 from actors.config import ScadaSettings
-# noinspection PyUnresolvedReferences
-from adafruit_ads1x15.analog_in import AnalogIn
 from drivers.driver_result import DriverOutcome
+from drivers.i2c.bus_scheduler import I2cBusScheduler
+from drivers.multipurpose_sensor.ads1115_backend import (
+    AdafruitAds1115Backend,
+    Ads1115Backend,
+    AnalogInput,
+)
 from drivers.multipurpose_sensor.multipurpose_sensor_driver import \
     MultipurposeSensorDriver
+from gwsproto.conversions.thermistor import volts_to_temp_c
 from gwsproto.enums import LogLevel
 from gwsproto.data_classes.components.ads111x_based_component import \
     Ads111xBasedComponent
@@ -37,6 +36,21 @@ VOLTAGE_DIVIDER_R_OHMS = 10000
 
 # TODO: add to component
 EXP_ALPHA = 0.2
+
+
+@dataclass(slots=True)
+class TsnapChannelPlan:
+    """Everything needed to read one channel, worked out once at start()"""
+    channel_name: str
+    terminal_block_idx: int
+    chip_idx: int
+    pin: int
+    processing_method: ThermistorDataMethod
+    analog_in: Optional[AnalogInput] = None
+    # Resolved from the channel's TelemetryName on first read
+    convert: Optional[Callable[[float], Result[float, Exception]]] = None
+
+
 class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
     # gives a range up to +/- 6.144V
     MAX_BACKOFF_SECONDS: float = 60
@@ -47,12 +61,27 @@ class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
         TelemetryName.AirTempCTimes1000,
     }
     MAX_READING_AGE_SEC = 30
+    CELSIUS_TELEMETRIES = frozenset({
+        TelemetryName.AirTempCTimes1000,
+        TelemetryName.WaterTempCTimes1000,
+    })
+    FAHRENHEIT_TELEMETRIES = frozenset({
+        TelemetryName.AirTempFTimes1000,
+        TelemetryName.WaterTempFTimes1000,
+    })
 
-    ads: dict[int, ADS]
-    i2c: busio.I2C
+    ads: Dict[int, Any]
     initialization_failed: Dict[int, bool]
-
-    def __init__(self, component: Ads111xBasedComponent, settings: ScadaSettings):
+    read_plan: Dict[str, TsnapChannelPlan]
+
+    def __init__(
+        self,
+        component: Ads111xBasedComponent,
+        settings: ScadaSettings,
+        ads_backend: Optional[Ads1115Backend] = None,
+        bulk_read: bool = False,
+        i2c_bus: Optional[I2cBusScheduler] = None,
+    ):
         """
         Each Ads111xBasedCac is comprised of 1-4 4-channel Ads 1115 i2c devices, each
         of which has a hex address
@@ -67,9 +96,13 @@ class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
 
         See https://drive.google.com/drive/u/0/folders/1KySP9BqT8F-sH8fgEvb9O3x_CTVAt71h for
         the Texas Instrument ADS1115 datasheet
+
+        ads_backend defaults to the Adafruit library on the Pi's i2c bus. With
+        bulk_read, read_telemetry_values reads each ADS1115 in a single pass.
+        Every conversion goes through i2c_bus, at telemetry priority.
         """
         super(GridworksTsnap1_MultipurposeSensorDriver, self).__init__(
-            component=component, settings=settings
+            component=component, settings=settings, i2c_bus=i2c_bus
         )
         models: List[MakeModel] = [
             MakeModel.GRIDWORKS__TSNAP1,
@@ -94,8 +127,12 @@ class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
         self.ads_address = {
             i: address for i, address in enumerate(component.cac.AdsI2cAddressList)
         }
+        self.ads_backend = ads_backend or AdafruitAds1115Backend()
+        self.bulk_read = bulk_read
         self.ads = {}
         self.initialization_failed = {}
+        self.read_plan = {}
+        self._last_pin_read: Dict[int, int] = {}  # chip idx -> pin
         self._curr_connect_delay = 0
         # Track last warning time per channel
         self._last_warning_time: Dict[str, float] = {}  # data channel name as key
@@ -122,19 +159,21 @@ class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
         driver_init_outcome = DriverOutcome(True)
 
         try:
-            self.i2c = busio.I2C(board.SCL, board.SDA)
+            self.ads_backend.open_bus()
         except BaseException as e:
             for idx in self.ads_address:
                 self.initialization_failed[idx] = True
             driver_init_outcome.value = False
             driver_init_outcome.add_comment(level=LogLevel.Critical, msg=str(e))
+            self.compile_read_plan()
             return Ok(driver_init_outcome)
 
         for idx, addr in self.ads_address.items():
             self.initialization_failed[idx] = False
             try:
-                ads1115 = ADS.ADS1115(address=addr, i2c=self.i2c)
-                ads1115.gain = self.ADS_GAIN
+                ads1115 = self.i2c_bus.transact(
+                    addr, lambda: self.ads_backend.open_chip(addr, self.ADS_GAIN)
+                )
             except BaseException as e:
                 driver_init_outcome.add_comment(
                     level=LogLevel.Critical,
@@ -145,8 +184,28 @@ class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
                 continue  # skip to next iteration
             self.ads[idx] = ads1115
 
+        self.compile_read_plan()
         return Ok(driver_init_outcome)
 
+    def compile_read_plan(self) -> None:
+        """Work out chip, pin, processing method and a reusable AnalogIn
+        handle for every configured channel."""
+        self.read_plan = {}
+        for cfg in self.component.gt.ConfigList:
+            chip_idx = int((cfg.TerminalBlockIdx - 1) / 4)
+            pin = (cfg.TerminalBlockIdx - 1) % 4
+            analog_in = None
+            if chip_idx in self.ads:
+                analog_in = self.ads_backend.analog_in(self.ads[chip_idx], pin)
+            self.read_plan[cfg.ChannelName] = TsnapChannelPlan(
+                channel_name=cfg.ChannelName,
+                terminal_block_idx=cfg.TerminalBlockIdx,
+                chip_idx=chip_idx,
+                pin=pin,
+                processing_method=self.data_processing_method[cfg.ChannelName],
+                analog_in=analog_in,
+            )
+
     def _should_skip_for_backoff(self, channel_name: str, now: float) -> bool:
         """
         Check if we should skip reading this channel due to being in a backoff period.
@@ -188,84 +247,98 @@ class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
         A None value with comments indicates reading was attempted but failed.
         A float value indicates successful reading, though there may still be comments.
         """
-        output = DriverOutcome[float](None)
-        now = time.time()
+        return Ok(self._read_planned_voltage(self.read_plan[ch.Name], time.time()))
 
-        if self._should_skip_for_backoff(ch.Name, now):
-            return Ok(output)
+    def _read_planned_voltage(self, plan: TsnapChannelPlan, now: float) -> DriverOutcome[float]:
+        output = DriverOutcome[float](None)
+        name = plan.channel_name
 
-        cfg = next(
-            (cfg for cfg in self.component.gt.ConfigList if cfg.ChannelName == ch.Name),
-            None,
-        )
-        i = int((cfg.TerminalBlockIdx - 1) / 4)
+        if self._should_skip_for_backoff(name, now):
+            return output
 
-        if self.initialization_failed[i]:
-            self._warning_delays[ch.Name] = self.ERROR_BACKOFF_SECONDS
+        if self.initialization_failed[plan.chip_idx]:
+            self._warning_delays[name] = self.ERROR_BACKOFF_SECONDS
             output.add_comment(
                 level=LogLevel.Warning,
-                msg=f"Missing i2c addr {self.ads_address[i]} | Channel {ch.Name} | Terminal {cfg.TerminalBlockIdx}",
+                msg=f"Missing i2c addr {self.ads_address[plan.chip_idx]} | Channel {name} | Terminal {plan.terminal_block_idx}",
             )
-            return Ok(output)
+            return output
 
-        pin = [ADS.P0, ADS.P1, ADS.P2, ADS.P3][(cfg.TerminalBlockIdx - 1) % 4]
         use_stale = False
         try:
-            channel = AnalogIn(self.ads[i], pin)
-            voltage = channel.voltage
+            voltage = self.i2c_bus.transact(
+                self.ads_address[plan.chip_idx], lambda: plan.analog_in.voltage
+            )
         except OSError as e:
             output.add_comment(
                 level=LogLevel.Warning,
-                msg=f"I2C read failed | Channel {ch.Name} | Terminal {cfg.TerminalBlockIdx} | Error: {str(e)}",
+                msg=f"I2C read failed | Channel {name} | Terminal {plan.terminal_block_idx} | Error: {str(e)}",
             )
-            self._handle_read_failure(ch.Name, now)
-            return Ok(output)
+            self._handle_read_failure(name, now)
+            return output
+        finally:
+            self._last_pin_read[plan.chip_idx] = plan.pin
 
         if voltage >= PI_VOLTAGE - 0.1: # sometimes it'll be be high from random noise
             output.add_comment(
                 level=LogLevel.Warning,
-                msg=f"Open Thermistor reading AND bad max voltage! | {ch.Name} (term {cfg.TerminalBlockIdx}) read {voltage:.3f}V | CODE PI MAX {PI_VOLTAGE}V",
+                msg=f"Open Thermistor reading AND bad max voltage! | {name} (term {plan.terminal_block_idx}) read {voltage:.3f}V | CODE PI MAX {PI_VOLTAGE}V",
             )
-            self._handle_read_failure(ch.Name, now)
+            self._handle_read_failure(name, now)
             use_stale = True
         elif voltage >= OPEN_VOLTAGE:
             output.add_comment(
                 level=LogLevel.Info,
-                msg=f"Open Thermistor reading! | Channel {ch.Name} | Terminal {cfg.TerminalBlockIdx} | ",
+                msg=f"Open Thermistor reading! | Channel {name} | Terminal {plan.terminal_block_idx} | ",
             )
-            self._handle_read_failure(ch.Name, now)
+            self._handle_read_failure(name, now)
             use_stale = True
         elif voltage == 0:
             output.add_comment(
                 level=LogLevel.Warning,
-                msg=f"Thermistor short!| Channel {ch.Name} | Terminal {cfg.TerminalBlockIdx}",
+                msg=f"Thermistor short!| Channel {name} | Terminal {plan.terminal_block_idx}",
             )
-            self._handle_read_failure(ch.Name, now)
+            self._handle_read_failure(name, now)
             use_stale = True
         else:
-            if self.data_processing_method[ch.Name] == ThermistorDataMethod.BetaWithExponentialAveraging:
-                output.value = self.apply_exp_weighted_avg(ch.Name, voltage)
-            elif self.data_processing_method[ch.Name] == ThermistorDataMethod.SimpleBeta:
-                output.value = voltage
+            if plan.processing_method == ThermistorDataMethod.BetaWithExponentialAveraging:
+                output.value = self.apply_exp_weighted_avg(name, voltage)
             else:
                 output.value = voltage # SimpleBeta is the fallback. TODO: let this be known
-            self._warning_delays[ch.Name] = 0
-            self._last_valid_reading[ch.Name] = voltage  
-            self._last_valid_reading_time[ch.Name] = now 
-        
+            self._warning_delays[name] = 0
+            self._last_valid_reading[name] = voltage
+            self._last_valid_reading_time[name] = now
+
         # if the ADS burped and we have a valid reading:
-        if use_stale and ch.Name in self._last_valid_reading:
+        if use_stale and name in self._last_valid_reading:
             # use it if it isn't too stale
-            if now - self._last_valid_reading_time[ch.Name] < self.MAX_READING_AGE_SEC:
-                    output.value = self._last_valid_reading[ch.Name]
+            if now - self._last_valid_reading_time[name] < self.MAX_READING_AGE_SEC:
+                    output.value = self._last_valid_reading[name]
             # or add a warning that this channel has been out to lunch for a while
             else:
                 output.add_comment(
                     level=LogLevel.Warning,
-                    msg=f"Data too stale for {ch.Name} - last valid reading {(now - self._last_valid_reading_time[ch.Name])/60:.1f} minutes ago"
+                    msg=f"Data too stale for {name} - last valid reading {(now - self._last_valid_reading_time[name])/60:.1f} minutes ago"
                 )
 
-        return Ok(output)
+        return output
+
+    def read_voltages_bulk(self, data_channels: List[DataChannel]) -> Dict[str, DriverOutcome[float]]:
+        """Read all requested channels one ADS1115 at a time. On each chip the
+        pass starts at the pin it last converted, so the input mux is switched
+        at most once per remaining pin."""
+        now = time.time()
+        by_chip: Dict[int, List[TsnapChannelPlan]] = {}
+        for ch in data_channels:
+            plan = self.read_plan[ch.Name]
+            by_chip.setdefault(plan.chip_idx, []).append(plan)
+        outcomes: Dict[str, DriverOutcome[float]] = {}
+        for chip_idx, plans in by_chip.items():
+            last_pin = self._last_pin_read.get(chip_idx, 0)
+            plans.sort(key=lambda p: (p.pin - last_pin) % 4)
+            for plan in plans:
+                outcomes[plan.channel_name] = self._read_planned_voltage(plan, now)
+        return outcomes
 
     def _handle_read_failure(self, channel_name: str, now: float) -> None:
         """Update warning tracking when a read fails"""
@@ -289,50 +362,54 @@ class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
         """
 
         outcome = DriverOutcome[Dict[str,Optional[int]]]({})
+        if self.bulk_read:
+            voltages = self.read_voltages_bulk(data_channels)
+        else:
+            now = time.time()
+            voltages = {
+                ch.Name: self._read_planned_voltage(self.read_plan[ch.Name], now)
+                for ch in data_channels
+            }
 
         for ch in data_channels:
-            read_result = self.read_voltage(ch)
-            if read_result.is_ok():
-                read_outcome = read_result.value
-                # Pass through any comments from voltage reading
-                outcome.comments.extend(read_outcome.comments)
-
-                if read_outcome.value is not None:
-                    if ch.TelemetryName not in {
-                        TelemetryName.AirTempCTimes1000,
-                        TelemetryName.AirTempFTimes1000,
-                        TelemetryName.WaterTempCTimes1000,
-                        TelemetryName.WaterTempFTimes1000,
-                    }:
-                        outcome.add_comment(
-                            level=LogLevel.Warning,
-                            msg=f"Unrecognized TelemetryName {ch.TelemetryName} for {ch.Name}!",
-                        )
-                        continue  # go onto the next channel
-                    if ch.TelemetryName in {
-                        TelemetryName.AirTempCTimes1000,
-                        TelemetryName.WaterTempCTimes1000,
-                    }:
-                        convert_voltage_result = self.voltage_to_c(read_outcome.value)
-                    elif ch.TelemetryName in {
-                        TelemetryName.AirTempFTimes1000,
-                        TelemetryName.WaterTempFTimes1000,
-                    }:
-                        convert_voltage_result = self.voltage_to_f(read_outcome.value)
-                    if convert_voltage_result.is_ok():
-                        outcome.value[ch.Name] = int(
-                            convert_voltage_result.value * 1000
-                        )
-                    else:
-                        outcome.add_comment(
-                            level=LogLevel.Warning,
-                            msg=f"Temperature conversion failed | Channel {ch.Name} | Voltage {read_outcome.value:.3f}V | Error: {convert_voltage_result.err()}",
-                        )
+            read_outcome = voltages[ch.Name]
+            # Pass through any comments from voltage reading
+            outcome.comments.extend(read_outcome.comments)
+
+            if read_outcome.value is not None:
+                plan = self.read_plan[ch.Name]
+                if plan.convert is None:
+                    plan.convert = self.voltage_converter(ch.TelemetryName)
+                if plan.convert is None:
+                    outcome.add_comment(
+                        level=LogLevel.Warning,
+                        msg=f"Unrecognized TelemetryName {ch.TelemetryName} for {ch.Name}!",
+                    )
+                    continue  # go onto the next channel
+                convert_voltage_result = plan.convert(read_outcome.value)
+                if convert_voltage_result.is_ok():
+                    outcome.value[ch.Name] = int(
+                        convert_voltage_result.value * 1000
+                    )
                 else:
-                    outcome.value[ch.Name] = None
+                    outcome.add_comment(
+                        level=LogLevel.Warning,
+                        msg=f"Temperature conversion failed | Channel {ch.Name} | Voltage {read_outcome.value:.3f}V | Error: {convert_voltage_result.err()}",
+                    )
+            else:
+                outcome.value[ch.Name] = None
 
         return Ok(outcome)
 
+    def voltage_converter(
+        self, telemetry_name: TelemetryName
+    ) -> Optional[Callable[[float], Result[float, Exception]]]:
+        if telemetry_name in self.CELSIUS_TELEMETRIES:
+            return self.voltage_to_c
+        if telemetry_name in self.FAHRENHEIT_TELEMETRIES:
+            return self.voltage_to_f
+        return None
+
     @classmethod
     def voltage_to_f(cls, voltage: float) -> Result[float, Exception]:
         """Calculate resistance from Beta function
@@ -344,7 +421,7 @@ class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
         """
         temp_c = cls.voltage_to_c(voltage)
         if temp_c.is_ok():
-            temp_f = 32 + 8 * temp_c / 5
+            temp_f = 32 + 9 * temp_c.value / 5
             return Ok(temp_f)
         else:
             return temp_c
@@ -362,21 +439,16 @@ class GridworksTsnap1_MultipurposeSensorDriver(MultipurposeSensorDriver):
         https://www.newport.com/medias/sys_master/images/images/hdb/hac/8797291479070/TN-STEIN-1-Thermistor-Constant-Conversions-Beta-to-Steinhart-Hart.pdf
 
         """
-        rd: int = int(VOLTAGE_DIVIDER_R_OHMS)
-        r0: int = int(THERMISTOR_R0_OHMS)
-        beta: int = int(THERMISTOR_BETA)
-        t0: int = int(THERMISTOR_T0_DEGREES_KELVIN)
-        # Calculate the resistance of the thermistor
         try:
-            rt = rd * voltage / (PI_VOLTAGE - voltage)
-        except Exception as e:
-            return Err(Exception(f"Didn't get to therm resistance! {str(e)}"))
-
-        # Calculate the temperature in degrees Celsius. Note that 273 is
-        # 0 degrees Celsius as measured in Kelvin.
-
-        try:
-            temp_c = 1 / ((1 / t0) + (math.log(rt / r0) / beta)) - 273
-            return Ok(temp_c)
+            return Ok(
+                volts_to_temp_c(
+                    voltage,
+                    beta=THERMISTOR_BETA,
+                    r0=THERMISTOR_R0_OHMS,
+                    r_divider=VOLTAGE_DIVIDER_R_OHMS,
+                    supply_v=PI_VOLTAGE,
+                    t0_k=THERMISTOR_T0_DEGREES_KELVIN,
+                )
+            )
         except Exception as e:
-            return Err(Exception(f"Got to therm resistance={rt}: {str(e)}"))
+            return Err(Exception(f"Beta conversion failed for {voltage}V: {str(e)}"))
@@ -1,9 +1,9 @@
 import time
-import math
 import board
 import busio
 import adafruit_ads1x15.ads1115 as ADS
 from adafruit_ads1x15.analog_in import AnalogIn
+from gwsproto.conversions.thermistor import volts_to_temp_c
 
 
 PI_VOLTAGE = 5.1
@@ -19,20 +19,16 @@ VOLTAGE_DIVIDER_R_OHMS = 10000
 
 def thermistor_temp_c_beta_formula(
         voltage: float) -> float:
-    rd: int = int(VOLTAGE_DIVIDER_R_OHMS)
-    r0: int = int(THERMISTOR_R0_OHMS)
-    beta: int = int(THERMISTOR_BETA)
-    t0: int = int(THERMISTOR_T0_DEGREES_KELVIN)
     if voltage >= PI_VOLTAGE:
         return -500
-    # Calculate the resistance of the thermistor
-    rt = rd * voltage / (PI_VOLTAGE - voltage)
-    # Calculate the temperature in degrees Celsius. Note that 273 is
-    # 0 degrees Celsius as measured in Kelvin.
-    temp_c = 1 / ((1 / t0) + (math.log(rt / r0) / beta)) - 273
-    # Convert the temperature to degrees Fahrenheit
-    temp_f = (temp_c * 9 / 5) + 32
-    return temp_c
+    return volts_to_temp_c(
+        voltage,
+        beta=THERMISTOR_BETA,
+        r0=THERMISTOR_R0_OHMS,
+        r_divider=VOLTAGE_DIVIDER_R_OHMS,
+        supply_v=PI_VOLTAGE,
+        t0_k=THERMISTOR_T0_DEGREES_KELVIN,
+    )
 
 
 # Create the I2C bus
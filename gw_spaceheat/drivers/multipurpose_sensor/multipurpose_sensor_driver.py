@@ -7,19 +7,27 @@ from gwsproto.data_classes.components.ads111x_based_component import \
     Ads111xBasedComponent
 from gwsproto.data_classes.data_channel import DataChannel
 from drivers.driver_result import DriverOutcome
+from drivers.i2c.bus_scheduler import I2cBusScheduler
 from result import Ok, Result
 
 
 
 
 class MultipurposeSensorDriver(ABC):
-    def __init__(self, component: Ads111xBasedComponent, settings: ScadaSettings):
+    def __init__(
+        self,
+        component: Ads111xBasedComponent,
+        settings: ScadaSettings,
+        i2c_bus: Optional[I2cBusScheduler] = None,
+    ):
         if not isinstance(component, Ads111xBasedComponent):
             raise Exception(
                 f"MultipurposeSensorDriver requires Ads111xBasedComponent. Got {component}"
             )
         self.component = component
         self.settings: ScadaSettings = settings
+        # shared with the app's other i2c actors; a private one if not given
+        self.i2c_bus = i2c_bus or I2cBusScheduler()
         self.logger = logging.getLogger(settings.logging.base_log_name)
 
     def start(self) -> Result[DriverOutcome[bool], Exception]:
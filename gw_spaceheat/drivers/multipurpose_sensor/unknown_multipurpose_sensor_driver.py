@@ -1,5 +1,6 @@
 from typing import Dict
 from typing import List
+from typing import Optional
 
 from gwsproto.data_classes.components import Ads111xBasedComponent
 from result import Ok
@@ -7,6 +8,7 @@ from result import Result
 
 from actors.config import ScadaSettings
 from drivers.driver_result import DriverOutcome
+from drivers.i2c.bus_scheduler import I2cBusScheduler
 from gwsproto.data_classes.data_channel import DataChannel
 from drivers.multipurpose_sensor.multipurpose_sensor_driver import (
     MultipurposeSensorDriver,
@@ -14,9 +16,14 @@ from drivers.multipurpose_sensor.multipurpose_sensor_driver import (
 
 
 class UnknownMultipurposeSensorDriver(MultipurposeSensorDriver):
-    def __init__(self, component: Ads111xBasedComponent, settings: ScadaSettings):
+    def __init__(
+        self,
+        component: Ads111xBasedComponent,
+        settings: ScadaSettings,
+        i2c_bus: Optional[I2cBusScheduler] = None,
+    ):
         super().__init__(
-            component=component, settings=settings
+            component=component, settings=settings, i2c_bus=i2c_bus
         )
 
     def __repr__(self):
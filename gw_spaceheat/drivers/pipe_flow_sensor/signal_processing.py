@@ -1,6 +1,21 @@
+import functools
+from typing import NamedTuple, Optional, Tuple
+
 import numpy as np
 
+try:
+    from scipy.signal import lfilter as scipy_lfilter
+except ImportError:
+    scipy_lfilter = None
+
+
 def butter_lowpass(N=5, Wn=2, fs=250):
+    b, a = _butter_lowpass(int(N), float(Wn), float(fs))
+    return b.copy(), a.copy()
+
+
+@functools.lru_cache(maxsize=128)
+def _butter_lowpass(N: int, Wn: float, fs: float) -> Tuple[np.ndarray, np.ndarray]:
     Wn = np.asarray(Wn)
     Wn = 2*Wn/fs
     # Get analog lowpass prototype
@@ -28,6 +43,8 @@ def butter_lowpass(N=5, Wn=2, fs=250):
     # Transform for output
     b = k * np.poly(z)
     a = np.atleast_1d(np.poly(p))
+    b.setflags(write=False)
+    a.setflags(write=False)
     return b, a
 
 
@@ -50,9 +67,9 @@ def lfilter_zi(b, a):
     # Construct the companion matrix: I - A^-1 (where A^-1 is represented in a column form)
     companion_matrix = np.eye(n - 1, dtype=np.result_type(a, b))
     # Create the last column as a column vector
-    last_column = np.zeros((n - 1, 1)) 
+    last_column = np.zeros((n - 1, 1))
     last_column[:] = (-a[1:] / a[0]).reshape(-1, 1)
-    IminusA = companion_matrix - last_column.T 
+    IminusA = companion_matrix - last_column.T
     # Vector B, adjusting the first element of b
     B = b[1:] - a[1:] * b[0]
     # Solve the linear system
@@ -67,28 +84,97 @@ def axis_slice(a, start=None, stop=None, step=None, axis=-1):
     return b
 
 
-def simple_linear_filter(b, a, x, axis=-1, initial=None):
-    b = np.asarray(b)
-    a = np.asarray(a)
-    x = np.asarray(x)
-    if initial is None:
-        initial = np.zeros(len(a) - 1)
-    y = np.zeros_like(x)
-    z = initial.copy()
-    if axis == -1:
-        axis = x.ndim - 1
-    for i in range(len(x)):
-        output = 0
-        for j in range(len(b)):
-            if i - j >= 0:
-                output += b[j] * x[i - j]
-        for k in range(1, len(a)):
-            if i - k >= 0:
-                output -= a[k] * y[i - k]
-        y[i] = output
-        z = np.roll(z, 1)
-        z[0] = output
-    return y, z
+class FilterState(NamedTuple):
+    """Direct form I filter history: the last `order` inputs and outputs,
+    oldest first."""
+    x: np.ndarray
+    y: np.ndarray
+
+
+def rest_state(b, a) -> FilterState:
+    order = max(len(np.atleast_1d(a)), len(np.atleast_1d(b))) - 1
+    return FilterState(x=np.zeros(order), y=np.zeros(order))
+
+
+def steady_state(b, a, x0: float) -> FilterState:
+    """History of a filter that has seen the constant input x0 forever"""
+    b, a = _normalize(b, a)
+    order = len(a) - 1
+    y0 = x0 * b.sum() / a.sum()
+    return FilterState(x=np.full(order, float(x0)), y=np.full(order, y0))
+
+
+def _normalize(b, a) -> Tuple[np.ndarray, np.ndarray]:
+    b = np.atleast_1d(np.asarray(b, dtype=float))
+    a = np.atleast_1d(np.asarray(a, dtype=float))
+    if a[0] != 1.0:
+        b, a = b / a[0], a / a[0]
+    n = max(len(a), len(b))
+    return np.r_[b, np.zeros(n - len(b))], np.r_[a, np.zeros(n - len(a))]
+
+
+def _numpy_lfilter(b: np.ndarray, a: np.ndarray, x: np.ndarray, state: FilterState) -> np.ndarray:
+    order = len(a) - 1
+    n = len(x)
+    xe = np.concatenate((state.x, x))
+    # Feed-forward taps for all samples at once, accumulated tap by tap
+    fir = b[0] * xe[order:]
+    for j in range(1, order + 1):
+        fir += b[j] * xe[order - j:order - j + n]
+    # The feedback recursion is inherently sequential; plain floats keep it cheap
+    y = state.y.tolist() + fir.tolist()
+    fb = [(k, float(a[k])) for k in range(1, order + 1) if a[k] != 0.0]
+    for i in range(order, order + n):
+        out = y[i]
+        for k, ak in fb:
+            out -= ak * y[i - k]
+        y[i] = out
+    return np.array(y[order:])
+
+
+def _scipy_lfilter(b: np.ndarray, a: np.ndarray, x: np.ndarray, state: FilterState) -> np.ndarray:
+    # Direct form II transposed state equivalent to the direct form I history
+    order = len(a) - 1
+    zi = np.zeros(order)
+    for m in range(order):
+        for k in range(m + 1, order + 1):
+            zi[m] += b[k] * state.x[m - k] - a[k] * state.y[m - k]
+    y, _ = scipy_lfilter(b, a, x, zi=zi)
+    return y
+
+
+def lfilter(
+    b, a, x, state: Optional[FilterState] = None, backend: Optional[str] = None
+) -> Tuple[np.ndarray, FilterState]:
+    """Filter 1-D x with the IIR filter (b, a) in direct form I, starting
+    from state (at rest if None). Returns the output and the state to pass
+    in with the next stretch of the same signal.
+
+    backend is "numpy" or "scipy"; by default SciPy is used if installed.
+    The numpy backend reproduces the original sample-by-sample loop exactly.
+    """
+    b, a = _normalize(b, a)
+    x = np.asarray(x, dtype=float)
+    if state is None:
+        state = rest_state(b, a)
+    if backend is None:
+        backend = "numpy" if scipy_lfilter is None else "scipy"
+    if backend == "numpy":
+        y = _numpy_lfilter(b, a, x, state)
+    elif backend == "scipy":
+        if scipy_lfilter is None:
+            raise ValueError("scipy backend requested but scipy is not installed")
+        y = _scipy_lfilter(b, a, x, state)
+    else:
+        raise ValueError(f"Unknown lfilter backend {backend}")
+    order = len(a) - 1
+    if order == 0:
+        return y, state
+    new_state = FilterState(
+        x=np.concatenate((state.x, x))[-order:],
+        y=np.concatenate((state.y, y))[-order:],
+    )
+    return y, new_state
 
 
 def odd_ext(x, n, axis=-1):
@@ -106,7 +192,10 @@ def odd_ext(x, n, axis=-1):
 
 
 def filtering(b, a, x, axis=-1, padtype='odd', padlen=None, method='pad',
-             irlen=None):
+             irlen=None, backend: Optional[str] = None):
+    """Zero-phase forward-backward filter of 1-D x with (b, a) after odd
+    extension by 30 * max(len(a), len(b)) samples at each end. Both passes
+    start from rest."""
     b = np.atleast_1d(b)
     a = np.atleast_1d(a)
     x = np.asarray(x)
@@ -114,22 +203,36 @@ def filtering(b, a, x, axis=-1, padtype='odd', padlen=None, method='pad',
     ntaps = 10 * max(len(a), len(b)) #default: 3 instead of 10
     edge = ntaps * 3
     ext = odd_ext(x, edge, axis=axis)
-    # Get the steady state of the filter's step response.
-    zi = lfilter_zi(b, a)
-    # Reshape zi and create x0 so that zi*x0 broadcasts appropriately.
-    zi_shape = [1] * x.ndim
-    zi_shape[axis] = zi.size
-    zi = np.reshape(zi, zi_shape)
-    x0 = axis_slice(ext, stop=1, axis=axis)
     # Forward filter.
-    (y, zf) = simple_linear_filter(b, a, ext, axis=axis, initial=zi * x0)
+    y, _ = lfilter(b, a, ext, backend=backend)
     # Backward filter.
-    # Create y0 so zi*y0 broadcasts appropriately.
-    y0 = axis_slice(y, start=-1, axis=axis)
-    (y, zf) = simple_linear_filter(b, a, axis_slice(y, step=-1, axis=axis), axis=axis, initial=zi * y0)
+    y, _ = lfilter(b, a, y[::-1], backend=backend)
     # Reverse y.
-    y = axis_slice(y, step=-1, axis=axis)
+    y = y[::-1]
     if edge > 0:
         # Slice the actual signal from the extended signal.
         y = axis_slice(y, start=edge, stop=-edge, axis=axis)
-    return y
\ No newline at end of file
+    return y
+
+
+class StreamingLowpass:
+    """Forward Butterworth low-pass whose state carries across calls, so
+    consecutive ticklists are filtered as one continuous signal. The first
+    sample seen sets the filter to its steady state for that value."""
+
+    def __init__(self, N: int = 5, Wn: float = 2, fs: float = 250, backend: Optional[str] = None):
+        self.b, self.a = butter_lowpass(N=N, Wn=Wn, fs=fs)
+        self.backend = backend
+        self.state: Optional[FilterState] = None
+
+    def process(self, x) -> np.ndarray:
+        x = np.asarray(x, dtype=float)
+        if len(x) == 0:
+            return x
+        if self.state is None:
+            self.state = steady_state(self.b, self.a, x[0])
+        y, self.state = lfilter(self.b, self.a, x, state=self.state, backend=self.backend)
+        return y
+
+    def reset(self) -> None:
+        self.state = None
@@ -0,0 +1,100 @@
+"""Array helpers for turning flow module ticklists into frequency readings.
+
+Tick times are int64 nanoseconds. Each step reproduces, value for value,
+the list-based processing ApiFlowModule used before, so the ChannelReadings
+built from them are unchanged.
+"""
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from drivers.pipe_flow_sensor.signal_processing import FilterState, lfilter
+
+STEP_20MS_NS = 20_000_000
+NO_FLOW_HZ = 0.001
+
+
+def tick_timestamps_ns(
+    first_tick_ns: int, relative_ticks: Sequence[int], unit_ns: float, delay_ns: int
+) -> np.ndarray:
+    """Sorted, de-duplicated absolute tick times.
+
+    The sums are formed in float64, as they always have been, so times keep
+    float64 resolution (256 ns at the current epoch) before becoming int64.
+    """
+    relative = np.asarray(relative_ticks, dtype=np.float64)
+    timestamps = float(first_tick_ns) + relative * unit_ns + float(delay_ns)
+    return np.unique(timestamps).astype(np.int64)
+
+
+def tick_frequencies(timestamps_ns: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Frequency from each tick to the next, stamped with the earlier tick"""
+    return timestamps_ns[:-1], 1 / np.diff(timestamps_ns) * 1e9
+
+
+def drop_outliers(
+    timestamps_ns: np.ndarray, hz: np.ndarray, min_hz: float = 0, max_hz: float = 500
+) -> Tuple[np.ndarray, np.ndarray]:
+    keep = (hz <= max_hz) & (hz >= min_hz)
+    return timestamps_ns[keep], hz[keep]
+
+
+def fill_no_flow_gaps(
+    timestamps_ns: np.ndarray,
+    hz: np.ndarray,
+    no_flow_ns: float,
+    step_ns: int = STEP_20MS_NS,
+    fill_hz: float = NO_FLOW_HZ,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Where consecutive ticks are more than no_flow_ns apart, add fill_hz
+    readings every step_ns after the earlier tick, stopping before the later one.
+    """
+    fills = np.zeros(len(timestamps_ns), dtype=np.int64)
+    gaps = np.diff(timestamps_ns)
+    fills[:-1] = np.where(gaps > no_flow_ns, (gaps - 1) // step_ns, 0)
+    if not fills.any():
+        return timestamps_ns, hz
+    repeats = fills + 1
+    first_of_run = np.repeat(np.cumsum(repeats) - repeats, repeats)
+    steps = np.arange(repeats.sum()) - first_of_run
+    filled_ns = np.repeat(timestamps_ns, repeats) + steps * step_ns
+    filled_hz = np.where(steps == 0, np.repeat(hz, repeats), fill_hz)
+    return filled_ns, filled_hz
+
+
+def exp_weighted_avg(hz: np.ndarray, alpha: float, initial_hz: float) -> np.ndarray:
+    """s[0] = initial_hz, s[t] = (1 - alpha) * s[t-1] + alpha * hz[t]"""
+    smoothed = np.empty(len(hz))
+    if len(hz) == 0:
+        return smoothed
+    smoothed[0] = initial_hz
+    if len(hz) > 1:
+        smoothed[1:], _ = lfilter(
+            [alpha],
+            [1, -(1 - alpha)],
+            hz[1:],
+            state=FilterState(x=np.zeros(1), y=np.array([initial_hz], dtype=float)),
+            backend="numpy",
+        )
+    return smoothed
+
+
+def sample_on_change(
+    hz: np.ndarray, timestamps_ns: np.ndarray, threshold_hz: float, initial_hz: float
+) -> Tuple[List[int], List[int]]:
+    """Micro hz readings and their unix ms times, starting at initial_hz and
+    then keeping only samples that moved more than threshold_hz from the last
+    kept reading. Each decision depends on the previous one, so this is a
+    single pass over plain floats.
+    """
+    hz_list = hz.tolist()
+    unix_ms = (np.asarray(timestamps_ns) / 1e6).tolist()
+    micro_hz_list = [int(initial_hz * 1e6)]
+    unix_ms_times = [int(unix_ms[0])]
+    last_hz = micro_hz_list[-1] / 1e6
+    for i in range(1, len(hz_list)):
+        if abs(hz_list[i] - last_hz) > threshold_hz:
+            micro_hz_list.append(int(hz_list[i] * 1e6))
+            unix_ms_times.append(int(unix_ms[i]))
+            last_hz = micro_hz_list[-1] / 1e6
+    return micro_hz_list, unix_ms_times
@@ -3,9 +3,12 @@ import struct
 from pathlib import Path
 from typing import Any
 from typing import Callable
+from typing import NamedTuple
 from typing import Optional
+from typing import Sequence
 from typing import Tuple
 
+import numpy as np
 from pyModbusTCP.client import ModbusClient
 from rich.table import Table
 
@@ -55,6 +58,53 @@ def read_function(type_: RegisterType) -> Callable:
 def read_register(c: ModbusClient, register: EGaugeRegister) -> Tuple[list[int], bytes, Any]:
     return read_function(register.Type)(c, register.offset)
 
+# Most registers a single Modbus read (function 0x03 or 0x04) may request
+MAX_READ_REGISTERS = 125
+
+
+class RegisterBlock(NamedTuple):
+    start: int
+    count: int
+
+
+def plan_register_blocks(
+    addresses: Sequence[int],
+    registers_per_value: int = 2,
+    max_registers: int = MAX_READ_REGISTERS,
+    max_gap: int = 0,
+) -> list[RegisterBlock]:
+    """Group the values at addresses into as few contiguous reads as possible.
+
+    A block is extended to the next value if that leaves at most max_gap
+    unused registers in between and the block stays within max_registers.
+    """
+    if registers_per_value > max_registers:
+        raise ValueError(
+            f"Values of {registers_per_value} registers do not fit reads of {max_registers}"
+        )
+    blocks: list[RegisterBlock] = []
+    start = end = None
+    for address in sorted(set(addresses)):
+        value_end = address + registers_per_value
+        if start is not None and address - end <= max_gap and value_end - start <= max_registers:
+            end = max(end, value_end)
+        else:
+            if start is not None:
+                blocks.append(RegisterBlock(start, end - start))
+            start, end = address, value_end
+    if start is not None:
+        blocks.append(RegisterBlock(start, end - start))
+    return blocks
+
+
+def decode_f32s(registers: Sequence[int], offsets: Sequence[int]) -> np.ndarray:
+    """The big-endian float32 values starting at each offset into a list
+    of 16-bit registers, as readF32 would decode them one at a time"""
+    words = np.asarray(registers, dtype=np.uint32)
+    offsets = np.asarray(offsets, dtype=np.intp)
+    return ((words[offsets] << 16) | words[offsets + 1]).view(np.float32)
+
+
 class EGaugeRegisters:
 
     by_offset: dict[int, EGaugeRegister]
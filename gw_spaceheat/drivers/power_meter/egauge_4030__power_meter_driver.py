@@ -1,9 +1,12 @@
 import contextlib
 import logging
+import math
 import socket
 import time
 import struct
 from typing import Any
+from typing import Dict
+from typing import List
 from typing import Optional
 
 from gwproactor.logger import LoggerOrAdapter
@@ -15,11 +18,15 @@ from result import Result
 from actors.config import ScadaSettings
 from gwsproto.data_classes.data_channel import DataChannel
 from gwsproto.data_classes.components.electric_meter_component import ElectricMeterComponent
+from gwsproto.enums import TelemetryName
 from drivers.driver_result import DriverResult
 from drivers.exceptions import DriverWarning
 from drivers.power_meter.egauge import ModbusClientSettings
 from drivers.power_meter.egauge import RegisterType
-from drivers.power_meter.egauge.registers import readF32
+from drivers.power_meter.egauge.registers import MAX_READ_REGISTERS
+from drivers.power_meter.egauge.registers import RegisterBlock
+from drivers.power_meter.egauge.registers import decode_f32s
+from drivers.power_meter.egauge.registers import plan_register_blocks
 from drivers.power_meter.egauge.registers import readT16
 from drivers.power_meter.power_meter_driver import PowerMeterDriver
 
@@ -123,18 +130,37 @@ class EGuage4030_PowerMeterDriver(PowerMeterDriver):
     MODBUS_HW_UID_REGISTER: int = 100
     CLIENT_TIMEOUT: float = 3.0
 
+    # Unused registers a block read may span to join two power registers
+    MAX_BLOCK_GAP_REGISTERS: int = 16
+
     _modbus_client: Optional[ModbusClient] = None
     _client_settings: ModbusClientSettings
     _curr_connect_delay = 0.5
     _last_connect_time: float = 0.0
+    _power_address: Dict[str, int]
+    _blocks: Dict[tuple[int, ...], list[RegisterBlock]]
 
 
-    def __init__(self, component: ElectricMeterComponent, settings: ScadaSettings, logger: LoggerOrAdapter):
+    def __init__(
+        self,
+        component: ElectricMeterComponent,
+        settings: ScadaSettings,
+        logger: LoggerOrAdapter,
+        max_block_gap_registers: Optional[int] = None,
+    ):
         super().__init__(component, settings, logger=logger)
         self._client_settings = ModbusClientSettings(
             port=self.component.gt.ModbusPort,
             timeout=self.CLIENT_TIMEOUT
         )
+        if max_block_gap_registers is not None:
+            self.MAX_BLOCK_GAP_REGISTERS = max_block_gap_registers
+        self._power_address = {
+            cfg.ChannelName: cfg.EgaugeRegisterConfig.Address
+            for cfg in self.component.gt.ConfigList
+            if cfg.EgaugeRegisterConfig is not None
+        }
+        self._blocks = {}
 
     def clean_client(self):
         if self._modbus_client is not None:
@@ -175,7 +201,10 @@ class EGuage4030_PowerMeterDriver(PowerMeterDriver):
                 self._last_connect_time = now
                 try:
                     self._client_settings.host = socket.gethostbyname(self.component.gt.ModbusHost)
-                    self._modbus_client = ModbusClient(**self._client_settings.model_dump())
+                    # pyModbusTCP 0.3 dropped the debug argument (it logs instead)
+                    self._modbus_client = ModbusClient(
+                        **self._client_settings.model_dump(exclude={"debug"})
+                    )
                 except Exception as e:
                     path_dbg |= 0x00000020
                     comm_warnings.append(e)
@@ -244,48 +273,109 @@ class EGuage4030_PowerMeterDriver(PowerMeterDriver):
         else:
             return connect_result
 
+    def register_blocks(self, addresses: tuple[int, ...]) -> list[RegisterBlock]:
+        """The block reads covering the f32 registers at addresses, planned
+        once per set of addresses"""
+        blocks = self._blocks.get(addresses)
+        if blocks is None:
+            blocks = plan_register_blocks(
+                addresses,
+                registers_per_value=2,
+                max_registers=MAX_READ_REGISTERS,
+                max_gap=self.MAX_BLOCK_GAP_REGISTERS,
+            )
+            self._blocks[addresses] = blocks
+        return blocks
+
     def read_power_w(self, channel: DataChannel) -> Result[DriverResult[int | None], Exception]:
-        egauge_config = next(
-            (
-                cfg for cfg in self.component.gt.ConfigList
-                if cfg.ChannelName == channel.Name
-            ),
-            None
-        ).EgaugeRegisterConfig
+        read_result = self.read_telemetry_values([channel])
+        if read_result.is_ok():
+            return Ok(DriverResult(read_result.value.value[channel], read_result.value.warnings))
+        return read_result
+
+    def read_telemetry_values(
+        self, channels: List[DataChannel]
+    ) -> Result[DriverResult[Dict[DataChannel, int | None]], Exception]:
+        """Read every power channel with one Modbus request per block of
+        nearby registers rather than one request per channel."""
+        power_channels = [ch for ch in channels if ch.TelemetryName == TelemetryName.PowerW]
+        if len(power_channels) < len(channels):
+            other_result = super().read_telemetry_values(
+                [ch for ch in channels if ch.TelemetryName != TelemetryName.PowerW]
+            )
+            if other_result.is_err():
+                return other_result
+            driver_result = other_result.value
+        else:
+            driver_result = DriverResult({})
+        if not power_channels:
+            return Ok(driver_result)
         connect_result = self.try_connect()
-        if connect_result.is_ok() and connect_result.value.connected:
-            _, _, power = readF32(self._modbus_client, egauge_config.Address)
-            driver_result: DriverResult[int | None] = DriverResult(None, connect_result.value.warnings)
+        if connect_result.is_err():
+            return connect_result
+        driver_result.warnings.extend(connect_result.value.warnings)
+        if not connect_result.value.connected:
+            driver_result.value.update({ch: None for ch in power_channels})
+            return Ok(driver_result)
+        addresses = tuple(sorted({self._power_address[ch.Name] for ch in power_channels}))
+        power_by_address: Dict[int, float] = {}
+        for block in self.register_blocks(addresses):
+            registers = self._modbus_client.read_input_registers(block.start, block.count)
+            offsets = [
+                address - block.start
+                for address in addresses
+                if block.start <= address < block.start + block.count
+            ]
+            if not registers or len(registers) != block.count:
+                driver_result.warnings.append(
+                    EGaugeReadFailed(
+                        offset=block.start,
+                        num_registers=block.count,
+                        register_type=RegisterType.f32,
+                        value=registers,
+                        client=self._modbus_client,
+                    )
+                )
+                continue
+            for offset, power in zip(offsets, decode_f32s(registers, offsets).tolist()):
+                power_by_address[block.start + offset] = power
+        for ch in power_channels:
+            address = self._power_address[ch.Name]
+            power = power_by_address.get(address)
             if power is None:
+                driver_result.value[ch] = None
+                continue
+            if not math.isfinite(power):
+                driver_result.value[ch] = None
                 driver_result.warnings.append(
                     EGaugeReadFailed(
-                        offset=egauge_config.Address,
+                        offset=address,
                         num_registers=2,
                         register_type=RegisterType.f32,
-                        value=None,
+                        value=power,
                         client=self._modbus_client,
+                        msg="Power is not a finite number",
                     )
                 )
-            else:
-                driver_result.value = int(power)
-                if not is_short_integer(driver_result.value):
-                    unclipped_int_power = driver_result.value
-                    MIN_POWER = -2**15
-                    MAX_POWER = 2**15 - 1
-                    driver_result.value = max(MIN_POWER, min(int(driver_result.value), MAX_POWER))
-                    driver_result.warnings.append(
-                        EGaugeReadOutOfRange(
-                            offset=egauge_config.Address,
-                            num_registers=2,
-                            register_type=RegisterType.f32,
-                            value=unclipped_int_power,
-                            client=self._modbus_client,
-                            msg=rf"Power value {unclipped_int_power} clipped to \[{MIN_POWER}, {MAX_POWER}] result: {driver_result.value}",
-                        )
+                continue
+            int_power = int(power)
+            if not is_short_integer(int_power):
+                MIN_POWER = -2**15
+                MAX_POWER = 2**15 - 1
+                clipped = max(MIN_POWER, min(int_power, MAX_POWER))
+                driver_result.warnings.append(
+                    EGaugeReadOutOfRange(
+                        offset=address,
+                        num_registers=2,
+                        register_type=RegisterType.f32,
+                        value=int_power,
+                        client=self._modbus_client,
+                        msg=rf"Power value {int_power} clipped to \[{MIN_POWER}, {MAX_POWER}] result: {clipped}",
                     )
-            return Ok(driver_result)
-        else:
-            return connect_result
+                )
+                int_power = clipped
+            driver_result.value[ch] = int_power
+        return Ok(driver_result)
 
     def read_current_rms_micro_amps(self, channel: DataChannel) -> Result[DriverResult[int | None], Exception]:
         raise NotImplementedError
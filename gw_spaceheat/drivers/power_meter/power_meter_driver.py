@@ -1,6 +1,6 @@
 import logging
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Dict, List, Optional
 
 from gwproactor.logger import LoggerOrAdapter
 from gwsproto.named_types import ElectricMeterChannelConfig
@@ -59,5 +59,20 @@ class PowerMeterDriver(ABC):
         else:
             return Err(ValueError(f"Driver {self} not set up to read {channel.TelemetryName}"))
 
+    def read_telemetry_values(
+        self,
+        channels: List[DataChannel]
+    ) -> Result[DriverResult[Dict[DataChannel, int | None]], Exception]:
+        """Read all of channels, collecting the warnings of each read. Drivers
+        that can read several channels in one transaction override this."""
+        driver_result: DriverResult[Dict[DataChannel, int | None]] = DriverResult({})
+        for channel in channels:
+            read = self.read_telemetry_value(channel)
+            if read.is_err():
+                return read
+            driver_result.value[channel] = read.value.value
+            driver_result.warnings.extend(read.value.warnings)
+        return Ok(driver_result)
+
     def validate_config(self, config: ElectricMeterChannelConfig) -> None:
         ...
\ No newline at end of file
@@ -1,8 +1,10 @@
 import typing
+from functools import cached_property
 from typing import Any
 from pathlib import Path
 from types import ModuleType
 
+from gwproactor import CommunicatorInterface
 from gwproactor import ProactorSettings
 from gwproactor.app import App, ActorConfig
 from gwproactor.config import MQTTClient
@@ -16,6 +18,9 @@ import actors
 from actors import SecondaryScada
 from actors import ScadaInterface
 from actors.config import ScadaSettings
+from actors.loop_monitor import LoopMonitor
+from actors.routing import MessageRoutes
+from drivers.i2c.bus_scheduler import I2cBusScheduler
 from actors.scada import ScadaCodecFactory
 from gwsproto.data_classes import house_0_names
 from gwsproto.data_classes.house_0_layout import House0Layout
@@ -104,3 +109,39 @@ class Scada2App(App, ScadaAppInterface):
     @property
     def hardware_layout(self) -> House0Layout:
         return typing.cast(House0Layout, super().hardware_layout)
+
+    @cached_property
+    def routes(self) -> MessageRoutes:
+        return MessageRoutes(self.get_communicator_names)
+
+    @cached_property
+    def i2c_bus(self) -> I2cBusScheduler:
+        return I2cBusScheduler()
+
+    @cached_property
+    def loop_monitor(self) -> LoopMonitor:
+        return LoopMonitor(
+            H0N.secondary_scada,
+            slow_callback_s=self.settings.slow_callback_ms / 1000,
+        )
+
+    def link_states(self) -> dict[str, str]:
+        links = self.proactor.links
+        states = {}
+        for name in links.link_names():
+            state = links.link_state(name)
+            states[name] = getattr(state, "value", str(state))
+        return states
+
+    def add_communicator(self, communicator: CommunicatorInterface) -> None:
+        super().add_communicator(communicator)
+        self.routes.invalidate()
+        self.loop_monitor.instrument(communicator)
+
+    def _load_actors(self) -> None:
+        super()._load_actors()
+        self.routes.invalidate()
+        self.loop_monitor.instrument_all(
+            map(self.get_communicator, self.get_communicator_names()),
+            prime_actor=self.prime_actor,
+        )
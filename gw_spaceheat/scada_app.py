@@ -1,9 +1,11 @@
 import typing
+from functools import cached_property
 from typing import Optional
 from pathlib import Path
 from types import ModuleType
 
 from gwproactor import CodecFactory
+from gwproactor import CommunicatorInterface
 from gwproactor import ProactorSettings
 from gwproactor.app import App
 from gwproactor.app import SubTypes
@@ -16,6 +18,9 @@ from gwproactor.persister import TimedRollingFilePersister
 from gwsproto.data_classes.hardware_layout import HardwareLayout
 
 import actors
+from actors.loop_monitor import LoopMonitor
+from actors.routing import MessageRoutes
+from drivers.i2c.bus_scheduler import I2cBusScheduler
 from actors.scada import Scada
 from actors.scada_interface import ScadaInterface
 from actors.config import ScadaSettings
@@ -119,6 +124,42 @@ class ScadaApp(App, ScadaAppInterface):
     def hardware_layout(self) -> House0Layout:
         return typing.cast(House0Layout, self.config.layout)
 
+    @cached_property
+    def routes(self) -> MessageRoutes:
+        return MessageRoutes(self.get_communicator_names)
+
+    @cached_property
+    def i2c_bus(self) -> I2cBusScheduler:
+        return I2cBusScheduler()
+
+    @cached_property
+    def loop_monitor(self) -> LoopMonitor:
+        return LoopMonitor(
+            H0N.primary_scada,
+            slow_callback_s=self.settings.slow_callback_ms / 1000,
+        )
+
+    def link_states(self) -> dict[str, str]:
+        links = self.proactor.links
+        states = {}
+        for name in links.link_names():
+            state = links.link_state(name)
+            states[name] = getattr(state, "value", str(state))
+        return states
+
+    def add_communicator(self, communicator: CommunicatorInterface) -> None:
+        super().add_communicator(communicator)
+        self.routes.invalidate()
+        self.loop_monitor.instrument(communicator)
+
+    def _load_actors(self) -> None:
+        super()._load_actors()
+        self.routes.invalidate()
+        self.loop_monitor.instrument_all(
+            map(self.get_communicator, self.get_communicator_names()),
+            prime_actor=self.prime_actor,
+        )
+
     def _get_name(self, layout: HardwareLayout) -> ProactorName:
         return ProactorName(
             long_name=layout.scada_g_node_alias,
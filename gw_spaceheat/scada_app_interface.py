@@ -1,10 +1,14 @@
 from abc import ABC
 from abc import abstractmethod
+from typing import Dict
 
 from gwproactor import AppInterface
 
+from actors.routing import MessageRoutes
 from actors.scada_interface import ScadaInterface
 from actors.config import ScadaSettings
+from actors.loop_monitor import LoopMonitor
+from drivers.i2c.bus_scheduler import I2cBusScheduler
 from gwsproto.data_classes.house_0_layout import House0Layout
 
 
@@ -28,4 +32,27 @@ class ScadaAppInterface(AppInterface, ABC):
     @property
     @abstractmethod
     def hardware_layout(self) -> House0Layout:
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+    @property
+    @abstractmethod
+    def routes(self) -> MessageRoutes:
+        """Message routes to every node, rebuilt when communicators change"""
+        raise NotImplementedError
+
+    @property
+    @abstractmethod
+    def i2c_bus(self) -> I2cBusScheduler:
+        """Arbitrates the i2c bus shared by this app's i2c actors"""
+        raise NotImplementedError
+
+    @property
+    @abstractmethod
+    def loop_monitor(self) -> LoopMonitor:
+        """Event loop lag and message handling instrumentation"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def link_states(self) -> Dict[str, str]:
+        """Current state of each MQTT link, from the proactor's link manager"""
+        raise NotImplementedError
@@ -28,6 +28,7 @@ from gwadmin.watch.clients.constrained_mqtt_client import MessageReceivedCallbac
 from gwadmin.watch.clients.constrained_mqtt_client import MQTTClientCallbacks
 from gwadmin.watch.clients.constrained_mqtt_client import StateChangeCallback
 from gwsproto.named_types import ScadaControlCapabilities, SendControlCapabilities, SnapshotSpaceheat
+from gwsproto.named_types import SnapshotSpaceheatDelta
 
 module_logger = logging.getLogger(__name__)
 
@@ -266,11 +267,28 @@ class AdminClient:
             subclient.process_scada_control_capabilities(self._ctrl_capabilities)
 
     def _process_snapshot(self, payload: bytes) -> None:
+        message = Message[SnapshotSpaceheat].model_validate_json(payload)
+        self._publish_snapshot(message.Payload)
+
+    def _process_snapshot_delta(self, payload: bytes) -> None:
+        delta = Message[SnapshotSpaceheatDelta].model_validate_json(payload).Payload
+        if self._snap is None or not delta.follows(self._snap):
+            # Missed a snapshot; deltas are useless until a new keyframe arrives.
+            if self._snap is not None:
+                self._logger.info(
+                    "Snapshot delta %d does not follow latest snapshot. Requesting keyframe.",
+                    delta.Seq,
+                )
+                self._snap = None
+                self._request_snapshot()
+            return
+        self._publish_snapshot(delta.apply(self._snap))
+
+    def _publish_snapshot(self, snapshot: SnapshotSpaceheat) -> None:
         # self._logger.debug("++AdminClient._process_snapshot")
         path_dbg = 0
         path_count = 0
-        message = Message[SnapshotSpaceheat].model_validate_json(payload)
-        self._snap = message.Payload
+        self._snap = snapshot
         for subclient in self.subclients():
             path_dbg |= 0x00000001
             path_count += 1
@@ -291,6 +309,9 @@ class AdminClient:
             elif decoded_topic.message_type == type_name(SnapshotSpaceheat):
                 path_dbg |= 0x00000002
                 self._process_snapshot(payload)
+            elif decoded_topic.message_type == type_name(SnapshotSpaceheatDelta):
+                path_dbg |= 0x00000040
+                self._process_snapshot_delta(payload)
             else:
                 path_dbg |= 0x00000004
                 for subclient in self.subclients():
@@ -0,0 +1,115 @@
+"""Three-layer model of stratified storage from per-layer tank temperatures.
+
+Layer temperatures, listed top of the store to bottom, are first made
+non-increasing by averaging inverted neighbours. The resulting profile is
+split into at most three contiguous groups (top, middle, bottom) that
+minimize the total squared distance to the group means. That split is the
+exact 1-D 3-means clustering of the layers, found by trying every pair of
+split points against prefix sums, so the same temperatures always give the
+same model.
+
+three_layer_storage_model is cached per temperature vector.
+"""
+
+from functools import lru_cache
+from typing import NamedTuple, Sequence
+
+MAX_INVERSION_PASSES = 20
+# thermocline reported when the whole store is one temperature
+SINGLE_CLUSTER_THERMOCLINE = 12
+
+
+class ThreeLayerStorage(NamedTuple):
+    top_temp: float
+    middle_temp: float
+    bottom_temp: float
+    thermocline1: int
+    thermocline2: int
+
+
+def remove_inversions(layer_temps: Sequence[float]) -> list[float]:
+    """Average each layer that is warmer than the one above it with that
+    layer (rounded to the degree), pass after pass, until the profile is
+    non-increasing. Sorts whatever is left after MAX_INVERSION_PASSES."""
+    temps = list(layer_temps)
+    passes = 0
+    while sorted(temps, reverse=True) != temps and passes < MAX_INVERSION_PASSES:
+        passes += 1
+        smoothed: list[float] = []
+        for t in temps:
+            if smoothed and t > smoothed[-1]:
+                mean = round((smoothed[-1] + t) / 2)
+                smoothed[-1] = mean
+                smoothed.append(mean)
+            else:
+                smoothed.append(t)
+        temps = smoothed
+        if passes == MAX_INVERSION_PASSES:
+            temps = sorted(temps, reverse=True)
+    return temps
+
+
+def optimal_splits(values: Sequence[float], k: int) -> list[int]:
+    """End indices of the k contiguous groups of values with the least total
+    within-group sum of squares. values must be sorted; for sorted 1-D data
+    these groups are the exact k-means clusters. Ties go to the earliest
+    split points."""
+    n = len(values)
+    if not 1 <= k <= 3 or k > n:
+        raise ValueError(f"Cannot split {n} values into {k} groups")
+    s1 = [0.0]
+    s2 = [0.0]
+    for v in values:
+        s1.append(s1[-1] + v)
+        s2.append(s2[-1] + v * v)
+
+    def sse(a: int, b: int) -> float:
+        total = s1[b] - s1[a]
+        return s2[b] - s2[a] - total * total / (b - a)
+
+    if k == 1:
+        return [n]
+    if k == 2:
+        best = min(range(1, n), key=lambda i: sse(0, i) + sse(i, n))
+        return [best, n]
+    best_cost = float("inf")
+    best_splits = [1, 2, n]
+    for i in range(1, n - 1):
+        head = sse(0, i)
+        for j in range(i + 1, n):
+            cost = head + sse(i, j) + sse(j, n)
+            if cost < best_cost:
+                best_cost = cost
+                best_splits = [i, j, n]
+    return best_splits
+
+
+@lru_cache(maxsize=256)
+def _three_layer_storage_model(layer_temps: tuple[float, ...]) -> ThreeLayerStorage:
+    temps = remove_inversions(layer_temps)
+    k = min(3, len(set(temps)))
+    groups = []
+    start = 0
+    for end in optimal_splits(temps, k):
+        groups.append(temps[start:end])
+        start = end
+    means = [round(sum(g) / len(g)) for g in groups]
+    if k == 3:
+        thermocline1 = max(1, len(groups[0]))
+        thermocline2 = thermocline1 + len(groups[1])
+        return ThreeLayerStorage(means[0], means[1], means[2], thermocline1, thermocline2)
+    if k == 2:
+        thermocline1 = len(groups[0])
+        return ThreeLayerStorage(means[0], means[0], means[1], thermocline1, thermocline1)
+    return ThreeLayerStorage(
+        means[0], means[0], means[0], SINGLE_CLUSTER_THERMOCLINE, SINGLE_CLUSTER_THERMOCLINE
+    )
+
+
+def three_layer_storage_model(layer_temps_f: Sequence[float]) -> ThreeLayerStorage:
+    """Top, middle and bottom temperatures (rounded to the degree) and the
+    number of layers above each thermocline, for layer temperatures listed
+    from the top of the store down"""
+    if not layer_temps_f:
+        raise ValueError("No layer temperatures")
+    return _three_layer_storage_model(tuple(float(t) for t in layer_temps_f))
@@ -0,0 +1,163 @@
+"""Voltage to temperature for NTC thermistors read through a voltage divider.
+
+The thermistor sits between the ADC input and ground, with a fixed divider
+resistor up to the supply:
+
+    r_therm = r_divider * volts / (supply_v - volts)
+    temp_c = 1 / (1/t0_k + ln(r_therm/r0) / beta) - 273
+
+volts_to_temp_c evaluates this through an interpolation table built once
+per (beta, r0, r_divider, supply_v, t0_k, max_error_c) and cached, so a
+reading costs an index and a multiply-add instead of a log and divisions.
+Within the table's temperature range the result is within max_error_c of
+the exact formula; outside it the exact formula is used.
+
+r0 and r_divider only need to share units (ohms or kohms).
+"""
+
+import math
+from functools import lru_cache
+from typing import Any, Sequence
+
+DEFAULT_MAX_ERROR_C = 0.001
+TABLE_MIN_C = -40.0
+TABLE_MAX_C = 150.0
+KELVIN_OFFSET = 273  # as in the original beta formula code, not 273.15
+MAX_TABLE_POINTS = 1 << 16
+
+
+def beta_temp_c(
+    volts: float,
+    beta: float,
+    r0: float,
+    r_divider: float,
+    supply_v: float,
+    t0_k: float = 298,
+) -> float:
+    """The exact beta formula. Raises ValueError unless 0 < volts < supply_v."""
+    if not 0 < volts < supply_v:
+        raise ValueError(
+            f"Thermistor voltage {volts} outside (0, {supply_v}): disconnected or shorted"
+        )
+    r_therm = r_divider * volts / (supply_v - volts)
+    return 1 / ((1 / t0_k) + (math.log(r_therm / r0) / beta)) - KELVIN_OFFSET
+
+
+def beta_volts(
+    temp_c: float,
+    beta: float,
+    r0: float,
+    r_divider: float,
+    supply_v: float,
+    t0_k: float = 298,
+) -> float:
+    """Inverse of beta_temp_c: the divider voltage at temp_c"""
+    r_therm = r0 * math.exp(beta * (1 / (temp_c + KELVIN_OFFSET) - 1 / t0_k))
+    return supply_v * r_therm / (r_divider + r_therm)
+
+
+class ThermistorTable:
+    """Linear interpolation of beta_temp_c on a uniform voltage grid.
+
+    The grid is doubled until the interpolation error at every interval
+    midpoint, where it peaks for a smooth curve, is under half of
+    max_error_c.
+    """
+
+    def __init__(
+        self,
+        beta: float,
+        r0: float,
+        r_divider: float,
+        supply_v: float,
+        t0_k: float = 298,
+        max_error_c: float = DEFAULT_MAX_ERROR_C,
+        min_c: float = TABLE_MIN_C,
+        max_c: float = TABLE_MAX_C,
+    ) -> None:
+        self.params = (beta, r0, r_divider, supply_v, t0_k)
+        self.max_error_c = max_error_c
+        # NTC: hotter means lower resistance and lower voltage
+        self.v_min = beta_volts(max_c, *self.params)
+        self.v_max = beta_volts(min_c, *self.params)
+        points = 64
+        while True:
+            step = (self.v_max - self.v_min) / (points - 1)
+            grid = [self.v_min + i * step for i in range(points)]
+            temps = [beta_temp_c(v, *self.params) for v in grid]
+            worst = max(
+                abs(beta_temp_c(v + step / 2, *self.params) - (t1 + t2) / 2)
+                for v, t1, t2 in zip(grid, temps, temps[1:])
+            )
+            if worst <= max_error_c / 2 or points >= MAX_TABLE_POINTS:
+                break
+            points *= 2
+        self.step = step
+        self.inv_step = 1 / step
+        self.volts = grid
+        self.temps = temps
+        # slope of each interval, so a lookup is one multiply-add
+        self.slopes = [t2 - t1 for t1, t2 in zip(temps, temps[1:])]
+        self._arrays: Any = None
+
+    def __len__(self) -> int:
+        return len(self.temps)
+
+    def temp_c(self, volts: float) -> float:
+        x = (volts - self.v_min) * self.inv_step
+        i = int(x)
+        if 0 <= x and i < len(self.slopes):
+            return self.temps[i] + self.slopes[i] * (x - i)
+        return beta_temp_c(volts, *self.params)
+
+    def temps_c(self, volts: Any) -> Any:
+        """Vectorized temp_c for a numpy array (or sequence) of voltages.
+        Voltages that are not strictly between 0 and the supply give nan."""
+        import numpy as np
+
+        if self._arrays is None:
+            self._arrays = (np.array(self.volts), np.array(self.temps))
+        v = np.asarray(volts, dtype=float)
+        out = np.interp(v, *self._arrays)
+        outside = (v < self.v_min) | (v > self.v_max)
+        if outside.any():
+            beta, r0, r_divider, supply_v, t0_k = self.params
+            vo = v[outside]
+            valid = (vo > 0) & (vo < supply_v)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                r_therm = r_divider * vo / (supply_v - vo)
+                exact = 1 / ((1 / t0_k) + (np.log(r_therm / r0) / beta)) - KELVIN_OFFSET
+            out[outside] = np.where(valid, exact, np.nan)
+        return out
+
+
+@lru_cache(maxsize=32)
+def thermistor_table(
+    beta: float,
+    r0: float,
+    r_divider: float,
+    supply_v: float,
+    t0_k: float = 298,
+    max_error_c: float = DEFAULT_MAX_ERROR_C,
+) -> ThermistorTable:
+    return ThermistorTable(beta, r0, r_divider, supply_v, t0_k, max_error_c)
+
+
+def volts_to_temp_c(
+    volts: float | Sequence[float] | Any,
+    beta: float,
+    r0: float,
+    r_divider: float,
+    supply_v: float,
+    t0_k: float = 298,
+    max_error_c: float = DEFAULT_MAX_ERROR_C,
+) -> Any:
+    """Temperature in C for one voltage (float, raises ValueError if the
+    thermistor looks disconnected or shorted) or for a batch (numpy array,
+    nan where it does). Batches need numpy."""
+    table = thermistor_table(beta, r0, r_divider, supply_v, t0_k, max_error_c)
+    if isinstance(volts, (int, float)):
+        if not 0 < volts < supply_v:
+            return beta_temp_c(volts, beta, r0, r_divider, supply_v, t0_k)
+        return table.temp_c(volts)
+    return table.temps_c(volts)
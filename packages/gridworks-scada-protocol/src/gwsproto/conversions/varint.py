@@ -0,0 +1,68 @@
+"""Compact text encoding for lists of integers that change slowly.
+
+Each integer is replaced by its difference from the one before (the first
+by its difference from a given start), mapped to a non-negative integer
+by zigzag (0, -1, 1, -2, ... -> 0, 1, 2, 3, ...) and written as a LEB128
+varint: 7 bits per byte, high bit set on every byte but the last. The
+bytes are then base64 encoded so they can travel in JSON.
+
+Readings sampled every few seconds have millisecond deltas of 4 digits,
+which take 2 bytes instead of the 14 a JSON timestamp takes.
+"""
+
+import base64
+from typing import Iterable, Sequence
+
+
+def zigzag(n: int) -> int:
+    return n << 1 if n >= 0 else ((-n) << 1) - 1
+
+
+def unzigzag(z: int) -> int:
+    return z >> 1 if not z & 1 else -((z + 1) >> 1)
+
+
+def encode_varints(values: Iterable[int]) -> bytes:
+    """LEB128 for non-negative integers of any size"""
+    out = bytearray()
+    append = out.append
+    for v in values:
+        while v > 0x7F:
+            append((v & 0x7F) | 0x80)
+            v >>= 7
+        append(v)
+    return bytes(out)
+
+
+def decode_varints(data: bytes) -> list[int]:
+    values = []
+    v = shift = 0
+    for byte in data:
+        v |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(v)
+            v = shift = 0
+    if shift:
+        raise ValueError("Truncated varint data")
+    return values
+
+
+def pack_deltas(values: Sequence[int], start: int = 0) -> str:
+    """base64 zigzag varints of the differences between successive values,
+    the first taken against start"""
+    previous = [start, *values[:-1]]
+    return base64.b64encode(
+        encode_varints(zigzag(v - p) for v, p in zip(values, previous))
+    ).decode("ascii")
+
+
+def unpack_deltas(blob: str, start: int = 0) -> list[int]:
+    """Inverse of pack_deltas"""
+    values = []
+    total = start
+    for z in decode_varints(base64.b64decode(blob, validate=True)):
+        total += unzigzag(z)
+        values.append(total)
+    return values
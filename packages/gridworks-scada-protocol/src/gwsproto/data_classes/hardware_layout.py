@@ -373,15 +373,12 @@ class HardwareLayout:
 
     @classmethod
     def check_handle_hierarchy(cls, nodes: dict[str, ShNode]) -> None:
+        handles = {n.handle for n in nodes.values()}
         for n in nodes.values():
             boss_handle = cls.boss_handle(n.handle)
             # No dots in your name: you are your own boss
-            if boss_handle:
-                boss = next(
-                    (n for n in nodes.values() if n.handle == boss_handle), None
-                )
-                if boss is None:
-                    raise DcError(f"{n.name} is missing boss {boss_handle}")
+            if boss_handle and boss_handle not in handles:
+                raise DcError(f"{n.name} is missing boss {boss_handle}")
 
     @classmethod
     def check_node_unique_ids(cls, nodes: dict[str, ShNode]) -> None:
@@ -546,6 +543,28 @@ class HardwareLayout:
         }
         self.data_channels = dict(data_channels)
         self.derived_channels = dict(derived_channels)
+        self.index_command_tree()
+
+    def index_command_tree(self) -> None:
+        """Rebuild the handle and hierarchy indexes behind node_by_handle,
+        node_from_handle, boss_node, direct_reports and parent_node.
+
+        add_node keeps them current. Code that reassigns node Handles (the
+        set_command_tree methods) must call this afterward.
+        """
+        self._nodes_by_handle: dict[str, ShNode] = {}
+        self._nodes_by_hierarchy_name: dict[str, ShNode] = {}
+        self._reports_by_boss_handle: dict[str, list[ShNode]] = defaultdict(list)
+        for node in self.nodes.values():
+            self._index_node(node)
+
+    def _index_node(self, node: ShNode) -> None:
+        # The first node with a handle wins, as in a scan of self.nodes
+        self._nodes_by_handle.setdefault(node.handle, node)
+        self._nodes_by_hierarchy_name.setdefault(node.actor_hierarchy_name, node)
+        # No dots in your name: you are your own boss
+        boss_handle = self.boss_handle(node.handle) or node.handle
+        self._reports_by_boss_handle[boss_handle].append(node)
 
     @cached_property
     def channel_registry(self) -> ChannelRegistry:
@@ -719,6 +738,7 @@ class HardwareLayout:
         self.resolve_node_links(node, self.nodes, self.components, raise_errors=True)
         if node.ComponentId is not None:
             self.nodes_by_component[node.ComponentId] = node.Name
+        self._index_node(node)
         self.clear_property_cache()
         return node
 
@@ -732,9 +752,10 @@ class HardwareLayout:
         return self.nodes.get(name, default)
 
     def node_by_handle(self, handle: str) -> Optional[ShNode]:
-        d = {node.Handle: node for node in self.nodes.values() if node.Handle}
-        if handle in d:
-            return d[handle]
+        """The node whose Handle is explicitly set to handle"""
+        node = self.node_from_handle(handle)
+        if node is not None and node.Handle:
+            return node
         return None
 
     def component(self, node_name: str) -> Optional[Component[Any, Any]]:
@@ -790,12 +811,10 @@ class HardwareLayout:
         h_name = self.parent_hierarchy_name(node.actor_hierarchy_name)
         if not h_name:
             return None
-        parent = next(
-            (n for n in self.nodes.values() if n.actor_hierarchy_name == h_name), None
-        )
+        parent = self._nodes_by_hierarchy_name.get(h_name)
         if parent is None:
             raise DcError(f"{node} is missing parent {h_name}!")
-        return self.node(h_name)
+        return parent
 
     @classmethod
     def boss_handle(cls, handle: str) -> Optional[str]:
@@ -808,16 +827,21 @@ class HardwareLayout:
         # No dots in your name: you are your own boss
         if not boss_handle:
             return node
-        boss = next((n for n in self.nodes.values() if n.handle == boss_handle), None)
+        boss = self.node_from_handle(boss_handle)
         if boss is None:
             raise DcError(f"{node} is missing boss {boss_handle}")
         return boss
 
     def direct_reports(self, node: ShNode) -> list[ShNode]:
-        return [n for n in self.nodes.values() if self.boss_node(n) == node]
+        return list(self._reports_by_boss_handle.get(node.handle, []))
 
     def node_from_handle(self, handle: str) -> Optional[ShNode]:
-        return next((n for n in self.nodes.values() if n.handle == handle), None)
+        node = self._nodes_by_handle.get(handle)
+        if node is not None and node.handle != handle:
+            # A Handle was reassigned without index_command_tree
+            self.index_command_tree()
+            node = self._nodes_by_handle.get(handle)
+        return node
 
     @cached_property
     def ltn_g_node_alias(self) -> str:
@@ -1,4 +1,5 @@
 from gwsproto.named_types.actuators_ready import ActuatorsReady
+from gwsproto.named_types.actor_message_timing import ActorMessageTiming
 from gwsproto.named_types.admin_analog_dispatch import AdminAnalogDispatch
 from gwsproto.named_types.ads111x_based_cac_gt import Ads111xBasedCacGt
 from gwsproto.named_types.ads111x_based_component_gt import Ads111xBasedComponentGt
@@ -15,6 +16,7 @@ from gwsproto.named_types.bid_recommendation import BidRecommendation
 from gwsproto.named_types.channel_config import ChannelConfig
 from gwsproto.named_types.channel_flatlined import ChannelFlatlined
 from gwsproto.named_types.channel_readings import ChannelReadings
+from gwsproto.named_types.channel_readings_compact import ChannelReadingsCompact
 from gwsproto.named_types.component_attribute_class_gt import ComponentAttributeClassGt
 from gwsproto.named_types.component_gt import ComponentGt
 from gwsproto.named_types.data_channel_gt import DataChannelGt
@@ -49,6 +51,7 @@ from gwsproto.named_types.hack_oil_on import HackOilOn
 from gwsproto.named_types.heating_forecast import HeatingForecast
 from gwsproto.named_types.latest_price import LatestPrice
 from gwsproto.named_types.layout_lite import LayoutLite
+from gwsproto.named_types.loop_health import LoopHealth
 from gwsproto.named_types.machine_states import MachineStates
 from gwsproto.named_types.micro_volts import MicroVolts
 from gwsproto.named_types.market_maker_ack import MarketMakerAck
@@ -85,14 +88,17 @@ from gwsproto.named_types.sim_pico_tank_module_component_gt import SimPicoTankMo
 from gwsproto.named_types.single_machine_state import SingleMachineState
 from gwsproto.named_types.slow_contract_heartbeat import SlowContractHeartbeat
 from gwsproto.named_types.single_reading import SingleReading
+from gwsproto.named_types.slow_callback import SlowCallback
 from gwsproto.named_types.spaceheat_node_gt import SpaceheatNodeGt
 from gwsproto.named_types.snapshot_spaceheat import SnapshotSpaceheat
+from gwsproto.named_types.snapshot_spaceheat_delta import SnapshotSpaceheatDelta
 from gwsproto.named_types.suit_up import SuitUp
 from gwsproto.named_types.synth_channel_gt import SynthChannelGt
 from gwsproto.named_types.synced_readings import SyncedReadings
 from gwsproto.named_types.tank_module_params import TankModuleParams
 from gwsproto.named_types.tank_temp_calibration import TankTempCalibration
 from gwsproto.named_types.tank_temp_calibration_map import TankTempCalibrationMap
+from gwsproto.named_types.thread_queue_depth import ThreadQueueDepth
 from gwsproto.named_types.ticklist_hall import TicklistHall
 from gwsproto.named_types.ticklist_hall_report import TicklistHallReport
 from gwsproto.named_types.ticklist_reed import TicklistReed
@@ -104,6 +110,7 @@ from gwsproto.named_types.weather_forecast import WeatherForecast
 __all__ = [
     "RemainingElecEvent",
     "ActuatorsReady",
+    "ActorMessageTiming",
     "Ads111xBasedCacGt",
     "Ads111xBasedComponentGt",
     "AdsChannelConfig",
@@ -120,6 +127,7 @@ __all__ = [
     "ChannelConfig",
     "ChannelFlatlined",
     "ChannelReadings",
+    "ChannelReadingsCompact",
     "ComponentAttributeClassGt",
     "ComponentGt",
     "DataChannelGt",
@@ -150,6 +158,7 @@ __all__ = [
     "I2cMultichannelDtRelayComponentGt",
     "LatestPrice",
     "LayoutLite",
+    "LoopHealth",
     "MarketMakerAck",
     "MachineStates",
     "MicroVolts",
@@ -187,7 +196,9 @@ __all__ = [
     "SimPicoTankModuleComponentGt",
     "SingleMachineState",
     "SingleReading",
+    "SlowCallback",
     "SnapshotSpaceheat",
+    "SnapshotSpaceheatDelta",
     "SpaceheatNodeGt",
     "SuitUp",
     "SynthChannelGt",
@@ -195,6 +206,7 @@ __all__ = [
     "TankModuleParams",
     "TankTempCalibration",
     "TankTempCalibrationMap",
+    "ThreadQueueDepth",
     "TicklistHall",
     "TicklistHallReport",
     "TicklistReed",
@@ -0,0 +1,23 @@
+from typing import List, Literal
+
+from pydantic import BaseModel, NonNegativeInt
+
+from gwsproto.property_format import SpaceheatName
+
+
+class ActorMessageTiming(BaseModel):
+    """
+    How long one actor's process_message took over a LoopHealth period.
+
+    BucketCountList[i] counts the messages that took at most
+    LoopHealth.BucketUpperMsList[i] ms and more than the bound before it;
+    the last count is for messages slower than every bound.
+    """
+
+    ActorName: SpaceheatName
+    Messages: NonNegativeInt
+    TotalMs: float
+    MaxMs: float
+    BucketCountList: List[NonNegativeInt]
+    TypeName: Literal["actor.message.timing"] = "actor.message.timing"
+    Version: Literal["000"] = "000"
@@ -0,0 +1,71 @@
+from typing import Literal, Sequence
+
+from pydantic import BaseModel, NonNegativeInt
+
+from gwsproto.conversions.varint import pack_deltas, unpack_deltas
+from gwsproto.named_types.channel_readings import ChannelReadings
+from gwsproto.property_format import SpaceheatName
+
+# Advertised (in SendLayout.ReportEncodings) by receivers that can decode it
+COMPACT_CHANNEL_READINGS_ENCODING = "channel.readings.compact.000"
+
+
+class ChannelReadingsCompact(BaseModel):
+    """
+    ChannelReadings packed for metered links. The read times are varint
+    deltas in milliseconds, the first against the start of the containing
+    Report's slot; the values are varint deltas, the first against 0. See
+    gwsproto.conversions.varint. Decoding with the same slot start gives
+    back the original ChannelReadings exactly.
+    """
+
+    ChannelName: SpaceheatName
+    Count: NonNegativeInt
+    ValueDeltas: str
+    ScadaReadTimeDeltas: str
+    TypeName: Literal["channel.readings.compact"] = "channel.readings.compact"
+    Version: Literal["000"] = "000"
+
+    @classmethod
+    def from_lists(
+        cls,
+        channel_name: str,
+        values: Sequence[int],
+        unix_ms: Sequence[int],
+        slot_start_unix_s: int,
+    ) -> "ChannelReadingsCompact":
+        if len(values) != len(unix_ms):
+            raise ValueError(
+                f"{channel_name}: {len(values)} values but {len(unix_ms)} read times"
+            )
+        return cls(
+            ChannelName=channel_name,
+            Count=len(values),
+            ValueDeltas=pack_deltas(values),
+            ScadaReadTimeDeltas=pack_deltas(unix_ms, slot_start_unix_s * 1000),
+        )
+
+    @classmethod
+    def from_readings(
+        cls, readings: ChannelReadings, slot_start_unix_s: int
+    ) -> "ChannelReadingsCompact":
+        return cls.from_lists(
+            readings.ChannelName,
+            readings.ValueList,
+            readings.ScadaReadTimeUnixMsList,
+            slot_start_unix_s,
+        )
+
+    def to_readings(self, slot_start_unix_s: int) -> ChannelReadings:
+        values = unpack_deltas(self.ValueDeltas)
+        unix_ms = unpack_deltas(self.ScadaReadTimeDeltas, slot_start_unix_s * 1000)
+        if len(values) != self.Count or len(unix_ms) != self.Count:
+            raise ValueError(
+                f"{self.ChannelName}: expected {self.Count} readings, decoded "
+                f"{len(values)} values and {len(unix_ms)} read times"
+            )
+        return ChannelReadings(
+            ChannelName=self.ChannelName,
+            ValueList=values,
+            ScadaReadTimeUnixMsList=unix_ms,
+        )
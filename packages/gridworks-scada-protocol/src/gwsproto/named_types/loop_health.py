@@ -0,0 +1,39 @@
+from typing import List, Literal
+
+from pydantic import BaseModel, NonNegativeInt
+
+from gwsproto.named_types.actor_message_timing import ActorMessageTiming
+from gwsproto.named_types.slow_callback import SlowCallback
+from gwsproto.named_types.thread_queue_depth import ThreadQueueDepth
+from gwsproto.property_format import (
+    LeftRightDotStr,
+    SpaceheatName,
+    UTCMilliseconds,
+)
+
+
+class LoopHealth(BaseModel):
+    """
+    Event loop instrumentation for one app over one period.
+
+    Loop lag is how late a callback scheduled from a watchdog thread ran.
+    LagBucketCountList and each ActorMessageTiming.BucketCountList are
+    histograms over BucketUpperMsList, with one extra count at the end for
+    samples above the last bound.
+    """
+
+    FromGNodeAlias: LeftRightDotStr
+    AppName: SpaceheatName
+    PeriodStartUnixMs: UTCMilliseconds
+    PeriodEndUnixMs: UTCMilliseconds
+    BucketUpperMsList: List[float]
+    LagSamples: NonNegativeInt
+    MeanLagMs: float
+    MaxLagMs: float
+    LagBucketCountList: List[NonNegativeInt]
+    TaskCount: NonNegativeInt
+    SlowCallbackList: List[SlowCallback]
+    ActorTimingList: List[ActorMessageTiming]
+    ThreadQueueList: List[ThreadQueueDepth]
+    TypeName: Literal["loop.health"] = "loop.health"
+    Version: Literal["000"] = "000"
@@ -1,8 +1,9 @@
-from typing import Literal
+from typing import Annotated, Literal, Union
 
-from pydantic import BaseModel, PositiveInt, field_validator
+from pydantic import BaseModel, Field, PositiveInt, field_validator
 
 from gwsproto.named_types.channel_readings import ChannelReadings
+from gwsproto.named_types.channel_readings_compact import ChannelReadingsCompact
 from gwsproto.named_types.fsm_full_report import FsmFullReport
 from gwsproto.named_types.machine_states import MachineStates
 from gwsproto.property_format import (
@@ -20,7 +21,12 @@ class Report(BaseModel):
     AboutGNodeAlias: LeftRightDotStr
     SlotStartUnixS: UTCSeconds
     SlotDurationS: PositiveInt
-    ChannelReadingList: list[ChannelReadings]
+    ChannelReadingList: list[
+        Annotated[
+            Union[ChannelReadings, ChannelReadingsCompact],
+            Field(discriminator="TypeName"),
+        ]
+    ]
     StateList: list[MachineStates]
     FsmReportList: list[FsmFullReport]
     MessageCreatedMs: UTCMilliseconds
@@ -31,6 +37,35 @@ class Report(BaseModel):
     @field_validator("ChannelReadingList")
     @classmethod
     def _check_channel_reading_list(
-        cls, v: list[ChannelReadings]
-    ) -> list[ChannelReadings]:
+        cls, v: list[Union[ChannelReadings, ChannelReadingsCompact]]
+    ) -> list[Union[ChannelReadings, ChannelReadingsCompact]]:
         return v
+
+    def compacted(self) -> "Report":
+        """A copy with every ChannelReadings packed as ChannelReadingsCompact"""
+        return self.model_copy(
+            update={
+                "ChannelReadingList": [
+                    ChannelReadingsCompact.from_readings(r, self.SlotStartUnixS)
+                    if isinstance(r, ChannelReadings)
+                    else r
+                    for r in self.ChannelReadingList
+                ]
+            }
+        )
+
+    def expanded(self) -> "Report":
+        """A copy with every ChannelReadingsCompact decoded to ChannelReadings.
+        Returns self if there is nothing to decode."""
+        if all(isinstance(r, ChannelReadings) for r in self.ChannelReadingList):
+            return self
+        return self.model_copy(
+            update={
+                "ChannelReadingList": [
+                    r.to_readings(self.SlotStartUnixS)
+                    if isinstance(r, ChannelReadingsCompact)
+                    else r
+                    for r in self.ChannelReadingList
+                ]
+            }
+        )
@@ -1,4 +1,4 @@
-from typing import Literal
+from typing import Literal, Optional
 
 from pydantic import BaseModel
 
@@ -8,5 +8,8 @@ from gwsproto.property_format import LeftRightDotStr, UTCMilliseconds
 class SendLayout(BaseModel):
     FromGNodeAlias: LeftRightDotStr
     MessageCreatedMs: UTCMilliseconds
+    # Optional ChannelReadings encodings the sender can decode in a Report,
+    # e.g. channel_readings_compact.COMPACT_CHANNEL_READINGS_ENCODING
+    ReportEncodings: Optional[list[str]] = None
     TypeName: Literal["send.layout"] = "send.layout"
     Version: Literal["001"] = "001"
@@ -0,0 +1,23 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+from gwsproto.property_format import UTCMilliseconds
+
+
+class SlowCallback(BaseModel):
+    """
+    One event loop callback that ran longer than the slow callback threshold.
+
+    TaskName is the asyncio task that was running, if the callback was a
+    task step. Handler is the outermost function the loop called and Where
+    is the line the loop thread was on when the threshold was crossed.
+    """
+
+    TaskName: Optional[str] = None
+    Handler: str
+    Where: str
+    DurationMs: float
+    StartUnixMs: UTCMilliseconds
+    TypeName: Literal["slow.callback"] = "slow.callback"
+    Version: Literal["000"] = "000"
@@ -0,0 +1,66 @@
+from typing import List, Literal
+
+from pydantic import BaseModel, PositiveInt
+
+from gwsproto.named_types.single_machine_state import SingleMachineState
+from gwsproto.named_types.single_reading import SingleReading
+from gwsproto.named_types.snapshot_spaceheat import SnapshotSpaceheat
+from gwsproto.property_format import (
+    LeftRightDotStr,
+    SpaceheatName,
+    UTCMilliseconds,
+    UUID4Str,
+)
+
+
+class SnapshotSpaceheatDelta(BaseModel):
+    """
+    What changed since the SCADA's previous snapshot.
+
+    Sent between full SnapshotSpaceheat keyframes. Applies only on top of
+    the snapshot (keyframe or keyframe with earlier deltas applied) whose
+    SnapshotTimeUnixMs is BaseSnapshotTimeUnixMs; a receiver holding any
+    other snapshot has missed a message and should send SendSnap for a
+    new keyframe.
+    """
+
+    FromGNodeAlias: LeftRightDotStr
+    FromGNodeInstanceId: UUID4Str
+    SnapshotTimeUnixMs: UTCMilliseconds
+    BaseSnapshotTimeUnixMs: UTCMilliseconds
+    Seq: PositiveInt
+    ChangedReadingList: List[SingleReading]
+    DroppedChannelNames: List[SpaceheatName]
+    ChangedStateList: List[SingleMachineState]
+    TypeName: Literal["snapshot.spaceheat.delta"] = "snapshot.spaceheat.delta"
+    Version: Literal["000"] = "000"
+
+    def follows(self, base: SnapshotSpaceheat) -> bool:
+        return (
+            base.SnapshotTimeUnixMs == self.BaseSnapshotTimeUnixMs
+            and base.FromGNodeInstanceId == self.FromGNodeInstanceId
+        )
+
+    def apply(self, base: SnapshotSpaceheat) -> SnapshotSpaceheat:
+        """The snapshot after this delta. Raises ValueError if base is not
+        the snapshot this delta follows."""
+        if not self.follows(base):
+            raise ValueError(
+                f"Delta {self.Seq} follows snapshot {self.BaseSnapshotTimeUnixMs}, "
+                f"not {base.SnapshotTimeUnixMs}"
+            )
+        readings = {r.ChannelName: r for r in base.LatestReadingList}
+        for name in self.DroppedChannelNames:
+            readings.pop(name, None)
+        for reading in self.ChangedReadingList:
+            readings[reading.ChannelName] = reading
+        states = {s.MachineHandle: s for s in base.LatestStateList}
+        for state in self.ChangedStateList:
+            states[state.MachineHandle] = state
+        return SnapshotSpaceheat(
+            FromGNodeAlias=self.FromGNodeAlias,
+            FromGNodeInstanceId=self.FromGNodeInstanceId,
+            SnapshotTimeUnixMs=self.SnapshotTimeUnixMs,
+            LatestReadingList=list(readings.values()),
+            LatestStateList=list(states.values()),
+        )
@@ -0,0 +1,14 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel, NonNegativeInt
+
+from gwsproto.property_format import SpaceheatName
+
+
+class ThreadQueueDepth(BaseModel):
+    """Messages waiting in a SyncThreadActor's thread queue"""
+
+    ActorName: SpaceheatName
+    SyncQueueDepth: Optional[NonNegativeInt] = None
+    TypeName: Literal["thread.queue.depth"] = "thread.queue.depth"
+    Version: Literal["000"] = "000"
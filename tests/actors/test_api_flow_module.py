@@ -0,0 +1,229 @@
+"""Test ApiFlowModule ticklist processing against the original list-based version"""
+import copy
+import json
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from gwproto import Message
+from gwproactor_test.certs import copy_keys, uses_tls
+
+from actors.api_flow_module import ApiFlowModule
+from drivers.pipe_flow_sensor.signal_processing import butter_lowpass, filtering
+from drivers.pipe_flow_sensor.ticklist import fill_no_flow_gaps, tick_timestamps_ns
+from gwsproto.data_classes.house_0_names import H0N
+from gwsproto.enums import HzCalcMethod
+from gwsproto.named_types import ChannelReadings, SyncedReadings, TicklistHall
+from layout_gen import LayoutDb
+from layout_gen.flow import HallCfg, add_flow
+from scada_app import ScadaApp
+from tests.conftest import TEST_HARDWARE_LAYOUT_PATH
+
+HALL_HW_UID = "pico_hall_test"
+
+
+def reference_timestamps(first_tick_ns, relative_list, unit, delay_ns):
+    return sorted(list(set([first_tick_ns + x * unit + delay_ns for x in relative_list])))
+
+
+def reference_micro_hz(flow):
+    """The list-based get_micro_hz_readings this module used to run, minus
+    the single tick and glitch paths. Returns (values, unix ms)."""
+    gt = flow._component.gt
+    timestamps = sorted(flow.nano_timestamps)
+    frequencies = [1/(t2-t1)*1e9 for t1,t2 in zip(timestamps[:-1], timestamps[1:])]
+    timestamps = timestamps[:-1]
+    if not flow.slow_turner:
+        min_hz, max_hz = 0, 500
+        tf_pairs = [(t,f) for t,f in zip(timestamps, frequencies) if f<=max_hz and f>=min_hz]
+        timestamps = [x[0] for x in tf_pairs]
+        frequencies = [x[1] for x in tf_pairs]
+        if not timestamps:
+            return [], []
+        new_timestamps, new_frequencies = [], []
+        for i in range(len(timestamps) - 1):
+            new_timestamps.append(timestamps[i])
+            new_frequencies.append(frequencies[i])
+            if timestamps[i+1] - timestamps[i] > gt.NoFlowMs*1e6:
+                step_20ms = 0.02*1e9
+                while new_timestamps[-1] + step_20ms < timestamps[i+1]:
+                    new_timestamps.append(new_timestamps[-1] + step_20ms)
+                    new_frequencies.append(0.001)
+        new_timestamps.append(timestamps[-1])
+        new_frequencies.append(frequencies[-1])
+        sorted_times_values = sorted(zip(new_timestamps, new_frequencies))
+        timestamps, frequencies = zip(*sorted_times_values)
+    first_reading = False
+    if flow.latest_hz is None:
+        first_reading = True
+        flow.latest_hz = frequencies[0]
+    if flow.slow_turner:
+        flow.latest_hz = frequencies[-1]
+        return [int(x*1e6) for x in frequencies], [int(x/1e6) for x in timestamps]
+    elif gt.HzCalcMethod == HzCalcMethod.BasicExpWeightedAvg:
+        alpha = gt.ExpAlpha
+        smoothed_frequencies = [flow.latest_hz]*len(frequencies)
+        for t in range(len(frequencies)-1):
+            smoothed_frequencies[t+1] = (1-alpha)*smoothed_frequencies[t] + alpha*frequencies[t+1]
+        sampled_timestamps = timestamps
+    else:
+        timestamps = [timestamps[0]-0.01*1e9] + list(timestamps)
+        frequencies = [flow.latest_hz] + list(frequencies)
+        f_s = 5 * max(frequencies)
+        sampled_timestamps = np.linspace(min(timestamps), max(timestamps), int((max(timestamps)-min(timestamps))/1e9 * f_s))
+        sampled_frequencies = np.interp(sampled_timestamps, timestamps, frequencies)
+        b, a = butter_lowpass(N=5, Wn=gt.CutoffFrequency, fs=f_s)
+        smoothed_frequencies = filtering(b, a, sampled_frequencies)
+        smoothed_frequencies = [
+            smoothed_frequencies[i]
+            for i in range(len(smoothed_frequencies))
+            if sampled_timestamps[i]>=timestamps[1]
+        ]
+        sampled_timestamps = [x for x in sampled_timestamps if x>=timestamps[1]]
+    threshold_hz = gt.AsyncCaptureThresholdGpmTimes100 / 100 / 60 / gt.ConstantGallonsPerTick
+    if first_reading:
+        flow.latest_hz = smoothed_frequencies[0]
+    micro_hz_list = [int(flow.latest_hz * 1e6)]
+    unix_ms_times = [int(sampled_timestamps[0] / 1e6)]
+    for i in range(1, len(smoothed_frequencies)):
+        if abs(smoothed_frequencies[i] - micro_hz_list[-1]/1e6) > threshold_hz:
+            micro_hz_list.append(int(smoothed_frequencies[i] * 1e6))
+            unix_ms_times.append(int(sampled_timestamps[i] / 1e6))
+    flow.latest_hz = micro_hz_list[-1]/1e6
+    return [x if x>0 else 0 for x in micro_hz_list], unix_ms_times
+
+
+def fake_flow_module(hz_calc_method, gallons_per_tick=0.0009, latest_hz=None):
+    """Just the attributes get_micro_hz_readings reads"""
+    return SimpleNamespace(
+        _component=SimpleNamespace(
+            gt=SimpleNamespace(
+                HzCalcMethod=hz_calc_method,
+                ExpAlpha=0.3,
+                CutoffFrequency=1.5,
+                NoFlowMs=200,
+                AsyncCaptureThresholdGpmTimes100=5,
+                ConstantGallonsPerTick=gallons_per_tick,
+            )
+        ),
+        hz_channel=SimpleNamespace(Name="primary-flow-hz"),
+        slow_turner=gallons_per_tick > 0.5,
+        latest_hz=latest_hz,
+        latest_tick_ns=None,
+        nano_timestamps=None,
+        log=lambda note: None,
+        _send_to=lambda dst, payload: None,
+    )
+
+
+def hall_ticklist(num_ticks: int, seed: int):
+    """Relative microsecond ticks around 40 Hz, with duplicates, bursts of
+    noise and a couple of pauses long enough to need no-flow filling"""
+    rng = np.random.default_rng(seed)
+    periods_us = (1e6 / (40 + 10 * np.sin(np.arange(num_ticks) / 30))).astype(int)
+    periods_us[rng.integers(0, num_ticks, 5)] = 0
+    periods_us[rng.integers(0, num_ticks, 5)] = 500
+    periods_us[rng.integers(0, num_ticks, 2)] = 900_000
+    return np.cumsum(periods_us).tolist()
+
+
+def flow_module_app() -> ScadaApp:
+    """A ScadaApp whose layout is the test layout plus a hall flow module
+    on dist-flow"""
+    layout = json.loads(TEST_HARDWARE_LAYOUT_PATH.read_text())
+    db = LayoutDb()
+    db.misc["MyTerminalAssetGNode"] = layout["MyTerminalAssetGNode"]
+    add_flow(db, HallCfg(HwUid=HALL_HW_UID, ActorNodeName=H0N.dist_flow))
+    for list_name, entries in db.dict().items():
+        if isinstance(entries, list):
+            layout.setdefault(list_name, []).extend(entries)
+    settings = ScadaApp.get_settings()
+    settings.is_simulated = True
+    if uses_tls(settings):
+        copy_keys("scada", settings)
+    settings.paths.mkdirs()
+    settings.paths.hardware_layout.write_text(json.dumps(layout))
+    return ScadaApp(app_settings=settings).instantiate()
+
+
+def test_tick_timestamps_match_reference():
+    first_tick_ns = time.time_ns() - 5 * 10**9
+    relative = hall_ticklist(300, seed=1)
+    delay_ns = 123_456_789
+    new = tick_timestamps_ns(first_tick_ns, relative, unit_ns=1e3, delay_ns=delay_ns)
+    assert new.dtype == np.int64
+    assert new.tolist() == reference_timestamps(first_tick_ns, relative, 1e3, delay_ns)
+    new = tick_timestamps_ns(first_tick_ns, relative[:50], unit_ns=1e6, delay_ns=delay_ns)
+    assert new.tolist() == reference_timestamps(first_tick_ns, relative[:50], 1e6, delay_ns)
+
+
+def test_fill_no_flow_gaps():
+    ts = np.array([0, 10, 100_000_010, 100_000_020], dtype=np.int64)
+    hz = np.array([1.0, 2.0, 3.0, 4.0])
+    filled_ns, filled_hz = fill_no_flow_gaps(ts, hz, no_flow_ns=50e6, step_ns=20_000_000)
+    assert filled_ns.tolist() == [0, 10, 20_000_010, 40_000_010, 60_000_010, 80_000_010, 100_000_010, 100_000_020]
+    assert filled_hz.tolist() == [1.0, 2.0, 0.001, 0.001, 0.001, 0.001, 3.0, 4.0]
+
+
+@pytest.mark.parametrize(
+    "hz_calc_method, gallons_per_tick, latest_hz",
+    [
+        (HzCalcMethod.BasicExpWeightedAvg, 0.0009, None),
+        (HzCalcMethod.BasicExpWeightedAvg, 0.0009, 12.5),
+        (HzCalcMethod.BasicButterWorth, 0.0009, None),
+        (HzCalcMethod.BasicButterWorth, 0.0009, 30.0),
+        (HzCalcMethod.BasicExpWeightedAvg, 1.0, None),
+    ],
+)
+@pytest.mark.parametrize("num_ticks", [25, 400, 3000])
+def test_micro_hz_readings_match_reference(hz_calc_method, gallons_per_tick, latest_hz, num_ticks):
+    first_tick_ns = time.time_ns() - 60 * 10**9
+    relative = hall_ticklist(num_ticks, seed=num_ticks)
+    new = fake_flow_module(hz_calc_method, gallons_per_tick, latest_hz)
+    new.nano_timestamps = tick_timestamps_ns(first_tick_ns, relative, unit_ns=1e3, delay_ns=1000)
+    old = copy.deepcopy(new)
+    old.nano_timestamps = reference_timestamps(first_tick_ns, relative, 1e3, 1000)
+
+    readings = ApiFlowModule.get_micro_hz_readings(new)
+    values, unix_ms = reference_micro_hz(old)
+    assert readings.ValueList == values
+    assert readings.ScadaReadTimeUnixMsList == unix_ms
+    assert new.latest_hz == old.latest_hz
+    assert new.latest_tick_ns == old.nano_timestamps[-1]
+
+
+def test_flow_module_processes_ticklists():
+    app = flow_module_app()
+    flow = app.get_communicator(H0N.dist_flow)
+    assert isinstance(flow, ApiFlowModule)
+    sent = []
+    flow._send_to = lambda dst, payload, src=None: sent.append((dst.Name, payload))
+
+    def ticklist(relative_us: list[int]) -> Message:
+        now_ns = time.time_ns()
+        return Message(
+            Src=flow.name,
+            Dst=flow.name,
+            Payload=TicklistHall(
+                HwUid=HALL_HW_UID,
+                FirstTickTimestampNanoSecond=now_ns - 5 * 10**9 if relative_us else None,
+                RelativeMicrosecondList=relative_us,
+                PicoBeforePostTimestampNanoSecond=now_ns,
+            ),
+        )
+
+    # An empty ticklist before any flow publishes zero flow
+    assert flow.process_message(ticklist([])).is_ok()
+    assert flow.last_heard > time.time() - 5
+    (synced,) = [p for dst, p in sent if dst == H0N.primary_scada]
+    assert isinstance(synced, SyncedReadings)
+    assert synced.ValueList[0] == 0
+
+    sent.clear()
+    assert flow.process_message(ticklist(hall_ticklist(200, seed=7))).is_ok()
+    to_scada = [p for dst, p in sent if dst == H0N.primary_scada]
+    assert {p.ChannelName for p in to_scada} == {flow.gpm_channel.Name, flow.hz_channel.Name}
+    assert all(isinstance(p, ChannelReadings) and p.ValueList for p in to_scada)
+    assert flow.latest_gpm is not None
+    assert flow.latest_tick_ns == int(flow.nano_timestamps[-1])
@@ -8,7 +8,7 @@ from gwproactor_test.certs import copy_keys
 from actors import DerivedGenerator
 from actors.config import ScadaSettings
 from gwsproto.data_classes.house_0_names import H0N
-from gwsproto.named_types import ScadaParams
+from gwsproto.named_types import HeatingForecast, ScadaParams
 from scada_app import ScadaApp
 
 def test_ha1(monkeypatch, tmp_path):
@@ -59,6 +59,22 @@ def test_ha1(monkeypatch, tmp_path):
     # try something hotter
     assert derived.required_swt(required_kw_thermal=8) == 171.7
 
+    # discharge model is kept until params or the required swt change
+    hour_s = int(time.time()) // 3600 * 3600
+    derived.data.heating_forecast = HeatingForecast(
+        FromGNodeAlias=derived.layout.scada_g_node_alias,
+        Time=[hour_s + 3600 * (i + 1) for i in range(24)],
+        AvgPowerKw=[3] * 24,
+        RswtF=[130.5] * 24,
+        RswtDeltaTF=[9] * 24,
+        WeatherUid=str(uuid.uuid4()),
+    )
+    model = derived.discharge_model
+    assert model.required_swt == 130.5
+    assert derived.discharge_model is model
+    assert derived.rwt_f(140) == round(140 - derived.delta_T(140), 2)
+    assert derived.rwt_f(100) == 100
+
     # test getting new params from ltn, resulting in new rswt quad params
     new = derived.params.model_copy(update={"DdPowerKw": 10})
     params_from_ltn = ScadaParams(
@@ -81,6 +97,10 @@ def test_ha1(monkeypatch, tmp_path):
 
     # this changes required_swt etc
     assert derived.required_swt(required_kw_thermal=5.5) == 128.7
+    assert derived.discharge_model is not model
+    model = derived.discharge_model
+    derived.process_scada_params(s.ltn, params_from_ltn)
+    assert derived.discharge_model is not model
 
     # Todo: validate scada sends out ScadaParams message with
     # correct new params
@@ -0,0 +1,108 @@
+"""Test DischargeModel against the per-layer loops DerivedGenerator used to run"""
+import random
+
+import numpy as np
+import pytest
+
+from actors.discharge_model import DischargeModel, rswt_quadratic_params
+from gwsproto.named_types import Ha1Params
+
+
+def ha1_params(**update) -> Ha1Params:
+    return Ha1Params(
+        AlphaTimes10=55,
+        BetaTimes100=-10,
+        GammaEx6=0,
+        IntermediatePowerKw=1.5,
+        IntermediateRswtF=100,
+        DdPowerKw=5.5,
+        DdRswtF=150,
+        DdDeltaTF=20,
+        HpMaxKwEl=9.66,
+        MaxEwtF=170,
+        LoadOverestimationPercent=10,
+        CopIntercept=1.02,
+        CopOatCoeff=0.0257,
+        CopLwtCoeff=0,
+        CopMin=1.4,
+        CopMinOatF=15,
+    ).model_copy(update=update)
+
+
+def scalar_rwt_f(params: Ha1Params, required_swt: float, swt_f: float) -> float:
+    a, b, c = rswt_quadratic_params(params)
+
+    def delta_T(swt: float) -> float:
+        delivered_heat_power = a*swt**2 + b*swt + c
+        d = params.DdDeltaTF/params.DdPowerKw * delivered_heat_power
+        return d if d>0 else 0
+
+    if swt_f < required_swt - 10:
+        delta_t = 0
+    elif swt_f < required_swt:
+        delta_t = delta_T(required_swt) * (swt_f-(required_swt-10))/10
+    else:
+        delta_t = delta_T(swt_f)
+    return round(swt_f - delta_t,2)
+
+
+def scan_usable_kwh(rwt_f, layers_f: list[float], kwh_per_layer_f: float) -> float:
+    """The loop formerly in DerivedGenerator.update_usable_energy"""
+    usable_kwh = 0
+    while True:
+        hottest_f = layers_f[0]
+        rwt = rwt_f(hottest_f)
+        if round(hottest_f) == round(rwt):
+            layers_f = [sum(layers_f) / len(layers_f)] * len(layers_f)
+            if round(layers_f[0]) == round(rwt):
+                break
+        usable_kwh += kwh_per_layer_f * (hottest_f - rwt)
+        layers_f = layers_f[1:] + [rwt]
+    return usable_kwh
+
+
+def scan_max_storage_kwh(rwt_f, num_layers: int, start_f: float, kwh_per_layer_f: float) -> float:
+    """The loop formerly in DerivedGenerator.update_required_energy"""
+    layers = [start_f] * num_layers
+    max_storage_kwh = 0
+    while True:
+        if round(rwt_f(layers[0])) == round(layers[0]):
+            layers = [sum(layers)/len(layers) for x in layers]
+            if round(rwt_f(layers[0])) == round(layers[0]):
+                break
+        max_storage_kwh += kwh_per_layer_f * (layers[0] - rwt_f(layers[0]))
+        layers = layers[1:] + [rwt_f(layers[0])]
+    return max_storage_kwh
+
+
+@pytest.mark.parametrize("required_swt", [95.3, 128.7, 150, 171.7])
+@pytest.mark.parametrize("dd_power", [5.5, 10])
+def test_rwt_f_matches_scalar(required_swt, dd_power):
+    params = ha1_params(DdPowerKw=dd_power)
+    model = DischargeModel(params, required_swt)
+    swts = np.concatenate([np.arange(40, 220, 0.37), [required_swt - 10, required_swt]])
+    expected = [scalar_rwt_f(params, required_swt, x) for x in swts.tolist()]
+    assert model.rwt_f(swts).tolist() == expected
+    assert float(model.rwt_f(swts[7])) == expected[7]
+
+
+@pytest.mark.parametrize("required_swt", [95.3, 128.7, 150, 171.7])
+@pytest.mark.parametrize("num_layers", [3, 9])
+def test_discharge_simulations_match_scan(required_swt, num_layers):
+    params = ha1_params()
+    model = DischargeModel(params, required_swt)
+    rwt_f = lambda x: scalar_rwt_f(params, required_swt, x)  # noqa: E731
+    kwh_per_layer_f = 0.0974
+    rng = random.Random(num_layers * 1000 + int(required_swt))
+    for _ in range(20):
+        layers_f = sorted((rng.uniform(70, 180) for _ in range(num_layers)), reverse=True)
+        if rng.random() < 0.3:
+            layers_f = [round(x) for x in layers_f]
+        assert model.usable_kwh(layers_f, kwh_per_layer_f) == pytest.approx(
+            scan_usable_kwh(rwt_f, layers_f, kwh_per_layer_f), abs=1e-9
+        )
+    expected = scan_max_storage_kwh(rwt_f, num_layers, params.MaxEwtF + 10, kwh_per_layer_f)
+    assert model.max_storage_kwh(num_layers, params.MaxEwtF + 10, kwh_per_layer_f) == pytest.approx(expected, abs=1e-9)
+    # memoized
+    assert model.max_storage_kwh(num_layers, params.MaxEwtF + 10, kwh_per_layer_f) == pytest.approx(expected, abs=1e-9)
+    assert len(model._max_storage_kwh) == 1
@@ -0,0 +1,114 @@
+"""Test the LTN's segmented event archive, its reader and the replay CLI"""
+import json
+import shutil
+import time
+
+from typer.testing import CliRunner
+
+from actors.ltn.cli import app as ltn_cli_app
+from actors.ltn.event_archive import (
+    ACTIVE_SUFFIX,
+    INDEX_NAME,
+    SEGMENT_SUFFIX,
+    EventArchive,
+    EventArchiveReader,
+)
+
+T0_MS = 1_718_000_000_000
+
+
+def payload(i: int) -> str:
+    return json.dumps({"Index": i, "Note": "x" * 50}, separators=(",", ":"))
+
+
+def fill(archive: EventArchive, n: int, first: int = 0) -> None:
+    for i in range(first, first + n):
+        archive.append("report" if i % 10 == 0 else "gridworks.event.problem", T0_MS + 1000 * i, payload(i))
+
+
+def test_archive_round_trip(tmp_path):
+    archive = EventArchive(tmp_path, max_segment_bytes=2_000, flush_records=25)
+    fill(archive, 500)
+    archive.close()
+
+    segments = sorted(tmp_path.glob(f"*{SEGMENT_SUFFIX}"))
+    assert len(segments) > 1
+    assert not list(tmp_path.glob(f"*{ACTIVE_SUFFIX}"))
+    assert len((tmp_path / INDEX_NAME).read_text().splitlines()) == len(segments)
+
+    reader = EventArchiveReader(tmp_path)
+    records = list(reader.records())
+    assert [r.payload["Index"] for r in records] == list(range(500))
+    assert sum(s.records for s in reader.segments()) == 500
+
+    # time window [start, end)
+    window = list(reader.records(start_ms=T0_MS + 100_000, end_ms=T0_MS + 200_000))
+    assert [r.payload["Index"] for r in window] == list(range(100, 200))
+    assert len(reader.segments(start_ms=T0_MS + 100_000, end_ms=T0_MS + 200_000)) < len(segments)
+
+    reports = list(reader.records(type_names=["report"]))
+    assert [r.payload["Index"] for r in reports] == list(range(0, 500, 10))
+    assert reader.segments(type_names=["no.such.type"]) == []
+
+
+def test_archive_rolls_by_time(tmp_path):
+    archive = EventArchive(tmp_path, max_segment_s=0, flush_records=1)
+    fill(archive, 3)
+    assert len(list(tmp_path.glob(f"*{SEGMENT_SUFFIX}"))) == 3
+    archive.close()
+
+
+def test_archive_flushes_when_quiet(tmp_path):
+    archive = EventArchive(tmp_path, flush_records=100, flush_s=0.05, max_segment_s=0.2)
+    fill(archive, 3)
+    archive.flush_if_due()
+    assert list(EventArchiveReader(tmp_path).records()) == []
+
+    # no more appends: the periodic call writes the buffer, then rolls the segment
+    time.sleep(0.06)
+    archive.flush_if_due()
+    assert len(list(EventArchiveReader(tmp_path).records())) == 3
+    assert list(tmp_path.glob(f"*{ACTIVE_SUFFIX}"))
+    time.sleep(0.15)
+    archive.flush_if_due()
+    assert not list(tmp_path.glob(f"*{ACTIVE_SUFFIX}"))
+    assert len(list(tmp_path.glob(f"*{SEGMENT_SUFFIX}"))) == 1
+    archive.close()
+
+
+def test_archive_recovers_after_crash(tmp_path):
+    archive = EventArchive(tmp_path, flush_records=10)
+    fill(archive, 35)
+    # simulate a crash: the open segment is never finished and the last
+    # 5 records were still buffered
+    active = list(tmp_path.glob(f"*{ACTIVE_SUFFIX}"))
+    assert len(active) == 1
+    crashed = tmp_path / "crashed"
+    crashed.mkdir()
+    shutil.copy(active[0], crashed)
+
+    # readable while still in progress
+    assert len(list(EventArchiveReader(crashed).records())) == 30
+
+    reopened = EventArchive(crashed)
+    assert not list(crashed.glob(f"*{ACTIVE_SUFFIX}"))
+    fill(reopened, 5, first=35)
+    reopened.close()
+    indices = [r.payload["Index"] for r in EventArchiveReader(crashed).records()]
+    assert indices == list(range(30)) + list(range(35, 40))
+    archive.close()
+
+
+def test_archive_cli(tmp_path):
+    archive = EventArchive(tmp_path)
+    fill(archive, 30)
+    archive.close()
+    runner = CliRunner()
+    result = runner.invoke(
+        ltn_cli_app,
+        ["archive", "--archive-dir", str(tmp_path), "--type", "report", "--env-file", str(tmp_path / ".env")],
+    )
+    assert result.exit_code == 0, result.output
+    lines = [json.loads(line) for line in result.output.splitlines()]
+    assert [line["Payload"]["Index"] for line in lines] == [0, 10, 20]
+    assert all(line["TypeName"] == "report" for line in lines)
@@ -0,0 +1,189 @@
+"""Test the array FLO graph and the vectorized bid price sweep against the
+object graph loops they replaced"""
+import json
+import pickle
+import random
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from actors.ltn.dtypes import DEdge, DNode, FloGraph, segment_argmin
+from actors.ltn.flo import BidSweep, Flo, bid_prices_usd_mwh
+from gwsproto.named_types import BidRecommendation, FloParamsHouse0
+from tests.named_types.test_flo_params_house0 import flo_params_house0_dict
+
+
+def scan_pq_pairs(edges: list[DEdge], cop: float, prices: list[float]) -> list[tuple[int, int]]:
+    """The per-price loop formerly in Flo.generate_recommendation"""
+    pq_pairs = []
+    edge_cost = {}
+    for price_usd_mwh in prices:
+        for edge in edges:
+            edge_cost[edge] = edge.cost if edge.cost >= 1e4 else edge.hp_heat_out/cop * price_usd_mwh/1000
+        best_edge = min(edges, key=lambda e: e.head.pathcost + edge_cost[e])
+        best_quantity_kwh = max(0, best_edge.hp_heat_out/cop)
+        if not pq_pairs or (pq_pairs[-1][1] - int(best_quantity_kwh*1000) > 10):
+            pq_pairs.append((int(price_usd_mwh * 1000), int(best_quantity_kwh * 1000)))
+    return pq_pairs
+
+
+def synthetic_bid_edges(num_edges: int, seed: int) -> list[DEdge]:
+    rng = random.Random(seed)
+    params = SimpleNamespace(HorizonHours=48)  # all DNode reads
+    tail = DNode(params, time_slice=0)
+    edges = []
+    for i in range(num_edges):
+        head = DNode(params, time_slice=1)
+        hp_heat_out = rng.choice([0.0, -0.3, rng.uniform(0, 25), round(rng.uniform(0, 25), 1)])
+        # storage that ends up fuller has a cheaper future
+        head.pathcost = 40 - rng.uniform(0.01, 0.06) * hp_heat_out
+        cost = 1e5 if i % 17 == 5 else 0
+        edges.append(DEdge(tail, head, cost, hp_heat_out))
+    # exact duplicates: the first one must win
+    dup = edges[len(edges) // 2]
+    edges.append(DEdge(tail, dup.head, dup.cost, dup.hp_heat_out))
+    return edges
+
+
+@pytest.mark.parametrize("num_edges,seed", [(1, 0), (5, 1), (60, 2), (250, 3)])
+@pytest.mark.parametrize("forecasted_price", [52, 77.37, -100, 1999.5])
+def test_bid_sweep_matches_scan(num_edges, seed, forecasted_price):
+    cop = 2.63
+    edges = synthetic_bid_edges(num_edges, seed)
+    prices = bid_prices_usd_mwh(forecasted_price)
+    scalar_prices = sorted(list(range(-100, 2000)) + [forecasted_price])
+    assert prices.tolist() == scalar_prices
+    sweep = BidSweep.from_edges(edges, cop)
+    expected = scan_pq_pairs(edges, cop, scalar_prices)
+    if num_edges >= 60:
+        assert len(expected) > 3
+    assert [(pq.PriceX1000, pq.QuantityX1000) for pq in sweep.pq_pairs(prices)] == expected
+    best = sweep.best_edge_idx(prices[::97])
+    for price, idx in zip(prices[::97].tolist(), best):
+        assert edges[idx] is min(
+            edges,
+            key=lambda e: e.head.pathcost + (e.cost if e.cost >= 1e4 else e.hp_heat_out/cop * price/1000),
+        )
+
+
+def test_bid_sweep_resolution():
+    edges = synthetic_bid_edges(60, 4)
+    sweep = BidSweep.from_edges(edges, 3.1)
+    fine = bid_prices_usd_mwh(52, step_usd_mwh=0.125)
+    assert len(fine) == 2100 * 8 + 1
+    chunked = BidSweep.from_edges(edges, 3.1)
+    chunked.MAX_CELLS = 1000  # force several argmin chunks
+    assert np.array_equal(chunked.best_edge_idx(fine), sweep.best_edge_idx(fine))
+    pairs = [(pq.PriceX1000, pq.QuantityX1000) for pq in sweep.pq_pairs(fine)]
+    assert pairs == scan_pq_pairs(edges, 3.1, fine.tolist())
+    assert any(price % 1000 for price, _ in pairs[1:])
+    with pytest.raises(ValueError):
+        BidSweep.from_edges([], 3.1)
+
+
+def synthetic_flo_graph(horizon: int, num_states: int, max_edges: int, seed: int) -> FloGraph:
+    rng = np.random.default_rng(seed)
+    energy, edge_ptr, edge_head, edge_cost, edge_hp_heat_out = [], [], [], [], []
+    for t in range(horizon + 1):
+        energy.append(np.linspace(0, 40, num_states))
+        if t == horizon:
+            break
+        counts = rng.integers(0, max_edges + 1, num_states)
+        counts[0] = max(counts[0], 1)
+        edge_ptr.append(np.concatenate([[0], np.cumsum(counts)]))
+        heads = rng.integers(0, num_states, counts.sum())
+        edge_head.append(heads)
+        # coarse costs so there are ties for the first edge to win
+        edge_cost.append(rng.integers(0, 40, counts.sum()) / 8)
+        edge_hp_heat_out.append(rng.uniform(0, 12, counts.sum()))
+    return FloGraph(energy, edge_ptr, edge_head, edge_cost, edge_hp_heat_out, cop=rng.uniform(1.5, 4, horizon))
+
+
+def object_graph(graph: FloGraph) -> tuple[dict[int, list[DNode]], dict[DNode, list[DEdge]]]:
+    params = SimpleNamespace(HorizonHours=graph.horizon)
+    nodes = {t: [DNode(params, time_slice=t) for _ in range(graph.num_states(t))] for t in range(graph.horizon + 1)}
+    edges = {}
+    for t in range(graph.horizon):
+        for i, node in enumerate(nodes[t]):
+            edges[node] = [
+                DEdge(node, nodes[t + 1][graph.edge_head[t][e]], float(graph.edge_cost[t][e]), float(graph.edge_hp_heat_out[t][e]))
+                for e in range(graph.edge_ptr[t][i], graph.edge_ptr[t][i + 1])
+            ]
+    return nodes, edges
+
+
+def scan_solve(nodes: dict[int, list[DNode]], edges: dict[DNode, list[DEdge]], horizon: int) -> None:
+    """The per-node loop formerly in Flo.solve_dijkstra"""
+    for time_slice in range(horizon - 1, -1, -1):
+        for node in nodes[time_slice]:
+            if not edges[node]:
+                continue
+            best_edge = min(edges[node], key=lambda e: e.head.pathcost + e.cost)
+            node.pathcost = best_edge.head.pathcost + best_edge.cost
+            node.next_node = best_edge.head
+
+
+def test_segment_argmin():
+    values = np.array([3.0, 1.0, 1.0, 5.0, 2.0, 2.0, 7.0])
+    mins, arg = segment_argmin(values, np.array([0, 3, 3, 4, 6, 7]))
+    assert mins.tolist() == [1.0, np.inf, 5.0, 2.0, 7.0]
+    assert arg.tolist() == [1, -1, 3, 4, 6]
+    mins, arg = segment_argmin(np.empty(0), np.array([0, 0]))
+    assert arg.tolist() == [-1]
+
+
+@pytest.mark.parametrize("horizon,num_states,max_edges,seed", [(1, 3, 2, 0), (6, 40, 5, 1), (24, 120, 12, 2)])
+def test_flo_graph_solve_matches_scan(horizon, num_states, max_edges, seed):
+    graph = synthetic_flo_graph(horizon, num_states, max_edges, seed)
+    nodes, edges = object_graph(graph)
+    scan_solve(nodes, edges, horizon)
+    graph.solve()
+    for t in range(horizon + 1):
+        assert graph.pathcost[t].tolist() == [node.pathcost for node in nodes[t]]
+    index = {node: i for t in nodes for i, node in enumerate(nodes[t])}
+    for t in range(horizon):
+        heads = [graph.edge_head[t][e] if e >= 0 else None for e in graph.next_edge[t]]
+        assert heads == [index.get(node.next_node) for node in nodes[t]]
+
+    plan = graph.shortest_path_hp_kwh_el(0)
+    for i, node in enumerate(nodes[0]):
+        expected = []
+        for t in range(horizon):
+            if node.next_node is None:
+                break
+            edge = next(e for e in edges[node] if e.head is node.next_node and e.head.pathcost + e.cost == node.pathcost)
+            expected.append(np.float32(edge.hp_heat_out) / graph.cop[t])
+            node = node.next_node
+        assert plan[i, :len(expected)].tolist() == pytest.approx(expected)
+        assert np.isnan(plan[i, len(expected):]).all()
+
+
+def test_flo_trimmed_graph_bid_and_plan():
+    params = FloParamsHouse0.model_validate(flo_params_house0_dict())
+    params_bytes = params.model_dump_json().encode()
+    graph = synthetic_flo_graph(params.HorizonHours, 200, 20, 3)
+    nodes, edges = object_graph(graph)
+    scan_solve(nodes, edges, graph.horizon)
+
+    flo = Flo(params_bytes, graph=graph)
+    flo.solve_dijkstra()
+    flo.trim_graph_for_waiting()
+    assert flo.graph is None
+    trimmed_size = len(pickle.dumps(flo.trimmed_graph))
+    assert trimmed_size < 200_000
+    flo = pickle.loads(pickle.dumps(flo))
+
+    recommendation = BidRecommendation.model_validate(json.loads(flo.generate_recommendation(params_bytes)))
+    cop = params.COP(oat=params.OatForecastF[0])
+    initial_edges = edges[nodes[0][flo.initial_state]]
+    sweep = BidSweep.from_edges(initial_edges, cop)
+    prices = bid_prices_usd_mwh(params.total_price_forecast[0])
+    assert recommendation.PqPairs == sweep.pq_pairs(prices)
+
+    price = params.total_price_forecast[0]
+    next_node = flo.get_next_node_at_price(price)
+    best_edge = initial_edges[sweep.best_edge_idx([price])[0]]
+    assert next_node.energy == pytest.approx(graph.energy[1][nodes[1].index(best_edge.head)])
+    assert next_node.pathcost == best_edge.head.pathcost
+    assert len(next_node.shortest_path_hp_kwh_el) <= params.HorizonHours - 1
@@ -0,0 +1,159 @@
+"""Test the long-lived FLO worker process and the BidRunner that drives it"""
+import json
+import logging
+import time
+
+import pytest
+
+from actors.ltn.flo import Flo
+from actors.ltn.flo_worker import (
+    BUILD,
+    PLANS,
+    RECOMMEND,
+    FloWorker,
+    FloWorkerError,
+    flo_next_hour_plan,
+)
+from actors.ltn.ltn import BidRunner
+from gwproactor.message import PatInternalWatchdogMessage
+from gwproto import Message
+from gwsproto.enums import LogLevel
+from gwsproto.named_types import Bid, FloNextHourPlans, FloParamsHouse0, Glitch
+from tests.actors.test_flo import synthetic_flo_graph
+from tests.named_types.test_flo_params_house0 import flo_params_house0_dict
+
+
+def synthetic_flo(params_bytes: bytes) -> Flo:
+    params = FloParamsHouse0.model_validate_json(params_bytes)
+    return Flo(params_bytes, graph=synthetic_flo_graph(params.HorizonHours, 200, 20, 3))
+
+
+def slow_flo(params_bytes: bytes) -> Flo:
+    time.sleep(30)
+    return synthetic_flo(params_bytes)
+
+
+@pytest.fixture
+def params_bytes() -> bytes:
+    return FloParamsHouse0.model_validate(flo_params_house0_dict()).model_dump_json().encode()
+
+
+def local_results(params_bytes: bytes) -> tuple[bytes, tuple[float, list[float]]]:
+    flo = synthetic_flo(params_bytes)
+    flo.solve_dijkstra()
+    flo.trim_graph_for_waiting()
+    recommendation = flo.generate_recommendation(params_bytes)
+    return recommendation, flo_next_hour_plan(flo, 61.5)
+
+
+def test_flo_worker_phases(params_bytes):
+    expected_recommendation, expected_plan = local_results(params_bytes)
+    worker = FloWorker(max_runs=3, flo_factory=synthetic_flo)
+    try:
+        with pytest.raises(FloWorkerError):
+            worker.request(RECOMMEND, params_bytes)
+        pid = worker.pid
+        for run in range(2):
+            _, stats = worker.request(BUILD, params_bytes)
+            assert stats.pid == pid
+            assert stats.peak_rss_mb >= stats.rss_mb > 0
+            recommendation, _ = worker.request(RECOMMEND, params_bytes)
+            assert recommendation == expected_recommendation
+            plan, _ = worker.request(PLANS, 61.5)
+            assert plan == expected_plan
+            assert worker.finish_run() is not None
+            assert worker.runs == run + 1
+            assert worker.pid == pid
+        # the graph is gone after a run
+        with pytest.raises(FloWorkerError):
+            worker.request(PLANS, 61.5)
+    finally:
+        worker.stop()
+    assert not worker.is_alive()
+
+
+def test_flo_worker_recycling(params_bytes):
+    worker = FloWorker(max_runs=2, flo_factory=synthetic_flo)
+    try:
+        worker.request(BUILD, params_bytes)
+        first_pid = worker.pid
+        worker.finish_run()
+        worker.request(BUILD, params_bytes)
+        assert worker.pid == first_pid
+        worker.finish_run()
+        assert not worker.is_alive()
+        worker.request(BUILD, params_bytes)
+        assert worker.pid != first_pid
+        assert worker.runs == 0
+        worker.max_rss_mb = 0
+        worker.finish_run()
+        assert not worker.is_alive()
+        assert worker.finish_run() is None
+    finally:
+        worker.stop()
+
+
+def test_flo_worker_failures(params_bytes):
+    worker = FloWorker()
+    try:
+        # the local Flo stub cannot build its own graph
+        with pytest.raises(FloWorkerError, match="NotImplementedError"):
+            worker.request(BUILD, params_bytes)
+        assert worker.is_alive()
+        with pytest.raises(FloWorkerError, match="Unknown command"):
+            worker.request("bogus")
+    finally:
+        worker.stop()
+
+    pats = []
+    worker = FloWorker(flo_factory=slow_flo)
+    try:
+        with pytest.raises(FloWorkerError, match="timed out"):
+            worker.request(BUILD, params_bytes, timeout_s=0.1, max_total_s=1, pat_watchdog=lambda: pats.append(1))
+        assert pats
+        assert not worker.is_alive()
+    finally:
+        worker.stop()
+
+
+def test_bid_runner(params_bytes):
+    expected_recommendation, (expected_storage, expected_plan) = local_results(params_bytes)
+    params = FloParamsHouse0.model_validate_json(params_bytes)
+    sent = []
+    completed = []
+    worker = FloWorker(flo_factory=synthetic_flo)
+    runner = BidRunner(
+        params=params,
+        settings=None,
+        io_loop_manager_name="io_loop_manager",
+        ltn_name="ltn",
+        ltn_g_node_alias="hw1.isone.me.versant.keene.beech.ltn",
+        send_threadsafe=sent.append,
+        on_complete=completed.append,
+        flo_worker=worker,
+        logger=logging.getLogger("test_bid_runner"),
+    )
+    try:
+        runner.get_bid(params)
+        runner.get_next_hour_plans(61.5)
+        runner.run()
+        assert completed == ["ltn"]
+        payloads = [m.Payload for m in sent if isinstance(m, Message)]
+        assert all(
+            isinstance(m, PatInternalWatchdogMessage) for m in sent if not isinstance(m, Message)
+        )
+        bid, plans, glitch = payloads
+        assert isinstance(bid, Bid)
+        assert [pq.model_dump() for pq in bid.PqPairs] == json.loads(expected_recommendation)["PqPairs"]
+        assert isinstance(plans, FloNextHourPlans)
+        assert plans.ExpectedStorageKwhAtHour1 == expected_storage
+        assert plans.HourlyHpKwhElPlan == expected_plan
+        assert isinstance(glitch, Glitch)
+        assert glitch.Type == LogLevel.Info
+        for phase in (BUILD, RECOMMEND, PLANS):
+            assert phase in glitch.Details
+        # the worker outlives the runner, ready for the next slot
+        assert worker.is_alive()
+        assert worker.runs == 1
+    finally:
+        worker.stop()
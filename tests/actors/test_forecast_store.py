@@ -0,0 +1,213 @@
+"""Test the SQLite forecast store, the fetcher and DerivedGenerator's weather"""
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from actors import DerivedGenerator
+from actors.config import ScadaSettings
+from actors.forecast_store import (
+    FALLBACK_WEATHER_CHANNEL,
+    HOUR_S,
+    PRICE,
+    WEATHER,
+    ForecastFetcher,
+    ForecastStore,
+    HourlyForecast,
+    StubSource,
+    hour_start,
+)
+from actors.ltn.ltn import Ltn
+from gwsproto.data_classes.house_0_names import H0N
+from gwsproto.named_types import WeatherForecast
+from scada_app import ScadaApp
+
+SCADA_ALIAS = "d1.isone.ver.keene.holly.scada"
+
+
+def weather(first_hour_s: int, hours: int, oat: float = 20.0) -> HourlyForecast:
+    return HourlyForecast(
+        WEATHER,
+        [first_hour_s + HOUR_S * i for i in range(hours)],
+        {"oat": [oat + i for i in range(hours)], "ws": [5.0] * hours},
+    )
+
+
+def test_store(tmp_path):
+    store = ForecastStore(tmp_path / "forecasts.sqlite", retention_hours=24)
+    now_hour_s = hour_start(time.time())
+    store.put(weather(now_hour_s, 48), fetched_s=now_hour_s)
+
+    assert store.hour(WEATHER, now_hour_s + 1800) == {"oat": 20.0, "ws": 5.0}
+    assert store.hour(WEATHER, now_hour_s + 48 * HOUR_S) is None
+    assert store.hour(PRICE, now_hour_s) is None
+    assert store.fetched_s(WEATHER) == now_hour_s
+    assert store.fetched_s(PRICE) is None
+
+    window = store.hours(WEATHER, now_hour_s + HOUR_S, 48)
+    assert len(window) == 47
+    assert window.hour_start_s[0] == now_hour_s + HOUR_S
+    assert window.fields["oat"][:2] == [21.0, 22.0]
+
+    # a newer forecast replaces overlapping hours and keeps the rest
+    store.put(weather(now_hour_s + 10 * HOUR_S, 2, oat=-5), fetched_s=now_hour_s + 10)
+    assert store.hour(WEATHER, now_hour_s + 10 * HOUR_S)["oat"] == -5
+    assert store.hour(WEATHER, now_hour_s + 12 * HOUR_S)["oat"] == 32
+    assert store.fetched_s(WEATHER) == now_hour_s + 10
+
+    # hours older than the retention are dropped on the next put
+    store.put(weather(now_hour_s + 40 * HOUR_S, 1), fetched_s=now_hour_s + 30 * HOUR_S)
+    assert store.hour(WEATHER, now_hour_s) is None
+    assert store.hour(WEATHER, now_hour_s + 6 * HOUR_S) is not None
+
+    # a malformed forecast leaves the store untouched
+    with pytest.raises(ValueError):
+        store.put(HourlyForecast(WEATHER, [now_hour_s], {"oat": [1.0, 2.0]}))
+    assert store.hour(WEATHER, now_hour_s + 40 * HOUR_S)["oat"] == 20
+
+    # values survive reopening the file
+    store.close()
+    reopened = ForecastStore(tmp_path / "forecasts.sqlite")
+    assert reopened.hour(WEATHER, now_hour_s + 40 * HOUR_S) == {"oat": 20.0, "ws": 5.0}
+    reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_fetcher(tmp_path):
+    now_hour_s = hour_start(time.time())
+    fetcher = ForecastFetcher(
+        ForecastStore(tmp_path / "forecasts.sqlite"),
+        [StubSource(WEATHER, weather(now_hour_s, 3)), StubSource(PRICE)],
+    )
+    assert not fetcher.is_fresh(WEATHER, 3600)
+    forecast = await fetcher.fetch(WEATHER, session=None)
+    assert forecast == weather(now_hour_s, 3)
+    assert fetcher.store.hours(WEATHER, now_hour_s, 3) == forecast
+    assert fetcher.is_fresh(WEATHER, 3600)
+    assert not fetcher.is_fresh(WEATHER, 3600, now_s=time.time() + 2 * 3600)
+
+    # a failing source stores nothing
+    assert await fetcher.fetch(PRICE, session=None) is None
+    assert fetcher.store.fetched_s(PRICE) is None
+
+    fetcher.set_source(StubSource(PRICE, HourlyForecast(PRICE, [now_hour_s], {"dist": [40.0], "lmp": [60.0]})))
+    assert await fetcher.fetch(PRICE, session=None) is not None
+    assert fetcher.store.hour(PRICE, int(time.time())) == {"dist": 40.0, "lmp": 60.0}
+
+    # forecasts forwarded by message go to the same store, without
+    # counting as a fetch of our own
+    fetched_s = fetcher.store.fetched_s(WEATHER)
+    assert fetcher.store_fields(
+        WEATHER, [now_hour_s + 5 * HOUR_S], {"oat": [7], "ws": [0]}, fetched_s=fetched_s + 1
+    )
+    assert fetcher.store.hour(WEATHER, now_hour_s + 5 * HOUR_S) == {"oat": 7.0, "ws": 0.0}
+    assert fetcher.store.fetched_s(WEATHER) == fetched_s
+    assert fetcher.store.forwarded_s(WEATHER) == fetched_s + 1
+    later_s = fetched_s + 2 * 3600
+    assert not fetcher.is_fresh(WEATHER, 3600, now_s=later_s)
+    assert fetcher.is_fresh(WEATHER, 3600, now_s=later_s, include_forwarded=True)
+    # a forwarded copy older than our own fetch is not stored
+    assert not fetcher.store_fields(
+        WEATHER, [now_hour_s + 5 * HOUR_S], {"oat": [8], "ws": [0]}, fetched_s=fetched_s - 1
+    )
+    assert fetcher.store.hour(WEATHER, now_hour_s + 5 * HOUR_S)["oat"] == 7
+    fetcher.store.close()
+
+
+@pytest.mark.asyncio
+async def test_derived_generator_weather(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    Path(".env").touch()
+    scada_app = ScadaApp(app_settings=ScadaSettings(is_simulated=True))
+    scada_app.settings.paths.mkdirs()
+    scada_app.instantiate()
+    derived = DerivedGenerator(H0N.derived_generator, services=scada_app)
+    next_hour_s = hour_start(time.time()) + HOUR_S
+
+    derived.forecast_fetcher.set_source(StubSource(WEATHER, weather(next_hour_s, 96)))
+    await derived.get_weather(session=None)
+    assert derived.weather_forecast.Time == [next_hour_s + HOUR_S * i for i in range(48)]
+    assert derived.weather_forecast.OatF[0] == 20
+
+    # the API is down: fall back to the stored forecast, dated when it was fetched
+    derived.forecast_fetcher.set_source(StubSource(WEATHER))
+    await derived.get_weather(session=None)
+    assert derived.weather_forecast.OatF[0] == 20
+    assert derived.weather_forecast.ForecastCreatedS == derived.forecast_fetcher.store.fetched_s(WEATHER)
+
+    # nothing usable stored: coldest of the month
+    derived.forecast_fetcher.store.close()
+    (scada_app.settings.paths.data_dir / "forecasts.sqlite").unlink()
+    derived._forecast_fetcher = None
+    derived.forecast_fetcher.set_source(StubSource(WEATHER))
+    await derived.get_weather(session=None)
+    assert len(set(derived.weather_forecast.OatF)) == 1
+    assert len(derived.weather_forecast.Time) == 48
+    assert derived.weather_forecast.WeatherChannelName == FALLBACK_WEATHER_CHANNEL
+
+    # ... which is not forwarded to the LTN
+    sent = []
+    derived._send_to = lambda dst, payload, src=None: sent.append(payload)
+    derived.first_required_energy_update_done = True
+    await derived.get_forecasts(session=None)
+    assert sent
+    assert not any(isinstance(payload, WeatherForecast) for payload in sent)
+
+
+class CountingSource(StubSource):
+    def __init__(self, name: str, forecast: HourlyForecast):
+        super().__init__(name, forecast)
+        self.fetches = 0
+
+    async def fetch(self, session):
+        self.fetches += 1
+        return await super().fetch(session)
+
+
+@pytest.mark.asyncio
+async def test_ltn_weather_after_scada_fallback(tmp_path):
+    """SCADA's fetch failed and it forwarded its coldest-of-the-month
+    fallback: the LTN must not store it, and must fetch for itself once
+    SCADA's last real forecast is stale"""
+    next_hour_s = hour_start(time.time()) + HOUR_S
+    source = CountingSource(WEATHER, weather(next_hour_s, 48, oat=30))
+    fetcher = ForecastFetcher(ForecastStore(tmp_path / "forecasts.sqlite"), [source])
+    logs = []
+    ltn = SimpleNamespace(
+        forecast_fetcher=fetcher,
+        log=logs.append,
+        WEATHER_MAX_AGE_S=Ltn.WEATHER_MAX_AGE_S,
+        coldest_oat_by_month=[-3] * 12,
+        weather_forecast=None,
+    )
+
+    def scada_forecast(oat: float, channel: str, created_s: int) -> WeatherForecast:
+        return WeatherForecast(
+            FromGNodeAlias=SCADA_ALIAS,
+            WeatherChannelName=channel,
+            Time=[next_hour_s + HOUR_S * i for i in range(48)],
+            OatF=[oat] * 48,
+            WindSpeedMph=[0] * 48,
+            ForecastCreatedS=created_s,
+        )
+
+    # A fresh real forecast from SCADA: stored, and the LTN does not fetch
+    Ltn.process_weather_forecast(ltn, scada_forecast(10, "weather.gov.kmlt", int(time.time())))
+    assert fetcher.store.fetched_s(WEATHER) is None
+    await Ltn.get_weather(ltn, session=None)
+    assert source.fetches == 0
+    assert ltn.weather_forecast["oat"] == [10] * 48
+
+    # SCADA's fetch failed: its fallback is ignored
+    Ltn.process_weather_forecast(ltn, scada_forecast(-7, FALLBACK_WEATHER_CHANNEL, int(time.time())))
+    assert fetcher.store.hour(WEATHER, next_hour_s)["oat"] == 10
+    assert any("fallback" in note for note in logs)
+
+    # Once SCADA's real copy is stale the LTN asks api.weather.gov itself
+    stale_s = int(time.time()) - 2 * Ltn.WEATHER_MAX_AGE_S
+    fetcher.store.put(weather(next_hour_s, 48, oat=10), fetched_s=stale_s, forwarded=True)
+    await Ltn.get_weather(ltn, session=None)
+    assert source.fetches == 1
+    assert ltn.weather_forecast["oat"][0] == 30
+    fetcher.store.close()
@@ -0,0 +1,120 @@
+"""I2cRelayMultiplexer against the simulated PCF8575 bus"""
+import asyncio
+import time
+import uuid
+
+from gwsproto.enums import ChangeRelayPin, RelayEnergizationState
+from gwsproto.named_types import ActuatorsReady, FsmAtomicReport, FsmEvent, SingleReading
+
+from actors.i2c_relay_multiplexer import I2cRelayMultiplexer, board_from_gw_idx, gw_to_pin
+from drivers.i2c.pcf8575_backend import PORT_ALL_HIGH, SimulatedPcf8575Backend
+from tests.utils.scada_replay import make_scada_app
+
+
+def make_multiplexer(backend: SimulatedPcf8575Backend) -> tuple[I2cRelayMultiplexer, list]:
+    app = make_scada_app()
+    multiplexer = next(
+        communicator
+        for communicator in map(app.get_communicator, app.get_communicator_names())
+        if isinstance(communicator, I2cRelayMultiplexer)
+    )
+    multiplexer.pcf_backend = backend
+    sent = []
+    multiplexer._send_to = lambda dst, payload, *args, **kwargs: sent.append(payload)
+    multiplexer._send = lambda message: None
+    multiplexer.services.add_task = lambda task: task.cancel()
+    return multiplexer, sent
+
+
+def pin_event(multiplexer: I2cRelayMultiplexer, relay_idx: int, event: ChangeRelayPin) -> FsmEvent:
+    relay = next(r for r in multiplexer.my_relays if multiplexer.get_idx(r) == relay_idx)
+    return FsmEvent(
+        FromHandle=relay.handle,
+        ToHandle=multiplexer.node.handle,
+        EventType=ChangeRelayPin.enum_name(),
+        EventName=event.value,
+        TriggerId=str(uuid.uuid4()),
+        SendTimeUnixMs=int(time.time() * 1000),
+    )
+
+
+def test_burst_is_one_write_per_board():
+    async def run() -> None:
+        backend = SimulatedPcf8575Backend()
+        multiplexer, sent = make_multiplexer(backend)
+        await multiplexer.initialize_boards()
+        assert backend.writes == 2
+        assert all(board.port == PORT_ALL_HIGH for board in backend.boards.values())
+        assert any(isinstance(m, ActuatorsReady) for m in sent)
+        sent.clear()
+
+        indices = sorted(multiplexer.get_idx(r) for r in multiplexer.my_relays)
+        for idx in indices:
+            multiplexer._process_event_message(pin_event(multiplexer, idx, ChangeRelayPin.Energize))
+        # nothing goes on the bus until the loop turns over
+        assert backend.writes == 2
+        await asyncio.sleep(0)
+        boards_touched = {board_from_gw_idx(idx) for idx in indices}
+        assert backend.writes == 2 + len(boards_touched)
+        for idx in indices:
+            assert multiplexer.relay_state[idx] == RelayEnergizationState.Energized
+            assert not multiplexer.port_shadow[board_from_gw_idx(idx)] & (1 << gw_to_pin(idx))
+        for board_idx, board in multiplexer.krida_board.items():
+            assert board.port == multiplexer.port_shadow[board_idx]
+        readings = [m for m in sent if isinstance(m, SingleReading)]
+        reports = [m for m in sent if isinstance(m, FsmAtomicReport)]
+        assert len(readings) == len(reports) == len(indices)
+        assert all(r.Value == RelayEnergizationState.Energized.value for r in readings)
+
+        # energize then de-energize in one tick: last one wins
+        idx = indices[0]
+        multiplexer._process_event_message(pin_event(multiplexer, idx, ChangeRelayPin.DeEnergize))
+        multiplexer._process_event_message(pin_event(multiplexer, idx, ChangeRelayPin.Energize))
+        multiplexer._process_event_message(pin_event(multiplexer, idx, ChangeRelayPin.DeEnergize))
+        await asyncio.sleep(0)
+        assert backend.writes == 3 + len(boards_touched)
+        assert multiplexer.relay_state[idx] == RelayEnergizationState.DeEnergized
+
+    asyncio.run(run())
+
+
+def test_verify_rewrites_only_on_mismatch():
+    async def run() -> None:
+        backend = SimulatedPcf8575Backend()
+        multiplexer, _ = make_multiplexer(backend)
+        await multiplexer.initialize_boards()
+        writes = backend.writes
+        multiplexer.verify_ports()
+        assert backend.reads == 2
+        assert backend.writes == writes
+
+        board = multiplexer.krida_board[1]
+        board.port = 0
+        multiplexer.verify_ports()
+        assert backend.writes == writes + 1
+        assert board.port == multiplexer.port_shadow[1]
+
+        # a failing board is logged, not raised, and the other is still checked
+        board.fail = True
+        multiplexer.verify_ports()
+        assert backend.reads == 5
+
+    asyncio.run(run())
+
+
+def test_failed_write_drops_pending_changes():
+    async def run() -> None:
+        backend = SimulatedPcf8575Backend()
+        multiplexer, sent = make_multiplexer(backend)
+        await multiplexer.initialize_boards()
+        sent.clear()
+        idx = min(multiplexer.get_idx(r) for r in multiplexer.my_relays)
+        board_idx = board_from_gw_idx(idx)
+        multiplexer.krida_board[board_idx].fail = True
+        multiplexer._process_event_message(pin_event(multiplexer, idx, ChangeRelayPin.Energize))
+        await asyncio.sleep(0)
+        assert multiplexer.relay_state[idx] == RelayEnergizationState.DeEnergized
+        assert multiplexer.port_shadow[board_idx] == PORT_ALL_HIGH
+        assert not sent
+
+    asyncio.run(run())
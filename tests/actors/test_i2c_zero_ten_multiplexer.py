@@ -0,0 +1,73 @@
+"""I2cZeroTenMultiplexer against the simulated smbus backend"""
+from gwsproto.named_types import Glitch, SingleReading
+
+from actors.i2c_zero_ten_multiplexer import I2cZeroTenMultiplexer
+from drivers.i2c.gp8403_backend import SimulatedSmbusBackend, gp8403_data
+from tests.utils.scada_replay import make_scada_app
+
+
+def make_multiplexer(backend: SimulatedSmbusBackend) -> tuple[I2cZeroTenMultiplexer, list]:
+    app = make_scada_app()
+    multiplexer = next(
+        communicator
+        for communicator in map(app.get_communicator, app.get_communicator_names())
+        if isinstance(communicator, I2cZeroTenMultiplexer)
+    )
+    multiplexer.smbus_backend = backend
+    sent = []
+    multiplexer._send_to = lambda dst, payload, *args, **kwargs: sent.append(payload)
+    multiplexer.initialize_board()
+    return multiplexer, sent
+
+
+def test_writes_only_on_change():
+    backend = SimulatedSmbusBackend()
+    multiplexer, sent = make_multiplexer(backend)
+    dfr = multiplexer.my_dfrs[0]
+    register = multiplexer.get_register(dfr)
+    writes = backend.bus.writes[register]
+
+    multiplexer.set_level(dfr, 42)
+    assert backend.bus.writes[register] == writes + 1
+    assert backend.bus.registers[register] == gp8403_data(42)
+    multiplexer.set_level(dfr, 42)
+    assert backend.bus.writes[register] == writes + 1
+    multiplexer.set_level(dfr, 43)
+    assert backend.bus.writes[register] == writes + 2
+    assert multiplexer.write_counts[dfr.name] == writes + 2
+    # the reading still goes out for every dispatch
+    assert sum(isinstance(m, SingleReading) for m in sent) >= 3
+
+
+def test_refresh_rewrites_every_output():
+    backend = SimulatedSmbusBackend()
+    multiplexer, _ = make_multiplexer(backend)
+    total = sum(backend.bus.writes.values())
+    multiplexer.refresh()
+    assert sum(backend.bus.writes.values()) == total + len(multiplexer.my_dfrs)
+    for dfr in multiplexer.my_dfrs:
+        register = multiplexer.get_register(dfr)
+        assert backend.bus.registers[register] == gp8403_data(multiplexer.dfr_val[dfr.name])
+
+
+def test_failed_write_is_counted_and_retried():
+    backend = SimulatedSmbusBackend()
+    multiplexer, sent = make_multiplexer(backend)
+    dfr = multiplexer.my_dfrs[0]
+    address, register = multiplexer.get_register(dfr)
+
+    backend.bus.fail.add(address)
+    sent.clear()
+    multiplexer.set_level(dfr, 77)
+    assert multiplexer.i2c_errors[dfr.name] == 1
+    assert multiplexer.resend_dfr[dfr.name]
+    assert (address, register) not in multiplexer.committed
+    assert not sent
+
+    multiplexer.refresh()
+    assert any(isinstance(m, Glitch) for m in sent)
+
+    backend.bus.fail.clear()
+    multiplexer.set_level(dfr, 77)
+    assert backend.bus.registers[(address, register)] == gp8403_data(77)
+    assert not multiplexer.resend_dfr[dfr.name]
@@ -0,0 +1,90 @@
+"""LoopMonitor lag probe, slow callback detection and actor timing"""
+import asyncio
+import json
+import time
+
+from gwsproto.named_types import LoopHealth
+
+from actors.i2c_relay_multiplexer import I2cRelayMultiplexer
+from actors.loop_monitor import BUCKET_UPPER_MS, LoopMonitor
+from tests.utils.scada_replay import make_scada_app
+
+ALIAS = "d1.isone.ver.keene.holly.scada"
+
+
+class FakeActor:
+    name = "fake-actor"
+
+    def __init__(self) -> None:
+        self.seen = []
+
+    def process_message(self, message) -> None:
+        self.seen.append(message)
+        if message == "slow":
+            time.sleep(0.02)
+
+
+def test_actor_timing():
+    monitor = LoopMonitor("s")
+    actor = FakeActor()
+    monitor.instrument(actor)
+    monitor.instrument(actor)  # no double wrapping
+    actor.process_message("fast")
+    actor.process_message("slow")
+    assert actor.seen == ["fast", "slow"]
+    histogram = monitor.actor_timing[actor.name]
+    assert histogram.samples == 2
+    assert histogram.max_ms >= 20
+    assert len(histogram.counts) == len(BUCKET_UPPER_MS) + 1
+
+    health = monitor.snapshot(ALIAS)
+    (timing,) = health.ActorTimingList
+    assert (timing.ActorName, timing.Messages) == (actor.name, 2)
+    assert sum(timing.BucketCountList) == 2
+    # snapshot starts a new period
+    assert monitor.snapshot(ALIAS).ActorTimingList[0].Messages == 0
+
+
+def test_slow_callback_detection():
+    def block_the_loop() -> None:
+        time.sleep(0.3)
+
+    async def blocking_task() -> None:
+        await asyncio.sleep(0.1)
+        block_the_loop()
+
+    async def run() -> LoopHealth:
+        monitor = LoopMonitor("s", probe_interval_s=0.02, slow_callback_s=0.05)
+        monitor.start()
+        await asyncio.create_task(blocking_task(), name="blocker")
+        await asyncio.sleep(0.1)
+        monitor.stop()
+        return monitor.snapshot(ALIAS)
+
+    health = asyncio.run(run())
+    assert health.LagSamples > 3
+    assert health.MaxLagMs >= 200
+    assert health.SlowCallbackList
+    slow = health.SlowCallbackList[0]
+    assert slow.TaskName == "blocker"
+    assert slow.Handler == "test_slow_callback_detection.<locals>.blocking_task"
+    assert "block_the_loop" in slow.Where
+    # round trips as a named type
+    assert LoopHealth.model_validate_json(health.model_dump_json()) == health
+
+
+def test_scada_app_is_instrumented():
+    app = make_scada_app()
+    monitor = app.loop_monitor
+    multiplexer = next(
+        communicator
+        for communicator in map(app.get_communicator, app.get_communicator_names())
+        if isinstance(communicator, I2cRelayMultiplexer)
+    )
+    assert multiplexer.name in monitor.actor_timing
+    assert app.scada.name in monitor.actor_timing
+
+    response = asyncio.run(app.scada._handle_loop_health(None))
+    health = LoopHealth.model_validate(json.loads(response.text))
+    assert health.AppName == "s"
+    assert {t.ActorName for t in health.ActorTimingList} >= {multiplexer.name, app.scada.name}
@@ -0,0 +1,88 @@
+"""Test MessageDispatcher and its use by Scada"""
+import time
+
+import pytest
+from gwproactor_test.certs import copy_keys, uses_tls
+
+from actors.config import ScadaSettings
+from actors.message_dispatcher import DispatchErrorPolicy, MessageDispatcher
+from gwsproto.data_classes.house_0_names import H0CN
+from gwsproto.named_types import SingleReading, SyncedReadings, WakeUp
+from scada_app import ScadaApp
+
+
+def test_message_dispatcher():
+    errors = []
+    received = []
+    dispatcher = MessageDispatcher(on_error=errors.append)
+    dispatcher.register(WakeUp, lambda from_node, payload: received.append(payload))
+
+    def bad_handler(from_node, payload):
+        raise ValueError("bad reading")
+
+    dispatcher.register(SingleReading, bad_handler)
+    dispatcher.register(
+        SyncedReadings, bad_handler, error_policy=DispatchErrorPolicy.Raise
+    )
+    with pytest.raises(ValueError):
+        dispatcher.register(WakeUp, bad_handler)
+
+    wake_up = WakeUp(ToName="h")
+    assert dispatcher.dispatch(None, wake_up)
+    assert received == [wake_up]
+
+    # Log policy: exception counted and reported, not raised
+    reading = SingleReading(ChannelName="x", Value=1, ScadaReadTimeUnixMs=int(time.time() * 1000))
+    assert dispatcher.dispatch(None, reading)
+    assert len(errors) == 1
+    assert "SingleReading" in errors[0]
+
+    # Raise policy: exception counted and re-raised
+    synced = SyncedReadings(ChannelNameList=["x"], ValueList=[1], ScadaReadTimeUnixMs=reading.ScadaReadTimeUnixMs)
+    with pytest.raises(ValueError):
+        dispatcher.dispatch(None, synced)
+
+    # No handler
+    assert not dispatcher.dispatch(None, "not a named type")
+    assert not dispatcher.handles("not a named type")
+
+    stats = dispatcher.stats()
+    assert stats["WakeUp"].calls == 1
+    assert stats["WakeUp"].exceptions == 0
+    assert stats["SingleReading"].calls == 1
+    assert stats["SingleReading"].exceptions == 1
+    assert stats["SyncedReadings"].exceptions == 1
+    assert all(s.seconds >= 0 for s in stats.values())
+
+    dispatcher.reset_stats()
+    assert all(s.calls == 0 for s in dispatcher.stats().values())
+
+
+def test_scada_message_handler_stats():
+    scada_app = ScadaApp(app_settings=ScadaSettings(is_simulated=True))
+    settings = scada_app.settings
+    if uses_tls(settings):
+        copy_keys("scada", settings)
+    settings.paths.mkdirs()
+    scada_app.instantiate()
+    scada = scada_app.scada
+    from_node = scada.layout.node(scada.layout.channel(H0CN.store_pump_pwr).CapturedByNodeName)
+    now_ms = int(time.time() * 1000)
+    scada.process_scada_message(
+        from_node,
+        SingleReading(ChannelName=H0CN.store_pump_pwr, Value=43, ScadaReadTimeUnixMs=now_ms),
+    )
+    assert scada.data.latest_channel_values[H0CN.store_pump_pwr] == 43
+
+    # unknown channel: logged and counted, not raised
+    scada.process_scada_message(
+        from_node,
+        SingleReading(ChannelName="not-a-channel", Value=1, ScadaReadTimeUnixMs=now_ms),
+    )
+    stats = scada.message_handler_stats()
+    assert stats["SingleReading"].calls == 2
+    assert stats["SingleReading"].exceptions == 1
+    assert stats["PowerWatts"].calls == 0
+
+    with pytest.raises(ValueError):
+        scada.process_scada_message(from_node, "not a named type")
@@ -0,0 +1,55 @@
+from actors.routing import Destination, MessageRoutes, Route
+from gwproactor_test.certs import copy_keys, uses_tls
+from gwsproto.data_classes.house_0_names import H0N
+from scada_app import ScadaApp
+
+
+def test_message_routes():
+    names = {H0N.derived_generator, H0N.local_control}
+    calls = []
+
+    def get_names() -> set[str]:
+        calls.append(1)
+        return set(names)
+
+    routes = MessageRoutes(get_names)
+    assert routes.resolve(H0N.derived_generator) == Destination(Route.communicator, H0N.derived_generator)
+    assert routes.resolve(H0N.local_control_normal) == Destination(Route.communicator, H0N.local_control)
+    assert routes.resolve(H0N.admin) == Destination(Route.admin, H0N.admin)
+    assert routes.resolve(H0N.ltn) == Destination(Route.ltn, H0N.ltn)
+    assert routes.resolve("not-here") == Destination(Route.local_mqtt, "not-here")
+    assert routes.resolve("not-here", local_name="not-here") == Destination(Route.communicator, "not-here")
+    assert routes.resolve("not-here") == Destination(Route.local_mqtt, "not-here")
+    assert len(calls) == 1
+    assert routes.counts == {Route.communicator: 3, Route.admin: 1, Route.ltn: 1, Route.local_mqtt: 2}
+
+    names.add("not-here")
+    names.remove(H0N.local_control)
+    routes.invalidate()
+    assert routes.resolve("not-here") == Destination(Route.communicator, "not-here")
+    assert routes.resolve(H0N.local_control_normal) == Destination(Route.local_mqtt, H0N.local_control)
+    assert len(calls) == 2
+    assert routes.rebuilds == 2
+
+
+def test_scada_app_routes():
+    settings = ScadaApp.get_settings()
+    settings.is_simulated = True
+    if uses_tls(settings):
+        copy_keys("scada", settings)
+    settings.paths.mkdirs()
+    app = ScadaApp(app_settings=settings).instantiate()
+    routes = app.routes
+    communicator_names = app.get_communicator_names()
+    for name in communicator_names:
+        assert routes.resolve(name) == Destination(Route.communicator, name)
+    rebuilds = routes.rebuilds
+
+    class Extra:
+        name = "extra-actor"
+        monitored_names = []
+
+    assert routes.resolve("extra-actor").route == Route.local_mqtt
+    app.add_communicator(Extra())
+    assert routes.resolve("extra-actor").route == Route.communicator
+    assert routes.rebuilds == rebuilds + 1
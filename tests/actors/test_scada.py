@@ -45,13 +45,11 @@ def test_scada_small():
 
     ch = scada._layout.data_channels[H0CN.store_pump_pwr]
 
-    scada._data.recent_channel_values[ch.Name] = [43]
-    scada._data.recent_channel_unix_ms[ch.Name] = [
-        int(time.time() * 1000)
-    ]
+    scada._data.add_reading(ch.Name, 43, int(time.time() * 1000))
     
     s = scada._data.make_channel_readings(ch=ch)
     assert isinstance(s, ChannelReadings)
+    assert s.ValueList == [43]
 
 
     scada.send_report()
@@ -0,0 +1,178 @@
+"""Test ScadaData recent readings storage"""
+import time
+
+from gwproactor_test.certs import copy_keys, uses_tls
+
+from actors.config import ScadaSettings
+from actors.scada_data import ChannelReadingsBuffer
+from gwsproto.data_classes.house_0_names import H0CN
+from actors.ltn.data import LtnData
+from gwsproto.named_types import SendLayout, SingleMachineState, SnapshotSpaceheat, SnapshotSpaceheatDelta
+from gwsproto.named_types.channel_readings_compact import COMPACT_CHANNEL_READINGS_ENCODING
+from scada_app import ScadaApp
+
+
+def test_channel_readings_buffer():
+    buffer = ChannelReadingsBuffer(capacity=2)
+    assert len(buffer) == 0
+    assert buffer.value_list() == []
+
+    now_ms = int(time.time() * 1000)
+    for i in range(5):
+        buffer.append(i, now_ms + i)
+    assert len(buffer) == 5
+    assert buffer.capacity == 8
+    assert buffer.value_list() == [0, 1, 2, 3, 4]
+    assert buffer.unix_ms_list() == [now_ms + i for i in range(5)]
+
+    buffer.extend([5, 6, 7, 8], [now_ms + 5, now_ms + 6, now_ms + 7, now_ms + 8])
+    assert buffer.capacity == 16
+    assert buffer.value_list() == list(range(9))
+    assert list(buffer.unix_ms()) == [now_ms + i for i in range(9)]
+
+    # clear keeps capacity; old data is not reported again
+    buffer.clear()
+    assert len(buffer) == 0
+    assert buffer.capacity == 16
+    assert buffer.value_list() == []
+    buffer.append(-7, now_ms)
+    assert buffer.value_list() == [-7]
+    assert buffer.unix_ms_list() == [now_ms]
+
+
+def test_scada_data_recent_readings():
+    scada_app = ScadaApp(app_settings=ScadaSettings(is_simulated=True))
+    settings = scada_app.settings
+    if uses_tls(settings):
+        copy_keys("scada", settings)
+    settings.paths.mkdirs()
+    scada_app.instantiate()
+    data = scada_app.scada.data
+    ch = data.layout.data_channels[H0CN.store_pump_pwr]
+
+    now_ms = int(time.time() * 1000)
+    data.add_reading(ch.Name, 10, now_ms)
+    data.add_readings(ch.Name, [11, 12], [now_ms + 1, now_ms + 2])
+    assert data.latest_channel_values[ch.Name] == 12
+    assert data.latest_channel_unix_ms[ch.Name] == now_ms + 2
+    assert list(data.recent_channel_values[ch.Name]) == [10, 11, 12]
+    assert len(data.recent_channel_unix_ms[ch.Name]) == 3
+
+    report = data.make_report(int(time.time()))
+    readings = next(r for r in report.ChannelReadingList if r.ChannelName == ch.Name)
+    assert readings.ValueList == [10, 11, 12]
+    assert readings.ScadaReadTimeUnixMsList == [now_ms, now_ms + 1, now_ms + 2]
+    compact = data.make_report(report.SlotStartUnixS, compact=True)
+    assert all(r.TypeName == "channel.readings.compact" for r in compact.ChannelReadingList)
+    assert compact.model_copy(update={"MessageCreatedMs": report.MessageCreatedMs, "Id": report.Id}).expanded() == report
+
+    data.flush_recent_readings()
+    assert len(data.recent_channel_values[ch.Name]) == 0
+    assert data.make_channel_readings(ch) is None
+    # latest values survive the flush
+    assert data.latest_channel_values[ch.Name] == 12
+
+
+def test_scada_data_channel_indexes():
+    scada_app = ScadaApp(app_settings=ScadaSettings(is_simulated=True))
+    settings = scada_app.settings
+    if uses_tls(settings):
+        copy_keys("scada", settings)
+    settings.paths.mkdirs()
+    scada_app.instantiate()
+    data = scada_app.scada.data
+    ch = data.layout.data_channels[H0CN.store_pump_pwr]
+
+    assert ch.Name in data.my_channel_names
+    assert data.my_reported_channels is data.my_reported_channels
+    capture_s = data.capture_seconds(ch)
+    assert data.flatline_ms_by_channel[ch.Name] == capture_s * data.NYQUIST * 1000
+
+    now_ms = int(time.time() * 1000)
+    assert data.flatlined(ch)
+    data.add_reading(ch.Name, 10, now_ms)
+    assert not data.flatlined(ch, now_ms)
+    assert data.flatlined(ch, now_ms + capture_s * 3 * 1000)
+    snap = data.make_snapshot()
+    assert ch.Name in [r.ChannelName for r in snap.LatestReadingList]
+
+    # Indexes are only rebuilt when told the layout changed
+    new_ch = ch.model_copy(update={"Name": "new-channel"})
+    data.layout.data_channels[new_ch.Name] = new_ch
+    assert new_ch.Name not in data.my_channel_names
+    data.layout_changed()
+    assert new_ch.Name in data.my_channel_names
+    assert new_ch.Name in data.recent_readings
+    assert data.latest_channel_values[new_ch.Name] is None
+    assert data.latest_channel_values[ch.Name] == 10
+
+
+def test_scada_compact_report_negotiation():
+    scada_app = ScadaApp(app_settings=ScadaSettings(is_simulated=True, compact_reports=True))
+    settings = scada_app.settings
+    if uses_tls(settings):
+        copy_keys("scada", settings)
+    settings.paths.mkdirs()
+    scada_app.instantiate()
+    scada = scada_app.scada
+    assert not scada.compact_reports()
+    old_ltn = SendLayout(FromGNodeAlias=scada.layout.ltn_g_node_alias, MessageCreatedMs=int(time.time() * 1000))
+    scada._process_send_layout(scada.ltn, old_ltn)
+    assert not scada.compact_reports()
+    scada._process_send_layout(
+        scada.ltn, old_ltn.model_copy(update={"ReportEncodings": [COMPACT_CHANNEL_READINGS_ENCODING]})
+    )
+    assert scada.compact_reports()
+    scada.settings.compact_reports = False
+    assert not scada.compact_reports()
+
+
+def test_scada_data_snapshot_deltas():
+    scada_app = ScadaApp(app_settings=ScadaSettings(is_simulated=True, snapshots_per_keyframe=3))
+    settings = scada_app.settings
+    if uses_tls(settings):
+        copy_keys("scada", settings)
+    settings.paths.mkdirs()
+    scada_app.instantiate()
+    data = scada_app.scada.data
+    pump = data.layout.data_channels[H0CN.store_pump_pwr].Name
+    hp = data.layout.data_channels[H0CN.hp_idu_pwr].Name
+
+    def readings(snapshot: SnapshotSpaceheat) -> dict:
+        return {r.ChannelName: r for r in snapshot.LatestReadingList}
+
+    now_ms = int(time.time() * 1000)
+    data.add_reading(pump, 10, now_ms)
+    data.add_reading(hp, 2000, now_ms)
+    keyframe = data.next_snapshot()
+    assert isinstance(keyframe, SnapshotSpaceheat)
+    ltn_data = LtnData()
+    ltn_data.latest_snapshot = keyframe
+
+    data.add_readings(pump, [11, 12], [now_ms + 1, now_ms + 2])
+    delta = data.next_snapshot()
+    assert isinstance(delta, SnapshotSpaceheatDelta)
+    assert delta.Seq == 1 and delta.BaseSnapshotTimeUnixMs == keyframe.SnapshotTimeUnixMs
+    assert [(r.ChannelName, r.Value) for r in delta.ChangedReadingList] == [(pump, 12)]
+    assert delta.DroppedChannelNames == []
+    snapshot = ltn_data.apply_snapshot_delta(delta)
+    assert readings(snapshot) == readings(data.make_snapshot())
+    ltn_data.latest_snapshot = snapshot
+
+    data.flush_channel_from_latest(hp)
+    state = SingleMachineState(
+        MachineHandle="a.test.machine", StateEnum="test.states", State="On", UnixMs=now_ms
+    )
+    data.latest_machine_state["test-machine"] = state
+    delta2 = data.next_snapshot()
+    assert delta2.Seq == 2 and delta2.ChangedReadingList == []
+    assert delta2.DroppedChannelNames == [hp]
+    assert delta2.ChangedStateList == [state]
+    # A receiver that missed delta 1 can't apply delta 2
+    assert ltn_data.apply_snapshot_delta(delta2.model_copy(update={"BaseSnapshotTimeUnixMs": keyframe.SnapshotTimeUnixMs})) is None
+    snapshot = ltn_data.apply_snapshot_delta(delta2)
+    assert readings(snapshot) == readings(data.make_snapshot())
+    assert snapshot.LatestStateList[-1] == state
+    assert isinstance(data.next_snapshot(), SnapshotSpaceheat)
+    assert isinstance(data.next_snapshot(), SnapshotSpaceheatDelta)
+    assert isinstance(data.next_snapshot(keyframe=True), SnapshotSpaceheat)
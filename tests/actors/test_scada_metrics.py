@@ -0,0 +1,74 @@
+"""Scada's /metrics endpoint, scraped through an aiohttp test client"""
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from actors.pico_cycler import PicoCycler
+from actors.scada import Scada
+from actors.scada_metrics import Exposition
+from gwsproto.data_classes.house_0_names import H0N
+from tests.utils.scada_replay import ScadaReplay, make_scada_app, synthetic_stream
+
+
+def samples(text: str) -> dict[str, float]:
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if line and not line.startswith("#")
+    }
+
+
+def test_exposition_escapes_labels():
+    out = Exposition()
+    out.family("m", "gauge", "help")
+    out.sample("m", 1.5, name='a "b"\\c\nd')
+    out.sample("m", True)
+    assert out.text() == (
+        "# HELP m help\n# TYPE m gauge\n"
+        'm{name="a \\"b\\"\\\\c\\nd"} 1.5\n'
+        "m 1\n"
+    )
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint():
+    app = make_scada_app()
+    scada = app.scada
+    replay = ScadaReplay(app)
+    result = await replay.run(synthetic_stream(app, 200, seed=5))
+    assert not result.errors
+    app.i2c_bus.transact(0x33, lambda: None)
+    cycler = app.get_communicator(H0N.pico_cycler)
+    zombie = None
+    if isinstance(cycler, PicoCycler) and cycler.picos:
+        zombie = cycler.picos[0]
+        cycler.reboots[zombie] = cycler.REBOOT_ATTEMPTS
+
+    web_app = web.Application()
+    web_app.router.add_get("/metrics", scada._handle_metrics)
+    async with TestClient(TestServer(web_app)) as client:
+        response = await client.get("/metrics")
+        assert response.status == 200
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        text = await response.text()
+
+    metrics = samples(text)
+    for type_name, latencies in result.latency_s.items():
+        link = Scada.LTN_MQTT if type_name == "send.snap" else Scada.LOCAL_MQTT
+        key = f'scada_messages_received_total{{link="{link}",type_name="{type_name}"}}'
+        assert metrics[key] == len(latencies)
+    assert (
+        metrics['scada_build_duration_seconds_count{kind="snapshot"}']
+        == len(result.latency_s["send.snap"])
+    )
+    for name, value in scada.data.latest_channel_values.items():
+        if value is not None:
+            assert metrics[f'scada_channel_value{{channel="{name}"}}'] == value
+    assert any(k.startswith(f'scada_link_state{{link="{Scada.LTN_MQTT}"') for k in metrics)
+    assert metrics['scada_handler_calls_total{payload="SingleReading"}'] > 0
+    assert metrics['scada_i2c_transactions_total{address="0x33"}'] == 1
+    assert metrics['scada_i2c_errors_total{address="0x33"}'] == 0
+    if zombie is not None:
+        assert metrics[f'scada_pico_zombie{{pico="{zombie}"}}'] == 1
+        assert metrics[f'scada_pico_reboots{{pico="{zombie}"}}'] == cycler.REBOOT_ATTEMPTS
+    assert metrics["process_resident_memory_bytes"] > 0
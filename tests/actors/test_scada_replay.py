@@ -0,0 +1,41 @@
+"""Offline replay through the primary Scada's MQTT message path"""
+import time
+
+from actors.scada import Scada
+from tests.utils.scada_replay import (
+    load_stream,
+    make_scada_app,
+    percentile,
+    replay,
+    save_stream,
+    synthetic_stream,
+)
+
+
+def test_replay_synthetic_stream():
+    result = replay(count=400)
+    assert not result.errors
+    assert result.count == 400
+    assert set(result.latency_s) == {
+        "single.reading", "synced.readings", "gridworks.event.problem", "send.snap"
+    }
+    # events from scada2 are passed on, snapshot requests answered upstream
+    assert result.published["event"] == len(result.latency_s["gridworks.event.problem"])
+    assert result.published[Scada.LTN_MQTT] == len(result.latency_s["send.snap"])
+    assert result.lag_s
+    assert 0 < percentile(result.latency_s["single.reading"], 50) < 0.05
+
+
+def test_replay_recorded_stream_at_rate(tmp_path):
+    stream = synthetic_stream(make_scada_app(), 50, seed=3)
+    path = tmp_path / "stream.ndjson"
+    save_stream(path, stream)
+    assert load_stream(path) == stream
+
+    start = time.perf_counter()
+    result = replay(load_stream(path), rate_hz=1000, trace_allocations=True)
+    assert time.perf_counter() - start >= 0.049
+    assert not result.errors
+    assert result.count == 50
+    assert sum(len(v) for v in result.alloc_bytes.values()) == 50
+    assert all(b > 0 for v in result.alloc_bytes.values() for b in v)
@@ -0,0 +1,72 @@
+"""Benchmark DerivedGenerator's per-tick energy updates: old loops vs DischargeModel.
+
+The old rwt_f found the required SWT in the heating forecast on every
+call; the loops called it once or more per simulated layer. Times one
+usable-energy and one max-storage update per tick for 3 tanks (9 layers).
+
+    python tests/benchmarks/bench_discharge_model.py [--repeat 200]
+"""
+import argparse
+import random
+import time
+import timeit
+from datetime import datetime
+
+import pytz
+
+from actors.discharge_model import DischargeModel
+from tests.actors.test_discharge_model import ha1_params, scalar_rwt_f, scan_max_storage_kwh, scan_usable_kwh
+
+TIMEZONE = pytz.timezone("America/New_York")
+KWH_PER_LAYER_F = 0.0974
+
+
+def forecast_rwt_f(params, forecast_times: list[int], rswt: list[float]):
+    def rwt_f(swt_f: float) -> float:
+        times_tz = [datetime.fromtimestamp(x, tz=TIMEZONE) for x in forecast_times]
+        datetime.now(TIMEZONE)
+        required_swt = max(r for t, r in zip(times_tz, rswt) if t.hour in [7, 8, 9, 10, 11, 16, 17, 18, 19])
+        return scalar_rwt_f(params, required_swt, swt_f)
+    return rwt_f
+
+
+def run(repeat: int) -> None:
+    params = ha1_params()
+    hour_s = int(time.time()) // 3600 * 3600
+    forecast_times = [hour_s + 3600 * (i + 1) for i in range(24)]
+    rng = random.Random(0)
+    rswt = [rng.uniform(110, 150) for _ in range(24)]
+    layers_f = sorted((rng.uniform(120, 175) for _ in range(9)), reverse=True)
+    rwt_f = forecast_rwt_f(params, forecast_times, rswt)
+    required_swt = max(
+        r for t, r in zip(forecast_times, rswt)
+        if datetime.fromtimestamp(t, tz=TIMEZONE).hour in [7, 8, 9, 10, 11, 16, 17, 18, 19]
+    )
+
+    def old_tick():
+        scan_usable_kwh(rwt_f, layers_f, KWH_PER_LAYER_F)
+        scan_max_storage_kwh(rwt_f, 9, params.MaxEwtF + 10, KWH_PER_LAYER_F)
+
+    model = DischargeModel(params, required_swt)
+
+    def new_tick():
+        model.usable_kwh(layers_f, KWH_PER_LAYER_F)
+        model.max_storage_kwh(9, params.MaxEwtF + 10, KWH_PER_LAYER_F)
+
+    old_ms = 1000 * min(timeit.repeat(old_tick, number=1, repeat=max(3, repeat // 20)))
+    new_ms = 1000 * min(timeit.repeat(new_tick, number=1, repeat=repeat))
+    print(f"{'design':>15} {'ms/tick':>8}")
+    print(f"{'old loops':>15} {old_ms:>8.3f}")
+    print(f"{'DischargeModel':>15} {new_ms:>8.3f}")
+    print(f"speedup: {old_ms / new_ms:.0f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    run(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
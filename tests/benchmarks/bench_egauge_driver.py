@@ -0,0 +1,79 @@
+"""Benchmark eGauge power meter polls against a local dummy Modbus server.
+
+Times one poll of a 12-channel meter read channel by channel (one request
+per channel, as PowerMeterDriverThread used to poll) and in register blocks.
+--latency-ms adds a delay to every request the server answers, standing
+in for the network round trip to a real meter.
+
+    python tests/benchmarks/bench_egauge_driver.py [--polls 200] [--latency-ms 0]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from pyModbusTCP.server import ModbusServer
+
+from drivers.power_meter.egauge.modbus_dummy import DummyDataBank
+from tests.drivers.test_egauge_driver import egauge_driver, egauge_layout, free_port
+
+
+class SlowDummyDataBank(DummyDataBank):
+    def __init__(self, latency_s: float, **kwargs):
+        super().__init__(**kwargs)
+        self.latency_s = latency_s
+        self.requests = 0
+
+    def get_input_registers(self, address, number=1, srv_info=None):
+        if srv_info is not None:
+            self.requests += 1
+            if self.latency_s:
+                time.sleep(self.latency_s)
+        return super().get_input_registers(address, number, srv_info)
+
+
+def run(polls: int, latency_ms: float, channels: int) -> None:
+    data_bank = SlowDummyDataBank(latency_ms / 1000)
+    port = free_port()
+    server = ModbusServer(host="127.0.0.1", port=port, no_block=True, data_bank=data_bank)
+    server.start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            layout = egauge_layout(
+                Path(tmp) / "hardware-layout.json",
+                {f"load-{i}": 9000 + 2 * i for i in range(channels)},
+                port,
+            )
+        power_channels = [ch for ch in layout.data_channels.values() if ch.Name.startswith("load-")]
+        driver = egauge_driver(layout)
+        print(f"{'mode':>12} {'ms/poll':>10} {'requests/poll':>14}")
+        for mode in ("per-channel", "block"):
+            requests_before = data_bank.requests
+            start = time.perf_counter()
+            for _ in range(polls):
+                if mode == "block":
+                    driver.read_telemetry_values(power_channels)
+                else:
+                    for ch in power_channels:
+                        driver.read_power_w(ch)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{mode:>12} {1e3 * elapsed / polls:>10.3f}"
+                f" {(data_bank.requests - requests_before) / polls:>14.1f}"
+            )
+        driver.clean_client()
+    finally:
+        server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--polls", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to each Modbus request")
+    parser.add_argument("--channels", type=int, default=12)
+    args = parser.parse_args()
+    run(args.polls, args.latency_ms, args.channels)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Benchmark LTN event archiving: one file per event vs the segmented archive.
+
+Archives a simulated day: a ReportEvent (and its Report) every 5 minutes
+plus small problem events in between. The old layout wrote str(report) to
+Report.<slot>.json and each event, pretty-printed, to its own file named
+from a freshly built timezone. Reports disk usage as allocated blocks.
+
+    python tests/benchmarks/bench_event_archive.py [--events-per-slot 5] [--temps 20]
+"""
+import argparse
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import pytz
+from gwproto.messages import ProblemEvent
+from gwsproto.named_types import ReportEvent
+
+from actors.ltn.event_archive import EventArchive
+from tests.benchmarks.bench_report_encoding import SLOT_DURATION_S, make_report
+
+
+def day_of_messages(events_per_slot: int, temps: int) -> list:
+    report = make_report(temps, temps // 3, 2)
+    messages = []
+    for slot in range(24 * 3600 // SLOT_DURATION_S):
+        slot_report = report.model_copy(update={"SlotStartUnixS": report.SlotStartUnixS + slot * SLOT_DURATION_S})
+        created_ms = slot_report.SlotStartUnixS * 1000 + SLOT_DURATION_S * 1000
+        messages.append(ReportEvent(Report=slot_report, TimeCreatedMs=created_ms, MessageId=str(uuid.uuid4())))
+        for i in range(events_per_slot):
+            messages.append(
+                ProblemEvent(
+                    Src="hw1.isone.me.versant.keene.beech.scada",
+                    ProblemType="warning",
+                    Summary=f"relay{i % 8} state mismatch",
+                    Details="expected RelayClosed got RelayOpen",
+                    TimeCreatedMs=created_ms + 1000 * (i + 1),
+                    MessageId=str(uuid.uuid4()),
+                )
+            )
+    return messages
+
+
+def per_file(messages: list, directory: Path) -> None:
+    """Ltn._process_event and process_report before the archive"""
+    report_dir = directory / "report"
+    report_dir.mkdir()
+    for event in messages:
+        timezone = pytz.timezone("America/New_York")
+        event_dt = datetime.fromtimestamp(event.TimeCreatedMs / 1000, tz=timezone)
+        event_file = Path(f"{directory}/{event_dt.isoformat()}.{event.TypeName}.uid[{event.MessageId}].json")
+        with event_file.open("w") as f:
+            f.write(event.model_dump_json(indent=2))
+        if isinstance(event, ReportEvent):
+            report = event.Report
+            with (report_dir / f"Report.{report.SlotStartUnixS}.json").open("w") as f:
+                f.write(str(report))
+
+
+def archived(messages: list, directory: Path, compresslevel: int) -> None:
+    """Ltn._process_event with the archive; a ReportEvent's report is not
+    archived again"""
+    archive = EventArchive(directory, compresslevel=compresslevel)
+    for event in messages:
+        archive.append(event.TypeName, event.TimeCreatedMs, event.model_dump_json())
+    archive.close()
+
+
+def disk_usage(directory: Path) -> tuple[int, int, int]:
+    files = [p for p in directory.rglob("*") if p.is_file()]
+    return len(files), sum(p.stat().st_size for p in files), sum(p.stat().st_blocks * 512 for p in files)
+
+
+def run(events_per_slot: int, temps: int) -> None:
+    messages = day_of_messages(events_per_slot, temps)
+    print(f"{len(messages)} events in a day")
+    print(f"{'layout':>9} {'s/day':>7} {'events/s':>9} {'files':>6} {'MB':>7} {'MB on disk':>11}")
+    layouts = [("per-file", per_file)] + [
+        (f"gzip -{level}", lambda m, d, level=level: archived(m, d, level)) for level in (1, 6)
+    ]
+    for name, write in layouts:
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            write(messages, Path(tmp))
+            elapsed = time.perf_counter() - start
+            files, size, allocated = disk_usage(Path(tmp))
+            print(
+                f"{name:>9} {elapsed:>7.2f} {len(messages) / elapsed:>9.0f} {files:>6} "
+                f"{size / 2**20:>7.2f} {allocated / 2**20:>11.2f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events-per-slot", type=int, default=5)
+    parser.add_argument("--temps", type=int, default=20)
+    args = parser.parse_args()
+    run(args.events_per_slot, args.temps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark FLO backward induction: DNode/DEdge objects vs FloGraph arrays.
+
+Builds a synthetic graph of --states storage states per hour over a 48
+hour horizon, solves it both ways and compares time, memory held by the
+graph and the pickled size of what is kept after trimming.
+
+    python tests/benchmarks/bench_flo_graph.py [--states 100 400] [--edges 30]
+"""
+import argparse
+import pickle
+import time
+import tracemalloc
+
+from tests.actors.test_flo import object_graph, scan_solve, synthetic_flo_graph
+
+HORIZON_HOURS = 48
+
+
+def run(state_counts: list[int], max_edges: int) -> None:
+    print(
+        f"{'states':>7} {'edges':>9} {'objects MB':>11} {'arrays MB':>10} "
+        f"{'scan s':>8} {'solve ms':>9} {'trimmed kB':>11}"
+    )
+    for n in state_counts:
+        tracemalloc.start()
+        graph = synthetic_flo_graph(HORIZON_HOURS, n, max_edges, seed=n)
+        arrays_mb = tracemalloc.get_traced_memory()[0] / 1e6
+        nodes, edges = object_graph(graph)
+        objects_mb = tracemalloc.get_traced_memory()[0] / 1e6 - arrays_mb
+        tracemalloc.stop()
+        num_edges = sum(len(h) for h in graph.edge_head)
+
+        st = time.perf_counter()
+        scan_solve(nodes, edges, HORIZON_HOURS)
+        scan_s = time.perf_counter() - st
+        del nodes, edges
+
+        st = time.perf_counter()
+        graph.solve()
+        solve_ms = 1000 * (time.perf_counter() - st)
+        trimmed_kb = len(pickle.dumps(graph.trimmed())) / 1000
+        print(
+            f"{n:>7} {num_edges:>9} {objects_mb:>11.1f} {arrays_mb:>10.1f} "
+            f"{scan_s:>8.2f} {solve_ms:>9.1f} {trimmed_kb:>11.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--states", type=int, nargs="+", default=[100, 400])
+    parser.add_argument("--edges", type=int, default=30, help="max edges per state")
+    args = parser.parse_args()
+    run(args.states, args.edges)
+
+
+if __name__ == "__main__":
+    main()
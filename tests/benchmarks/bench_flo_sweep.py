@@ -0,0 +1,44 @@
+"""Benchmark the bid price sweep in Flo.generate_recommendation.
+
+Times the per-price scalar loop against BidSweep on synthetic bid edges,
+over the integer price range and a 0.1 $/MWh grid.
+
+    python tests/benchmarks/bench_flo_sweep.py [--edges 20 100 400] [--repeat 3]
+"""
+import argparse
+import timeit
+
+from actors.ltn.flo import BidSweep, bid_prices_usd_mwh
+from tests.actors.test_flo import scan_pq_pairs, synthetic_bid_edges
+
+COP = 2.63
+FORECASTED_PRICE = 77.37
+
+
+def best_ms(stmt, repeat: int) -> float:
+    return 1000 * min(timeit.repeat(stmt, number=1, repeat=repeat))
+
+
+def run(edge_counts: list[int], repeat: int) -> None:
+    prices = bid_prices_usd_mwh(FORECASTED_PRICE)
+    fine = bid_prices_usd_mwh(FORECASTED_PRICE, step_usd_mwh=0.1)
+    print(f"{'edges':>6} {'scan ms':>9} {'sweep ms':>9} {'speedup':>8} {'0.1 $/MWh sweep ms':>19}")
+    for n in edge_counts:
+        edges = synthetic_bid_edges(n, seed=n)
+        scalar_prices = prices.tolist()
+        scan_ms = best_ms(lambda: scan_pq_pairs(edges, COP, scalar_prices), repeat)
+        sweep_ms = best_ms(lambda: BidSweep(edges, COP).pq_pairs(prices), repeat)
+        fine_ms = best_ms(lambda: BidSweep(edges, COP).pq_pairs(fine), repeat)
+        print(f"{n:>6} {scan_ms:>9.1f} {sweep_ms:>9.2f} {scan_ms / sweep_ms:>7.0f}x {fine_ms:>19.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--edges", type=int, nargs="+", default=[20, 100, 400])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.edges, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark FLO process handling: a forkserver child per phase vs one FloWorker.
+
+Runs --slots market slots of build, recommend and plans on a synthetic
+graph of --states storage states per hour. "children" starts a new child
+for each phase and pickles the trimmed graph between them, as BidRunner
+used to; "worker" sends the same phases to one long-lived FloWorker.
+
+    python tests/benchmarks/bench_flo_worker.py [--states 400] [--slots 3]
+"""
+import argparse
+import multiprocessing
+import pickle
+import time
+from functools import partial
+
+from actors.ltn.flo import Flo
+from actors.ltn.flo_worker import BUILD, PLANS, RECOMMEND, FloWorker, flo_next_hour_plan, peak_rss_mb
+from gwsproto.named_types import FloParamsHouse0
+from tests.actors.test_flo import synthetic_flo_graph
+from tests.named_types.test_flo_params_house0 import flo_params_house0_dict
+
+PRICE_USD_MWH = 61.5
+
+
+def synthetic_flo(num_states: int, params_bytes: bytes) -> Flo:
+    params = FloParamsHouse0.model_validate_json(params_bytes)
+    return Flo(params_bytes, graph=synthetic_flo_graph(params.HorizonHours, num_states, 30, 3))
+
+
+def _child(phase: str, num_states: int, arg, params_bytes: bytes, queue) -> None:
+    if phase == BUILD:
+        g = synthetic_flo(num_states, params_bytes)
+        g.solve_dijkstra()
+        g.trim_graph_for_waiting()
+        queue.put((pickle.dumps(g), peak_rss_mb()))
+        return
+    g = pickle.loads(arg)
+    if phase == RECOMMEND:
+        queue.put((g.generate_recommendation(params_bytes), peak_rss_mb()))
+    else:
+        g.find_initial_node()
+        queue.put((flo_next_hour_plan(g, PRICE_USD_MWH), peak_rss_mb()))
+
+
+def children_slot(num_states: int, params_bytes: bytes) -> tuple[float, int]:
+    ctx = multiprocessing.get_context("forkserver")
+    peak = 0.0
+    pickled = 0
+    trimmed = None
+    for phase in (BUILD, RECOMMEND, PLANS):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_child, args=(phase, num_states, trimmed, params_bytes, queue))
+        proc.start()
+        result, child_peak = queue.get(timeout=600)
+        proc.join()
+        peak = max(peak, child_peak)
+        if phase == BUILD:
+            trimmed = result
+            pickled = len(result)
+    return peak, pickled
+
+
+def worker_slot(worker: FloWorker, params_bytes: bytes) -> tuple[float, int]:
+    peak = 0.0
+    for phase, arg in ((BUILD, params_bytes), (RECOMMEND, params_bytes), (PLANS, PRICE_USD_MWH)):
+        _, stats = worker.request(phase, arg)
+        peak = max(peak, stats.peak_rss_mb)
+    worker.finish_run()
+    return peak, 0
+
+
+def run(num_states: int, slots: int) -> None:
+    params_bytes = FloParamsHouse0.model_validate(flo_params_house0_dict()).model_dump_json().encode()
+    worker = FloWorker(max_runs=slots + 1, flo_factory=partial(synthetic_flo, num_states))
+    print(f"{'design':>9} {'slot':>5} {'seconds':>8} {'peak MB':>8} {'pickled kB':>11}")
+    try:
+        for design in ("children", "worker"):
+            for slot in range(slots):
+                st = time.perf_counter()
+                if design == "children":
+                    peak, pickled = children_slot(num_states, params_bytes)
+                else:
+                    peak, pickled = worker_slot(worker, params_bytes)
+                elapsed = time.perf_counter() - st
+                print(f"{design:>9} {slot:>5} {elapsed:>8.2f} {peak:>8.0f} {pickled / 1000:>11.1f}")
+    finally:
+        worker.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--states", type=int, default=400)
+    parser.add_argument("--slots", type=int, default=3)
+    args = parser.parse_args()
+    run(args.states, args.slots)
+
+
+if __name__ == "__main__":
+    main()
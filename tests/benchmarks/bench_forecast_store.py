@@ -0,0 +1,67 @@
+"""Benchmark the current-hour price lookup: price_forecast.csv row scan vs ForecastStore.
+
+The LTN used to re-read and scan the whole CSV for the current hour. Times
+one lookup for CSV files and stores holding the given number of hours.
+
+    python tests/benchmarks/bench_forecast_store.py [--hours 48 336 2000] [--repeat 200]
+"""
+import argparse
+import csv
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+from actors.forecast_store import HOUR_S, PRICE, ForecastStore, HourlyForecast, hour_start
+
+
+def csv_price(prices_file: Path, start_of_hour_timestamp: int) -> float:
+    """Ltn.read_forecasted_price_for_now before the forecast store"""
+    with open(prices_file, 'r', newline='') as f:
+        reader = csv.reader(f)
+        next(reader)
+        rows = list(reader)
+    for row in rows:
+        if float(row[0]) == start_of_hour_timestamp:
+            return float(row[1]) + float(row[2])
+    raise ValueError("no price for this hour")
+
+
+def run(hour_counts: list[int], repeat: int) -> None:
+    now_hour_s = hour_start(time.time())
+    print(f"{'hours':>6} {'csv us':>8} {'store us':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in hour_counts:
+            # the current hour is the last stored, the worst case for a scan
+            hours = [now_hour_s - HOUR_S * (n - 1 - i) for i in range(n)]
+            dist = [40.0 + i % 24 for i in range(n)]
+            lmp = [60.0 + i % 7 for i in range(n)]
+            prices_file = Path(tmp) / f"price_forecast_{n}.csv"
+            with open(prices_file, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['HourStartS', 'DistList', 'LmpList'])
+                writer.writerows(zip(hours, dist, lmp))
+            store = ForecastStore(Path(tmp) / f"forecasts_{n}.sqlite", retention_hours=n + 1)
+            store.put(HourlyForecast(PRICE, hours, {"dist": dist, "lmp": lmp}))
+
+            def store_price() -> float:
+                prices = store.hour(PRICE, now_hour_s)
+                return prices["dist"] + prices["lmp"]
+
+            assert csv_price(prices_file, now_hour_s) == store_price()
+            csv_us = 1e6 * min(timeit.repeat(lambda: csv_price(prices_file, now_hour_s), number=1, repeat=repeat))
+            store_us = 1e6 * min(timeit.repeat(store_price, number=1, repeat=repeat))
+            print(f"{n:>6} {csv_us:>8.1f} {store_us:>9.1f}")
+            store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=int, nargs="+", default=[48, 336, 2000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    run(args.hours, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
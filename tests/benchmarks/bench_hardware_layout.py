@@ -0,0 +1,62 @@
+"""Benchmark HardwareLayout handle and hierarchy lookups on a synthetic layout.
+
+Compares the indexed lookups with the linear scans they replaced, on a
+tree of --nodes actors.
+
+    python tests/benchmarks/bench_hardware_layout.py [--nodes 500] [--repeat 5]
+"""
+import argparse
+import timeit
+from typing import Optional
+
+from gwsproto.data_classes.hardware_layout import HardwareLayout
+from gwsproto.data_classes.sh_node import ShNode
+from tests.test_misc.test_hardware_layout import scan_direct_reports, scan_node_from_handle, synthetic_layout
+
+
+def scan_node_by_handle(layout: HardwareLayout, handle: str) -> Optional[ShNode]:
+    d = {node.Handle: node for node in layout.nodes.values() if node.Handle}
+    return d.get(handle)
+
+
+def scan_boss_node(layout: HardwareLayout, node: ShNode) -> Optional[ShNode]:
+    boss_handle = layout.boss_handle(node.handle)
+    if not boss_handle:
+        return node
+    return scan_node_from_handle(layout, boss_handle)
+
+
+def best_us(stmt, number: int, repeat: int) -> float:
+    return 1e6 * min(timeit.repeat(stmt, number=number, repeat=repeat)) / number
+
+
+def run(num_nodes: int, repeat: int) -> None:
+    layout = synthetic_layout(num_nodes)
+    leaf = list(layout.nodes.values())[-1]
+    mid = layout.node(f"n{num_nodes // 8}")
+    cases = [
+        ("node_by_handle", lambda: scan_node_by_handle(layout, leaf.handle), lambda: layout.node_by_handle(leaf.handle), 200),
+        ("node_from_handle", lambda: scan_node_from_handle(layout, leaf.handle), lambda: layout.node_from_handle(leaf.handle), 200),
+        ("boss_node", lambda: scan_boss_node(layout, leaf), lambda: layout.boss_node(leaf), 200),
+        ("direct_reports", lambda: scan_direct_reports(layout, mid), lambda: layout.direct_reports(mid), 2),
+    ]
+    print(f"{num_nodes} nodes")
+    print(f"{'lookup':>18} {'scan us':>12} {'indexed us':>12} {'speedup':>9}")
+    for name, scan, indexed, number in cases:
+        assert scan() == indexed()
+        scan_us = best_us(scan, number, repeat)
+        indexed_us = best_us(indexed, 1000, repeat)
+        print(f"{name:>18} {scan_us:>12.2f} {indexed_us:>12.3f} {scan_us / indexed_us:>8.0f}x")
+    print(f"{'index_command_tree':>18} {'':>12} {best_us(layout.index_command_tree, 20, repeat):>12.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.nodes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
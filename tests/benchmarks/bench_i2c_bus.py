@@ -0,0 +1,124 @@
+"""Benchmark contention on the shared i2c bus: free-for-all vs I2cBusScheduler.
+
+Runs the three kinds of i2c traffic a Pi sees on a SimulatedI2cWire, each
+from its own thread: TSnap ADS1115 conversions polled continuously, relay
+bursts (a few PCF8575 writes back to back) and occasional 0-10V writes.
+Without arbitration, transactions that overlap collide and fail. With the
+scheduler, none collide; the cost is the time actuation waits in the queue.
+
+    python tests/benchmarks/bench_i2c_bus.py [--seconds 3] [--conversion-ms 2]
+"""
+import argparse
+import random
+import threading
+import time
+from typing import Callable, List
+
+from drivers.i2c.bus_scheduler import I2cBusScheduler, I2cPriority, SimulatedI2cWire
+
+PCF8575_S = 3 * 9 / 100_000
+GP8403_S = 4 * 9 / 100_000
+ADS_ADDRESSES = [0x4B, 0x49, 0x48]
+RELAY_ADDRESSES = [0x20, 0x21]
+DFR_ADDRESSES = [0x5E, 0x5F]
+
+
+class Tally:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.ok = 0
+        self.failed = 0
+        self.latencies_ms: List[float] = []
+
+    def record(self, started_s: float, ok: bool) -> None:
+        with self.lock:
+            if ok:
+                self.ok += 1
+            else:
+                self.failed += 1
+            self.latencies_ms.append(1000 * (time.perf_counter() - started_s))
+
+
+def run_traffic(
+    seconds: float,
+    conversion_s: float,
+    submit: Callable[[int, Callable[[], None], I2cPriority], None],
+    wire: SimulatedI2cWire,
+) -> dict[str, Tally]:
+    tallies = {"telemetry": Tally(), "relay": Tally(), "0-10V": Tally()}
+    stop = threading.Event()
+
+    def transaction(tally: Tally, address: int, duration_s: float, priority: I2cPriority) -> None:
+        started_s = time.perf_counter()
+        try:
+            submit(address, lambda: wire.transaction(address, duration_s), priority)
+            tally.record(started_s, True)
+        except OSError:
+            tally.record(started_s, False)
+
+    def telemetry() -> None:
+        while not stop.is_set():
+            for address in ADS_ADDRESSES:
+                transaction(tallies["telemetry"], address, conversion_s, I2cPriority.Telemetry)
+
+    def relays() -> None:
+        rng = random.Random(1)
+        while not stop.is_set():
+            time.sleep(rng.uniform(0.01, 0.05))
+            for _ in range(rng.randint(1, 4)):
+                address = rng.choice(RELAY_ADDRESSES)
+                transaction(tallies["relay"], address, PCF8575_S, I2cPriority.Actuation)
+
+    def zero_ten() -> None:
+        rng = random.Random(2)
+        while not stop.is_set():
+            time.sleep(rng.uniform(0.05, 0.2))
+            address = rng.choice(DFR_ADDRESSES)
+            transaction(tallies["0-10V"], address, GP8403_S, I2cPriority.Actuation)
+
+    threads = [threading.Thread(target=fn) for fn in (telemetry, relays, zero_ten)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return tallies
+
+
+def report(name: str, wire: SimulatedI2cWire, tallies: dict[str, Tally]) -> None:
+    print(f"{name}: {wire.transactions} transactions, {wire.collisions} collisions")
+    print(f"  {'traffic':>10} {'ok':>6} {'failed':>7} {'p50 ms':>7} {'p99 ms':>7}")
+    for kind, tally in tallies.items():
+        if not tally.latencies_ms:
+            continue
+        latencies = sorted(tally.latencies_ms)
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+        print(f"  {kind:>10} {tally.ok:>6} {tally.failed:>7} {p50:>7.2f} {p99:>7.2f}")
+
+
+def run(seconds: float, conversion_ms: float) -> None:
+    conversion_s = conversion_ms / 1000
+
+    wire = SimulatedI2cWire()
+    tallies = run_traffic(seconds, conversion_s, lambda address, fn, priority: fn(), wire)
+    report("free-for-all", wire, tallies)
+
+    wire = SimulatedI2cWire()
+    bus = I2cBusScheduler()
+    tallies = run_traffic(seconds, conversion_s, bus.transact, wire)
+    report("scheduled", wire, tallies)
+    print(f"  {bus.metrics()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--conversion-ms", type=float, default=2)
+    args = parser.parse_args()
+    run(args.seconds, args.conversion_ms)
+
+
+if __name__ == "__main__":
+    main()
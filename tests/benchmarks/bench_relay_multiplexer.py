@@ -0,0 +1,115 @@
+"""Benchmark i2c traffic to the Krida relay boards: per-pin writes vs shadow registers.
+
+Drives a simulated day through the relay multiplexer on the simulated
+PCF8575 bus: board initialization, bursts of relay dispatches (as when the
+house changes mode) and the once-a-minute relay maintenance. The per-pin
+column replays the same day the way the multiplexer used to drive the
+boards: one transaction per pin at init (switch_to_output, then value),
+one per dispatch and one per relay every maintenance pass. Bus time assumes
+a 3 byte PCF8575 transaction at 100 kHz.
+
+    python tests/benchmarks/bench_relay_multiplexer.py [--bursts-per-hour 6] [--burst 4]
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from gwsproto.enums import ChangeRelayPin
+from gwsproto.named_types import FsmEvent
+
+from actors.i2c_relay_multiplexer import I2cRelayMultiplexer
+from drivers.i2c.pcf8575_backend import SimulatedPcf8575Backend
+from tests.utils.scada_replay import make_scada_app, offline_env
+
+TRANSACTION_S = 3 * 9 / 100_000
+MINUTES_PER_DAY = 24 * 60
+
+
+def make_multiplexer() -> I2cRelayMultiplexer:
+    app = make_scada_app()
+    multiplexer = next(
+        communicator
+        for communicator in map(app.get_communicator, app.get_communicator_names())
+        if isinstance(communicator, I2cRelayMultiplexer)
+    )
+    multiplexer.pcf_backend = SimulatedPcf8575Backend()
+    multiplexer._send_to = lambda *args, **kwargs: None
+    multiplexer._send = lambda message: None
+    multiplexer.services.add_task = lambda task: task.cancel()
+    return multiplexer
+
+
+def day_of_bursts(indices: list[int], bursts_per_hour: int, burst: int) -> dict[int, list[tuple[int, ChangeRelayPin]]]:
+    """minute of the day -> the relay changes dispatched in that minute"""
+    rng = random.Random(0)
+    bursts = {}
+    for minute in rng.sample(range(MINUTES_PER_DAY), 24 * bursts_per_hour):
+        bursts[minute] = [
+            (idx, rng.choice([ChangeRelayPin.Energize, ChangeRelayPin.DeEnergize]))
+            for idx in rng.sample(indices, min(burst, len(indices)))
+        ]
+    return bursts
+
+
+def per_pin_transactions(relays: int, bursts: dict) -> int:
+    init = 2 * 16 * 2
+    dispatches = sum(len(b) for b in bursts.values())
+    maintenance = (MINUTES_PER_DAY - 1) * relays
+    return init + dispatches + maintenance
+
+
+async def shadow_day(multiplexer: I2cRelayMultiplexer, bursts: dict) -> SimulatedPcf8575Backend:
+    backend = multiplexer.pcf_backend
+    await multiplexer.initialize_boards()
+    relays = {multiplexer.get_idx(r): r for r in multiplexer.my_relays}
+    for minute in range(MINUTES_PER_DAY):
+        if minute:
+            multiplexer.verify_ports()
+        for idx, event in bursts.get(minute, []):
+            multiplexer._process_event_message(
+                FsmEvent(
+                    FromHandle=relays[idx].handle,
+                    ToHandle=multiplexer.node.handle,
+                    EventType=ChangeRelayPin.enum_name(),
+                    EventName=event.value,
+                    TriggerId=str(uuid.uuid4()),
+                    SendTimeUnixMs=int(time.time() * 1000),
+                )
+            )
+        await asyncio.sleep(0)
+    return backend
+
+
+def run(bursts_per_hour: int, burst: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp, offline_env(Path(tmp)):
+        multiplexer = make_multiplexer()
+        indices = sorted(multiplexer.get_idx(r) for r in multiplexer.my_relays)
+        bursts = day_of_bursts(indices, bursts_per_hour, burst)
+        backend = asyncio.run(shadow_day(multiplexer, bursts))
+    per_pin = per_pin_transactions(len(indices), bursts)
+    print(
+        f"{len(indices)} relays, {len(bursts)} bursts of {burst} dispatches, "
+        f"{MINUTES_PER_DAY} maintenance passes"
+    )
+    print(f"{'scheme':>8} {'writes':>7} {'reads':>6} {'transactions':>13} {'bus s/day':>10}")
+    print(f"{'per-pin':>8} {per_pin:>7} {0:>6} {per_pin:>13} {per_pin * TRANSACTION_S:>10.2f}")
+    print(
+        f"{'shadow':>8} {backend.writes:>7} {backend.reads:>6} {backend.transactions:>13} "
+        f"{backend.transactions * TRANSACTION_S:>10.2f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bursts-per-hour", type=int, default=6)
+    parser.add_argument("--burst", type=int, default=4)
+    args = parser.parse_args()
+    run(args.bursts_per_hour, args.burst)
+
+
+if __name__ == "__main__":
+    main()
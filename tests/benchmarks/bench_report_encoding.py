@@ -0,0 +1,117 @@
+"""Benchmark Report wire size and encode/decode time, full vs compact readings.
+
+Builds a 5 minute report with a realistic channel mix: temperatures read
+every 5 s that drift slowly, power channels reported asynchronously on
+changes, and flow channels sampled every second. Compares the JSON of the
+plain ChannelReadings with that of ChannelReadingsCompact.
+
+    python tests/benchmarks/bench_report_encoding.py [--temps 40] [--powers 12] [--flows 4]
+"""
+import argparse
+import random
+import time
+import timeit
+import uuid
+import zlib
+
+from gwsproto.named_types import ChannelReadings, Report
+
+SLOT_DURATION_S = 300
+
+
+def temperature_readings(rng: random.Random, name: str, slot_ms: int) -> ChannelReadings:
+    value = rng.randint(40_000, 170_000)  # milli-degrees
+    values, times = [], []
+    for i in range(SLOT_DURATION_S // 5):
+        value += rng.randint(-60, 60)
+        values.append(value)
+        times.append(slot_ms + 5000 * i + rng.randint(0, 40))
+    return ChannelReadings(ChannelName=name, ValueList=values, ScadaReadTimeUnixMsList=times)
+
+
+def power_readings(rng: random.Random, name: str, slot_ms: int) -> ChannelReadings:
+    value = rng.choice([0, 120, 4_200])
+    values, times = [], []
+    t = slot_ms + rng.randint(0, 3000)
+    while t < slot_ms + SLOT_DURATION_S * 1000:
+        value = max(0, value + rng.randint(-150, 150) if rng.random() < 0.9 else rng.randint(0, 6_000))
+        values.append(value)
+        times.append(t)
+        t += rng.randint(200, 8000)
+    return ChannelReadings(ChannelName=name, ValueList=values, ScadaReadTimeUnixMsList=times)
+
+
+def flow_readings(rng: random.Random, name: str, slot_ms: int) -> ChannelReadings:
+    value = rng.randint(0, 600)  # hundredths of gpm
+    values, times = [], []
+    for i in range(SLOT_DURATION_S):
+        value = max(0, value + rng.randint(-5, 5))
+        values.append(value)
+        times.append(slot_ms + 1000 * i + rng.randint(0, 10))
+    return ChannelReadings(ChannelName=name, ValueList=values, ScadaReadTimeUnixMsList=times)
+
+
+def make_report(temps: int, powers: int, flows: int, seed: int = 0) -> Report:
+    rng = random.Random(seed)
+    slot_start_s = int(time.time()) // SLOT_DURATION_S * SLOT_DURATION_S
+    slot_ms = slot_start_s * 1000
+    readings = (
+        [temperature_readings(rng, f"temp-{i}", slot_ms) for i in range(temps)]
+        + [power_readings(rng, f"pwr-{i}", slot_ms) for i in range(powers)]
+        + [flow_readings(rng, f"flow-{i}", slot_ms) for i in range(flows)]
+    )
+    return Report(
+        FromGNodeAlias="hw1.isone.me.versant.keene.beech.scada",
+        FromGNodeInstanceId=str(uuid.uuid4()),
+        AboutGNodeAlias="hw1.isone.me.versant.keene.beech.ta",
+        SlotStartUnixS=slot_start_s,
+        SlotDurationS=SLOT_DURATION_S,
+        ChannelReadingList=readings,
+        StateList=[],
+        FsmReportList=[],
+        MessageCreatedMs=slot_ms + SLOT_DURATION_S * 1000,
+        Id=str(uuid.uuid4()),
+    )
+
+
+def best_ms(stmt, repeat: int) -> float:
+    return 1000 * min(timeit.repeat(stmt, number=1, repeat=repeat))
+
+
+def run(temps: int, powers: int, flows: int, repeat: int) -> None:
+    report = make_report(temps, powers, flows)
+    full = report.model_dump_json().encode()
+    compact = report.compacted().model_dump_json().encode()
+    assert Report.model_validate_json(compact).expanded() == report
+    num_readings = sum(len(r.ValueList) for r in report.ChannelReadingList)
+    print(f"{len(report.ChannelReadingList)} channels, {num_readings} readings")
+    print(f"{'encoding':>8} {'bytes':>9} {'deflated':>9} {'encode ms':>10} {'decode ms':>10}")
+    cases = [
+        ("full", full, lambda: report.model_dump_json(), lambda: Report.model_validate_json(full)),
+        (
+            "compact",
+            compact,
+            lambda: report.compacted().model_dump_json(),
+            lambda: Report.model_validate_json(compact).expanded(),
+        ),
+    ]
+    for name, wire, encode, decode in cases:
+        print(
+            f"{name:>8} {len(wire):>9} {len(zlib.compress(wire)):>9} "
+            f"{best_ms(encode, repeat):>10.2f} {best_ms(decode, repeat):>10.2f}"
+        )
+    print(f"compact is {len(compact) / len(full):.1%} of full")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--temps", type=int, default=40)
+    parser.add_argument("--powers", type=int, default=12)
+    parser.add_argument("--flows", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.temps, args.powers, args.flows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
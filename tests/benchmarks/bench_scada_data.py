@@ -0,0 +1,89 @@
+"""Benchmark ScadaData.make_report / make_snapshot against channel count.
+
+Loads the test hardware layout, replaces its channels with N synthetic
+power channels, fills each with one report period of 1 Hz readings and
+times report and snapshot construction. Snapshot deltas are timed and
+sized with --dirty percent of the channels updated since the previous
+snapshot.
+
+    python tests/benchmarks/bench_scada_data.py [--counts 50 200 1000] [--dirty 10]
+"""
+import argparse
+import time
+import timeit
+import uuid
+from pathlib import Path
+
+from actors.config import ScadaSettings
+from actors.scada_data import ScadaData
+from gwsproto.data_classes.house_0_layout import House0Layout
+from gwsproto.data_classes.house_0_names import H0CN
+
+LAYOUT_PATH = Path(__file__).parent.parent / "config" / "hardware-layout.json"
+
+
+def synthetic_layout(num_channels: int) -> House0Layout:
+    layout = House0Layout.load(LAYOUT_PATH)
+    template = layout.data_channels[H0CN.store_pump_pwr]
+    component = template.captured_by_node.component
+    template_config = next(
+        c for c in component.gt.ConfigList if c.ChannelName == template.Name
+    )
+    channels = {}
+    for i in range(num_channels):
+        name = f"bench-ch-{i}"
+        channels[name] = template.model_copy(update={"Name": name, "Id": str(uuid.uuid4())})
+        component.gt.ConfigList.append(template_config.model_copy(update={"ChannelName": name}))
+    layout.data_channels = channels
+    layout.derived_channels = {}
+    return layout
+
+
+def fill(data: ScadaData, readings_per_channel: int) -> None:
+    start_ms = int(time.time() * 1000) - readings_per_channel * 1000
+    for ch in data.my_channels:
+        for i in range(readings_per_channel):
+            data.add_reading(ch.Name, i, start_ms + 1000 * i)
+
+
+def dirty_delta(data: ScadaData, dirty_percent: int):
+    now_ms = int(time.time() * 1000)
+    num_dirty = len(data.my_channels) * dirty_percent // 100
+    for ch in data.my_channels[:num_dirty]:
+        data.add_reading(ch.Name, 1, now_ms)
+    return data.make_snapshot_delta()
+
+
+def run(counts: list[int], readings_per_channel: int, dirty_percent: int, repeat: int) -> None:
+    settings = ScadaSettings(is_simulated=True)
+    print(
+        f"{'channels':>8} {'make_report ms':>15} {'make_snapshot ms':>17} "
+        f"{'delta ms':>9} {'snapshot B':>11} {'delta B':>8}"
+    )
+    for n in counts:
+        data = ScadaData(settings, synthetic_layout(n))
+        fill(data, readings_per_channel)
+        slot_start_s = int(time.time())
+        report_s = min(timeit.repeat(lambda: data.make_report(slot_start_s), number=1, repeat=repeat))
+        snap_s = min(timeit.repeat(data.make_snapshot, number=1, repeat=repeat))
+        keyframe = data.make_keyframe()
+        delta_s = min(timeit.repeat(lambda: dirty_delta(data, dirty_percent), number=1, repeat=repeat))
+        delta = dirty_delta(data, dirty_percent)
+        print(
+            f"{n:>8} {1000 * report_s:>15.2f} {1000 * snap_s:>17.2f} {1000 * delta_s:>9.2f} "
+            f"{len(keyframe.model_dump_json()):>11} {len(delta.model_dump_json()):>8}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--readings", type=int, default=10, help="readings per channel")
+    parser.add_argument("--dirty", type=int, default=10, help="percent of channels changed per delta")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.counts, args.readings, args.dirty, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark the primary Scada's inbound MQTT message path with an offline replay.
+
+Builds a Scada from the test hardware layout with MQTT links and all other
+actors stubbed (tests/utils/scada_replay.py) and replays a synthetic or
+recorded stream through codec decode, process_mqtt_message, _send_to and
+process_scada_message. Prints per-TypeName latency percentiles, event-loop
+lag and, with --allocations, tracemalloc peak bytes per message (latencies
+are inflated while tracing). --max-p99-us makes the run fail when any
+type's p99 latency exceeds it, for use as a CI regression check.
+
+    python tests/benchmarks/bench_scada_pipeline.py [--count 5000] [--rate 0]
+        [--record stream.ndjson | --save stream.ndjson] [--allocations] [--max-p99-us 2000]
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+from tests.utils.scada_replay import (
+    ReplayResult,
+    load_stream,
+    make_scada_app,
+    offline_env,
+    percentile,
+    replay,
+    save_stream,
+    synthetic_stream,
+)
+
+
+def print_result(result: ReplayResult) -> float:
+    """Prints the result table; returns the worst per-type p99 latency in us"""
+    print(
+        f"{result.count} messages in {result.elapsed_s:.2f} s "
+        f"({result.count / result.elapsed_s:.0f} msg/s)"
+    )
+    header = f"{'type':>26} {'n':>6} {'p50 us':>8} {'p95 us':>8} {'p99 us':>8} {'max us':>8}"
+    if result.alloc_bytes:
+        header += f" {'peak KB p50':>12}"
+    print(header)
+    worst_p99_us = 0.0
+    for type_name, latencies in sorted(result.latency_s.items()):
+        us = [1e6 * x for x in latencies]
+        worst_p99_us = max(worst_p99_us, percentile(us, 99))
+        line = (
+            f"{type_name:>26} {len(us):>6} {percentile(us, 50):>8.1f} {percentile(us, 95):>8.1f} "
+            f"{percentile(us, 99):>8.1f} {max(us):>8.1f}"
+        )
+        if result.alloc_bytes:
+            line += f" {percentile(result.alloc_bytes[type_name], 50) / 1024:>12.1f}"
+        print(line)
+    lag_ms = [1000 * x for x in result.lag_s]
+    print(
+        f"event-loop lag: p50 {percentile(lag_ms, 50):.2f} ms  p99 {percentile(lag_ms, 99):.2f} ms  "
+        f"max {max(lag_ms, default=0):.2f} ms  ({len(lag_ms)} samples)"
+    )
+    print(f"published: {dict(result.published)}  delivered: {dict(result.delivered)}")
+    if result.errors:
+        print(f"errors: {dict(result.errors)}")
+    return worst_p99_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--rate", type=float, default=0, help="messages per second; 0 for as fast as possible")
+    parser.add_argument("--record", type=Path, help="replay this saved stream instead of a synthetic one")
+    parser.add_argument("--save", type=Path, help="save the synthetic stream here")
+    parser.add_argument("--allocations", action="store_true")
+    parser.add_argument("--max-p99-us", type=float)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp, offline_env(Path(tmp)):
+        stream = None
+        if args.record is not None:
+            stream = load_stream(args.record)
+        elif args.save is not None:
+            stream = synthetic_stream(make_scada_app(), args.count)
+            save_stream(args.save, stream)
+        result = replay(stream, args.count, args.rate, args.allocations)
+    worst_p99_us = print_result(result)
+    if result.errors or (args.max_p99_us is not None and worst_p99_us > args.max_p99_us):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Benchmark Butterworth filtering of flow module ticklists.
+
+Builds a ticklist of N hall sensor ticks, resamples it the way
+ApiFlowModule does for BasicButterWorth, and times the original
+sample-by-sample filter against the current engine.
+
+    python tests/benchmarks/bench_signal_processing.py [--ticks 20 500 5000]
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from drivers.pipe_flow_sensor.signal_processing import butter_lowpass, filtering
+from tests.drivers.test_signal_processing import reference_filtering
+
+CUTOFF_HZ = 2
+
+
+def resampled_frequencies(num_ticks: int) -> tuple[np.ndarray, float]:
+    rng = np.random.default_rng(num_ticks)
+    periods_ns = 1e9 / (20 + 5 * np.sin(np.arange(num_ticks) / 50)) * rng.uniform(0.97, 1.03, num_ticks)
+    timestamps = np.cumsum(periods_ns)
+    frequencies = 1e9 / np.diff(timestamps)
+    timestamps = timestamps[:-1]
+    f_s = 5 * frequencies.max()
+    sampled = np.linspace(timestamps[0], timestamps[-1], int((timestamps[-1] - timestamps[0]) / 1e9 * f_s))
+    return np.interp(sampled, timestamps, frequencies), f_s
+
+
+def run(tick_counts: list[int], repeat: int) -> None:
+    print(f"{'ticks':>6} {'samples':>8} {'original ms':>12} {'engine ms':>10}")
+    for n in tick_counts:
+        x, f_s = resampled_frequencies(n)
+        b, a = butter_lowpass(N=5, Wn=CUTOFF_HZ, fs=f_s)
+        original_s = min(timeit.repeat(lambda: reference_filtering(b, a, x), number=1, repeat=repeat))
+        engine_s = min(
+            timeit.repeat(
+                lambda: filtering(*butter_lowpass(N=5, Wn=CUTOFF_HZ, fs=f_s), x),
+                number=1,
+                repeat=repeat,
+            )
+        )
+        print(f"{n:>6} {len(x):>8} {1000 * original_s:>12.2f} {1000 * engine_s:>10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, nargs="+", default=[20, 500, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.ticks, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark the three-layer storage model: 10 random-init k-means runs vs exact splits.
+
+    python tests/benchmarks/bench_storage_model.py [--layers 9 36] [--repeat 50]
+"""
+import argparse
+import random
+import timeit
+
+import numpy as np
+
+from gwsproto.conversions.storage_model import _three_layer_storage_model, optimal_splits, remove_inversions
+from tests.test_misc.test_storage_model import sse
+
+
+def kmeans(data, k=3, max_iters=100, tol=1e-4):
+    """Ltn.kmeans before the exact solver"""
+    data = np.array(data).reshape(-1, 1)
+    centroids = data[np.random.choice(len(data), k, replace=False)]
+    for _ in range(max_iters):
+        labels = np.argmin(np.abs(data - centroids.T), axis=1)
+        new_centroids = np.zeros_like(centroids)
+        for i in range(k):
+            cluster_points = data[labels == i]
+            if len(cluster_points) > 0:
+                new_centroids[i] = cluster_points.mean()
+            else:
+                new_centroids[i] = data[np.random.choice(len(data))]
+        if np.all(np.abs(new_centroids - centroids) < tol):
+            break
+        centroids = new_centroids
+    return labels
+
+
+def kmeans_runs(data: list[float]) -> list[list[float]]:
+    """The best of 10 runs by top cluster temperature, as Ltn chose it"""
+    runs = []
+    for _ in range(10):
+        labels = kmeans(data)
+        clusters = [sorted([data[i] for i in range(len(data)) if labels[i] == c], reverse=True) for c in range(3)]
+        top = max(clusters, key=lambda x: np.mean(x) if len(x) > 0 else 0)
+        runs.append((sum(top) / len(top), clusters))
+    return max(runs, key=lambda r: r[0])[1]
+
+
+def run(layer_counts: list[int], repeat: int) -> None:
+    rng = random.Random(0)
+    print(f"{'layers':>7} {'kmeans ms':>10} {'exact us':>9} {'cached us':>10} {'kmeans SSE':>11} {'exact SSE':>10}")
+    for n in layer_counts:
+        temps = sorted((rng.uniform(90, 175) for _ in range(n)), reverse=True)
+        temps = remove_inversions(temps)
+        kmeans_ms = 1000 * min(timeit.repeat(lambda: kmeans_runs(temps), number=1, repeat=max(3, repeat // 10)))
+        exact_us = 1e6 * min(timeit.repeat(
+            lambda: (_three_layer_storage_model.cache_clear(), _three_layer_storage_model(tuple(temps))),
+            number=1, repeat=repeat,
+        ))
+        cached_us = 1e6 * min(timeit.repeat(lambda: _three_layer_storage_model(tuple(temps)), number=1, repeat=repeat))
+        splits = optimal_splits(temps, 3)
+        exact_sse = sse([temps[a:b] for a, b in zip([0, *splits], splits)])
+        kmeans_sse = sse(kmeans_runs(temps))
+        print(f"{n:>7} {kmeans_ms:>10.2f} {exact_us:>9.1f} {cached_us:>10.2f} {kmeans_sse:>11.1f} {exact_sse:>10.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--layers", type=int, nargs="+", default=[9, 36])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    run(args.layers, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
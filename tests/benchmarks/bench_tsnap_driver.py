@@ -0,0 +1,46 @@
+"""Benchmark TSnap multipurpose sensor polls on simulated ADS1115 chips.
+
+Times read_telemetry_values for a fully populated 12-terminal TSnap in
+per-channel and bulk mode, and counts input mux switches per poll.
+
+    python tests/benchmarks/bench_tsnap_driver.py [--polls 2000] [--conversion-ms 0]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from drivers.multipurpose_sensor.ads1115_backend import SimulatedAds1115Backend
+from tests.drivers.test_tsnap_driver import tsnap_driver, tsnap_layout
+
+
+def run(polls: int, conversion_ms: float) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        layout = tsnap_layout(Path(tmp) / "hardware-layout.json", list(range(1, 13)))
+    print(f"{'mode':>12} {'us/poll':>10} {'mux switches/poll':>18}")
+    for bulk_read in (False, True):
+        backend = SimulatedAds1115Backend(conversion_s=conversion_ms / 1000)
+        driver, channels = tsnap_driver(layout, backend, bulk_read=bulk_read)
+        driver.read_telemetry_values(channels)
+        switches_before = backend.mux_switches
+        start = time.perf_counter()
+        for _ in range(polls):
+            driver.read_telemetry_values(channels)
+        elapsed = time.perf_counter() - start
+        mode = "bulk" if bulk_read else "per-channel"
+        print(
+            f"{mode:>12} {1e6 * elapsed / polls:>10.1f}"
+            f" {(backend.mux_switches - switches_before) / polls:>18.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--polls", type=int, default=2000)
+    parser.add_argument("--conversion-ms", type=float, default=0.0, help="simulated time per ADC conversion")
+    args = parser.parse_args()
+    run(args.polls, args.conversion_ms)
+
+
+if __name__ == "__main__":
+    main()
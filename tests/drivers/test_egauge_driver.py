@@ -0,0 +1,179 @@
+"""Test eGauge block reads against a local Modbus server"""
+import logging
+import math
+import socket
+import struct
+from pathlib import Path
+
+import pytest
+from pyModbusTCP.server import DataBank
+from pyModbusTCP.server import ModbusServer
+
+from actors.config import ScadaSettings
+from drivers.power_meter.egauge.modbus_dummy import DummyDataBank
+from drivers.power_meter.egauge.registers import RegisterBlock
+from drivers.power_meter.egauge.registers import decode_f32s
+from drivers.power_meter.egauge.registers import plan_register_blocks
+from drivers.power_meter.egauge_4030__power_meter_driver import EGaugeReadFailed
+from drivers.power_meter.egauge_4030__power_meter_driver import EGaugeReadOutOfRange
+from drivers.power_meter.egauge_4030__power_meter_driver import EGuage4030_PowerMeterDriver
+from gwsproto.data_classes.hardware_layout import HardwareLayout
+from gwsproto.data_classes.house_0_names import H0N
+from layout_gen import LayoutDb, StubConfig
+from layout_gen.egauge import EgaugeChannelConfig, PowerMeterGenConfig, add_egauge
+
+
+class CountingDataBank(DummyDataBank):
+    """DummyDataBank that serves the registers it was given instead of
+    random ones, and counts the reads it serves"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.reads: list[tuple[int, int]] = []
+
+    def get_input_registers(self, address, number=1, srv_info=None):
+        if srv_info is not None:
+            self.reads.append((address, number))
+        return DataBank.get_input_registers(self, address, number)
+
+
+def f32_registers(value: float) -> list[int]:
+    return list(struct.unpack(">HH", struct.pack(">f", value)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def modbus_server():
+    servers = []
+
+    def start(data_bank: DataBank) -> int:
+        port = free_port()
+        server = ModbusServer(host="127.0.0.1", port=port, no_block=True, data_bank=data_bank)
+        server.start()
+        servers.append(server)
+        return port
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def egauge_layout(path: Path, addresses: dict[str, int], port: int) -> HardwareLayout:
+    db = LayoutDb(add_stubs=True, stub_config=StubConfig(add_stub_power_meter=False))
+    add_egauge(
+        db,
+        PowerMeterGenConfig(
+            HwUid="egauge-test",
+            ModbusHost="127.0.0.1",
+            ModbusPort=port,
+            ChannelConfigs=[
+                EgaugeChannelConfig(AboutNodeName=name, EGaugeAddress=address)
+                for name, address in addresses.items()
+            ],
+        ),
+    )
+    db.write(path)
+    return HardwareLayout.load(path)
+
+
+def egauge_driver(layout: HardwareLayout, **kwargs) -> EGuage4030_PowerMeterDriver:
+    settings = ScadaSettings()
+    driver = EGuage4030_PowerMeterDriver(
+        component=layout.node(H0N.primary_power_meter).component,
+        settings=settings,
+        logger=logging.getLogger(settings.logging.base_log_name),
+        **kwargs,
+    )
+    assert driver.start().value.connected
+    return driver
+
+
+def test_plan_register_blocks():
+    assert plan_register_blocks([]) == []
+    assert plan_register_blocks([10, 12, 14]) == [RegisterBlock(10, 6)]
+    assert plan_register_blocks([14, 10, 12, 10]) == [RegisterBlock(10, 6)]
+    assert plan_register_blocks([10, 20]) == [RegisterBlock(10, 2), RegisterBlock(20, 2)]
+    assert plan_register_blocks([10, 20], max_gap=8) == [RegisterBlock(10, 12)]
+    assert plan_register_blocks([10, 20], max_gap=7) == [RegisterBlock(10, 2), RegisterBlock(20, 2)]
+    addresses = list(range(0, 300, 2))
+    blocks = plan_register_blocks(addresses)
+    assert [block.count for block in blocks] == [124, 124, 52]
+    assert all(block.count <= 125 for block in plan_register_blocks(addresses, max_gap=1000))
+    with pytest.raises(ValueError):
+        plan_register_blocks([0], registers_per_value=4, max_registers=3)
+
+
+def test_decode_f32s():
+    values = [0.0, -1.5, 1234.25, 2.0**100, -7.0]
+    registers = [0xFFFF] + [word for value in values for word in f32_registers(value)]
+    assert decode_f32s(registers, [1 + 2 * i for i in range(len(values))]).tolist() == values
+
+
+def test_egauge_block_reads(tmp_path, modbus_server):
+    powers = {"heat-pump": 2500.7, "store-pump": 65.2, "dist-pump": -3.9, "boost": 40000.0, "far-away": 12.0}
+    addresses = {"heat-pump": 9000, "store-pump": 9002, "dist-pump": 9006, "boost": 9008, "far-away": 9500}
+    data_bank = CountingDataBank()
+    for name, address in addresses.items():
+        data_bank.set_input_registers(address, f32_registers(powers[name]))
+    port = modbus_server(data_bank)
+    layout = egauge_layout(tmp_path / "hardware-layout.json", addresses, port)
+    channels = [layout.data_channels[f"{name}-pwr"] for name in addresses]
+
+    driver = egauge_driver(layout, max_block_gap_registers=2)
+    result = driver.read_telemetry_values(channels).value
+    assert sorted(data_bank.reads) == [(9000, 10), (9500, 2)]
+    assert {ch.Name: value for ch, value in result.value.items()} == {
+        "heat-pump-pwr": 2500,
+        "store-pump-pwr": 65,
+        "dist-pump-pwr": -3,
+        "boost-pwr": 2**15 - 1,
+        "far-away-pwr": 12,
+    }
+    assert len(result.warnings) == 1
+    assert isinstance(result.warnings[0], EGaugeReadOutOfRange)
+    assert result.warnings[0].offset == 9008
+
+    data_bank.reads.clear()
+    assert driver.read_power_w(layout.data_channels["dist-pump-pwr"]).value.value == -3
+    assert data_bank.reads == [(9006, 2)]
+
+    data_bank.reads.clear()
+    driver = egauge_driver(layout, max_block_gap_registers=0)
+    driver.read_telemetry_values(channels)
+    assert sorted(data_bank.reads) == [(9000, 4), (9006, 4), (9500, 2)]
+
+
+def test_egauge_matches_modbus_dummy(tmp_path, modbus_server):
+    """Against the development dummy server, each block decodes to the same
+    values as reading its registers one float at a time"""
+    data_bank = DummyDataBank()
+    port = modbus_server(data_bank)
+    addresses = {f"load-{i}": 9000 + 2 * i for i in range(12)}
+    layout = egauge_layout(tmp_path / "hardware-layout.json", addresses, port)
+    channels = [layout.data_channels[f"{name}-pwr"] for name in addresses]
+    driver = egauge_driver(layout)
+    result = driver.read_telemetry_values(channels).value
+    registers = data_bank.get_input_registers(9000, 24)
+    for i, ch in enumerate(channels):
+        (expected,) = struct.unpack(">f", struct.pack(">HH", *registers[2 * i: 2 * i + 2]))
+        if math.isfinite(expected):
+            assert result.value[ch] == max(-2**15, min(int(expected), 2**15 - 1))
+        else:
+            assert result.value[ch] is None
+
+
+def test_egauge_not_finite(tmp_path, modbus_server):
+    data_bank = CountingDataBank()
+    data_bank.set_input_registers(9000, f32_registers(float("nan")) + f32_registers(7.0))
+    port = modbus_server(data_bank)
+    layout = egauge_layout(tmp_path / "hardware-layout.json", {"a": 9000, "b": 9002}, port)
+    result = egauge_driver(layout).read_telemetry_values(
+        [layout.data_channels["a-pwr"], layout.data_channels["b-pwr"]]
+    ).value
+    assert {ch.Name: value for ch, value in result.value.items()} == {"a-pwr": None, "b-pwr": 7}
+    assert [type(warning) for warning in result.warnings] == [EGaugeReadFailed]
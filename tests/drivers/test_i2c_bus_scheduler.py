@@ -0,0 +1,135 @@
+"""I2cBusScheduler on the simulated i2c wire"""
+import threading
+import time
+
+import pytest
+
+from drivers.i2c.bus_scheduler import (
+    I2cBusScheduler,
+    I2cBusTimeout,
+    I2cPriority,
+    SimulatedI2cWire,
+)
+
+
+def test_wire_collisions():
+    wire = SimulatedI2cWire()
+    errors = []
+
+    def worker(address: int) -> None:
+        for _ in range(20):
+            try:
+                wire.transaction(address, 0.001)
+            except OSError:
+                errors.append(address)
+
+    threads = [threading.Thread(target=worker, args=(a,)) for a in (0x20, 0x48)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert wire.collisions > 0
+    assert errors
+
+
+def test_scheduled_transactions_do_not_collide():
+    wire = SimulatedI2cWire()
+    bus = I2cBusScheduler(max_wait_s={I2cPriority.Telemetry: 5, I2cPriority.Actuation: 5})
+
+    def worker(address: int, priority: I2cPriority) -> None:
+        for _ in range(20):
+            bus.transact(address, lambda: wire.transaction(address, 0.001), priority)
+
+    threads = [
+        threading.Thread(target=worker, args=(0x20, I2cPriority.Actuation)),
+        threading.Thread(target=worker, args=(0x48, I2cPriority.Telemetry)),
+        threading.Thread(target=worker, args=(0x49, I2cPriority.Telemetry)),
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert wire.collisions == 0
+    assert wire.transactions == 60
+    metrics = bus.metrics()
+    assert metrics["Devices"]["0x20"]["Transactions"] == 20
+    assert metrics["Queues"]["Actuation"]["Granted"] == 20
+    assert metrics["Queues"]["Telemetry"]["Granted"] == 40
+    assert 0 < metrics["Utilization"] <= 1
+
+
+def test_actuation_goes_first():
+    bus = I2cBusScheduler(max_wait_s={I2cPriority.Telemetry: 5, I2cPriority.Actuation: 5})
+    order = []
+    holding = threading.Event()
+    release = threading.Event()
+
+    def hold() -> None:
+        holding.set()
+        release.wait()
+
+    holder = threading.Thread(target=bus.transact, args=(0x48, hold))
+    holder.start()
+    holding.wait()
+    waiters = [
+        threading.Thread(target=bus.transact, args=(0x49, lambda: order.append("telemetry"))),
+        threading.Thread(
+            target=bus.transact,
+            args=(0x20, lambda: order.append("actuation"), I2cPriority.Actuation),
+        ),
+    ]
+    for t in waiters:
+        t.start()
+        while len(bus._waiting) < waiters.index(t) + 1:
+            time.sleep(0.001)
+    release.set()
+    for t in [holder, *waiters]:
+        t.join()
+    assert order == ["actuation", "telemetry"]
+
+
+def test_retries_and_timeouts():
+    bus = I2cBusScheduler(retries=2)
+    attempts = []
+
+    def flaky() -> int:
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise OSError("[Errno 121] Remote I/O error")
+        return 7
+
+    assert bus.transact(0x5E, flaky, I2cPriority.Actuation) == 7
+    stats = bus.devices[0x5E]
+    assert (stats.transactions, stats.errors, stats.retries) == (3, 2, 2)
+
+    def broken() -> None:
+        raise OSError("[Errno 121] Remote I/O error")
+
+    with pytest.raises(OSError):
+        bus.transact(0x5E, broken, retries=0)
+    assert bus.devices[0x5E].errors == 3
+
+    # device_stats is a copy that later transactions leave alone
+    snapshot = bus.device_stats()
+    bus.transact(0x5E, lambda: None)
+    bus.transact(0x21, lambda: None)
+    assert snapshot[0x5E].transactions == 4
+    assert bus.devices[0x5E].transactions == 5
+    assert 0x21 not in snapshot
+
+    bus.max_wait_s[I2cPriority.Telemetry] = 0.01
+    holding = threading.Event()
+    release = threading.Event()
+    holder = threading.Thread(
+        target=bus.transact, args=(0x20, lambda: (holding.set(), release.wait()))
+    )
+    holder.start()
+    holding.wait()
+    with pytest.raises(I2cBusTimeout):
+        bus.transact(0x48, lambda: None)
+    release.set()
+    holder.join()
+    assert bus.devices[0x48].timeouts == 1
+    assert not bus._waiting
+    # the bus is free again
+    assert bus.transact(0x48, lambda: 1) == 1
@@ -0,0 +1,92 @@
+"""Test the TSnap multipurpose sensor driver on simulated ADS1115 chips"""
+from pathlib import Path
+
+from actors.config import ScadaSettings
+from drivers.multipurpose_sensor.ads1115_backend import SimulatedAds1115Backend
+from drivers.multipurpose_sensor.gridworks_tsnap1__multipurpose_sensor_driver import (
+    GridworksTsnap1_MultipurposeSensorDriver,
+)
+from gwsproto.data_classes.hardware_layout import HardwareLayout
+from gwsproto.data_classes.house_0_names import H0N
+from gwsproto.enums import LogLevel
+from layout_gen import LayoutDb, SensorNodeGenCfg, StubConfig, TSnapMultipurposeGenCfg, add_tsnap_multipurpose
+
+# AdsI2cAddressList from add_tsnap_multipurpose: terminals 1-4, 5-8, 9-12
+ADS_ADDRESSES = [0x4b, 0x49, 0x48]
+
+
+def tsnap_layout(path: Path, terminal_blocks: list[int]) -> HardwareLayout:
+    db = LayoutDb(add_stubs=True, stub_config=StubConfig())
+    add_tsnap_multipurpose(
+        db,
+        TSnapMultipurposeGenCfg(
+            HWUid="tsnap-test",
+            SensorCfgs=[
+                SensorNodeGenCfg(ChannelName=f"temp-{idx}", TerminalBlockIdx=idx)
+                for idx in terminal_blocks
+            ],
+        ),
+    )
+    db.write(path)
+    return HardwareLayout.load(path)
+
+
+def tsnap_driver(layout: HardwareLayout, backend: SimulatedAds1115Backend, bulk_read: bool = False):
+    driver = GridworksTsnap1_MultipurposeSensorDriver(
+        component=layout.node(H0N.analog_temp).component,
+        settings=ScadaSettings(),
+        ads_backend=backend,
+        bulk_read=bulk_read,
+    )
+    assert driver.start().value.value == (backend.addresses is None)
+    channels = [ch for ch in layout.data_channels.values() if ch.CapturedByNodeName == H0N.analog_temp]
+    return driver, sorted(channels, key=lambda ch: driver.read_plan[ch.Name].terminal_block_idx)
+
+
+def test_tsnap_read_plan(tmp_path):
+    layout = tsnap_layout(tmp_path / "hardware-layout.json", [1, 2, 6, 12])
+    voltages = {(0x4b, 0): 2.4, (0x4b, 1): 1.9, (0x49, 1): 0, (0x48, 3): 2.5}
+    backend = SimulatedAds1115Backend(voltage_source=lambda address, pin: voltages[(address, pin)])
+    driver, channels = tsnap_driver(layout, backend)
+
+    plan = driver.read_plan["temp-6"]
+    assert (plan.chip_idx, plan.pin) == (1, 1)
+    assert driver.read_plan["temp-12"].pin == 3
+    handles = {name: p.analog_in for name, p in driver.read_plan.items()}
+
+    outcome = driver.read_telemetry_values(channels).value
+    assert outcome.value["temp-1"] == int(driver.voltage_to_c(2.4).value * 1000)
+    assert outcome.value["temp-2"] > outcome.value["temp-1"]
+    assert outcome.value["temp-6"] is None  # short
+    assert any("short" in c.msg for c in outcome.comments)
+    assert backend.conversions == 4
+    # handles are reused from poll to poll
+    driver.read_telemetry_values(channels)
+    assert all(driver.read_plan[name].analog_in is h for name, h in handles.items())
+    assert backend.conversions == 7  # temp-6 is backing off
+
+
+def test_tsnap_missing_chip(tmp_path):
+    layout = tsnap_layout(tmp_path / "hardware-layout.json", [1, 5])
+    backend = SimulatedAds1115Backend(addresses={0x4b})
+    driver, channels = tsnap_driver(layout, backend)
+    outcome = driver.read_telemetry_values(channels).value
+    assert outcome.value == {"temp-1": int(driver.voltage_to_c(2.4).value * 1000), "temp-5": None}
+    assert outcome.comments[0].level == LogLevel.Warning
+    assert "Missing i2c addr" in outcome.comments[0].msg
+
+
+def test_tsnap_bulk_read(tmp_path):
+    terminals = list(range(1, 13))
+    layout = tsnap_layout(tmp_path / "hardware-layout.json", terminals)
+    per_channel_backend = SimulatedAds1115Backend(voltage_source=lambda address, pin: 1 + pin / 4 + address / 1000)
+    bulk_backend = SimulatedAds1115Backend(voltage_source=per_channel_backend.voltage_source)
+    per_channel, channels = tsnap_driver(layout, per_channel_backend)
+    bulk, _ = tsnap_driver(layout, bulk_backend, bulk_read=True)
+
+    for _ in range(3):
+        assert bulk.read_telemetry_values(channels).value.value == per_channel.read_telemetry_values(channels).value.value
+    assert bulk_backend.conversions == per_channel_backend.conversions == 36
+    # Each bulk pass after the first starts on the pin its chip last converted
+    assert bulk_backend.mux_switches == 12 + 2 * 9
+    assert per_channel_backend.mux_switches == 36
@@ -1,8 +1,8 @@
 
 from gwsproto.named_types import FloParamsHouse0
 
-def test_flo_params_house0() -> None:
-    d = {
+def flo_params_house0_dict() -> dict:
+    return {
     "TypeName": "flo.params.house0",
     "Version": "007",
     "GNodeAlias": "hw1.isone.me.versant.keene.beech.scada",
@@ -308,5 +308,8 @@ def test_flo_params_house0() -> None:
     "FloGitCommit": "Unknown"
     }
 
+
+def test_flo_params_house0() -> None:
+    d = flo_params_house0_dict()
     d2 = FloParamsHouse0.model_validate(d).model_dump(exclude_none=True)
     assert d2 == d
\ No newline at end of file
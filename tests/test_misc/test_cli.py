@@ -57,6 +57,7 @@ def test_gws_cli_completes() -> None:
         ["ltn", "config", "--env-file", str(env_path)],
         ["ltn", "run", "--help"],
         ["ltn", "run", "--dry-run", "--env-file", str(env_path)],
+        ["ltn", "archive", "--summary", "--env-file", str(env_path)],
         ["config", "--env-file", str(env_path)],
         ["layout"],
         ["layout", "mktest", "--help"],
@@ -76,6 +76,7 @@ def test_scada_settings_defaults(default_test_env, clean_test_env, clean_scada_e
         pico_cycler_state_logging=False,
         power_meter_logging_level=logging.WARNING,
         relay_multiplexer_logging_level=logging.INFO,
+        dfr_refresh_seconds=300,
         local_mqtt=exp_local_mqtt.model_dump(),
         gridworks_mqtt=MQTTClient(
             tls=TLSInfo(use_tls=False).update_tls_paths(
@@ -86,7 +87,11 @@ def test_scada_settings_defaults(default_test_env, clean_test_env, clean_scada_e
         proactor=ProactorSettings().model_dump(),
         paho_logging=False,
         seconds_per_report=300,
+        compact_reports=False,
         seconds_per_snapshot=30,
+        snapshots_per_keyframe=1,
+        loop_health_seconds=300,
+        slow_callback_ms=100,
         async_power_reporting_threshold=0.02,
         paths=Paths().model_dump(),
         logging=LoggingSettings().model_dump(),
@@ -0,0 +1,98 @@
+"""Test the HardwareLayout handle and hierarchy indexes against linear scans"""
+import uuid
+from typing import Optional
+
+import pytest
+
+from gwsproto.data_classes.hardware_layout import HardwareLayout
+from gwsproto.data_classes.sh_node import ShNode
+from gwsproto.enums import ActorClass
+from gwsproto.errors import DcError
+from gwsproto.named_types import SpaceheatNodeGt
+
+
+def synthetic_layout(num_nodes: int, fan_out: int = 4) -> HardwareLayout:
+    """A tree of num_nodes actors. Node n{i} reports to n{(i - 1) // fan_out},
+    with the same chain for its handle and its actor hierarchy name."""
+    nodes: dict[str, ShNode] = {}
+    handles: list[str] = []
+    for i in range(num_nodes):
+        name = f"n{i}"
+        handle = name if i == 0 else f"{handles[(i - 1) // fan_out]}.{name}"
+        handles.append(handle)
+        nodes[name] = ShNode(
+            ShNodeId=str(uuid.uuid4()),
+            Name=name,
+            ActorClass=ActorClass.NoActor,
+            Handle=handle,
+            ActorHierarchyName=handle,
+        )
+    return HardwareLayout(
+        layout={}, cacs={}, components={}, nodes=nodes, data_channels={}, derived_channels={}
+    )
+
+
+def scan_node_from_handle(layout: HardwareLayout, handle: str) -> Optional[ShNode]:
+    return next((n for n in layout.nodes.values() if n.handle == handle), None)
+
+
+def scan_direct_reports(layout: HardwareLayout, node: ShNode) -> list[ShNode]:
+    def boss(n: ShNode) -> Optional[ShNode]:
+        boss_handle = HardwareLayout.boss_handle(n.handle)
+        return scan_node_from_handle(layout, boss_handle) if boss_handle else n
+    return [n for n in layout.nodes.values() if boss(n) == node]
+
+
+def assert_matches_scans(layout: HardwareLayout) -> None:
+    for node in layout.nodes.values():
+        assert layout.node_from_handle(node.handle) is scan_node_from_handle(layout, node.handle)
+        assert layout.node_by_handle(node.handle) is node
+        assert layout.direct_reports(node) == scan_direct_reports(layout, node)
+        boss_handle = HardwareLayout.boss_handle(node.handle)
+        assert layout.boss_node(node) is (
+            scan_node_from_handle(layout, boss_handle) if boss_handle else node
+        )
+    assert layout.node_from_handle("no.such.handle") is None
+    assert layout.node_by_handle("no.such.handle") is None
+
+
+def test_indexes_match_scans():
+    layout = synthetic_layout(60)
+    assert_matches_scans(layout)
+    assert [n.name for n in layout.direct_reports(layout.node("n0"))] == ["n0", "n1", "n2", "n3", "n4"]
+    assert layout.parent_node(layout.node("n5")) is layout.node("n1")
+    assert layout.parent_node(layout.node("n0")) is None
+
+    layout.add_node(
+        SpaceheatNodeGt(
+            ShNodeId=str(uuid.uuid4()),
+            Name="extra",
+            ActorClass=ActorClass.NoActor,
+            Handle="n0.n1.extra",
+        )
+    )
+    assert_matches_scans(layout)
+    assert layout.direct_reports(layout.node("n1"))[-1].name == "extra"
+
+
+def test_command_tree_change():
+    layout = synthetic_layout(60)
+    # Move n2 and everything under it to report to n7
+    moved = [n for n in layout.nodes.values() if n.handle.startswith("n0.n2")]
+    for node in moved:
+        node.Handle = node.handle.replace("n0.n2", "n0.n1.n7.n2", 1)
+    layout.index_command_tree()
+    assert_matches_scans(layout)
+    assert layout.node("n2") in layout.direct_reports(layout.node("n7"))
+    assert layout.node("n2") not in layout.direct_reports(layout.node("n0"))
+
+    # A lookup by a handle that was reassigned without reindexing still
+    # finds the right node
+    layout.node("n3").Handle = "n0.n1.n3"
+    assert layout.node_from_handle("n0.n3") is None
+    assert layout.node_from_handle("n0.n1.n3") is layout.node("n3")
+
+    layout.node("n7").Handle = "n0.n1.n8.n7"
+    layout.index_command_tree()
+    with pytest.raises(DcError):
+        layout.boss_node(layout.node("n2"))
@@ -0,0 +1,115 @@
+import base64
+import uuid
+
+import pytest
+from pydantic import ValidationError
+
+from gwsproto.conversions.varint import (
+    decode_varints,
+    encode_varints,
+    pack_deltas,
+    unpack_deltas,
+    unzigzag,
+    zigzag,
+)
+from gwsproto.named_types import ChannelReadings, ChannelReadingsCompact, Report, SendLayout
+
+SLOT_START_S = 1_760_000_100
+
+
+def test_zigzag_varints():
+    ints = [0, -1, 1, -2, 2, 63, -64, 64, 2**31, -(2**31), 2**63 - 1, -(2**63), 10**30]
+    assert [zigzag(n) for n in ints[:5]] == [0, 1, 2, 3, 4]
+    assert [unzigzag(zigzag(n)) for n in ints] == ints
+    data = encode_varints(zigzag(n) for n in ints)
+    assert [unzigzag(z) for z in decode_varints(data)] == ints
+    assert encode_varints([0, 127, 128, 300]) == bytes([0, 0x7F, 0x80, 0x01, 0xAC, 0x02])
+    assert decode_varints(b"") == []
+    with pytest.raises(ValueError):
+        decode_varints(bytes([0xAC]))
+
+
+@pytest.mark.parametrize(
+    "values,start",
+    [
+        ([], 0),
+        ([5], 0),
+        ([0, 0, 0], 0),
+        ([-40, 1_000_000, -(2**63), 2**63 - 1, 7], 0),
+        ([SLOT_START_S * 1000 + 999, SLOT_START_S * 1000 - 5, SLOT_START_S * 1000 + 300_000], SLOT_START_S * 1000),
+    ],
+)
+def test_pack_deltas_round_trip(values, start):
+    blob = pack_deltas(values, start)
+    assert unpack_deltas(blob, start) == values
+    base64.b64decode(blob, validate=True)
+
+
+def test_channel_readings_compact_round_trip():
+    slot_ms = SLOT_START_S * 1000
+    readings = ChannelReadings(
+        ChannelName="hp-idu-pwr",
+        ValueList=[0, 1230, 1228, -3, 4_200_000, 4_199_990],
+        # out of order and before the slot start are both allowed
+        ScadaReadTimeUnixMsList=[slot_ms - 2000, slot_ms + 1003, slot_ms + 998, slot_ms + 6001, slot_ms + 299_999, slot_ms + 299_999],
+    )
+    compact = ChannelReadingsCompact.from_readings(readings, SLOT_START_S)
+    assert compact.Count == 6
+    assert compact.to_readings(SLOT_START_S) == readings
+    with pytest.raises(ValueError):
+        ChannelReadingsCompact.from_lists("hp-idu-pwr", [1, 2], [slot_ms], SLOT_START_S)
+    bad = compact.model_copy(update={"Count": 5})
+    with pytest.raises(ValueError):
+        bad.to_readings(SLOT_START_S)
+
+
+def make_report(channel_reading_list) -> Report:
+    return Report(
+        FromGNodeAlias="hw1.isone.me.versant.keene.beech.scada",
+        FromGNodeInstanceId=str(uuid.uuid4()),
+        AboutGNodeAlias="hw1.isone.me.versant.keene.beech.ta",
+        SlotStartUnixS=SLOT_START_S,
+        SlotDurationS=300,
+        ChannelReadingList=channel_reading_list,
+        StateList=[],
+        FsmReportList=[],
+        MessageCreatedMs=(SLOT_START_S + 300) * 1000,
+        Id=str(uuid.uuid4()),
+    )
+
+
+def test_report_compact_round_trip():
+    slot_ms = SLOT_START_S * 1000
+    channel_reading_list = [
+        ChannelReadings(
+            ChannelName=f"ch-{i}",
+            ValueList=[(i * 37 + j * 11) % 500 - 100 for j in range(60)],
+            ScadaReadTimeUnixMsList=[slot_ms + 5000 * j + (i * j) % 17 for j in range(60)],
+        )
+        for i in range(10)
+    ]
+    report = make_report(channel_reading_list)
+    assert report.expanded() is report
+    compact = report.compacted()
+    assert all(isinstance(r, ChannelReadingsCompact) for r in compact.ChannelReadingList)
+    wire = compact.model_dump_json()
+    assert len(wire) < len(report.model_dump_json()) / 2
+    received = Report.model_validate_json(wire)
+    assert received.ChannelReadingList == compact.ChannelReadingList
+    assert received.expanded() == report
+    assert received.expanded().model_dump_json() == report.model_dump_json()
+
+    mixed = make_report([compact.ChannelReadingList[0], channel_reading_list[1]])
+    assert Report.model_validate_json(mixed.model_dump_json()).expanded().ChannelReadingList == channel_reading_list[:2]
+
+    payload = compact.model_dump()
+    payload["ChannelReadingList"][0]["TypeName"] = "channel.readings.bogus"
+    with pytest.raises(ValidationError):
+        Report.model_validate(payload)
+
+
+def test_send_layout_report_encodings():
+    old = SendLayout.model_validate(
+        {"FromGNodeAlias": "hw1.isone.me.versant.keene.beech.ltn", "MessageCreatedMs": SLOT_START_S * 1000, "TypeName": "send.layout", "Version": "001"}
+    )
+    assert old.ReportEncodings is None
@@ -0,0 +1,66 @@
+"""Test the three-layer storage model against brute-force clustering"""
+import itertools
+import random
+
+import pytest
+
+from gwsproto.conversions.storage_model import (
+    SINGLE_CLUSTER_THERMOCLINE,
+    ThreeLayerStorage,
+    _three_layer_storage_model,
+    optimal_splits,
+    remove_inversions,
+    three_layer_storage_model,
+)
+
+
+def sse(groups: list[list[float]]) -> float:
+    return sum(sum((v - sum(g) / len(g)) ** 2 for v in g) for g in groups if g)
+
+
+def brute_force_sse(values: list[float], k: int) -> float:
+    """Least within-cluster sum of squares over every labeling, contiguous or not"""
+    best = float("inf")
+    for labels in itertools.product(range(k), repeat=len(values)):
+        if len(set(labels)) < k:
+            continue
+        groups = [[v for v, label in zip(values, labels) if label == c] for c in range(k)]
+        best = min(best, sse(groups))
+    return best
+
+
+def test_remove_inversions():
+    assert remove_inversions([150, 140, 120]) == [150, 140, 120]
+    assert remove_inversions([150, 120, 130, 100]) == [150, 125, 125, 100]
+    profile = remove_inversions([100, 110, 120, 130, 140, 150])
+    assert profile == sorted(profile, reverse=True)
+
+
+@pytest.mark.parametrize("k", [1, 2, 3])
+@pytest.mark.parametrize("seed", range(6))
+def test_optimal_splits_are_exact_kmeans(k, seed):
+    rng = random.Random(seed)
+    values = sorted((round(rng.uniform(80, 170), 1) for _ in range(rng.randint(k, 8))), reverse=True)
+    splits = optimal_splits(values, k)
+    groups = [values[a:b] for a, b in zip([0, *splits], splits)]
+    assert sum(len(g) for g in groups) == len(values)
+    assert all(groups)
+    assert sse(groups) == pytest.approx(brute_force_sse(values, k), abs=1e-6)
+
+
+def test_three_layer_storage_model():
+    temps = [171.2, 170.4, 169.8, 150.1, 148.3, 120.5, 101.0, 99.2, 98.7]
+    assert three_layer_storage_model(temps) == ThreeLayerStorage(170, 149, 105, 3, 5)
+    # inversions are averaged out first
+    assert three_layer_storage_model([160, 158, 162, 130, 100, 100]) == ThreeLayerStorage(160, 130, 100, 3, 4)
+    assert three_layer_storage_model([160, 160, 160, 100, 100]) == ThreeLayerStorage(160, 160, 100, 3, 3)
+    assert three_layer_storage_model([140] * 9) == ThreeLayerStorage(
+        140, 140, 140, SINGLE_CLUSTER_THERMOCLINE, SINGLE_CLUSTER_THERMOCLINE
+    )
+    with pytest.raises(ValueError):
+        three_layer_storage_model([])
+
+    _three_layer_storage_model.cache_clear()
+    for _ in range(3):
+        three_layer_storage_model(temps)
+    assert _three_layer_storage_model.cache_info().hits == 2
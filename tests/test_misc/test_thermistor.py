@@ -0,0 +1,51 @@
+"""Test the shared thermistor lookup table against the exact beta formula"""
+import random
+
+import numpy as np
+import pytest
+
+from gwsproto.conversions.thermistor import (
+    beta_temp_c,
+    beta_volts,
+    thermistor_table,
+    volts_to_temp_c,
+)
+
+# TSnap (ohms, 4.85 V supply) and tank module (kohms, 3.3 V pico)
+CIRCUITS = [
+    dict(beta=3977, r0=10000, r_divider=10000, supply_v=4.85),
+    dict(beta=3950, r0=10, r_divider=5.65, supply_v=3.3),
+]
+
+
+@pytest.mark.parametrize("circuit", CIRCUITS)
+@pytest.mark.parametrize("max_error_c", [0.01, 0.001])
+def test_table_error_bound(circuit, max_error_c):
+    table = thermistor_table(**circuit, max_error_c=max_error_c)
+    rng = random.Random(0)
+    volts = [rng.uniform(table.v_min, table.v_max) for _ in range(20000)]
+    exact = [beta_temp_c(v, **circuit) for v in volts]
+    scalar_error = max(abs(table.temp_c(v) - t) for v, t in zip(volts, exact))
+    assert scalar_error <= max_error_c
+    array_error = np.max(np.abs(volts_to_temp_c(np.array(volts), **circuit, max_error_c=max_error_c) - exact))
+    assert array_error <= max_error_c
+    assert table is thermistor_table(**circuit, max_error_c=max_error_c)
+
+
+def test_table_range_and_fallback():
+    circuit = CIRCUITS[0]
+    table = thermistor_table(**circuit)
+    assert beta_temp_c(table.v_min, **circuit) == pytest.approx(150)
+    assert beta_temp_c(table.v_max, **circuit) == pytest.approx(-40)
+    assert beta_temp_c(beta_volts(60, **circuit), **circuit) == pytest.approx(60)
+    # beyond the table the exact formula is used
+    hot = table.v_min / 2
+    assert volts_to_temp_c(hot, **circuit) == beta_temp_c(hot, **circuit)
+    # disconnected / shorted
+    for volts in [0, circuit["supply_v"], 5.0]:
+        with pytest.raises(ValueError):
+            volts_to_temp_c(volts, **circuit)
+    temps = volts_to_temp_c(np.array([0, hot, 2.4, 5.0]), **circuit)
+    assert np.isnan(temps[0]) and np.isnan(temps[3])
+    assert temps[1] == pytest.approx(beta_temp_c(hot, **circuit))
+    assert temps[2] == pytest.approx(volts_to_temp_c(2.4, **circuit), abs=1e-9)
@@ -0,0 +1,276 @@
+"""Offline replay of MQTT traffic through the primary Scada's message path.
+
+ScadaReplay takes an instantiated (never started) ScadaApp, stubs its MQTT
+publishing, event generation and every communicator's process_message, and
+feeds encoded messages through
+
+    codec decode -> Scada.process_mqtt_message -> _send_to -> process_scada_message
+
+on a running event loop at a fixed rate, or as fast as the loop allows
+(rate_hz=0). It records per-TypeName handling latency, event-loop lag
+sampled by a ticker task and, optionally, tracemalloc allocations.
+
+Streams are lists of ReplayMessage: synthetic_stream builds one from the
+layout, and save_stream / load_stream keep them as newline-delimited JSON so
+a recorded stream can be replayed again.
+"""
+import asyncio
+import json
+import random
+import time
+import tracemalloc
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, NamedTuple, Optional, Sequence
+
+from gwproactor.message import MessageType, MQTTClientMessage, MQTTMessageModel, MQTTReceiptPayload
+from gwproactor_test.certs import copy_keys, uses_tls
+from gwproactor_test.clean import DefaultTestEnv
+from gwproto import Message
+from gwproto.messages import ProblemEvent
+
+from actors.scada import Scada
+from gwsproto.data_classes.house_0_names import H0N
+from gwsproto.named_types import SendSnap, SingleReading, SyncedReadings
+from scada_app import ScadaApp
+from tests.conftest import TEST_HARDWARE_LAYOUT_PATH
+
+LAG_INTERVAL_S = 0.005
+
+
+class ReplayMessage(NamedTuple):
+    link_name: str
+    topic: str
+    payload: bytes
+
+
+class ReplayResult(NamedTuple):
+    latency_s: dict[str, list[float]]
+    lag_s: list[float]
+    alloc_bytes: dict[str, list[int]]
+    errors: Counter
+    published: Counter
+    delivered: Counter
+    elapsed_s: float
+
+    @property
+    def count(self) -> int:
+        return sum(len(v) for v in self.latency_s.values())
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+@contextmanager
+def offline_env(xdg_home: Path) -> Iterator[None]:
+    """The test environment (no local .env, the test hardware layout) outside pytest"""
+    with DefaultTestEnv(
+        xdg_home=xdg_home, src_test_layout=TEST_HARDWARE_LAYOUT_PATH, use_test_dotenv=False
+    ).context():
+        yield
+
+
+def make_scada_app() -> ScadaApp:
+    settings = ScadaApp.get_settings()
+    settings.is_simulated = True
+    if uses_tls(settings):
+        copy_keys("scada", settings)
+    settings.paths.mkdirs()
+    return ScadaApp(app_settings=settings).instantiate()
+
+
+def synthetic_stream(app: ScadaApp, count: int, seed: int = 0) -> list[ReplayMessage]:
+    """Scada2 readings and events on the local link and snapshot requests from
+    the LTN, in roughly the proportions a house sees"""
+    rng = random.Random(seed)
+    scada = app.scada
+    codecs = app.proactor.links
+    channel_names = sorted(scada.layout.data_channels)
+    ltn_alias = scada.layout.ltn_g_node_alias
+
+    def single_reading() -> Message:
+        return Message(
+            Src=H0N.secondary_scada,
+            Dst=H0N.primary_scada,
+            Payload=SingleReading(
+                ChannelName=rng.choice(channel_names),
+                Value=rng.randint(0, 100_000),
+                ScadaReadTimeUnixMs=int(time.time() * 1000),
+            ),
+        )
+
+    def synced_readings() -> Message:
+        names = rng.sample(channel_names, 5)
+        return Message(
+            Src=H0N.secondary_scada,
+            Dst=H0N.primary_scada,
+            Payload=SyncedReadings(
+                ChannelNameList=names,
+                ValueList=[rng.randint(0, 100_000) for _ in names],
+                ScadaReadTimeUnixMs=int(time.time() * 1000),
+            ),
+        )
+
+    def problem_event() -> Message:
+        return Message(
+            Src=H0N.secondary_scada,
+            Dst=H0N.primary_scada,
+            Payload=ProblemEvent(
+                Src=H0N.secondary_scada,
+                ProblemType="warning",
+                Summary="relay state mismatch",
+                Details="expected RelayClosed got RelayOpen",
+                MessageId=str(uuid.uuid4()),
+            ),
+        )
+
+    def send_snap() -> Message:
+        return Message(Src=ltn_alias, Dst=H0N.primary_scada, Payload=SendSnap(FromGNodeAlias=ltn_alias))
+
+    kinds = [
+        (Scada.LOCAL_MQTT, single_reading, 60),
+        (Scada.LOCAL_MQTT, synced_readings, 30),
+        (Scada.LOCAL_MQTT, problem_event, 8),
+        (Scada.LTN_MQTT, send_snap, 2),
+    ]
+    stream = []
+    for _ in range(count):
+        link_name, make, _ = rng.choices(kinds, weights=[k[2] for k in kinds])[0]
+        message = make()
+        stream.append(
+            ReplayMessage(link_name, message.mqtt_topic(), codecs.decoder(link_name).encode(message))
+        )
+    return stream
+
+
+def save_stream(path: Path, stream: Sequence[ReplayMessage]) -> None:
+    with Path(path).open("w") as f:
+        for m in stream:
+            f.write(json.dumps({"Link": m.link_name, "Topic": m.topic, "Payload": m.payload.decode()}) + "\n")
+
+
+def load_stream(path: Path) -> list[ReplayMessage]:
+    with Path(path).open() as f:
+        return [
+            ReplayMessage(d["Link"], d["Topic"], d["Payload"].encode())
+            for d in map(json.loads, filter(str.strip, f))
+        ]
+
+
+class ScadaReplay:
+    def __init__(self, app: ScadaApp):
+        self.app = app
+        self.scada = app.scada
+        self.links = app.proactor.links
+        self.published: Counter = Counter()
+        self.delivered: Counter = Counter()
+        self._stub_outputs()
+
+    def _stub_outputs(self) -> None:
+        proactor = self.app.proactor
+
+        def publish_message(link_name: str, message: Message[Any], *args: Any, **kwargs: Any) -> None:
+            self.published[link_name] += 1
+
+        def generate_event(event: Any) -> None:
+            self.published["event"] += 1
+
+        proactor.publish_message = publish_message
+        proactor.generate_event = generate_event
+        for name in self.app.get_communicator_names():
+            communicator = self.app.get_communicator(name)
+            if communicator is self.scada:
+                continue
+
+            def process_message(message: Message[Any], name: str = name) -> None:
+                self.delivered[name] += 1
+
+            communicator.process_message = process_message
+
+    def handle(self, m: ReplayMessage) -> str:
+        """Decode and process one message; returns its TypeName"""
+        decoded = self.links.decode(m.link_name, m.topic, m.payload)
+        receipt = MQTTClientMessage(
+            message_type=MessageType.mqtt_message,
+            payload=MQTTReceiptPayload(
+                client_name=m.link_name,
+                userdata=None,
+                message=MQTTMessageModel(topic=m.topic, payload=m.payload),
+            ),
+        )
+        self.scada.process_mqtt_message(receipt, decoded)
+        return decoded.Payload.TypeName
+
+    async def run(
+        self,
+        stream: Sequence[ReplayMessage],
+        rate_hz: float = 0,
+        trace_allocations: bool = False,
+    ) -> ReplayResult:
+        latency: dict[str, list[float]] = defaultdict(list)
+        alloc: dict[str, list[int]] = defaultdict(list)
+        errors: Counter = Counter()
+        lag: list[float] = []
+        done = asyncio.Event()
+
+        async def sample_lag() -> None:
+            while not done.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(LAG_INTERVAL_S)
+                lag.append(max(0.0, time.perf_counter() - start - LAG_INTERVAL_S))
+
+        ticker = asyncio.create_task(sample_lag())
+        if trace_allocations:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            for i, m in enumerate(stream):
+                delay = start + i / rate_hz - time.perf_counter() if rate_hz else 0
+                await asyncio.sleep(max(0.0, delay))
+                if trace_allocations:
+                    tracemalloc.reset_peak()
+                    before = tracemalloc.get_traced_memory()[0]
+                t0 = time.perf_counter()
+                try:
+                    type_name = self.handle(m)
+                except Exception as e:
+                    errors[type(e).__name__] += 1
+                    continue
+                latency[type_name].append(time.perf_counter() - t0)
+                if trace_allocations:
+                    alloc[type_name].append(tracemalloc.get_traced_memory()[1] - before)
+            elapsed = time.perf_counter() - start
+        finally:
+            if trace_allocations:
+                tracemalloc.stop()
+            done.set()
+            await ticker
+        return ReplayResult(
+            latency_s=dict(latency),
+            lag_s=lag,
+            alloc_bytes=dict(alloc),
+            errors=errors,
+            published=Counter(self.published),
+            delivered=Counter(self.delivered),
+            elapsed_s=elapsed,
+        )
+
+
+def replay(
+    stream: Optional[Sequence[ReplayMessage]] = None,
+    count: int = 1000,
+    rate_hz: float = 0,
+    trace_allocations: bool = False,
+) -> ReplayResult:
+    """Build a Scada in the current environment and replay stream (or a
+    synthetic stream of count messages) through it"""
+    app = make_scada_app()
+    if stream is None:
+        stream = synthetic_stream(app, count)
+    return asyncio.run(ScadaReplay(app).run(stream, rate_hz, trace_allocations))